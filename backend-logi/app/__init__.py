@@ -3,9 +3,14 @@ Application Flask - Express Cargo Backend
 API REST pour la gestion de colis et logistique
 """
 
+import time
+
+# Début du démarrage (budget de démarrage, voir create_app)
+_IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -14,9 +19,34 @@ from config import config
 import logging
 import os
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Session: SELECT des vues @replica_read vers le réplica (voir app/utils/db_routing.py)"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        from app.utils.db_routing import route_bind
+        return route_bind(self, engine, clause)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
-migrate = Migrate()
+migrate = None  # Flask-Migrate, voir init_migrate
+
+
+def init_migrate(app):
+    """
+    Flask-Migrate (alembic: ~80 ms d'import), chargé seulement pour les
+    commandes `flask ...` et railway_migrate.py, pas par les workers.
+    """
+    global migrate
+    if migrate is None:
+        from flask_migrate import Migrate  # import différé (démarrage)
+        migrate = Migrate()
+    migrate.init_app(app, db)
+
 
 def get_rate_limit_key():
     """
@@ -61,6 +91,10 @@ def create_app(config_name='default'):
     Returns:
         Flask app configurée
     """
+    global _IMPORT_STARTED
+    started = _IMPORT_STARTED or time.perf_counter()
+    _IMPORT_STARTED = None  # Le temps d'import ne compte que pour la première app
+    
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
@@ -68,9 +102,17 @@ def create_app(config_name='default'):
     if config_name == 'production':
         config[config_name].init_app(app)
     
+    # Derrière un reverse proxy: schéma et hôte publics pour les URL absolues
+    proxy_hops = app.config.get('PROXY_FIX_HOPS', 0)
+    if proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=0, x_proto=proxy_hops, x_host=proxy_hops, x_port=proxy_hops)
+    
     # Initialisation des extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    import click
+    if click.get_current_context(silent=True) is not None:
+        init_migrate(app)  # CLI Flask (flask db ...)
     jwt.init_app(app)
     limiter.init_app(app)
     
@@ -167,10 +209,49 @@ def create_app(config_name='default'):
     from app.routes.support import support_bp
     app.register_blueprint(support_bp, url_prefix='/api/support')
     
+    # Routes synchronisation différentielle (app mobile)
+    from app.routes.sync import sync_bp
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    
     # Routes Super-Admin (niveau plateforme)
     from app.routes.superadmin import superadmin_bp
     app.register_blueprint(superadmin_bp, url_prefix='/api/superadmin')
     
+    # Routage lecture seule vers le réplica (DATABASE_REPLICA_URL)
+    from app.utils.db_routing import init_db_routing
+    init_db_routing(app)
+    
+    # Cache des limites de plan (invalidé aux changements d'abonnement)
+    from app.services.enforcement_service import init_enforcement
+    init_enforcement(app)
+    
+    # Cache des documents générés: pré-rendu des reçus au commit (DOCUMENT_PRERENDER)
+    from app.services.document_cache import init_document_cache
+    init_document_cache(app)
+    
+    # Instrumentation SQL par requête (Server-Timing, N+1, budgets)
+    from app.utils.sql_instrumentation import init_sql_instrumentation
+    init_sql_instrumentation(app)
+    
+    # Métriques Prometheus (/metrics)
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Profilage à la demande (PROFILER_ENABLED)
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+    
+    # ==================== AUDIT ====================
+    
+    from app.utils.audit import init_audit
+    init_audit(app)
+    
+    # ==================== TEMPS RÉEL ====================
+    
+    if app.config.get('REALTIME_ENABLED'):
+        from app.services.realtime_service import init_socketio
+        init_socketio(app)
+    
     # ==================== ERROR HANDLERS ====================
     
     @app.errorhandler(400)
@@ -222,7 +303,7 @@ def create_app(config_name='default'):
         with app.app_context():
             db.create_all()
     
-    # Seed system permissions (idempotent - ne crée que si manquantes)
+    # Seed system permissions (une lecture si seed_versions est à jour)
     with app.app_context():
         try:
             from app.models.permission import seed_system_permissions
@@ -230,6 +311,13 @@ def create_app(config_name='default'):
         except Exception as e:
             logger.warning(f"Could not seed permissions (table may not exist yet): {e}")
     
-    logger.info(f"Application démarrée en mode {config_name}")
+    # Budget de démarrage (scale-out: nouveaux workers rapidement disponibles)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    app.config['STARTUP_TIME_MS'] = round(elapsed_ms)
+    budget_ms = app.config.get('STARTUP_BUDGET_MS', 1000)
+    if budget_ms and elapsed_ms > budget_ms:
+        logger.warning(f"Démarrage lent: {elapsed_ms:.0f} ms (budget {budget_ms} ms)")
+    
+    logger.info(f"Application démarrée en mode {config_name} ({elapsed_ms:.0f} ms)")
     
     return app
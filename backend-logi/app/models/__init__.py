@@ -30,6 +30,12 @@ from app.models.platform_config import PlatformConfig, PlatformPaymentProvider,
 from app.models.device import UserDevice, DeviceVerificationLog
 from app.models.tenant_payment_provider import TenantPaymentProvider, TENANT_PROVIDER_TEMPLATES
 from app.models.support_message import SupportMessage
+from app.models.unread_counter import UnreadCounter
+from app.models.tenant_usage import TenantUsage
+from app.models.sync import SyncTombstone
+from app.models.webhook_event import WebhookEvent
+from app.models.tracking_alias import TrackingAlias
+from app.models.seed_version import SeedVersion
 
 __all__ = [
     # Enums
@@ -90,5 +96,15 @@ __all__ = [
     'TenantPaymentProvider',
     'TENANT_PROVIDER_TEMPLATES',
     # Support
-    'SupportMessage'
+    'SupportMessage',
+    # Compteurs
+    'UnreadCounter',
+    'TenantUsage',
+    # Synchronisation
+    'SyncTombstone',
+    # Webhooks
+    'WebhookEvent',
+    'TrackingAlias',
+    # Seed
+    'SeedVersion'
 ]
@@ -4,6 +4,7 @@ Stocke les origines, destinations, tarifs et paramètres
 """
 
 from app import db
+from sqlalchemy.orm.attributes import flag_modified
 from datetime import datetime
 import uuid
 
@@ -46,6 +47,7 @@ class TenantConfig(db.Model):
         if not self.config_data:
             self.config_data = {}
         self.config_data['origins'] = value
+        flag_modified(self, 'config_data')
     
     @property
     def destinations(self):
@@ -57,6 +59,7 @@ class TenantConfig(db.Model):
         if not self.config_data:
             self.config_data = {}
         self.config_data['destinations'] = value
+        flag_modified(self, 'config_data')
     
     @property
     def shipping_rates(self):
@@ -68,6 +71,7 @@ class TenantConfig(db.Model):
         if not self.config_data:
             self.config_data = {}
         self.config_data['shipping_rates'] = value
+        flag_modified(self, 'config_data')
     
     def get_rate(self, origin, destination, transport_mode):
         """
@@ -15,6 +15,12 @@ class Notification(db.Model):
     """
     __tablename__ = 'notifications'
     
+    # Liste paginée des notifications (non lues) d'un utilisateur
+    __table_args__ = (
+        db.Index('idx_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+        db.Index('idx_notification_user_updated', 'user_id', 'updated_at'),
+    )
+    
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     
@@ -42,6 +48,7 @@ class Notification(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         """Sérialisation en dictionnaire"""
@@ -14,7 +14,8 @@ class OTPCode(db.Model):
     __tablename__ = 'otp_codes'
     
     __table_args__ = (
-        db.Index('idx_otp_user_purpose', 'tenant_id', 'user_id', 'purpose'),
+        # Dernier code d'un (utilisateur, but): parcours de l'index, sans tri
+        db.Index('idx_otp_user_purpose_created', 'tenant_id', 'user_id', 'purpose', 'created_at'),
         db.Index('idx_otp_expires', 'expires_at'),
     )
     
@@ -17,6 +17,11 @@ def _money(value):
     return float(Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
 
 
+# Statuts où le colis attend au guichet de retrait (destination)
+PICKUP_READY_STATUSES = ('arrived_port', 'customs', 'out_for_delivery')
+_PICKUP_READY_WHERE = db.text(f"status IN ({', '.join(repr(s) for s in PICKUP_READY_STATUSES)})")
+
+
 class Package(db.Model):
     """
     Colis/Marchandise
@@ -32,6 +37,11 @@ class Package(db.Model):
         db.Index('idx_package_tenant_created', 'tenant_id', 'created_at'),
         db.Index('idx_package_departure', 'departure_id'),
         db.Index('idx_package_carrier_tracking', 'carrier_tracking'),
+        # Synchronisation différentielle (GET /api/sync/changes)
+        db.Index('idx_package_client_updated', 'client_id', 'updated_at'),
+        # Guichet de retrait: file des colis prêts par agence (index partiel)
+        db.Index('idx_package_pickup_ready', 'tenant_id', 'destination_warehouse_id', 'updated_at',
+                 postgresql_where=_PICKUP_READY_WHERE, sqlite_where=_PICKUP_READY_WHERE),
     )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -150,7 +160,7 @@ class Package(db.Model):
     amount_currency = db.Column(db.String(3), default='XAF')
     paid_amount = db.Column(db.Numeric(18, 2, asdecimal=False), default=0)  # Montant déjà payé
     
-    # Photos (JSON array d'URLs)
+    # Photos (JSON: url, ou ref / thumbnail_ref en stockage local, voir photos_with_urls)
     photos = db.Column(db.JSON, default=list)
     
     # Dates
@@ -164,8 +174,8 @@ class Package(db.Model):
     # Peut être modifié par le client (avant réception)
     is_editable = db.Column(db.Boolean, default=True)
     
-    # Notes internes (staff only)
-    internal_notes = db.Column(db.Text)
+    # Notes internes (staff only) - jamais sérialisées: chargées à la demande
+    internal_notes = db.deferred(db.Column(db.Text))
     
     # ==================== RETRAIT / PICKUP ====================
     # Conditions de retrait
@@ -180,23 +190,24 @@ class Package(db.Model):
     
     # Dates et preuves
     picked_up_at = db.Column(db.DateTime)
-    pickup_signature = db.Column(db.Text)  # Signature base64
-    pickup_photo = db.Column(db.String(255))  # URL photo preuve
-    pickup_notes = db.Column(db.Text)  # Notes du retrait
+    pickup_signature_ref = db.Column(db.String(255))  # Référence blob de la signature (app/services/blob_store.py)
+    pickup_photo = db.Column(db.String(255))  # Référence blob ou URL photo preuve
+    pickup_notes = db.deferred(db.Column(db.Text))  # Notes du retrait (détail dans Pickup)
     
     @property
     def is_paid(self):
         """Vérifie si le colis est entièrement payé"""
-        return self.paid_amount >= self.amount if self.amount else True
+        return (self.paid_amount or 0) >= self.amount if self.amount else True
     
     @property
     def payment_status(self):
         """Retourne le statut de paiement"""
         if not self.amount or self.amount == 0:
             return 'no_charge'
-        if self.paid_amount >= self.amount:
+        paid = self.paid_amount or 0
+        if paid >= self.amount:
             return 'paid'
-        if self.paid_amount > 0:
+        if paid > 0:
             return 'partial'
         return 'unpaid'
     
@@ -209,7 +220,7 @@ class Package(db.Model):
     def can_be_picked_up(self):
         """Vérifie si le colis peut être retiré"""
         # Statut doit être arrivé ou en cours de livraison
-        if self.status not in ['arrived_port', 'customs', 'out_for_delivery']:
+        if self.status not in PICKUP_READY_STATUSES:
             return False
         
         # Si paiement requis, vérifier qu'il est payé
@@ -230,6 +241,25 @@ class Package(db.Model):
         else:
             return 'not_ready'
     
+    def photos_with_urls(self) -> list:
+        """
+        Photos avec URL de lecture: stockage local conservé en références,
+        URL construites ici (hôte de la requête courante)
+        """
+        if not self.photos:
+            return []
+        from app.services.blob_store import resolve_url, stored_ref
+
+        photos = []
+        for photo in self.photos:
+            photo = dict(photo)
+            photo['url'] = resolve_url(self.tenant_id, photo.get('ref') or stored_ref(photo.get('url')))
+            thumbnail = photo.get('thumbnail_ref') or stored_ref(photo.get('thumbnail'))
+            if thumbnail:
+                photo['thumbnail'] = resolve_url(self.tenant_id, thumbnail)
+            photos.append(photo)
+        return photos
+
     # Relations
     history = db.relationship('PackageHistory', backref='package', lazy='dynamic', 
                               order_by='PackageHistory.created_at.desc()')
@@ -301,13 +331,14 @@ class Package(db.Model):
             'paid_amount': _money(self.paid_amount),
             'payment_status': self.payment_status,
             'remaining_amount': _money(self.remaining_amount),
-            'photos': self.photos or [],
+            'photos': self.photos_with_urls(),
             'is_editable': self.is_editable,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'received_at': self.received_at.isoformat() if self.received_at else None,
             'shipped_at': self.shipped_at.isoformat() if self.shipped_at else None,
             'estimated_delivery': self.estimated_delivery.isoformat() if self.estimated_delivery else None,
-            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None
+            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
         
         if include_history:
@@ -327,6 +358,9 @@ class Package(db.Model):
 class PackageHistory(db.Model):
     """Historique des changements de statut"""
     __tablename__ = 'package_history'
+    __table_args__ = (
+        db.Index('idx_history_package_created', 'package_id', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     package_id = db.Column(db.String(36), db.ForeignKey('packages.id'), nullable=False)
@@ -343,6 +377,7 @@ class PackageHistory(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'package_id': self.package_id,
             'status': self.status,
             'location': self.location,
             'notes': self.notes,
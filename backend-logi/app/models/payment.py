@@ -14,6 +14,9 @@ class Payment(db.Model):
     Peut être lié à un ou plusieurs colis
     """
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('idx_payment_client_updated', 'client_id', 'updated_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
@@ -41,6 +44,7 @@ class Payment(db.Model):
     
     # Métadonnées
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.String(36), db.ForeignKey('users.id'))  # Staff qui a enregistré
     
     # Relations
@@ -135,27 +135,55 @@ SYSTEM_PERMISSIONS = [
 ]
 
 
-def seed_system_permissions():
-    """Crée les permissions système par défaut"""
+SYSTEM_PERMISSIONS_SEED = 'system_permissions'
+
+
+def seed_system_permissions(force: bool = False):
+    """
+    Crée les permissions système manquantes
+
+    Une requête pour lire les noms existants, un INSERT pour les manquantes.
+    Sauté (une seule lecture) si l'empreinte de SYSTEM_PERMISSIONS est déjà
+    enregistrée dans seed_versions, sauf force=True.
+    """
     from app import db
+    from app.models.seed_version import SeedVersion
+    from sqlalchemy.exc import IntegrityError, SQLAlchemyError
     
-    created_count = 0
+    digest = SeedVersion.compute_digest(SYSTEM_PERMISSIONS)
+    if not force and SeedVersion.is_current(SYSTEM_PERMISSIONS_SEED, digest):
+        return 0
     
-    for resource, action, description in SYSTEM_PERMISSIONS:
-        # Vérifier si la permission existe déjà
-        name = f"{resource}.{action}"
-        existing = Permission.query.filter_by(name=name).first()
-        
-        if not existing:
+    wanted = {f"{resource}.{action}": (resource, action, description)
+              for resource, action, description in SYSTEM_PERMISSIONS}
+    existing = {
+        name for (name,) in db.session.query(Permission.name).filter(Permission.name.in_(list(wanted)))
+    }
+    
+    created_count = 0
+    for name, (resource, action, description) in wanted.items():
+        if name not in existing:
             permission = Permission.create_permission(resource, action, description)
             permission.is_system = True
             db.session.add(permission)
             created_count += 1
     
     if created_count > 0:
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Seed concurrent d'un autre processus: les permissions existent
+            db.session.rollback()
+            return 0
         print(f"✓ {created_count} permissions système créées")
     else:
         print("✓ Permissions système déjà présentes")
     
-    return created_count
\ No newline at end of file
+    try:
+        SeedVersion.mark(SYSTEM_PERMISSIONS_SEED, digest)
+        db.session.commit()
+    except SQLAlchemyError:
+        # seed_versions absente (migration non appliquée) ou écriture concurrente
+        db.session.rollback()
+    
+    return created_count
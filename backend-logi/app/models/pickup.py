@@ -18,6 +18,7 @@ class Pickup(db.Model):
     __table_args__ = (
         db.Index('idx_pickup_tenant_date', 'tenant_id', 'picked_up_at'),
         db.Index('idx_pickup_package', 'package_id'),
+        db.Index('idx_pickup_batch', 'batch_id'),
     )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -25,6 +26,9 @@ class Pickup(db.Model):
     package_id = db.Column(db.String(36), db.ForeignKey('packages.id'), nullable=False)
     client_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     
+    # Retrait groupé (plusieurs colis au même guichet): reçu et notification communs
+    batch_id = db.Column(db.String(36))
+    
     # Qui retire le colis
     pickup_by = db.Column(db.String(20), default='client')  # client, proxy
     proxy_name = db.Column(db.String(100))
@@ -40,8 +44,8 @@ class Pickup(db.Model):
     payment_reference = db.Column(db.String(100))
     
     # Confirmation
-    signature = db.Column(db.Text)  # Base64 de la signature
-    photo_proof = db.Column(db.String(500))  # URL de la photo
+    signature_ref = db.Column(db.String(255))  # Référence blob de la signature (app/services/blob_store.py)
+    photo_proof = db.Column(db.String(500))  # Référence blob (stockage local) ou URL de la photo
     
     # Lieu et staff
     warehouse_id = db.Column(db.String(100))
@@ -57,12 +61,20 @@ class Pickup(db.Model):
     staff = db.relationship('User', foreign_keys=[staff_id])
     payment = db.relationship('Payment', backref='pickup')
     
+    @property
+    def photo_url(self):
+        """URL de la photo (stockage local: construite depuis la référence)"""
+        from app.services.blob_store import resolve_url, stored_ref
+
+        return resolve_url(self.tenant_id, stored_ref(self.photo_proof))
+    
     def to_dict(self, include_package=False, include_client=False):
         """Sérialisation en dictionnaire"""
         data = {
             'id': self.id,
             'package_id': self.package_id,
             'client_id': self.client_id,
+            'batch_id': self.batch_id,
             'pickup_by': self.pickup_by,
             'proxy_name': self.proxy_name,
             'proxy_phone': self.proxy_phone,
@@ -75,10 +87,10 @@ class Pickup(db.Model):
             'amount_collected': self.payment_collected,
             'payment_method': self.payment_method,
             'payment_reference': self.payment_reference,
-            'has_signature': bool(self.signature),
+            'has_signature': bool(self.signature_ref),
             'has_photo': bool(self.photo_proof),
             # Alias pour compatibilité frontend
-            'photo_url': self.photo_proof,
+            'photo_url': self.photo_url,
             'warehouse_id': self.warehouse_id,
             'picked_up_at': self.picked_up_at.isoformat() if self.picked_up_at else None,
             # Alias pour compatibilité frontend
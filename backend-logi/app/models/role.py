@@ -116,60 +116,57 @@ DEFAULT_ROLES = {
 
 
 def seed_default_roles(tenant_id=None):
-    """Crée les rôles par défaut pour un tenant ou système"""
+    """
+    Crée les rôles par défaut pour un tenant ou système
+
+    Une requête pour les rôles existants, une pour les permissions, un
+    INSERT groupé pour les associations rôle-permission.
+    """
     from app.models.permission import Permission
     
-    created_count = 0
+    existing = {
+        name for (name,) in db.session.query(Role.name).filter(Role.tenant_id.is_(None) if tenant_id is None
+                                                               else Role.tenant_id == tenant_id)
+    }
+    missing = {name: cfg for name, cfg in DEFAULT_ROLES.items() if name not in existing}
+    if not missing:
+        return 0
+    
+    # Permissions nécessaires, en une requête
+    permission_query = db.session.query(Permission.name, Permission.id)
+    if not any(cfg['permissions'] == ['*'] for cfg in missing.values()):
+        needed = {perm for cfg in missing.values() for perm in cfg['permissions']}
+        permission_query = permission_query.filter(Permission.name.in_(needed))
+    permission_ids = dict(permission_query.all())
     
-    for role_name, role_config in DEFAULT_ROLES.items():
-        # Vérifier si le rôle existe déjà
-        existing = Role.query.filter_by(
+    roles = {}
+    for role_name, role_config in missing.items():
+        roles[role_name] = Role(
             tenant_id=tenant_id,
-            name=role_name
-        ).first()
-        
-        if not existing:
-            role = Role(
-                tenant_id=tenant_id,
-                name=role_name,
-                display_name=role_config['display_name'],
-                description=role_config['description'],
-                hierarchy_level=role_config['hierarchy_level'],
-                is_system=(tenant_id is None)
-            )
-            
-            db.session.add(role)
-            db.session.flush()  # Pour obtenir l'ID
-            
-            # Assigner les permissions
-            permissions = role_config['permissions']
-            if permissions == ['*']:
-                # Super admin: toutes les permissions
-                all_permissions = Permission.query.all()
-                for permission in all_permissions:
-                    db.session.execute(
-                        role_permissions.insert().values(
-                            role_id=role.id,
-                            permission_id=permission.id
-                        )
-                    )
-            else:
-                # Permissions spécifiques
-                for perm_name in permissions:
-                    permission = Permission.query.filter_by(name=perm_name).first()
-                    if permission:
-                        db.session.execute(
-                            role_permissions.insert().values(
-                                role_id=role.id,
-                                permission_id=permission.id
-                            )
-                        )
-            
-            created_count += 1
+            name=role_name,
+            display_name=role_config['display_name'],
+            description=role_config['description'],
+            hierarchy_level=role_config['hierarchy_level'],
+            is_system=(tenant_id is None)
+        )
+    db.session.add_all(roles.values())
+    db.session.flush()  # Pour obtenir les IDs
+    
+    # Assigner les permissions (super admin: toutes)
+    rows = []
+    for role_name, role in roles.items():
+        permissions = missing[role_name]['permissions']
+        names = permission_ids.keys() if permissions == ['*'] else permissions
+        rows.extend(
+            {'role_id': role.id, 'permission_id': permission_ids[name]}
+            for name in names if name in permission_ids
+        )
+    if rows:
+        db.session.execute(role_permissions.insert(), rows)
     
-    if created_count > 0:
-        db.session.commit()
-        tenant_info = f"tenant {tenant_id}" if tenant_id else "système"
-        print(f"✓ {created_count} rôles créés pour {tenant_info}")
+    created_count = len(roles)
+    db.session.commit()
+    tenant_info = f"tenant {tenant_id}" if tenant_id else "système"
+    print(f"✓ {created_count} rôles créés pour {tenant_info}")
     
-    return created_count
\ No newline at end of file
+    return created_count
@@ -0,0 +1,51 @@
+"""
+Modèle SeedVersion - Empreinte des données de référence déjà semées
+Permet de sauter le seed au démarrage quand rien n'a changé
+"""
+
+from app import db
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+import hashlib
+import json
+
+
+class SeedVersion(db.Model):
+    """
+    Dernière empreinte appliquée pour un seed donné
+
+    name   : identifiant du seed (system_permissions, seed_script, ...)
+    digest : SHA-256 des données semées (voir compute_digest)
+    """
+    __tablename__ = 'seed_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def compute_digest(*data) -> str:
+        """SHA-256 stable de données JSON-sérialisables"""
+        raw = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @classmethod
+    def is_current(cls, name: str, digest: str) -> bool:
+        """True si ce seed a déjà été appliqué avec cette empreinte (une requête)"""
+        try:
+            stored = db.session.query(cls.digest).filter_by(name=name).scalar()
+        except SQLAlchemyError:
+            # Table pas encore créée: le seed s'exécute normalement
+            db.session.rollback()
+            return False
+        return stored == digest
+
+    @classmethod
+    def mark(cls, name: str, digest: str):
+        """Enregistre l'empreinte appliquée (l'appelant commite)"""
+        version = db.session.get(cls, name)
+        if version:
+            version.digest = digest
+            version.applied_at = datetime.utcnow()
+        else:
+            db.session.add(cls(name=name, digest=digest))
@@ -11,6 +11,9 @@ import uuid
 class SupportMessage(db.Model):
     """Message de support entre un tenant et le super-admin."""
     __tablename__ = 'support_messages'
+    __table_args__ = (
+        db.Index('idx_support_direction_read', 'direction', 'is_read', 'tenant_id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False, index=True)
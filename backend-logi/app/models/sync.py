@@ -0,0 +1,55 @@
+"""
+Modèle SyncTombstone - Traces de suppression pour la synchronisation
+Permet au client mobile de retirer de son cache local les entités supprimées
+"""
+
+from app import db
+from datetime import datetime
+import uuid
+
+
+class SyncTombstone(db.Model):
+    """
+    Trace d'une suppression visible par un utilisateur.
+
+    Une ligne par entité supprimée (entity_id), ou une ligne avec
+    entity_id = ALL pour une suppression en masse (ex: toutes les
+    notifications de l'utilisateur jusqu'à deleted_at).
+    """
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('idx_tombstone_user_deleted', 'user_id', 'deleted_at'),
+    )
+
+    ENTITY_PACKAGE = 'package'
+    ENTITY_NOTIFICATION = 'notification'
+
+    ALL = '*'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), nullable=False)
+
+    entity_type = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=False)
+
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def record(cls, tenant_id: str, user_id: str, entity_type: str, entity_id: str):
+        """Ajoute une trace à la session (commitée avec la suppression)"""
+        if not user_id:
+            return
+        db.session.add(cls(
+            tenant_id=tenant_id,
+            user_id=user_id,
+            entity_type=entity_type,
+            entity_id=entity_id
+        ))
+
+    def to_dict(self):
+        return {
+            'type': self.entity_type,
+            'id': self.entity_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
@@ -0,0 +1,134 @@
+"""
+Modèle TenantUsage - Compteurs de consommation des quotas
+Évite un COUNT(*) croissant sur les colis du mois à chaque création
+"""
+
+from app import db
+from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+import uuid
+
+
+class TenantUsage(db.Model):
+    """
+    Compteur de consommation par (tenant, ressource, période)
+
+    Ressources:
+    - packages : colis créés (période mensuelle 'YYYY-MM')
+
+    Le compteur est incrémenté dans la même transaction que l'insertion
+    (`try_increment`): un UPDATE conditionnel vérifie la limite et
+    incrémente en une instruction, deux créations concurrentes ne peuvent
+    pas dépasser le quota. S'il n'existe pas encore, il est initialisé
+    depuis la table source.
+    """
+    __tablename__ = 'tenant_usage'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'resource', 'period', name='uq_tenant_usage_resource_period'),
+    )
+
+    RESOURCE_PACKAGES = 'packages'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
+    resource = db.Column(db.String(30), nullable=False)
+    period = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def period_of(moment: datetime = None) -> str:
+        return (moment or datetime.utcnow()).strftime('%Y-%m')
+
+    @classmethod
+    def try_increment(cls, tenant_id: str, resource: str, amount: int = 1, limit: int = -1,
+                      period: str = None) -> bool:
+        """
+        Incrémente le compteur si count + amount <= limit (-1 = illimité).
+        L'appelant commite avec l'insertion (ou annule les deux).
+
+        Returns:
+            False si la limite serait dépassée
+        """
+        period = period or cls.period_of()
+        for _ in range(2):
+            statement = db.update(cls).where(
+                cls.tenant_id == tenant_id,
+                cls.resource == resource,
+                cls.period == period
+            )
+            if limit is not None and limit >= 0:
+                statement = statement.where(cls.count + amount <= limit)
+            result = db.session.execute(
+                statement
+                .values(count=cls.count + amount, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                return True
+            # Compteur absent (première création de la période) ou limite atteinte
+            if db.session.query(cls.id).filter_by(tenant_id=tenant_id, resource=resource, period=period).scalar():
+                return False
+            cls.rebuild(tenant_id, resource, period)
+        return False
+
+    @classmethod
+    def adjust(cls, tenant_id: str, resource: str, delta: int, period: str = None):
+        """Ajuste le compteur (ex: colis supprimé), jamais en dessous de 0"""
+        if not delta:
+            return
+        new_count = cls.count + delta
+        db.session.execute(
+            db.update(cls)
+            .where(cls.tenant_id == tenant_id, cls.resource == resource, cls.period == (period or cls.period_of()))
+            .values(count=case((new_count < 0, 0), else_=new_count), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def get(cls, tenant_id: str, resource: str, period: str = None) -> int:
+        """
+        Consommation de la période (lecture d'une seule ligne indexée).
+        À la première lecture, le compteur est calculé et inséré: l'appelant
+        doit commiter la session.
+        """
+        period = period or cls.period_of()
+        count = db.session.query(cls.count).filter_by(tenant_id=tenant_id, resource=resource, period=period).scalar()
+        if count is not None:
+            return count
+        return cls.rebuild(tenant_id, resource, period)
+
+    @classmethod
+    def rebuild(cls, tenant_id: str, resource: str, period: str = None) -> int:
+        """Recalcule le compteur depuis la table source (init / resynchronisation)"""
+        period = period or cls.period_of()
+        count = cls._count_source(tenant_id, resource, period)
+
+        usage = cls.query.filter_by(tenant_id=tenant_id, resource=resource, period=period).first()
+        if usage:
+            usage.count = count
+            return count
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(tenant_id=tenant_id, resource=resource, period=period, count=count))
+        except IntegrityError:
+            # Créé en parallèle par une autre requête
+            pass
+        return count
+
+    @classmethod
+    def _count_source(cls, tenant_id: str, resource: str, period: str) -> int:
+        """COUNT sur la table source (uniquement pour l'initialisation)"""
+        if resource == cls.RESOURCE_PACKAGES:
+            from app.models.package import Package
+
+            start = datetime.strptime(period, '%Y-%m')
+            end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+            return Package.query.filter(
+                Package.tenant_id == tenant_id,
+                Package.created_at >= start,
+                Package.created_at < end
+            ).count()
+        return 0
@@ -0,0 +1,192 @@
+"""
+Modèle TrackingAlias - Index unifié des numéros de tracking
+Un numéro (normalisé) -> départ ou colis, en une seule lecture indexée
+"""
+
+from app import db
+from datetime import datetime
+import uuid
+
+
+class TrackingAlias(db.Model):
+    """
+    Alias de tracking d'une entité du tenant
+
+    Remplace la recherche sur Departure.carrier_tracking puis
+    Package(tracking_number OR supplier_tracking OR carrier_tracking).
+    Tenu à jour par les routes qui modifient ces champs (sync_package,
+    sync_departure, remove).
+    """
+    __tablename__ = 'tracking_aliases'
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', 'kind', name='uq_tracking_alias_entity_kind'),
+        db.Index('idx_tracking_alias_lookup', 'tenant_id', 'tracking'),
+    )
+
+    ENTITY_DEPARTURE = 'departure'
+    ENTITY_PACKAGE = 'package'
+
+    KIND_TRACKING = 'tracking_number'
+    KIND_SUPPLIER = 'supplier_tracking'
+    KIND_CARRIER = 'carrier_tracking'
+
+    PACKAGE_KINDS = (KIND_TRACKING, KIND_SUPPLIER, KIND_CARRIER)
+    DEPARTURE_KINDS = (KIND_CARRIER,)
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = db.Column(db.String(36), nullable=False)
+
+    # Numéro normalisé (voir normalize)
+    tracking = db.Column(db.String(100), nullable=False)
+
+    entity_type = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=False)
+    kind = db.Column(db.String(30), nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def normalize(value) -> str:
+        """Supprime les espaces et met en majuscules ('  ab 12 ' -> 'AB12')"""
+        if not value:
+            return None
+        normalized = ''.join(str(value).split()).upper()[:100]
+        return normalized or None
+
+    # ==================== MAINTENANCE ====================
+
+    @classmethod
+    def _sync(cls, tenant_id: str, entity_type: str, entity_id: str, values: dict):
+        """Aligne les alias d'une entité sur {kind: valeur} (ajout, modification, suppression)"""
+        existing = {
+            alias.kind: alias
+            for alias in cls.query.filter_by(entity_type=entity_type, entity_id=entity_id).all()
+        }
+
+        for kind, value in values.items():
+            tracking = cls.normalize(value)
+            alias = existing.get(kind)
+            if tracking is None:
+                if alias:
+                    db.session.delete(alias)
+            elif alias:
+                alias.tracking = tracking
+            else:
+                db.session.add(cls(
+                    tenant_id=tenant_id,
+                    tracking=tracking,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    kind=kind
+                ))
+
+    @classmethod
+    def sync_package(cls, package):
+        """À appeler après création / modification des numéros d'un colis"""
+        if package.id is None:
+            db.session.flush()
+        cls._sync(package.tenant_id, cls.ENTITY_PACKAGE, package.id, {
+            cls.KIND_TRACKING: package.tracking_number,
+            cls.KIND_SUPPLIER: package.supplier_tracking,
+            cls.KIND_CARRIER: package.carrier_tracking,
+        })
+
+    @classmethod
+    def sync_departure(cls, departure):
+        """À appeler après assignation / retrait du transporteur d'un départ"""
+        if departure.id is None:
+            db.session.flush()
+        cls._sync(departure.tenant_id, cls.ENTITY_DEPARTURE, departure.id, {
+            cls.KIND_CARRIER: departure.carrier_tracking,
+        })
+
+    @classmethod
+    def remove(cls, entity_type: str, entity_id: str):
+        """Supprime les alias d'une entité supprimée"""
+        cls.query.filter_by(entity_type=entity_type, entity_id=entity_id).delete(
+            synchronize_session=False
+        )
+
+    @classmethod
+    def rebuild(cls, tenant_id: str = None) -> int:
+        """
+        Reconstruit l'index depuis les colis et départs (initialisation,
+        resynchronisation). L'appelant doit commiter.
+        """
+        from app.models import Package, Departure
+
+        delete_query = cls.query
+        package_query = db.session.query(
+            Package.id, Package.tenant_id, Package.tracking_number,
+            Package.supplier_tracking, Package.carrier_tracking
+        )
+        departure_query = db.session.query(
+            Departure.id, Departure.tenant_id, Departure.carrier_tracking
+        ).filter(Departure.carrier_tracking.isnot(None))
+        if tenant_id:
+            delete_query = delete_query.filter_by(tenant_id=tenant_id)
+            package_query = package_query.filter(Package.tenant_id == tenant_id)
+            departure_query = departure_query.filter(Departure.tenant_id == tenant_id)
+
+        delete_query.delete(synchronize_session=False)
+
+        rows = []
+        for pkg in package_query.yield_per(1000):
+            for kind, value in ((cls.KIND_TRACKING, pkg.tracking_number),
+                                (cls.KIND_SUPPLIER, pkg.supplier_tracking),
+                                (cls.KIND_CARRIER, pkg.carrier_tracking)):
+                tracking = cls.normalize(value)
+                if tracking:
+                    rows.append({'id': str(uuid.uuid4()), 'tenant_id': pkg.tenant_id, 'tracking': tracking,
+                                 'entity_type': cls.ENTITY_PACKAGE, 'entity_id': pkg.id, 'kind': kind,
+                                 'created_at': datetime.utcnow()})
+        for dep in departure_query:
+            tracking = cls.normalize(dep.carrier_tracking)
+            if tracking:
+                rows.append({'id': str(uuid.uuid4()), 'tenant_id': dep.tenant_id, 'tracking': tracking,
+                             'entity_type': cls.ENTITY_DEPARTURE, 'entity_id': dep.id, 'kind': cls.KIND_CARRIER,
+                             'created_at': datetime.utcnow()})
+
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+        return len(rows)
+
+    # ==================== RÉSOLUTION ====================
+
+    @classmethod
+    def resolve(cls, tenant_id: str, trackings, entity_type: str = None) -> dict:
+        """
+        Résout plusieurs numéros en une requête.
+
+        Returns:
+            dict: numéro normalisé -> [(entity_type, entity_id, kind), ...]
+                  (départs en premier)
+        """
+        normalized = {cls.normalize(t) for t in trackings}
+        normalized.discard(None)
+        if not normalized:
+            return {}
+
+        query = db.session.query(cls.tracking, cls.entity_type, cls.entity_id, cls.kind).filter(
+            cls.tenant_id == tenant_id,
+            cls.tracking.in_(normalized)
+        )
+        if entity_type:
+            query = query.filter(cls.entity_type == entity_type)
+
+        resolved = {}
+        for row in query:
+            resolved.setdefault(row.tracking, []).append((row.entity_type, row.entity_id, row.kind))
+
+        # Un départ a priorité sur un colis portant le même numéro
+        for matches in resolved.values():
+            matches.sort(key=lambda m: (m[0] != cls.ENTITY_DEPARTURE, cls.PACKAGE_KINDS.index(m[2])))
+        return resolved
+
+    @classmethod
+    def resolve_one(cls, tenant_id: str, tracking: str, entity_type: str = None):
+        """Première entité correspondant au numéro: (entity_type, entity_id) ou None"""
+        matches = cls.resolve(tenant_id, [tracking], entity_type).get(cls.normalize(tracking))
+        if not matches:
+            return None
+        return matches[0][0], matches[0][1]
@@ -0,0 +1,123 @@
+"""
+Modèle UnreadCounter - Compteurs de non-lus maintenus
+Évite un COUNT(*) sur les notifications / messages support à chaque poll
+"""
+
+from app import db
+from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+import uuid
+
+
+class UnreadCounter(db.Model):
+    """
+    Compteur de non-lus par (scope, propriétaire)
+
+    Scopes:
+    - notifications  : notifications non lues d'un utilisateur (owner = user_id)
+    - support_tenant : réponses support non lues d'un tenant (owner = tenant_id)
+    - support_admin  : messages tenants non lus côté super-admin (owner = 'platform')
+
+    Le compteur est mis à jour dans la même transaction que l'insertion /
+    lecture / suppression (`adjust`, `reset`). S'il n'existe pas encore, il
+    est initialisé depuis la table source à la première lecture (`get`).
+    """
+    __tablename__ = 'unread_counters'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'owner_id', name='uq_unread_counter_scope_owner'),
+    )
+
+    SCOPE_NOTIFICATIONS = 'notifications'
+    SCOPE_SUPPORT_TENANT = 'support_tenant'
+    SCOPE_SUPPORT_ADMIN = 'support_admin'
+
+    PLATFORM_OWNER = 'platform'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    scope = db.Column(db.String(30), nullable=False)
+    owner_id = db.Column(db.String(36), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def adjust(cls, scope: str, owner_id: str, delta: int):
+        """
+        Incrémente / décrémente le compteur (jamais en dessous de 0).
+        Sans effet si le compteur n'est pas encore initialisé.
+        """
+        if not owner_id or not delta:
+            return
+        new_count = cls.count + delta
+        db.session.execute(
+            db.update(cls)
+            .where(cls.scope == scope, cls.owner_id == owner_id)
+            .values(count=case((new_count < 0, 0), else_=new_count), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def reset(cls, scope: str, owner_id: str):
+        """Remet le compteur à zéro (ex: tout marquer comme lu)"""
+        if not owner_id:
+            return
+        db.session.execute(
+            db.update(cls)
+            .where(cls.scope == scope, cls.owner_id == owner_id)
+            .values(count=0, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def get(cls, scope: str, owner_id: str) -> int:
+        """
+        Retourne le compteur (lecture d'une seule ligne indexée).
+        À la première lecture, le compteur est calculé depuis la table source
+        et inséré: l'appelant doit commiter la session.
+        """
+        count = db.session.query(cls.count).filter(
+            cls.scope == scope,
+            cls.owner_id == owner_id
+        ).scalar()
+        if count is not None:
+            return count
+        return cls.rebuild(scope, owner_id)
+
+    @classmethod
+    def rebuild(cls, scope: str, owner_id: str) -> int:
+        """Recalcule le compteur depuis la table source (init / resynchronisation)"""
+        count = cls._count_source(scope, owner_id)
+
+        counter = cls.query.filter_by(scope=scope, owner_id=owner_id).first()
+        if counter:
+            counter.count = count
+            return count
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(scope=scope, owner_id=owner_id, count=count))
+        except IntegrityError:
+            # Créé en parallèle par une autre requête
+            pass
+        return count
+
+    @classmethod
+    def _count_source(cls, scope: str, owner_id: str) -> int:
+        """COUNT sur la table source (uniquement pour l'initialisation)"""
+        if scope == cls.SCOPE_NOTIFICATIONS:
+            from app.models.notification import Notification
+            return Notification.query.filter_by(user_id=owner_id, is_read=False).count()
+
+        from app.models.support_message import SupportMessage
+        if scope == cls.SCOPE_SUPPORT_TENANT:
+            return SupportMessage.query.filter_by(
+                tenant_id=owner_id,
+                direction='admin_to_tenant',
+                is_read=False
+            ).count()
+        if scope == cls.SCOPE_SUPPORT_ADMIN:
+            return SupportMessage.query.filter_by(
+                direction='tenant_to_admin',
+                is_read=False
+            ).count()
+        return 0
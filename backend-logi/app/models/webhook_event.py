@@ -0,0 +1,78 @@
+"""
+Modèle WebhookEvent - Boîte de réception des webhooks transporteurs
+Le payload brut est persisté avant traitement (accusé de réception rapide,
+déduplication des renvois, rejeu)
+"""
+
+from app import db
+from datetime import datetime
+import hashlib
+import uuid
+
+
+class WebhookEvent(db.Model):
+    """
+    Webhook reçu d'un fournisseur de tracking (17Track, AfterShip, DHL, générique)
+
+    Statuts:
+    - queued     : accepté, en attente de traitement par les workers
+    - processing : réclamé par un processus (claimed_at), en cours de traitement
+    - processed  : traité (les trackings inconnus ne sont pas une erreur)
+    - failed     : erreur pendant le traitement (voir error, rejouable)
+    - ignored    : aucun événement exploitable dans le payload
+    - dead       : abandonné après WEBHOOK_MAX_ATTEMPTS reprises (rejouable)
+    """
+    __tablename__ = 'webhook_events'
+    __table_args__ = (
+        # Déduplication des renvois du fournisseur
+        db.UniqueConstraint('tenant_id', 'provider', 'content_hash', name='uq_webhook_event_hash'),
+        db.Index('idx_webhook_event_status_received', 'status', 'received_at'),
+        db.Index('idx_webhook_event_tenant_received', 'tenant_id', 'received_at'),
+    )
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+    STATUS_IGNORED = 'ignored'
+    STATUS_DEAD = 'dead'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
+    provider = db.Column(db.String(30), nullable=False)
+
+    # Corps brut tel que reçu (signature vérifiée) et son SHA-256
+    payload = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+
+    status = db.Column(db.String(20), default=STATUS_QUEUED, nullable=False)
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+
+    # Résumé du dernier traitement: {updates, matched, updated_packages, notified_clients}
+    result = db.Column(db.JSON)
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def hash_payload(raw: bytes) -> str:
+        return hashlib.sha256(raw or b'').hexdigest()
+
+    def to_dict(self, include_payload=False):
+        data = {
+            'id': self.id,
+            'provider': self.provider,
+            'content_hash': self.content_hash,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'result': self.result,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'claimed_at': self.claimed_at.isoformat() if self.claimed_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+        if include_payload:
+            data['payload'] = self.payload
+        return data
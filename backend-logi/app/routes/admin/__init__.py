@@ -23,3 +23,4 @@ from app.routes.admin import finance
 from app.routes.admin import accounting
 from app.routes.admin import exports
 from app.routes.admin import payment_providers
+from app.routes.admin import webhooks
@@ -9,6 +9,7 @@ from app import db
 from app.routes.admin import admin_bp
 from app.models import Payment, DepartureExpense, Salary, Expense, OtherIncome, Departure, User
 from app.utils.decorators import admin_required, module_required
+from app.utils.db_routing import replica_read
 from sqlalchemy import func
 from datetime import datetime, date, timedelta
 from app.models import Package, PackagePayment
@@ -56,6 +57,7 @@ def get_period_dates(period, year, month):
 
 @admin_bp.route('/accounting', methods=['GET'])
 @module_required('finance')
+@replica_read
 def admin_get_accounting():
     """
     Récupère toutes les données comptables pour une période
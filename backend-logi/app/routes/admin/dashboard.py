@@ -8,12 +8,16 @@ from flask_jwt_extended import get_jwt_identity
 from app.routes.admin import admin_bp
 from app.models import Package, User, Payment, Departure
 from app.utils.decorators import admin_required
+from app.utils.db_routing import replica_read
+from app.utils.sql_instrumentation import query_budget
 from datetime import datetime, timedelta
 from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 
 
 @admin_bp.route('/dashboard/stats', methods=['GET'])
 @admin_required
+@replica_read
 def get_dashboard_stats():
     """
     Statistiques générales du dashboard
@@ -140,6 +144,7 @@ def get_dashboard_stats():
 
 @admin_bp.route('/dashboard/recent-packages', methods=['GET'])
 @admin_required
+@query_budget(6)
 def get_recent_packages():
     """
     Derniers colis enregistrés
@@ -160,14 +165,14 @@ def get_recent_packages():
             Package.destination_warehouse_id.in_(staff_wh_ids),
         ))
 
-    packages = query.order_by(
+    packages = query.options(joinedload(Package.client)).order_by(
         Package.created_at.desc()
     ).limit(limit).all()
     
     # Formater pour le dashboard
     result = []
     for p in packages:
-        client = User.query.get(p.client_id)
+        client = p.client
         result.append({
             'id': p.id,
             'tracking': p.tracking_number,
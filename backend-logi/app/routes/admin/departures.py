@@ -9,11 +9,12 @@ Permet de grouper les colis et gérer les expéditions.
 from flask import request, jsonify, g
 from flask_jwt_extended import get_jwt_identity
 from app import db
-from app.models import Departure, Package, PackageHistory, User, TenantConfig
+from app.models import Departure, Package, PackageHistory, User, TenantConfig, TrackingAlias
 from app.routes.admin import admin_bp
 from app.utils.decorators import admin_required, permission_required, module_required
 from app.services.notification_service import NotificationService
 from app.routes.webhooks import update_package_status
+from app.services.realtime_service import publish_package_status, publish_departure
 from datetime import datetime, date
 import logging
 from sqlalchemy import or_
@@ -359,6 +360,7 @@ def delete_departure(departure_id):
         return jsonify({'error': 'Impossible de supprimer un départ avec des colis assignés'}), 403
     
     try:
+        TrackingAlias.remove(TrackingAlias.ENTITY_DEPARTURE, departure.id)
         db.session.delete(departure)
         db.session.commit()
         
@@ -581,7 +583,9 @@ def mark_departure_departed(departure_id):
                 updated_by=user_id
             )
             db.session.add(history)
+            publish_package_status(package, old_status)
         
+        publish_departure(departure, 'depart')
         db.session.commit()
         
         # Notifier les clients (async serait mieux)
@@ -637,6 +641,7 @@ def mark_departure_arrived(departure_id):
         # Mettre à jour tous les colis
         packages = departure.packages.all()
         for package in packages:
+            old_status = package.status
             package.status = 'arrived_port'
             
             history = PackageHistory(
@@ -647,7 +652,9 @@ def mark_departure_arrived(departure_id):
                 updated_by=user_id
             )
             db.session.add(history)
+            publish_package_status(package, old_status)
         
+        publish_departure(departure, 'arrive')
         db.session.commit()
         
         # Notifier les clients
@@ -806,6 +813,7 @@ def assign_carrier_to_departure(departure_id):
         # Mettre à jour les infos transporteur actuelles
         departure.carrier = carrier
         departure.carrier_tracking = carrier_tracking
+        TrackingAlias.sync_departure(departure)
         departure.carrier_status = None  # Reset, sera mis à jour par webhook
         departure.carrier_location = None
         departure.is_final_leg = is_final_leg
@@ -821,6 +829,7 @@ def assign_carrier_to_departure(departure_id):
             if package.status == 'received':
                 package.status = 'in_transit'
                 package.shipped_at = datetime.utcnow()
+                publish_package_status(package, 'received')
             
             # Message d'historique adapté
             if is_carrier_change:
@@ -923,6 +932,7 @@ def remove_carrier_from_departure(departure_id):
         departure.carrier_tracking = None
         departure.carrier_status = None
         departure.carrier_location = None
+        TrackingAlias.sync_departure(departure)
         
         db.session.commit()
         
@@ -3,15 +3,19 @@ Routes Admin - Exports PDF et Excel
 ====================================
 
 Endpoints pour générer et télécharger des documents.
+
+Factures, reçus et tickets passent par DocumentCache (app/services/document_cache.py):
+rendu une fois par version, ETag / 304 à la réouverture.
 """
 
 from flask import request, jsonify, g, Response
 from flask_jwt_extended import get_jwt_identity
 from app import db
-from app.models import Package, Invoice, Departure, Tenant, TenantConfig
+from app.models import Package, Invoice, Departure
 from app.routes.admin import admin_bp
 from app.utils.decorators import admin_required
-from app.services.export_service import PDFGenerator, ExcelGenerator
+from app.utils.db_routing import replica_read
+from app.services.document_cache import DocumentCache, DocumentRenderError, TenantBranding
 from datetime import datetime
 import logging
 from sqlalchemy import or_
@@ -19,6 +23,18 @@ from sqlalchemy import or_
 logger = logging.getLogger(__name__)
 
 
+def _pdf_generator(tenant_name: str):
+    """Import différé de export_service (reportlab, coûteux au démarrage)"""
+    from app.services.export_service import PDFGenerator
+    return PDFGenerator(tenant_name)
+
+
+def _excel_generator():
+    """Import différé de export_service (openpyxl, coûteux au démarrage)"""
+    from app.services.export_service import ExcelGenerator
+    return ExcelGenerator()
+
+
 def _get_staff_wh_ids():
     return getattr(g, 'staff_warehouse_ids', None) or ([] if not getattr(g, 'staff_warehouse_id', None) else [getattr(g, 'staff_warehouse_id')])
 
@@ -39,58 +55,14 @@ def _apply_staff_package_scope(query):
 
 def get_tenant_info(tenant_id: str) -> dict:
     """Récupère les infos du tenant pour les documents (logo, header, footer, etc.)"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return {}
-    
-    info = {
-        'name': tenant.name,
-        'email': tenant.email,
-        'phone': tenant.phone,
-        'address': tenant.address,
-        # Valeurs par défaut pour les documents
-        'logo': None,
-        'header': '',
-        'footer': '',
-        'show_logo': True,
-        'primary_color': '#2563eb',
-        'export_footer': ''
-    }
-    
-    # Récupérer la config principale du tenant (contient invoice, export, etc.)
-    config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
-    
-    if config and config.config_data:
-        # Config company
-        if config.config_data.get('company'):
-            info.update(config.config_data['company'])
-        
-        # Config invoice (logo, header, footer, couleur)
-        invoice_config = config.config_data.get('invoice', {})
-        if invoice_config:
-            info['logo'] = invoice_config.get('logo', info['logo'])
-            info['header'] = invoice_config.get('header', info['header'])
-            info['footer'] = invoice_config.get('footer', info['footer'])
-            info['show_logo'] = invoice_config.get('show_logo', info['show_logo'])
-            info['primary_color'] = invoice_config.get('primary_color', info['primary_color'])
-            
-            # Log pour debug
-            logger.info(f"[Export] Invoice config loaded - Logo: {'Yes' if info['logo'] else 'No'}, Color: {info['primary_color']}")
-        
-        # Config export
-        export_config = config.config_data.get('export', {})
-        if export_config:
-            info['export_footer'] = export_config.get('footer', info['export_footer'])
-    else:
-        logger.warning(f"[Export] No config found for tenant {tenant_id}")
-    
-    return info
+    return TenantBranding.get(tenant_id)[1]
 
 
 # ==================== PDF EXPORTS ====================
 
 @admin_bp.route('/exports/invoice/<invoice_id>/pdf', methods=['GET'])
 @admin_required
+@replica_read
 def export_invoice_pdf(invoice_id):
     """Génère et télécharge le PDF d'une facture"""
     tenant_id = g.tenant_id
@@ -111,26 +83,16 @@ def export_invoice_pdf(invoice_id):
         if pkg.origin_warehouse_id not in staff_wh_ids and pkg.destination_warehouse_id not in staff_wh_ids:
             return jsonify({'error': 'Accès refusé'}), 403
     
-    tenant_info = get_tenant_info(tenant_id)
-    
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
-    result = pdf_gen.generate_invoice_pdf(invoice.to_dict(), tenant_info)
-    
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur génération PDF'}), 500
-    
-    return Response(
-        result.data,
-        mimetype=result.content_type,
-        headers={
-            'Content-Disposition': f'attachment; filename="{result.filename}"',
-            'Content-Length': len(result.data)
-        }
-    )
+    try:
+        return DocumentCache.serve_export('invoice', invoice)
+    except DocumentRenderError as e:
+        logger.error(f"Export invoice {invoice.id}: {e}")
+        return jsonify({'error': 'Erreur génération PDF'}), 500
 
 
 @admin_bp.route('/exports/package/<package_id>/label', methods=['GET'])
 @admin_required
+@replica_read
 def export_package_label(package_id):
     """Génère et télécharge l'étiquette d'un colis"""
     tenant_id = g.tenant_id
@@ -152,7 +114,7 @@ def export_package_label(package_id):
     
     tenant_info = get_tenant_info(tenant_id)
     
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
+    pdf_gen = _pdf_generator(tenant_info.get('name', 'Express Cargo'))
     result = pdf_gen.generate_package_label_pdf(package.to_dict(include_client=True), tenant_info)
     
     if not result.success:
@@ -170,6 +132,7 @@ def export_package_label(package_id):
 
 @admin_bp.route('/exports/packages/labels', methods=['POST'])
 @admin_required
+@replica_read
 def export_multiple_labels():
     """
     Génère les étiquettes de plusieurs colis
@@ -194,6 +157,7 @@ def export_multiple_labels():
 
 @admin_bp.route('/exports/packages/excel', methods=['GET'])
 @admin_required
+@replica_read
 def export_packages_excel():
     """
     Exporte les colis en Excel
@@ -243,7 +207,7 @@ def export_packages_excel():
     if not packages:
         return jsonify({'error': 'Aucun colis à exporter'}), 404
     
-    excel_gen = ExcelGenerator()
+    excel_gen = _excel_generator()
     result = excel_gen.generate_packages_excel(
         [p.to_dict(include_client=True) for p in packages]
     )
@@ -265,6 +229,7 @@ def export_packages_excel():
 
 @admin_bp.route('/exports/packages', methods=['POST'])
 @admin_required
+@replica_read
 def export_packages():
     """
     Exporte les colis en Excel ou PDF
@@ -324,7 +289,7 @@ def export_packages():
         return jsonify({'error': 'Aucun colis à exporter'}), 404
     
     if format_type == 'excel':
-        excel_gen = ExcelGenerator()
+        excel_gen = _excel_generator()
         result = excel_gen.generate_packages_excel(
             [p.to_dict(include_client=True) for p in packages]
         )
@@ -345,7 +310,7 @@ def export_packages():
     
     elif format_type == 'pdf':
         tenant_info = get_tenant_info(tenant_id)
-        pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
+        pdf_gen = _pdf_generator(tenant_info.get('name', 'Express Cargo'))
         result = pdf_gen.generate_packages_pdf(
             [p.to_dict(include_client=True) for p in packages],
             tenant_info
@@ -368,6 +333,7 @@ def export_packages():
 
 @admin_bp.route('/exports/invoices/excel', methods=['GET'])
 @admin_required
+@replica_read
 def export_invoices_excel():
     """Exporte les factures en Excel"""
     tenant_id = g.tenant_id
@@ -411,7 +377,7 @@ def export_invoices_excel():
     if not invoices:
         return jsonify({'error': 'Aucune facture à exporter'}), 404
     
-    excel_gen = ExcelGenerator()
+    excel_gen = _excel_generator()
     result = excel_gen.generate_invoices_excel([i.to_dict() for i in invoices])
     
     if not result.success:
@@ -429,6 +395,7 @@ def export_invoices_excel():
 
 @admin_bp.route('/exports/departures/excel', methods=['GET'])
 @admin_required
+@replica_read
 def export_departures_excel():
     """Exporte les départs en Excel"""
     tenant_id = g.tenant_id
@@ -472,7 +439,7 @@ def export_departures_excel():
     if not departures:
         return jsonify({'error': 'Aucun départ à exporter'}), 404
     
-    excel_gen = ExcelGenerator()
+    excel_gen = _excel_generator()
     result = excel_gen.generate_departures_excel([d.to_dict() for d in departures])
     
     if not result.success:
@@ -492,6 +459,7 @@ def export_departures_excel():
 
 @admin_bp.route('/exports/payment/<payment_id>/receipt', methods=['GET', 'OPTIONS'])
 @admin_required
+@replica_read
 def export_payment_receipt(payment_id):
     """Génère et télécharge le reçu de paiement"""
     from app.models import Payment
@@ -523,26 +491,16 @@ def export_payment_receipt(payment_id):
             if pp.package.origin_warehouse_id not in staff_wh_ids and pp.package.destination_warehouse_id not in staff_wh_ids:
                 return jsonify({'error': 'Accès refusé'}), 403
     
-    tenant_info = get_tenant_info(tenant_id)
-    
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
-    result = pdf_gen.generate_payment_receipt(payment.to_dict(include_packages=True), tenant_info)
-    
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur génération reçu'}), 500
-    
-    return Response(
-        result.data,
-        mimetype=result.content_type,
-        headers={
-            'Content-Disposition': f'attachment; filename="{result.filename}"',
-            'Content-Length': len(result.data)
-        }
-    )
+    try:
+        return DocumentCache.serve_export('payment_receipt', payment)
+    except DocumentRenderError as e:
+        logger.error(f"Export payment_receipt {payment.id}: {e}")
+        return jsonify({'error': 'Erreur génération reçu'}), 500
 
 
 @admin_bp.route('/exports/pickup/<pickup_id>/receipt', methods=['GET', 'OPTIONS'])
 @admin_required
+@replica_read
 def export_pickup_receipt(pickup_id):
     """Génère et télécharge le reçu de retrait"""
     from app.models import Pickup
@@ -569,28 +527,18 @@ def export_pickup_receipt(pickup_id):
         if pkg.origin_warehouse_id not in staff_wh_ids and pkg.destination_warehouse_id not in staff_wh_ids:
             return jsonify({'error': 'Accès refusé'}), 403
     
-    tenant_info = get_tenant_info(tenant_id)
-    
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
-    result = pdf_gen.generate_pickup_receipt(pickup.to_dict(), tenant_info)
-    
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur génération reçu'}), 500
-    
-    return Response(
-        result.data,
-        mimetype=result.content_type,
-        headers={
-            'Content-Disposition': f'attachment; filename="{result.filename}"',
-            'Content-Length': len(result.data)
-        }
-    )
+    try:
+        return DocumentCache.serve_export('pickup_receipt', pickup)
+    except DocumentRenderError as e:
+        logger.error(f"Export pickup_receipt {pickup.id}: {e}")
+        return jsonify({'error': 'Erreur génération reçu'}), 500
 
 
 # ==================== RAPPORTS PDF ====================
 
 @admin_bp.route('/exports/reports/statistics', methods=['GET'])
 @admin_required
+@replica_read
 def export_statistics_report():
     """
     Génère un rapport statistiques PDF
@@ -609,7 +557,7 @@ def export_statistics_report():
         stats_response = admin_finance_stats()
         stats = stats_response.get_json()
     
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
+    pdf_gen = _pdf_generator(tenant_info.get('name', 'Express Cargo'))
     result = pdf_gen.generate_statistics_report(stats, tenant_info)
     
     if not result.success:
@@ -629,6 +577,7 @@ def export_statistics_report():
 
 @admin_bp.route('/exports/payment/<payment_id>/ticket', methods=['GET', 'OPTIONS'])
 @admin_required
+@replica_read
 def export_payment_ticket(payment_id):
     """Génère et télécharge un ticket de paiement (format 80mm)"""
     from app.models import Payment
@@ -660,26 +609,16 @@ def export_payment_ticket(payment_id):
             if pp.package.origin_warehouse_id not in staff_wh_ids and pp.package.destination_warehouse_id not in staff_wh_ids:
                 return jsonify({'error': 'Accès refusé'}), 403
     
-    tenant_info = get_tenant_info(tenant_id)
-    
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
-    result = pdf_gen.generate_payment_ticket(payment.to_dict(include_packages=True), tenant_info)
-    
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur génération ticket'}), 500
-    
-    return Response(
-        result.data,
-        mimetype=result.content_type,
-        headers={
-            'Content-Disposition': f'attachment; filename="{result.filename}"',
-            'Content-Length': len(result.data)
-        }
-    )
+    try:
+        return DocumentCache.serve_export('payment_ticket', payment)
+    except DocumentRenderError as e:
+        logger.error(f"Export payment_ticket {payment.id}: {e}")
+        return jsonify({'error': 'Erreur génération ticket'}), 500
 
 
 @admin_bp.route('/exports/pickup/<pickup_id>/ticket', methods=['GET', 'OPTIONS'])
 @admin_required
+@replica_read
 def export_pickup_ticket(pickup_id):
     """Génère et télécharge un ticket de retrait (format 80mm)"""
     from app.models import Pickup
@@ -706,19 +645,8 @@ def export_pickup_ticket(pickup_id):
         if pkg.origin_warehouse_id not in staff_wh_ids and pkg.destination_warehouse_id not in staff_wh_ids:
             return jsonify({'error': 'Accès refusé'}), 403
     
-    tenant_info = get_tenant_info(tenant_id)
-    
-    pdf_gen = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
-    result = pdf_gen.generate_pickup_ticket(pickup.to_dict(), tenant_info)
-    
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur génération ticket'}), 500
-    
-    return Response(
-        result.data,
-        mimetype=result.content_type,
-        headers={
-            'Content-Disposition': f'attachment; filename="{result.filename}"',
-            'Content-Length': len(result.data)
-        }
-    )
+    try:
+        return DocumentCache.serve_export('pickup_ticket', pickup)
+    except DocumentRenderError as e:
+        logger.error(f"Export pickup_ticket {pickup.id}: {e}")
+        return jsonify({'error': 'Erreur génération ticket'}), 500
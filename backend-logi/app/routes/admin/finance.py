@@ -9,6 +9,7 @@ from app import db
 from app.routes.admin import admin_bp
 from app.models import Payment, Invoice, Package, User, TenantConfig
 from app.utils.decorators import admin_required, module_required
+from app.utils.db_routing import replica_read
 from sqlalchemy import func, and_, extract, or_
 from datetime import datetime, timedelta, date
 import csv
@@ -74,6 +75,7 @@ def get_previous_period_dates(period, year, month):
 
 @admin_bp.route('/finance/stats', methods=['GET'])
 @module_required('finance')
+@replica_read
 def admin_finance_stats():
     """
     Statistiques financières complètes
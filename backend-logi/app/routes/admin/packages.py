@@ -7,10 +7,11 @@ from flask import request, jsonify, g
 from flask_jwt_extended import get_jwt_identity
 from app import db
 from app.routes.admin import admin_bp
-from app.models import Package, PackageHistory, User, Departure, Warehouse
+from app.models import Package, PackageHistory, User, Departure, Warehouse, SyncTombstone, TrackingAlias, TenantUsage
 from app.models.package import _money
 from app.utils.decorators import admin_required, permission_required, admin_or_permission_required, module_required
 from app.utils.audit import audit_log, AuditAction
+from app.utils.sql_instrumentation import query_budget
 from app.utils.helpers import (
     generate_tracking_number,
     can_read_package,
@@ -18,9 +19,13 @@ from app.utils.helpers import (
     can_edit_package_destination,
     can_manage_payments,
 )
-from app.services.pdf_export_service import PDFExportService
+from app.services.realtime_service import publish_package_status
 from datetime import datetime
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+# Nombre max de codes par appel à /packages/find/batch
+MAX_FIND_BATCH = 200
 
 
 def _apply_staff_package_scope(query, write=False):
@@ -181,7 +186,7 @@ def admin_find_package():
     Recherche un colis par tracking (pour scanner)
     
     Query params:
-        - tracking: Code tracking à rechercher
+        - tracking: Code tracking à rechercher (interne, fournisseur ou transporteur)
     """
     tenant_id = g.tenant_id
     tracking = request.args.get('tracking', '').strip()
@@ -189,13 +194,9 @@ def admin_find_package():
     if not tracking:
         return jsonify({'error': 'Tracking code required'}), 400
     
-    # Recherche par tracking interne ou fournisseur
-    package = Package.query.filter_by(tenant_id=tenant_id).filter(
-        or_(
-            Package.tracking_number.ilike(tracking),
-            Package.supplier_tracking.ilike(tracking)
-        )
-    ).first()
+    # Lecture indexée sur tracking_aliases
+    match = TrackingAlias.resolve_one(tenant_id, tracking, TrackingAlias.ENTITY_PACKAGE)
+    package = db.session.get(Package, match[1]) if match else None
     
     if not package:
         return jsonify({'found': False, 'message': 'Package not found'})
@@ -209,6 +210,59 @@ def admin_find_package():
     })
 
 
+@admin_bp.route('/packages/find/batch', methods=['POST'])
+@module_required('packages')
+@query_budget(6)
+def admin_find_packages_batch():
+    """
+    Recherche de plusieurs colis par tracking en un appel (scan en rafale)
+    
+    Body:
+        - trackings: Liste de codes (max 200)
+    
+    Returns:
+        results: [{tracking, found, package}] dans l'ordre de la demande
+    """
+    tenant_id = g.tenant_id
+    data = request.get_json(silent=True) or {}
+    trackings = data.get('trackings')
+    
+    if not isinstance(trackings, list) or not trackings:
+        return jsonify({'error': 'trackings list required'}), 400
+    if len(trackings) > MAX_FIND_BATCH:
+        return jsonify({'error': f'Maximum {MAX_FIND_BATCH} trackings par appel'}), 400
+    
+    trackings = [str(t).strip() for t in trackings]
+    resolved = TrackingAlias.resolve(tenant_id, trackings, TrackingAlias.ENTITY_PACKAGE)
+    
+    package_ids = {matches[0][1] for matches in resolved.values()}
+    packages = {}
+    if package_ids:
+        for package in Package.query.options(joinedload(Package.client)).filter(
+            Package.tenant_id == tenant_id,
+            Package.id.in_(package_ids)
+        ):
+            if g.user_role == 'staff' and not can_read_package(g.user, package):
+                continue
+            packages[package.id] = package
+    
+    results = []
+    for tracking in trackings:
+        matches = resolved.get(TrackingAlias.normalize(tracking))
+        package = packages.get(matches[0][1]) if matches else None
+        results.append({
+            'tracking': tracking,
+            'found': package is not None,
+            'package': package.to_dict(include_client=True) if package else None
+        })
+    
+    return jsonify({
+        'results': results,
+        'found': sum(1 for r in results if r['found']),
+        'total': len(results)
+    })
+
+
 @admin_bp.route('/packages', methods=['POST'])
 @module_required('packages')
 def admin_create_package():
@@ -229,9 +283,9 @@ def admin_create_package():
     if not data.get('description'):
         return jsonify({'error': 'Description is required'}), 400
     
-    # Vérification des quotas
+    # Vérification + consommation du quota (annulée avec la transaction en cas d'échec)
     from app.services.enforcement_service import EnforcementService
-    quota_result = EnforcementService.check_quota(tenant_id, EnforcementService.RESOURCE_PACKAGES_MONTHLY)
+    quota_result = EnforcementService.consume_quota(tenant_id, EnforcementService.RESOURCE_PACKAGES_MONTHLY)
     if not quota_result['allowed']:
         return jsonify({
             'error': 'Quota atteint',
@@ -320,6 +374,7 @@ def admin_create_package():
     
     db.session.add(package)
     db.session.flush()
+    TrackingAlias.sync_package(package)
     
     # Historique
     history = PackageHistory(
@@ -380,30 +435,21 @@ def admin_receive_package(package_id):
     can_manage_amounts = g.user_role == 'admin' or can_edit_package_destination(g.user, package)
     unit_price = data.get('unit_price') if can_manage_amounts else None
     if can_manage_amounts and unit_price is None:
-        # Récupérer depuis la config des tarifs
-        from app.models import TenantConfig
-        config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
-        if config:
-            origin = package.origin_country or 'China'
-            dest = package.destination_country or 'Cameroon'
-            transport = package.transport_mode or 'air_normal'
-            pkg_type = package.package_type or 'normal'
-            
-            route_key = f"{origin}_{dest}"
-            shipping_rates = config.shipping_rates or {}
-            route_rates = shipping_rates.get(route_key, {})
-            transport_rates = route_rates.get(transport, {})
-            
-            # Le tarif peut être:
-            # - un nombre direct (ancien format)
-            # - un objet avec 'rate' (nouveau format: {label, rate, unit})
-            rate_data = transport_rates.get(pkg_type)
-            if isinstance(rate_data, dict):
-                unit_price = rate_data.get('rate')
-            elif isinstance(rate_data, (int, float)):
-                unit_price = rate_data
+        # Récupérer depuis la table de tarifs compilée
+        from app.services.rate_service import RateService
+        table = RateService.get_table(tenant_id)
+        if table:
+            entry = table.lookup(
+                package.origin_country or 'China',
+                package.destination_country or 'Cameroon',
+                package.transport_mode or 'air_normal',
+                package.package_type or 'normal'
+            )
+            if entry:
+                unit_price = entry.rate
     
     # Mise à jour du statut
+    previous_status = package.status
     package.status = 'received'
     package.received_at = datetime.utcnow()
     package.is_editable = False
@@ -461,6 +507,7 @@ def admin_receive_package(package_id):
         updated_by=user_id
     )
     db.session.add(history)
+    publish_package_status(package, previous_status)
     db.session.commit()
     
     # Notification au client
@@ -601,6 +648,7 @@ def admin_update_status(package_id):
         updated_by=user_id
     )
     db.session.add(history)
+    publish_package_status(package, old_status)
     db.session.commit()
     
     # Notification au client si demandé
@@ -773,6 +821,7 @@ def admin_bulk_update_status():
     
     updated_count = 0
     for package in packages:
+        previous_status = package.status
         package.status = new_status
         if data.get('location'):
             package.current_location = data['location']
@@ -786,6 +835,8 @@ def admin_bulk_update_status():
             updated_by=user_id
         )
         db.session.add(history)
+        # Regroupé par room à l'envoi (après commit)
+        publish_package_status(package, previous_status)
         updated_count += 1
     
     db.session.commit()
@@ -861,6 +912,7 @@ def admin_confirm_delivery(package_id):
     db.session.add(pickup)
     
     # Mise à jour du colis
+    previous_status = package.status
     package.status = 'delivered'
     package.delivered_at = datetime.utcnow()
     package.picked_up_by = recipient or 'Client'
@@ -875,6 +927,7 @@ def admin_confirm_delivery(package_id):
         updated_by=user_id
     )
     db.session.add(history)
+    publish_package_status(package, previous_status)
     db.session.commit()
     
     return jsonify({
@@ -897,6 +950,10 @@ def admin_delete_package(package_id):
     
     # Supprimer l'historique d'abord
     PackageHistory.query.filter_by(package_id=package_id).delete()
+    SyncTombstone.record(tenant_id, package.client_id, SyncTombstone.ENTITY_PACKAGE, package.id)
+    TrackingAlias.remove(TrackingAlias.ENTITY_PACKAGE, package.id)
+    # Le colis supprimé libère son quota du mois de création
+    TenantUsage.adjust(tenant_id, TenantUsage.RESOURCE_PACKAGES, -1, TenantUsage.period_of(package.created_at))
     db.session.delete(package)
     db.session.commit()
     
@@ -1016,11 +1073,13 @@ def admin_assign_carrier(package_id):
         
         package.carrier = carrier
         package.carrier_tracking = carrier_tracking
+        TrackingAlias.sync_package(package)
         
         # Si le colis était en "received", le passer en "in_transit"
         if package.status == 'received':
             package.status = 'in_transit'
             package.shipped_at = datetime.utcnow()
+            publish_package_status(package, 'received')
         
         # Ajouter à l'historique
         carrier_name = SUPPORTED_CARRIERS.get(carrier, carrier.upper())
@@ -1096,6 +1155,7 @@ def admin_remove_carrier(package_id):
         
         package.carrier = None
         package.carrier_tracking = None
+        TrackingAlias.sync_package(package)
         
         # Historique
         history = PackageHistory(
@@ -1183,6 +1243,7 @@ def admin_refresh_tracking(package_id):
                 updated_by=user_id
             )
             db.session.add(history)
+            publish_package_status(package, old_status)
             db.session.commit()
             updated = True
         
@@ -1328,6 +1389,7 @@ def admin_export_packages_pdf():
         tenant = g.tenant
         tenant_name = tenant.name if tenant else "Express Cargo"
         
+        from app.services.pdf_export_service import PDFExportService  # reportlab à la demande
         pdf_service = PDFExportService(tenant_name)
         return pdf_service.export_packages(
             packages_data=packages_data,
@@ -10,6 +10,7 @@ from app.routes.admin import admin_bp
 from app.models import Payment, PackagePayment, Package, User
 from app.utils.decorators import admin_required, permission_required, admin_or_permission_required, module_required
 from app.utils.helpers import can_manage_payments
+from app.services.realtime_service import publish_payment
 from sqlalchemy import func
 
 
@@ -242,6 +243,7 @@ def admin_create_payment():
                 package.paid_amount = (package.paid_amount or 0) + allocated
                 remaining_amount -= allocated
     
+    publish_payment(payment, 'created')
     db.session.commit()
     
     return jsonify({
@@ -299,6 +301,7 @@ def admin_cancel_payment(payment_id):
             package.paid_amount = max(0, (package.paid_amount or 0) - (pkg_payment.amount or 0))
     
     payment.status = 'cancelled'
+    publish_payment(payment, 'cancelled')
     db.session.commit()
     
     return jsonify({
@@ -331,6 +334,7 @@ def admin_confirm_payment(payment_id):
         return jsonify({'error': 'Cannot confirm cancelled payment'}), 400
     
     payment.status = 'confirmed'
+    publish_payment(payment, 'confirmed')
     db.session.commit()
     
     return jsonify({
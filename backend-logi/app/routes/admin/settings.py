@@ -11,6 +11,7 @@ from app.routes.admin import admin_bp
 from app.models import TenantConfig, Warehouse, Tenant
 from app.utils.decorators import admin_required, module_required
 from app.utils.audit import audit_log, AuditAction
+from app.services.notification_templates import validate_templates
 from datetime import datetime
 import os
 
@@ -43,6 +44,14 @@ def _upsert_warehouse_from_tarifs(tenant_id: str, country: str, code: str, name:
     return wh
 
 
+def _invalid_templates_response(templates: dict):
+    """Retourne une réponse 400 si les templates sont invalides, sinon None"""
+    errors = validate_templates(templates)
+    if errors:
+        return jsonify({'error': 'Templates invalides', 'details': errors}), 400
+    return None
+
+
 def _sync_tarifs_to_warehouses(tenant_id: str, origins: dict, destinations: dict):
     """Create/update Warehouse rows from Tarifs config.
 
@@ -519,7 +528,12 @@ def admin_update_notification_settings():
         - templates: Templates de messages
     """
     tenant_id = g.tenant_id
-    data = request.get_json()
+    data = request.get_json() or {}
+    
+    if data.get('templates'):
+        invalid = _invalid_templates_response(data['templates'])
+        if invalid:
+            return invalid
     
     config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
     if not config:
@@ -705,7 +719,11 @@ def admin_update_template(template_key):
         - email: Template Email
     """
     tenant_id = g.tenant_id
-    data = request.get_json()
+    data = request.get_json() or {}
+    
+    invalid = _invalid_templates_response({template_key: data})
+    if invalid:
+        return invalid
     
     config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
     if not config:
@@ -891,9 +909,21 @@ def admin_update_notification_template(template_id):
         - sms: Template SMS
         - whatsapp: Template WhatsApp
         - email: { subject, body } Template Email
+        - push: Template Push
     """
     tenant_id = g.tenant_id
-    data = request.get_json()
+    data = request.get_json() or {}
+    
+    template = {
+        'sms': data.get('sms'),
+        'whatsapp': data.get('whatsapp'),
+        'email': data.get('email'),
+        'push': data.get('push')
+    }
+    
+    invalid = _invalid_templates_response({template_id: template})
+    if invalid:
+        return invalid
     
     config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
     if not config:
@@ -907,11 +937,7 @@ def admin_update_notification_template(template_id):
         config.config_data['templates'] = {}
     
     # Mettre à jour le template
-    config.config_data['templates'][template_id] = {
-        'sms': data.get('sms'),
-        'whatsapp': data.get('whatsapp'),
-        'email': data.get('email')
-    }
+    config.config_data['templates'][template_id] = template
     
     from sqlalchemy.orm.attributes import flag_modified
     flag_modified(config, 'config_data')
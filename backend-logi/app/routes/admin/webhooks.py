@@ -0,0 +1,115 @@
+"""
+Routes Admin - Boîte de réception des webhooks transporteurs
+Consultation et rejeu des webhooks reçus (table webhook_events)
+"""
+
+from flask import request, jsonify, g
+from app.routes.admin import admin_bp
+from app.utils.decorators import admin_required
+from app.models import WebhookEvent
+from app.services.webhook_inbox import WebhookInbox
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_REPLAY = 100
+
+
+@admin_bp.route('/webhooks/events', methods=['GET'])
+@admin_required
+def list_webhook_events():
+    """
+    Liste des webhooks reçus (plus récents d'abord)
+
+    Query params:
+        - status: queued, processed, failed, ignored
+        - provider: generic, 17track, aftership, dhl
+        - page, per_page
+    """
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+
+    query = WebhookEvent.query.filter_by(tenant_id=g.tenant_id)
+
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+
+    provider = request.args.get('provider')
+    if provider:
+        query = query.filter_by(provider=provider)
+
+    pagination = query.order_by(WebhookEvent.received_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    return jsonify({
+        'events': [e.to_dict() for e in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page
+    })
+
+
+@admin_bp.route('/webhooks/events/<event_id>', methods=['GET'])
+@admin_required
+def get_webhook_event(event_id):
+    """Détail d'un webhook, avec le payload brut"""
+    event = WebhookEvent.query.filter_by(id=event_id, tenant_id=g.tenant_id).first()
+    if not event:
+        return jsonify({'error': 'Webhook event not found'}), 404
+
+    return jsonify({'event': event.to_dict(include_payload=True)})
+
+
+@admin_bp.route('/webhooks/events/<event_id>/replay', methods=['POST'])
+@admin_required
+def replay_webhook_event(event_id):
+    """Rejoue un webhook stocké"""
+    event = WebhookEvent.query.filter_by(id=event_id, tenant_id=g.tenant_id).first()
+    if not event:
+        return jsonify({'error': 'Webhook event not found'}), 404
+
+    try:
+        scheduled = WebhookInbox.replay(event)
+    except ValueError:
+        return jsonify({'error': 'Payload illisible'}), 400
+
+    logger.info(f"Webhook event {event.id} rejoué ({scheduled} mise(s) à jour)")
+
+    return jsonify({
+        'message': 'Replay scheduled',
+        'event': event.to_dict(),
+        'updates': scheduled
+    }), 202
+
+
+@admin_bp.route('/webhooks/events/replay', methods=['POST'])
+@admin_required
+def replay_webhook_events():
+    """
+    Rejoue plusieurs webhooks, dans l'ordre de réception
+
+    Body:
+        - event_ids: Liste d'IDs (optionnel)
+        - status: Statut à rejouer si pas d'IDs (défaut: failed)
+    """
+    data = request.get_json(silent=True) or {}
+
+    query = WebhookEvent.query.filter_by(tenant_id=g.tenant_id)
+    if data.get('event_ids'):
+        query = query.filter(WebhookEvent.id.in_(data['event_ids'][:MAX_BULK_REPLAY]))
+    else:
+        query = query.filter_by(status=data.get('status', WebhookEvent.STATUS_FAILED))
+
+    events = query.order_by(WebhookEvent.received_at).limit(MAX_BULK_REPLAY).all()
+
+    replayed = 0
+    for event in events:
+        try:
+            WebhookInbox.replay(event)
+            replayed += 1
+        except ValueError:
+            continue
+
+    return jsonify({'message': 'Replay scheduled', 'replayed': replayed}), 202
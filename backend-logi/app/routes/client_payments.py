@@ -22,6 +22,7 @@ from app.models import (
 )
 from app.services.payment_gateway_service import payment_gateway
 from app.services.enforcement_service import EnforcementService
+from app.services.realtime_service import publish_payment
 from app.utils.decorators import tenant_required
 from datetime import datetime
 import uuid
@@ -511,6 +512,7 @@ def _complete_package_payment(payment, verify_result=None):
             max_payable = float(pkg.amount or 0) - current_paid
             pkg.paid_amount = current_paid + min(pp_amount, max(0, max_payable))
     
+    publish_payment(payment, 'confirmed')
     db.session.commit()
     
     logger.info(f"Package payment completed: {payment.id} ({payment.amount} {payment.currency})")
@@ -6,10 +6,14 @@ les tarifs, origines, destinations, départs programmés
 
 from flask import Blueprint, request, jsonify
 from app.models import TenantConfig, Tenant, Announcement, Departure, Subscription
+from app.services.rate_service import RateService
 from datetime import datetime, date
 
 config_bp = Blueprint('config', __name__)
 
+# Nombre max de colis par appel de calcul groupé
+MAX_BATCH_QUOTES = 500
+
 
 @config_bp.route('/tenant/<tenant_id>', methods=['GET'])
 def get_tenant_config(tenant_id):
@@ -162,43 +166,20 @@ def get_tenant_rates(tenant_id):
     if not tenant:
         return jsonify({'error': 'Tenant not found'}), 404
     
-    config = TenantConfig.query.filter_by(tenant_id=tenant.id).first()
+    table = RateService.get_table(tenant.id)
     
-    if not config:
+    if not table:
         return jsonify({'rates': {}})
     
-    rates = config.shipping_rates or {}
-    
     # Filtres optionnels
     origin = request.args.get('origin')
     destination = request.args.get('destination')
     transport = request.args.get('transport')
     
-    if origin or destination:
-        filtered_rates = {}
-        for route_key, route_rates in rates.items():
-            parts = route_key.split('_')
-            if len(parts) == 2:
-                route_origin, route_dest = parts
-                
-                if origin and route_origin != origin:
-                    continue
-                if destination and route_dest != destination:
-                    continue
-                
-                if transport:
-                    # Filtrer par mode de transport
-                    if transport in route_rates:
-                        filtered_rates[route_key] = {transport: route_rates[transport]}
-                else:
-                    filtered_rates[route_key] = route_rates
-        
-        rates = filtered_rates
-    
     return jsonify({
-        'rates': rates,
-        'currencies': config.config_data.get('currencies', ['XAF', 'USD', 'EUR']),
-        'default_currency': config.config_data.get('default_currency', 'XAF')
+        'rates': table.filter(origin, destination, transport),
+        'currencies': table.currencies,
+        'default_currency': table.default_currency
     })
 
 
@@ -226,12 +207,12 @@ def calculate_shipping(tenant_id):
     if not tenant:
         return jsonify({'error': 'Tenant not found'}), 404
     
-    config = TenantConfig.query.filter_by(tenant_id=tenant.id).first()
+    table = RateService.get_table(tenant.id)
     
-    if not config:
+    if not table:
         return jsonify({'error': 'No rates configured'}), 400
     
-    data = request.get_json()
+    data = request.get_json() or {}
     
     # Validation
     required = ['origin', 'destination', 'transport_mode', 'package_type']
@@ -239,60 +220,108 @@ def calculate_shipping(tenant_id):
         if not data.get(field):
             return jsonify({'error': f'{field} is required'}), 400
     
-    # Récupérer le tarif
-    route_key = f"{data['origin']}_{data['destination']}"
-    route_rates = config.shipping_rates.get(route_key, {})
-    transport_rates = route_rates.get(data['transport_mode'], {})
-    
-    if not transport_rates:
+    if not table.has_transport(data['origin'], data['destination'], data['transport_mode']):
         return jsonify({'error': 'No rates for this route/transport'}), 404
     
     package_type = data['package_type']
-    rate_info = transport_rates.get(package_type)
+    entry = table.lookup(data['origin'], data['destination'], data['transport_mode'], package_type)
     
-    if not rate_info:
+    if not entry:
         return jsonify({'error': f'No rate for package type: {package_type}'}), 404
     
-    # Calculer le coût
-    currency = transport_rates.get('currency', 'XAF')
-    
-    # Support ancien format (number) et nouveau format (object)
-    if isinstance(rate_info, dict):
-        rate = rate_info.get('rate', 0)
-        unit = rate_info.get('unit', 'kg')
-    else:
-        rate = rate_info
-        unit = 'kg'
-    
-    # Calculer selon l'unité
-    if unit == 'kg':
-        weight = data.get('weight', 0)
-        total = rate * weight
-        calculation = f"{weight} kg × {rate} {currency}/kg"
-    elif unit == 'cbm':
-        cbm = data.get('cbm', 0)
-        total = rate * cbm
-        calculation = f"{cbm} m³ × {rate} {currency}/m³"
-    elif unit == 'piece':
-        quantity = data.get('quantity', 1)
-        total = rate * quantity
-        calculation = f"{quantity} pcs × {rate} {currency}/pc"
-    elif unit == 'fixed':
-        total = rate
-        calculation = f"Forfait: {rate} {currency}"
-    else:
-        total = rate
-        calculation = f"{rate} {currency}"
+    try:
+        quote = table.quote(entry, data.get('weight'), data.get('cbm'), data.get('quantity'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'route': route_key,
+        'route': entry.route_key,
         'transport_mode': data['transport_mode'],
         'package_type': package_type,
-        'rate': rate,
-        'unit': unit,
-        'currency': currency,
-        'total': round(total, 2),
-        'calculation': calculation
+        **quote
+    })
+
+
+@config_bp.route('/tenant/<tenant_id>/calculate/batch', methods=['POST'])
+def calculate_shipping_batch(tenant_id):
+    """
+    Calculer le coût d'expédition de plusieurs colis en un appel
+    
+    Utilisé par les écrans de réception et de planification des départs.
+    
+    Body:
+        - items: Liste d'objets {ref?, origin, destination, transport_mode,
+                 package_type, weight?, cbm?, quantity?} (max MAX_BATCH_QUOTES)
+        - defaults: Valeurs par défaut appliquées à chaque item (optionnel)
+    
+    Returns:
+        Un devis (ou une erreur) par item, dans l'ordre, et les totaux par devise
+    """
+    tenant = Tenant.query.filter(
+        (Tenant.id == tenant_id) | (Tenant.slug == tenant_id)
+    ).first()
+    
+    if not tenant:
+        return jsonify({'error': 'Tenant not found'}), 404
+    
+    data = request.get_json() or {}
+    items = data.get('items')
+    defaults = data.get('defaults') or {}
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items is required'}), 400
+    
+    if len(items) > MAX_BATCH_QUOTES:
+        return jsonify({'error': f'Too many items (max {MAX_BATCH_QUOTES})'}), 400
+    
+    table = RateService.get_table(tenant.id)
+    
+    if not table:
+        return jsonify({'error': 'No rates configured'}), 400
+    
+    quotes = []
+    totals = {}
+    errors = 0
+    
+    for index, raw_item in enumerate(items):
+        item = {**defaults, **raw_item} if isinstance(raw_item, dict) else dict(defaults)
+        result = {'index': index, 'ref': item.get('ref')}
+        
+        missing = [f for f in ('origin', 'destination', 'transport_mode', 'package_type') if not item.get(f)]
+        entry = None
+        if missing:
+            result['error'] = f'{missing[0]} is required'
+        else:
+            entry = table.lookup(item['origin'], item['destination'], item['transport_mode'], item['package_type'])
+            if not entry:
+                if table.has_transport(item['origin'], item['destination'], item['transport_mode']):
+                    result['error'] = f"No rate for package type: {item['package_type']}"
+                else:
+                    result['error'] = 'No rates for this route/transport'
+        
+        if entry:
+            try:
+                quote = table.quote(entry, item.get('weight'), item.get('cbm'), item.get('quantity'))
+            except ValueError as e:
+                result['error'] = str(e)
+            else:
+                result.update({
+                    'route': entry.route_key,
+                    'transport_mode': item['transport_mode'],
+                    'package_type': item['package_type'],
+                    **quote
+                })
+                totals[quote['currency']] = round(totals.get(quote['currency'], 0) + quote['total'], 2)
+        
+        if 'error' in result:
+            errors += 1
+        quotes.append(result)
+    
+    return jsonify({
+        'quotes': quotes,
+        'count': len(quotes),
+        'errors': errors,
+        'totals': totals
     })
 
 
@@ -1,8 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import get_jwt_identity
 from app import db
-from app.models import Notification, User, PushSubscription
+from app.models import Notification, User, PushSubscription, UnreadCounter, SyncTombstone
 from app.utils.decorators import tenant_required
+from app.utils.sql_instrumentation import query_budget
 from datetime import datetime
 
 notifications_bp = Blueprint('notifications', __name__)
@@ -26,10 +27,13 @@ def get_notifications():
     query = query.order_by(Notification.created_at.desc())
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
+    unread_count = UnreadCounter.get(UnreadCounter.SCOPE_NOTIFICATIONS, user_id)
+    db.session.commit()
+    
     return jsonify({
         'notifications': [n.to_dict() for n in pagination.items],
         'total': pagination.total,
-        'unread_count': Notification.query.filter_by(user_id=user_id, is_read=False).count(),
+        'unread_count': unread_count,
         'pages': pagination.pages,
         'current_page': page
     })
@@ -49,8 +53,10 @@ def mark_as_read(notification_id):
     if not notification:
         return jsonify({'error': 'Notification not found'}), 404
     
-    notification.mark_as_read()
-    db.session.commit()
+    if not notification.is_read:
+        notification.mark_as_read()
+        UnreadCounter.adjust(UnreadCounter.SCOPE_NOTIFICATIONS, user_id, -1)
+        db.session.commit()
     
     return jsonify({'message': 'Notification marked as read'})
 
@@ -68,6 +74,7 @@ def mark_all_as_read():
         'is_read': True,
         'read_at': datetime.utcnow()
     })
+    UnreadCounter.reset(UnreadCounter.SCOPE_NOTIFICATIONS, user_id)
     
     db.session.commit()
     
@@ -88,6 +95,9 @@ def delete_notification(notification_id):
     if not notification:
         return jsonify({'error': 'Notification not found'}), 404
     
+    if not notification.is_read:
+        UnreadCounter.adjust(UnreadCounter.SCOPE_NOTIFICATIONS, user_id, -1)
+    SyncTombstone.record(g.tenant_id, user_id, SyncTombstone.ENTITY_NOTIFICATION, notification.id)
     db.session.delete(notification)
     db.session.commit()
     
@@ -101,6 +111,9 @@ def delete_all_notifications():
     user_id = get_jwt_identity()
     
     deleted_count = Notification.query.filter_by(user_id=user_id).delete()
+    UnreadCounter.reset(UnreadCounter.SCOPE_NOTIFICATIONS, user_id)
+    if deleted_count:
+        SyncTombstone.record(g.tenant_id, user_id, SyncTombstone.ENTITY_NOTIFICATION, SyncTombstone.ALL)
     db.session.commit()
     
     return jsonify({
@@ -111,14 +124,13 @@ def delete_all_notifications():
 
 @notifications_bp.route('/unread-count', methods=['GET'])
 @tenant_required
+@query_budget(8)
 def get_unread_count():
-    """Nombre de notifications non lues"""
+    """Nombre de notifications non lues (compteur maintenu, sans COUNT)"""
     user_id = get_jwt_identity()
     
-    count = Notification.query.filter_by(
-        user_id=user_id,
-        is_read=False
-    ).count()
+    count = UnreadCounter.get(UnreadCounter.SCOPE_NOTIFICATIONS, user_id)
+    db.session.commit()
     
     return jsonify({'unread_count': count})
 
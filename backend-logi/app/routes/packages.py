@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import get_jwt_identity
 from app import db
-from app.models import Package, PackageHistory, User, Tenant, Departure, TenantConfig
+from app.models import Package, PackageHistory, User, Tenant, Departure, TenantConfig, SyncTombstone, TrackingAlias, TenantUsage
 from app.models.package import _money
 from app.utils.decorators import tenant_required, get_current_tenant_id
 from app.utils.helpers import generate_tracking_number
@@ -111,15 +111,11 @@ def validate_package_data(data: dict, is_update: bool = False, tenant_id: str =
         
         # Si on a origine et destination, vérifier que le type existe dans les tarifs configurés
         if origin and dest:
-            from app.models import TenantConfig
-            config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
-            if config and config.shipping_rates:
-                route_key = f"{origin}_{dest}"
-                route_rates = config.shipping_rates.get(route_key, {})
-                transport_rates = route_rates.get(transport, {})
-                
-                # Vérifier que le type existe dans les tarifs (exclure 'currency')
-                valid_types = [k for k in transport_rates.keys() if k != 'currency']
+            from app.services.rate_service import RateService
+            table = RateService.get_table(tenant_id)
+            if table:
+                # Types configurés pour la route (hors 'currency')
+                valid_types = table.package_types(origin, dest, transport)
                 
                 if valid_types and pkg_type not in valid_types:
                     return False, f'Type de colis "{pkg_type}" non configuré pour cette route. Types disponibles: {", ".join(valid_types)}'
@@ -251,9 +247,9 @@ def create_package():
     if not is_valid:
         return jsonify({'error': error_msg}), 400
         
-    # Vérification des quotas (Enforcement)
+    # Vérification + consommation du quota (Enforcement, même transaction que l'insertion)
     from app.services.enforcement_service import EnforcementService
-    quota_result = EnforcementService.check_quota(tenant_id, EnforcementService.RESOURCE_PACKAGES_MONTHLY)
+    quota_result = EnforcementService.consume_quota(tenant_id, EnforcementService.RESOURCE_PACKAGES_MONTHLY)
     if not quota_result['allowed']:
         return jsonify({
             'error': 'Quota atteint',
@@ -315,6 +311,7 @@ def create_package():
         
         db.session.add(package)
         db.session.flush()
+        TrackingAlias.sync_package(package)
         
         # Vérifier si l'auto-assignation est activée dans les paramètres
         assigned_departure = None
@@ -410,6 +407,7 @@ def update_package(package_id):
         # Champs modifiables par le client avec sanitization
         if 'supplier_tracking' in data:
             package.supplier_tracking = data['supplier_tracking'].strip()[:100] if data['supplier_tracking'] else None
+            TrackingAlias.sync_package(package)
         if 'description' in data:
             package.description = data['description'].strip()[:MAX_DESCRIPTION_LENGTH]
         if 'category' in data:
@@ -489,6 +487,10 @@ def delete_package(package_id):
         tracking = package.tracking_number
         # Supprimer l'historique d'abord
         PackageHistory.query.filter_by(package_id=package_id).delete()
+        SyncTombstone.record(tenant_id, package.client_id, SyncTombstone.ENTITY_PACKAGE, package.id)
+        TrackingAlias.remove(TrackingAlias.ENTITY_PACKAGE, package.id)
+        # Le colis supprimé libère son quota du mois de création
+        TenantUsage.adjust(tenant_id, TenantUsage.RESOURCE_PACKAGES, -1, TenantUsage.period_of(package.created_at))
         db.session.delete(package)
         db.session.commit()
         
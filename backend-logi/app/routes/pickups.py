@@ -3,32 +3,102 @@ Routes API pour la gestion des retraits de colis
 Gère le processus complet de retrait avec paiement intégré
 """
 
-from flask import Blueprint, request, jsonify, current_app, g, make_response
+from flask import Blueprint, request, jsonify, g, make_response
 from flask_jwt_extended import jwt_required
 from app import db
-from app.models import Package, Pickup, Payment, PackagePayment, User, PackageHistory
+from app.models import Package, Pickup, Payment, PackagePayment, User, PackageHistory, Departure
+from app.models.package import PICKUP_READY_STATUSES
 from app.utils.decorators import tenant_required, admin_required
+from app.utils.sql_instrumentation import query_budget
 from app.utils.helpers import can_process_pickup
 from app.services.notification_service import NotificationService
+from app.services.realtime_service import publish_package_status, publish_payment
+from app.services.qr_service import QRCodeCache, render_sheet
+from app.services.blob_store import put_data_url, send_ref, exists_ref, stored_ref, BlobStoreError
+from app.services.image_pipeline import store_image, ImageProcessingError
+from app.services.document_cache import DocumentCache, entity_version
 from datetime import datetime
+from sqlalchemy import and_, case, func, or_, true
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import flag_modified
 import base64
 import os
+import uuid
 import logging
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import io
-import qrcode
-from qrcode.constants import ERROR_CORRECT_L
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('pickups', __name__, url_prefix='/api/pickups')
 
+MAX_SIGNATURE_BYTES = 500 * 1024
+BATCH_PICKUP_MAX = 50
+PICKUP_PAYMENT_METHODS = ['cash', 'mobile_money', 'bank_transfer', 'card']
+QR_SHEET_MAX = 600
+
+
+def _pickup_scope():
+    """Agences de destination visibles: None = toutes (admin), liste (staff)"""
+    if g.user_role != 'staff':
+        return None
+    return getattr(g, 'staff_warehouse_ids', None) or ([] if not g.staff_warehouse_id else [g.staff_warehouse_id])
+
+
+def _ready_criteria(tenant_id, warehouse_ids):
+    """Colis prêts au retrait (index partiel idx_package_pickup_ready)"""
+    criteria = [Package.tenant_id == tenant_id, Package.status.in_(PICKUP_READY_STATUSES)]
+    if warehouse_ids is not None:
+        criteria.append(Package.destination_warehouse_id.in_(warehouse_ids))
+    return criteria
+
+
+def _pickup_stats(tenant_id, warehouse_ids) -> dict:
+    """Compteurs du guichet en une requête (agrégats conditionnels)"""
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+
+    unpaid = and_(Package.amount > 0, or_(Package.paid_amount == None, Package.paid_amount < Package.amount))
+    packages = db.select(
+        func.count().label('awaiting_pickup'),
+        func.coalesce(func.sum(case((unpaid, 1), else_=0)), 0).label('awaiting_payment')
+    ).where(*_ready_criteria(tenant_id, warehouse_ids)).subquery()
+
+    pickups = db.select(
+        func.coalesce(func.sum(case((Pickup.picked_up_at >= today_start, 1), else_=0)), 0).label('pickups_today'),
+        func.count().label('pickups_month')
+    ).where(Pickup.tenant_id == tenant_id, Pickup.picked_up_at >= month_start).subquery()
+
+    row = db.session.execute(
+        db.select(packages, pickups).select_from(packages.join(pickups, true()))
+    ).one()
+    return {
+        'awaiting_pickup': row.awaiting_pickup,
+        'awaiting_payment': int(row.awaiting_payment),
+        'pickups_today': int(row.pickups_today),
+        'pickups_month': row.pickups_month
+    }
+
+
+def _ready_package_dict(p) -> dict:
+    """Ligne de la file de retrait (client chargé avec le colis)"""
+    client = p.client
+    return {
+        'id': p.id,
+        'tracking_number': p.tracking_number,
+        'client_name': f"{client.first_name} {client.last_name}" if client else 'N/A',
+        'client_phone': client.phone if client else '',
+        'description': p.description[:50] + '...' if p.description and len(p.description) > 50 else p.description,
+        'status': p.status,
+        'amount': p.amount or 0,
+        'paid_amount': p.paid_amount or 0,
+        'remaining': (p.amount or 0) - (p.paid_amount or 0),
+        'currency': p.amount_currency or 'XAF',
+        'payment_status': p.payment_status,
+        'can_pickup': p.can_be_picked_up,
+        'arrived_at': p.updated_at.isoformat() if p.updated_at else None
+    }
+
 
 @bp.route('/stats', methods=['GET'])
 @admin_required
@@ -36,59 +106,51 @@ def get_pickup_stats():
     """
     Statistiques des retraits pour le mini dashboard
     """
+    warehouse_ids = _pickup_scope()
+    if warehouse_ids is not None and not warehouse_ids:
+        return jsonify({'error': 'Accès refusé'}), 403
+
+    return jsonify(_pickup_stats(g.tenant_id, warehouse_ids))
+
+
+@bp.route('/desk', methods=['GET'])
+@admin_required
+@query_budget(5)
+def get_pickup_desk():
+    """
+    Guichet de retrait: compteurs + première page de la file des colis prêts
+    (écran rafraîchi en continu: deux requêtes SQL hors authentification)
+
+    Query params:
+        - per_page: taille de la file (défaut: 10, max 50)
+    """
     tenant_id = g.tenant_id
-    
-    # Colis en attente de retrait (arrivés mais pas encore livrés)
-    ready_statuses = ['arrived_port', 'customs', 'out_for_delivery']
-    
-    awaiting_pickup_query = Package.query.filter(
-        Package.tenant_id == tenant_id,
-        Package.status.in_(ready_statuses)
-    )
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))
 
-    if g.user_role == 'staff':
-        staff_wh_ids = getattr(g, 'staff_warehouse_ids', None) or ([] if not g.staff_warehouse_id else [g.staff_warehouse_id])
-        if not staff_wh_ids:
-            return jsonify({'error': 'Accès refusé'}), 403
-        awaiting_pickup_query = awaiting_pickup_query.filter(
-            Package.destination_warehouse_id.in_(staff_wh_ids)
-        )
+    warehouse_ids = _pickup_scope()
+    if warehouse_ids is not None and not warehouse_ids:
+        return jsonify({'error': 'Accès refusé'}), 403
 
-    awaiting_pickup = awaiting_pickup_query.count()
-    
-    # Colis avec paiement en attente
-    awaiting_payment_query = Package.query.filter(
-        Package.tenant_id == tenant_id,
-        Package.status.in_(ready_statuses),
-        Package.amount > 0,
-        (Package.paid_amount == None) | (Package.paid_amount < Package.amount)
-    )
+    stats = _pickup_stats(tenant_id, warehouse_ids)
 
-    if g.user_role == 'staff':
-        staff_wh_ids = getattr(g, 'staff_warehouse_ids', None) or ([] if not g.staff_warehouse_id else [g.staff_warehouse_id])
-        awaiting_payment_query = awaiting_payment_query.filter(Package.destination_warehouse_id.in_(staff_wh_ids))
+    packages = []
+    if stats['awaiting_pickup']:
+        packages = Package.query.options(joinedload(Package.client)).filter(
+            *_ready_criteria(tenant_id, warehouse_ids)
+        ).order_by(Package.updated_at.desc()).limit(per_page).all()
 
-    awaiting_payment = awaiting_payment_query.count()
-    
-    # Retraits aujourd'hui
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    pickups_today = Pickup.query.filter(
-        Pickup.tenant_id == tenant_id,
-        Pickup.picked_up_at >= today_start
-    ).count()
-    
-    # Total retraits ce mois
-    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    pickups_month = Pickup.query.filter(
-        Pickup.tenant_id == tenant_id,
-        Pickup.picked_up_at >= month_start
-    ).count()
-    
+    total = stats['awaiting_pickup']
     return jsonify({
-        'awaiting_pickup': awaiting_pickup,
-        'awaiting_payment': awaiting_payment,
-        'pickups_today': pickups_today,
-        'pickups_month': pickups_month
+        'stats': stats,
+        'queue': {
+            'packages': [_ready_package_dict(p) for p in packages],
+            'pagination': {
+                'page': 1,
+                'pages': -(-total // per_page),
+                'per_page': per_page,
+                'total': total
+            }
+        }
     })
 
 
@@ -102,20 +164,12 @@ def get_available_packages():
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 50)
     search = request.args.get('search', '').strip()
-    
-    # Statuts éligibles au retrait
-    ready_statuses = ['arrived_port', 'customs', 'out_for_delivery']
-    
-    query = Package.query.filter(
-        Package.tenant_id == tenant_id,
-        Package.status.in_(ready_statuses)
-    )
 
-    if g.user_role == 'staff':
-        staff_wh_ids = getattr(g, 'staff_warehouse_ids', None) or ([] if not g.staff_warehouse_id else [g.staff_warehouse_id])
-        if not staff_wh_ids:
-            return jsonify({'error': 'Accès refusé'}), 403
-        query = query.filter(Package.destination_warehouse_id.in_(staff_wh_ids))
+    warehouse_ids = _pickup_scope()
+    if warehouse_ids is not None and not warehouse_ids:
+        return jsonify({'error': 'Accès refusé'}), 403
+
+    query = Package.query.options(joinedload(Package.client)).filter(*_ready_criteria(tenant_id, warehouse_ids))
     
     # Recherche
     if search:
@@ -133,25 +187,8 @@ def get_available_packages():
         page=page, per_page=per_page, error_out=False
     )
     
-    result = []
-    for p in packages.items:
-        client = User.query.get(p.client_id)
-        result.append({
-            'id': p.id,
-            'tracking_number': p.tracking_number,
-            'client_name': f"{client.first_name} {client.last_name}" if client else 'N/A',
-            'client_phone': client.phone if client else '',
-            'description': p.description[:50] + '...' if p.description and len(p.description) > 50 else p.description,
-            'status': p.status,
-            'amount': p.amount or 0,
-            'paid_amount': p.paid_amount or 0,
-            'remaining': (p.amount or 0) - (p.paid_amount or 0),
-            'currency': p.amount_currency or 'XAF',
-            'arrived_at': p.updated_at.isoformat() if p.updated_at else None
-        })
-    
     return jsonify({
-        'packages': result,
+        'packages': [_ready_package_dict(p) for p in packages.items],
         'pagination': {
             'page': page,
             'pages': packages.pages,
@@ -200,7 +237,7 @@ def search_package():
                 tenant_id=tenant_id,
                 client_id=client.id
             ).filter(
-                Package.status.in_(['arrived_port', 'customs', 'out_for_delivery'])
+                Package.status.in_(PICKUP_READY_STATUSES)
             ).order_by(Package.updated_at.desc()).first()
     
     if not package:
@@ -234,6 +271,29 @@ def search_package():
 
 
 
+def _signature_ref(data: dict, tenant_id: str):
+    """
+    Référence blob de la signature d'une requête de retrait
+    
+    Returns:
+        (signature_ref ou None, réponse d'erreur ou None)
+    """
+    if data.get('signature'):
+        try:
+            return put_data_url(tenant_id, data['signature'], MAX_SIGNATURE_BYTES, private=True), None
+        except ValueError as e:
+            return None, (jsonify({'error': f'Signature invalide: {e}'}), 400)
+        except BlobStoreError as e:
+            logger.error(f"Stockage signature impossible: {e}")
+            return None, (jsonify({'error': 'Stockage de la signature impossible'}), 500)
+    if data.get('signature_ref'):
+        # Signature déposée par /upload-signature pour ce tenant uniquement
+        if not exists_ref(tenant_id, data['signature_ref'], private=True):
+            return None, (jsonify({'error': 'Référence de signature inconnue'}), 400)
+        return data['signature_ref'], None
+    return None, None
+
+
 @bp.route('/process', methods=['POST'])
 @admin_required
 def process_pickup():
@@ -303,9 +363,8 @@ def process_pickup():
             return jsonify({'error': 'Paiement requis (méthode manquante)'}), 400
         
         # Validation de la méthode de paiement
-        valid_methods = ['cash', 'mobile_money', 'bank_transfer', 'card']
-        if payment_data['method'] not in valid_methods:
-            return jsonify({'error': f'Méthode de paiement invalide. Valeurs acceptées: {", ".join(valid_methods)}'}), 400
+        if payment_data['method'] not in PICKUP_PAYMENT_METHODS:
+            return jsonify({'error': f'Méthode de paiement invalide. Valeurs acceptées: {", ".join(PICKUP_PAYMENT_METHODS)}'}), 400
         
         payment_collected = package.remaining_amount
         
@@ -359,12 +418,14 @@ def process_pickup():
         **proxy_data
     )
     
-    # Signature et photo
-    if 'signature' in data and data['signature']:
-        pickup.signature = data['signature']
+    # Signature (data URL ou référence renvoyée par /upload-signature) et photo
+    pickup.signature_ref, error = _signature_ref(data, tenant_id)
+    if error:
+        return error
     
     if 'photo_url' in data and data['photo_url']:
-        pickup.photo_proof = data['photo_url']
+        # URL renvoyée par /upload-photo: stockage local conservé en référence
+        pickup.photo_proof = stored_ref(data['photo_url'])
     
     db.session.add(pickup)
     
@@ -384,7 +445,7 @@ def process_pickup():
         package.picked_up_by_phone = package.client.phone
     
     package.picked_up_at = pickup.picked_up_at
-    package.pickup_signature = pickup.signature
+    package.pickup_signature_ref = pickup.signature_ref
     package.pickup_photo = pickup.photo_proof
     package.pickup_notes = pickup.notes
     
@@ -398,6 +459,10 @@ def process_pickup():
     )
     db.session.add(history)
     
+    publish_package_status(package, old_status)
+    if payment_id:
+        publish_payment(payment)
+    
     try:
         db.session.commit()
         
@@ -447,42 +512,396 @@ def process_pickup():
 
 
 
-@bp.route('/upload-signature', methods=['POST'])
+@bp.route('/batch', methods=['POST'])
 @admin_required
-def upload_signature():
+def process_batch_pickup():
     """
-    Valide une signature en base64
+    Retrait groupé: plusieurs colis d'un même client au guichet
+    
+    Un seul paiement (lié à chaque colis par PackagePayment), tous les retraits
+    dans une transaction, un reçu commun (/batch/<batch_id>/pdf) et une seule
+    notification au client.
+    
+    Body:
+        - package_ids: liste des colis (max BATCH_PICKUP_MAX)
+        - pickup_by, proxy_*, payment, signature | signature_ref, photo_url,
+          warehouse_id, notes: comme /process
     """
     data = request.get_json()
-    if not data or 'signature' not in data:
-        return jsonify({'error': 'Champ "signature" requis'}), 400
+    if not data:
+        return jsonify({'error': 'Données requises'}), 400
+    
+    package_ids = data.get('package_ids')
+    if not isinstance(package_ids, list) or not package_ids:
+        return jsonify({'error': 'Champ "package_ids" requis (liste)'}), 400
+    package_ids = list(dict.fromkeys(package_ids))
+    if len(package_ids) > BATCH_PICKUP_MAX:
+        return jsonify({'error': f'Maximum {BATCH_PICKUP_MAX} colis par retrait groupé'}), 400
     
-    # Valider le format base64
+    pickup_by = data.get('pickup_by')
+    if pickup_by not in ['client', 'proxy']:
+        return jsonify({'error': 'pickup_by doit être "client" ou "proxy"'}), 400
+    
+    tenant_id = g.tenant_id
+    staff_id = g.user.id
+    
+    # Tous les colis (et leur client) en une requête, verrouillés jusqu'au commit
+    packages = Package.query.options(joinedload(Package.client)).filter(
+        Package.tenant_id == tenant_id,
+        Package.id.in_(package_ids)
+    ).with_for_update(of=Package).all()
+    
+    found = {p.id for p in packages}
+    missing = [pid for pid in package_ids if pid not in found]
+    if missing:
+        return jsonify({'error': 'Colis non trouvé(s)', 'package_ids': missing}), 404
+    
+    if len({p.client_id for p in packages}) > 1:
+        return jsonify({'error': 'Les colis doivent appartenir au même client'}), 400
+    
+    if g.user_role == 'staff' and not all(can_process_pickup(g.user, p) for p in packages):
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    delivered = [p.tracking_number for p in packages if p.status == 'delivered']
+    if delivered:
+        return jsonify({'error': 'Colis déjà retiré(s)', 'tracking_numbers': delivered}), 400
+    
+    unavailable = [p.tracking_number for p in packages if p.status not in PICKUP_READY_STATUSES]
+    if unavailable:
+        return jsonify({'error': 'Colis non disponible(s) pour retrait', 'tracking_numbers': unavailable}), 400
+    
+    # Données du retireur
+    proxy_data = {}
+    if pickup_by == 'proxy':
+        for field in ['proxy_name', 'proxy_phone', 'proxy_id_type', 'proxy_id_number']:
+            if field not in data:
+                return jsonify({'error': f'Champ requis pour mandataire: {field}'}), 400
+            proxy_data[field] = data[field]
+    
+    # Montant restant par colis (avant paiement)
+    remaining = {p.id: p.remaining_amount for p in packages}
+    total_collected = sum(remaining.values())
+    currencies = {p.amount_currency or 'XAF' for p in packages if remaining[p.id] > 0}
+    if len(currencies) > 1:
+        return jsonify({'error': 'Devises différentes: encaisser les colis séparément'}), 400
+    
+    payment_data = data.get('payment') or {}
+    payment = None
+    if total_collected > 0:
+        if 'method' not in payment_data:
+            return jsonify({'error': 'Paiement requis (méthode manquante)', 'remaining_amount': total_collected}), 400
+        if payment_data['method'] not in PICKUP_PAYMENT_METHODS:
+            return jsonify({'error': f'Méthode de paiement invalide. Valeurs acceptées: {", ".join(PICKUP_PAYMENT_METHODS)}'}), 400
+    
+    signature_ref, error = _signature_ref(data, tenant_id)
+    if error:
+        return error
+    
+    client = packages[0].client
+    batch_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    
+    if total_collected > 0:
+        payment = Payment(
+            id=str(uuid.uuid4()),
+            tenant_id=tenant_id,
+            client_id=client.id,
+            amount=total_collected,
+            currency=currencies.pop(),
+            method=payment_data['method'],
+            reference=payment_data.get('reference'),
+            notes=f"Paiement au retrait groupé - {len(packages)} colis",
+            status='confirmed',
+            created_by=staff_id
+        )
+        if pickup_by == 'proxy':
+            payment.payer_name = proxy_data['proxy_name']
+            payment.payer_phone = proxy_data['proxy_phone']
+        db.session.add(payment)
+    
+    pickups = []
+    rows = []
+    old_statuses = {}
+    for package in packages:
+        due = remaining[package.id]
+        if due > 0:
+            rows.append(PackagePayment(payment_id=payment.id, package_id=package.id, amount=due))
+        # Même jeu de colonnes pour tous les colis: UPDATE groupés en un executemany
+        # (flag_modified: un montant inchangé serait sinon omis de l'UPDATE)
+        package.paid_amount = (package.paid_amount or 0) + due
+        flag_modified(package, 'paid_amount')
+        
+        pickup = Pickup(
+            tenant_id=tenant_id,
+            package_id=package.id,
+            client_id=package.client_id,
+            batch_id=batch_id,
+            pickup_by=pickup_by,
+            payment_id=payment.id if due > 0 else None,
+            payment_required=due > 0,
+            payment_collected=due,
+            payment_method=payment_data.get('method') if due > 0 else None,
+            payment_reference=payment_data.get('reference') if due > 0 else None,
+            signature_ref=signature_ref,
+            photo_proof=stored_ref(data.get('photo_url')),
+            warehouse_id=data.get('warehouse_id'),
+            staff_id=staff_id,
+            picked_up_at=now,
+            notes=data.get('notes'),
+            **proxy_data
+        )
+        pickups.append(pickup)
+        
+        old_statuses[package.id] = package.status
+        package.status = 'delivered'
+        package.delivered_at = now
+        package.picked_up_at = now
+        package.picked_up_by = proxy_data['proxy_name'] if pickup_by == 'proxy' else client.full_name
+        package.picked_up_by_phone = proxy_data['proxy_phone'] if pickup_by == 'proxy' else client.phone
+        if pickup_by == 'proxy':
+            package.picked_up_by_id_type = proxy_data['proxy_id_type']
+            package.picked_up_by_id_number = proxy_data['proxy_id_number']
+        package.pickup_signature_ref = signature_ref
+        package.pickup_photo = pickup.photo_proof
+        package.pickup_notes = pickup.notes
+        
+        rows.append(PackageHistory(
+            package_id=package.id,
+            status='delivered',
+            location=data.get('warehouse_id', 'Entrepôt'),
+            notes=f"Retrait groupé effectué par {pickup_by} ({len(packages)} colis)",
+            updated_by=staff_id
+        ))
+    
+    db.session.add_all(pickups + rows)
+    
+    for package in packages:
+        publish_package_status(package, old_statuses[package.id])
+    if payment:
+        publish_payment(payment)
+    
+    try:
+        # Réponse construite avant le commit: évite de recharger chaque ligne expirée
+        db.session.flush()
+        trackings = [p.tracking_number for p in packages]
+        result = {
+            'success': True,
+            'batch_id': batch_id,
+            'payment_id': payment.id if payment else None,
+            'amount_collected': total_collected,
+            'pickups': [p.to_dict(include_package=True, include_client=True) for p in pickups],
+            'receipt_url': f'/api/pickups/batch/{batch_id}/pdf',
+            'message': f'{len(packages)} colis retirés avec succès'
+        }
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erreur lors du retrait groupé: {str(e)}")
+        return jsonify({'error': 'Erreur lors du retrait groupé'}), 500
+    
+    logger.info(f"Retrait groupé {batch_id}: {len(packages)} colis par {pickup_by} (staff: {staff_id})")
+    
+    # Une notification pour l'ensemble des colis
     try:
-        signature_data = data['signature']
-        if not signature_data.startswith('data:image/'):
-            return jsonify({'error': 'Format de signature invalide (doit commencer par data:image/)'}), 400
+        notification_results = NotificationService(tenant_id).send_event_notification(
+            event_type='package_picked_up',
+            user=client,
+            variables={
+                'tracking': ', '.join(trackings),
+                'package_count': len(packages),
+                'client_name': result['pickups'][0]['client']['name'],
+                'pickup_date': now.strftime('%d/%m/%Y %H:%M'),
+                'pickup_by': pickup_by,
+                'proxy_name': proxy_data.get('proxy_name', ''),
+                'amount_collected': f"{total_collected:.0f}",
+                'payment_method': payment_data.get('method', '') if payment else '',
+                'warehouse': data.get('warehouse_id', 'Entrepôt principal')
+            },
+            title=f'{len(packages)} colis retirés avec succès' if len(packages) > 1 else 'Colis retiré avec succès'
+        )
+        logger.info(f"Notifications envoyées pour retrait groupé {batch_id}: {notification_results}")
+    except Exception as notif_error:
+        logger.error(f"Erreur lors de l'envoi des notifications: {str(notif_error)}")
+    
+    return jsonify(result)
+
+
+@bp.route('/batch/<batch_id>/pdf', methods=['GET'])
+@admin_required
+def generate_batch_pickup_pdf(batch_id):
+    """
+    Reçu commun d'un retrait groupé (un tableau de colis, un total)
+    """
+    pickups = Pickup.query.options(
+        joinedload(Pickup.package), joinedload(Pickup.client)
+    ).filter_by(
+        batch_id=batch_id,
+        tenant_id=g.tenant_id
+    ).all()
+    
+    if not pickups:
+        return jsonify({'error': 'Retrait groupé non trouvé'}), 404
+    
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    
+    try:
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
         
-        # Extraire les données base64
-        if ',' not in signature_data:
-            return jsonify({'error': 'Format de signature invalide (séparateur manquant)'}), 400
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30, alignment=1)
+        heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, spaceAfter=12)
+        normal_style = styles['Normal']
+        info_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
         
-        header, encoded = signature_data.split(',', 1)
-        decoded = base64.b64decode(encoded)
+        first = pickups[0]
+        currency = next((p.package.amount_currency for p in pickups if p.payment_collected), None) or 'XAF'
+        total = sum(p.payment_collected or 0 for p in pickups)
         
-        # Vérifier la taille (max 500KB)
-        if len(decoded) > 500 * 1024:
-            return jsonify({'error': 'Signature trop volumineuse (max 500KB)'}), 400
+        story = [Paragraph("REÇU DE RETRAIT GROUPÉ", title_style), Spacer(1, 20)]
         
-        # La signature est valide, on la retourne
-        return jsonify({
-            'success': True,
-            'signature': signature_data
-        })
+        info = [
+            ['Client:', f"{first.client.first_name} {first.client.last_name}"],
+            ['Téléphone client:', first.client.phone or 'N/A'],
+            ['Date de retrait:', first.picked_up_at.strftime('%d/%m/%Y %H:%M')],
+            ['Entrepôt:', first.warehouse_id or 'Entrepôt principal'],
+            ['Retiré par:', 'Client' if first.pickup_by == 'client' else f'Mandataire: {first.proxy_name}'],
+        ]
+        if first.pickup_by == 'proxy':
+            info.extend([
+                ['Téléphone:', first.proxy_phone],
+                ['Type d\'ID:', first.proxy_id_type],
+                ['Numéro d\'ID:', first.proxy_id_number],
+            ])
+        info_table = Table(info, colWidths=[2*inch, 4*inch])
+        info_table.setStyle(info_style)
+        story.extend([info_table, Spacer(1, 20)])
+        
+        # Colis retirés
+        story.append(Paragraph(f"COLIS RETIRÉS ({len(pickups)})", heading_style))
+        rows = [['N° de suivi', 'Description', 'Encaissé']]
+        for p in sorted(pickups, key=lambda p: p.package.tracking_number):
+            description = p.package.description or ''
+            rows.append([
+                p.package.tracking_number,
+                description[:40] + '...' if len(description) > 40 else description,
+                f"{p.payment_collected or 0:.0f} {currency}"
+            ])
+        rows.append(['', 'TOTAL', f"{total:.0f} {currency}"])
+        packages_table = Table(rows, colWidths=[1.8*inch, 3*inch, 1.4*inch], repeatRows=1)
+        packages_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.extend([packages_table, Spacer(1, 20)])
+        
+        if total > 0:
+            story.append(Paragraph("PAIEMENT", heading_style))
+            paid = next(p for p in pickups if p.payment_collected)
+            payment_table = Table([
+                ['Montant collecté:', f"{total:.0f} {currency}"],
+                ['Méthode:', paid.payment_method],
+                ['Référence:', paid.payment_reference or 'N/A'],
+            ], colWidths=[2*inch, 4*inch])
+            payment_table.setStyle(info_style)
+            story.extend([payment_table, Spacer(1, 20)])
+        
+        if first.notes:
+            story.append(Paragraph("NOTES", heading_style))
+            story.append(Paragraph(first.notes, normal_style))
+            story.append(Spacer(1, 20))
+        
+        story.append(Paragraph("SIGNATURE", heading_style))
+        story.append(Paragraph(
+            "Signature numérique présente ✓" if first.signature_ref else "Signature non fournie", normal_style
+        ))
+        story.append(Spacer(1, 30))
+        footer_style = ParagraphStyle('Footer', parent=normal_style, fontSize=8, textColor=colors.grey, alignment=1)
+        story.append(Paragraph(
+            f"Reçu généré le {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>"
+            f"Express Cargo - Système de gestion logistique<br/>"
+            f"ID du retrait groupé: {batch_id}",
+            footer_style
+        ))
+        
+        doc.build(story)
+        pdf_data = buffer.getvalue()
+        buffer.close()
+        
+        response = make_response(pdf_data)
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = f'inline; filename=retrait_groupe_{batch_id[:8]}.pdf'
+        response.headers['Content-Length'] = len(pdf_data)
+        return response
         
     except Exception as e:
-        logger.error(f"Erreur validation signature: {str(e)}")
-        return jsonify({'error': 'Signature invalide'}), 400
+        logger.error(f"Erreur génération PDF retrait groupé: {str(e)}")
+        return jsonify({'error': 'Erreur lors de la génération du PDF'}), 500
+
+
+@bp.route('/upload-signature', methods=['POST'])
+@admin_required
+def upload_signature():
+    """
+    Valide et stocke une signature en base64 (data URL)
+    La référence renvoyée peut être passée à /process (signature_ref)
+    """
+    data = request.get_json()
+    if not data or 'signature' not in data:
+        return jsonify({'error': 'Champ "signature" requis'}), 400
+    
+    try:
+        signature_ref = put_data_url(g.tenant_id, data['signature'], MAX_SIGNATURE_BYTES, private=True)
+    except ValueError as e:
+        return jsonify({'error': f'Signature invalide: {e}'}), 400
+    except BlobStoreError as e:
+        logger.error(f"Stockage signature impossible: {e}")
+        return jsonify({'error': 'Stockage de la signature impossible'}), 500
+    
+    return jsonify({
+        'success': True,
+        'signature_ref': signature_ref
+    })
+
+
+@bp.route('/<pickup_id>/signature', methods=['GET'])
+@admin_required
+def get_pickup_signature(pickup_id):
+    """
+    Image de la signature d'un retrait (contenu immuable: cache long)
+    """
+    signature_ref = db.session.query(Pickup.signature_ref).filter_by(
+        id=pickup_id,
+        tenant_id=g.tenant_id
+    ).scalar()
+    
+    if not signature_ref:
+        return jsonify({'error': 'Signature non trouvée'}), 404
+    
+    try:
+        # Cloudinary: redirection; local: fichier de l'espace du tenant (ETag / 304, cache privé immuable)
+        return send_ref(g.tenant_id, signature_ref, private=True)
+    except BlobStoreError as e:
+        logger.error(f"Signature illisible ({pickup_id}): {e}")
+        return jsonify({'error': 'Signature indisponible'}), 404
 
 
 @bp.route('/upload-photo', methods=['POST'])
@@ -513,32 +932,21 @@ def upload_photo():
         return jsonify({'error': 'Photo trop volumineuse (max 5MB)'}), 400
     
     try:
-        # Générer un nom unique
-        import uuid
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"pickup_{uuid.uuid4().hex}.{ext}"
-        
-        # Créer le dossier s'il n'existe pas
-        upload_dir = os.path.join(current_app.instance_path, 'uploads', 'pickups')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Sauvegarder le fichier
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        
-        # Retourner l'URL relative
-        photo_url = f"/uploads/pickups/{filename}"
-        
-        logger.info(f"Photo de retrait uploadée: {filename}")
-        
-        return jsonify({
-            'success': True,
-            'photo_url': photo_url
-        })
-        
-    except Exception as e:
+        # Prétraitée puis stockée (Cloudinary ou stockage local servi par /api/uploads/files)
+        stored = store_image(g.tenant_id, file.read(), folder='pickups', tags=[g.tenant_id, 'pickup'])
+    except ImageProcessingError as e:
+        return jsonify({'error': str(e)}), 400
+    except BlobStoreError as e:
         logger.error(f"Erreur upload photo: {str(e)}")
         return jsonify({'error': 'Erreur lors de l\'upload'}), 500
+    
+    logger.info(f"Photo de retrait uploadée: {stored.public_id or stored.ref}")
+    
+    return jsonify({
+        'success': True,
+        'photo_url': stored.url,
+        'thumbnail': stored.thumbnail_url
+    })
 
 
 @bp.route('/history', methods=['GET'])
@@ -608,61 +1016,89 @@ def pickup_history():
 def generate_qr_code(tracking_number):
     """
     Génère un QR code pour un colis (contient le tracking number)
+    
+    Query params:
+        - format: json (défaut, data URL base64) | png (image brute, cache navigateur long)
     """
     tenant_id = g.tenant_id
     
     # Vérifier que le colis existe et appartient au tenant
-    package = Package.query.filter_by(
+    package_id = db.session.query(Package.id).filter_by(
         tenant_id=tenant_id,
         tracking_number=tracking_number
-    ).first()
+    ).scalar()
     
-    if not package:
+    if not package_id:
         return jsonify({'error': 'Colis non trouvé'}), 404
     
     try:
-        # Créer le QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        
-        # Ajouter les données au QR code
-        qr_data = {
-            'tracking': tracking_number,
-            'tenant_id': tenant_id,
-            'package_id': package.id
-        }
-        
-        import json
-        qr.add_data(json.dumps(qr_data))
-        qr.make(fit=True)
-        
-        # Créer l'image
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir en base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        img_data_url = f"data:image/png;base64,{img_base64}"
-        
-        buffer.close()
-        
-        return jsonify({
-            'success': True,
-            'qr_code': img_data_url,
-            'tracking_number': tracking_number,
-            'package_id': package.id
-        })
-        
+        png, etag = QRCodeCache.get(tenant_id, package_id, tracking_number)
     except Exception as e:
         logger.error(f"Erreur génération QR code: {str(e)}")
         return jsonify({'error': 'Erreur lors de la génération du QR code'}), 500
+    
+    if request.args.get('format') == 'png':
+        # Contenu figé pour ce colis: immuable, revalidation par ETag
+        response = make_response(png)
+        response.headers['Content-Type'] = 'image/png'
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        response.set_etag(etag)
+        return response.make_conditional(request)
+    
+    return jsonify({
+        'success': True,
+        'qr_code': f"data:image/png;base64,{base64.b64encode(png).decode()}",
+        'tracking_number': tracking_number,
+        'package_id': package_id
+    })
+
+
+@bp.route('/qr/sheet', methods=['POST'])
+@admin_required
+def generate_qr_sheet():
+    """
+    Planches A4 de QR codes à imprimer (12 étiquettes par page)
+    
+    Body (un des deux):
+        - departure_id: tous les colis du départ
+        - package_ids: sélection de colis (max QR_SHEET_MAX)
+    """
+    data = request.get_json() or {}
+    tenant_id = g.tenant_id
+    
+    query = Package.query.options(joinedload(Package.client)).filter(Package.tenant_id == tenant_id)
+    title = None
+    
+    if data.get('departure_id'):
+        departure = Departure.query.filter_by(id=data['departure_id'], tenant_id=tenant_id).first()
+        if not departure:
+            return jsonify({'error': 'Départ non trouvé'}), 404
+        query = query.filter(Package.departure_id == departure.id)
+        title = f"Départ {departure.origin_country} - {departure.dest_country} du {departure.departure_date.strftime('%d/%m/%Y')}"
+    elif isinstance(data.get('package_ids'), list) and data['package_ids']:
+        if len(data['package_ids']) > QR_SHEET_MAX:
+            return jsonify({'error': f'Maximum {QR_SHEET_MAX} étiquettes par impression'}), 400
+        query = query.filter(Package.id.in_(data['package_ids']))
+    else:
+        return jsonify({'error': 'Champ "departure_id" ou "package_ids" requis'}), 400
+    
+    packages = query.order_by(Package.tracking_number).limit(QR_SHEET_MAX + 1).all()
+    if not packages:
+        return jsonify({'error': 'Aucun colis'}), 404
+    if len(packages) > QR_SHEET_MAX:
+        return jsonify({'error': f'Maximum {QR_SHEET_MAX} étiquettes par impression'}), 400
+    
+    try:
+        pdf_data = render_sheet(tenant_id, packages, title)
+    except Exception as e:
+        logger.error(f"Erreur génération planche QR: {str(e)}")
+        return jsonify({'error': 'Erreur lors de la génération du PDF'}), 500
+    
+    response = make_response(pdf_data)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'inline; filename=qr_codes_{len(packages)}.pdf'
+    response.headers['Content-Length'] = len(pdf_data)
+    return response
 
 
 @bp.route('/scan', methods=['POST'])
@@ -752,7 +1188,7 @@ def scan_qr_code():
 @admin_required
 def generate_pickup_pdf(pickup_id):
     """
-    Génère un PDF de reçu pour un retrait
+    Génère un PDF de reçu pour un retrait (cache documents, ETag / 304)
     """
     tenant_id = g.tenant_id
     
@@ -765,53 +1201,129 @@ def generate_pickup_pdf(pickup_id):
     if not pickup:
         return jsonify({'error': 'Retrait non trouvé'}), 404
     
-    try:
-        # Créer le buffer PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Centré
+    def render():
+        from app.services.export_service import ExportResult
+
+        return ExportResult(
+            success=True,
+            data=_build_pickup_pdf(pickup),
+            filename=f"retrait_{pickup.package.tracking_number}.pdf",
+            content_type='application/pdf'
         )
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12
+    
+    try:
+        return DocumentCache.serve(
+            'pickup_pdf', tenant_id, pickup.id, entity_version(pickup), render, disposition='inline'
         )
-        normal_style = styles['Normal']
-        
-        # Contenu du PDF
-        story = []
-        
-        # Titre
-        story.append(Paragraph("REÇU DE RETRAIT", title_style))
-        story.append(Spacer(1, 20))
+    except Exception as e:
+        logger.error(f"Erreur génération PDF: {str(e)}")
+        return jsonify({'error': 'Erreur lors de la génération du PDF'}), 500
+
+
+def _build_pickup_pdf(pickup) -> bytes:
+    """Reçu de retrait A4 (ReportLab)"""
+    # reportlab importé à la demande (coûteux au démarrage)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    
+    # Créer le buffer PDF
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=1  # Centré
+    )
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12
+    )
+    normal_style = styles['Normal']
+    
+    # Contenu du PDF
+    story = []
+    
+    # Titre
+    story.append(Paragraph("REÇU DE RETRAIT", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Informations du retrait
+    pickup_data = [
+        ['Numéro de suivi:', pickup.package.tracking_number],
+        ['Date de retrait:', pickup.picked_up_at.strftime('%d/%m/%Y %H:%M')],
+        ['Entrepôt:', pickup.warehouse_id or 'Entrepôt principal'],
+        ['Retiré par:', 'Client' if pickup.pickup_by == 'client' else f'Mandataire: {pickup.proxy_name}'],
+    ]
+    
+    if pickup.pickup_by == 'proxy':
+        pickup_data.extend([
+            ['Nom du mandataire:', pickup.proxy_name],
+            ['Téléphone:', pickup.proxy_phone],
+            ['Type d\'ID:', pickup.proxy_id_type],
+            ['Numéro d\'ID:', pickup.proxy_id_number],
+        ])
+    
+    pickup_table = Table(pickup_data, colWidths=[2*inch, 4*inch])
+    pickup_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(pickup_table)
+    story.append(Spacer(1, 20))
+    
+    # Informations du colis
+    story.append(Paragraph("INFORMATIONS DU COLIS", heading_style))
+    
+    package_data = [
+        ['Description:', pickup.package.description],
+        ['Client:', f"{pickup.client.first_name} {pickup.client.last_name}"],
+        ['Téléphone client:', pickup.client.phone or 'N/A'],
+    ]
+    
+    package_table = Table(package_data, colWidths=[2*inch, 4*inch])
+    package_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(package_table)
+    story.append(Spacer(1, 20))
+    
+    # Informations de paiement si applicable
+    if pickup.payment_required and pickup.payment_collected > 0:
+        story.append(Paragraph("PAIEMENT", heading_style))
         
-        # Informations du retrait
-        pickup_data = [
-            ['Numéro de suivi:', pickup.package.tracking_number],
-            ['Date de retrait:', pickup.picked_up_at.strftime('%d/%m/%Y %H:%M')],
-            ['Entrepôt:', pickup.warehouse_id or 'Entrepôt principal'],
-            ['Retiré par:', 'Client' if pickup.pickup_by == 'client' else f'Mandataire: {pickup.proxy_name}'],
+        payment_data = [
+            ['Montant collecté:', f"{pickup.payment_collected:.0f} {pickup.package.amount_currency or 'XAF'}"],
+            ['Méthode:', pickup.payment_method],
+            ['Référence:', pickup.payment_reference or 'N/A'],
         ]
         
-        if pickup.pickup_by == 'proxy':
-            pickup_data.extend([
-                ['Nom du mandataire:', pickup.proxy_name],
-                ['Téléphone:', pickup.proxy_phone],
-                ['Type d\'ID:', pickup.proxy_id_type],
-                ['Numéro d\'ID:', pickup.proxy_id_number],
-            ])
-        
-        pickup_table = Table(pickup_data, colWidths=[2*inch, 4*inch])
-        pickup_table.setStyle(TableStyle([
+        payment_table = Table(payment_data, colWidths=[2*inch, 4*inch])
+        payment_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (0, -1), colors.grey),
             ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -822,104 +1334,44 @@ def generate_pickup_pdf(pickup_id):
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
         
-        story.append(pickup_table)
+        story.append(payment_table)
         story.append(Spacer(1, 20))
-        
-        # Informations du colis
-        story.append(Paragraph("INFORMATIONS DU COLIS", heading_style))
-        
-        package_data = [
-            ['Description:', pickup.package.description],
-            ['Client:', f"{pickup.client.first_name} {pickup.client.last_name}"],
-            ['Téléphone client:', pickup.client.phone or 'N/A'],
-        ]
-        
-        package_table = Table(package_data, colWidths=[2*inch, 4*inch])
-        package_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(package_table)
+    
+    # Notes si présentes
+    if pickup.notes:
+        story.append(Paragraph("NOTES", heading_style))
+        story.append(Paragraph(pickup.notes, normal_style))
         story.append(Spacer(1, 20))
-        
-        # Informations de paiement si applicable
-        if pickup.payment_required and pickup.payment_collected > 0:
-            story.append(Paragraph("PAIEMENT", heading_style))
-            
-            payment_data = [
-                ['Montant collecté:', f"{pickup.payment_collected:.0f} {pickup.package.amount_currency or 'XAF'}"],
-                ['Méthode:', pickup.payment_method],
-                ['Référence:', pickup.payment_reference or 'N/A'],
-            ]
-            
-            payment_table = Table(payment_data, colWidths=[2*inch, 4*inch])
-            payment_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(payment_table)
-            story.append(Spacer(1, 20))
-        
-        # Notes si présentes
-        if pickup.notes:
-            story.append(Paragraph("NOTES", heading_style))
-            story.append(Paragraph(pickup.notes, normal_style))
-            story.append(Spacer(1, 20))
-        
-        # Signature
-        story.append(Paragraph("SIGNATURE", heading_style))
-        if pickup.signature:
-            story.append(Paragraph("Signature numérique présente ✓", normal_style))
-        else:
-            story.append(Paragraph("Signature non fournie", normal_style))
-        
-        story.append(Spacer(1, 30))
-        
-        # Pied de page
-        footer_text = f"""
-        <br/><br/>
-        <hr/>
-        <para align="center" fontSize="8" textColor="gray">
-        Reçu généré le {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-        Express Cargo - Système de gestion logistique<br/>
-        ID du retrait: {pickup.id}
-        </para>
-        """
-        
-        story.append(Paragraph(footer_text, normal_style))
-        
-        # Générer le PDF
-        doc.build(story)
-        
-        # Préparer la réponse
-        buffer.seek(0)
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        
-        response = make_response(pdf_data)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'inline; filename=retrait_{pickup.package.tracking_number}.pdf'
-        response.headers['Content-Length'] = len(pdf_data)
-        
-        return response
-        
-    except Exception as e:
-        logger.error(f"Erreur génération PDF: {str(e)}")
-        return jsonify({'error': 'Erreur lors de la génération du PDF'}), 500
+    
+    # Signature
+    story.append(Paragraph("SIGNATURE", heading_style))
+    if pickup.signature_ref:
+        story.append(Paragraph("Signature numérique présente ✓", normal_style))
+    else:
+        story.append(Paragraph("Signature non fournie", normal_style))
+    
+    story.append(Spacer(1, 30))
+    
+    # Pied de page
+    footer_text = f"""
+    <br/><br/>
+    <hr/>
+    <para align="center" fontSize="8" textColor="gray">
+    Reçu généré le {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
+    Express Cargo - Système de gestion logistique<br/>
+    ID du retrait: {pickup.id}
+    </para>
+    """
+    
+    story.append(Paragraph(footer_text, normal_style))
+    
+    # Générer le PDF
+    doc.build(story)
+    
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    
+    return pdf_data
 
 
 @bp.route('/<pickup_id>', methods=['GET'])
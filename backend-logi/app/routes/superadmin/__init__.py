@@ -21,3 +21,5 @@ from app.routes.superadmin import dashboard
 from app.routes.superadmin import config
 from app.routes.superadmin import billing
 from app.routes.superadmin import support
+from app.routes.superadmin import audit
+from app.routes.superadmin import profiles
@@ -0,0 +1,113 @@
+"""
+Routes Super-Admin - Journal d'audit
+====================================
+
+Recherche dans le log d'audit (toutes partitions mensuelles) et archivage
+des mois anciens. Voir app/services/audit_service.py.
+"""
+
+from flask import request, jsonify, current_app
+from app.routes.superadmin import superadmin_bp
+from app.routes.superadmin.auth import superadmin_permission_required
+from app.services.audit_service import AuditSearch, AuditPartitions, AuditArchiver, partition_name
+from app.utils.cursor import InvalidCursor
+from app import db
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+@superadmin_bp.route('/audit-logs', methods=['GET'])
+@superadmin_permission_required('audit.read')
+def search_audit_logs():
+    """
+    Recherche dans le log d'audit (plus récents d'abord)
+
+    Query params:
+        - tenant_id, user_id, resource_type, resource_id, status
+        - action: une action ou plusieurs séparées par des virgules
+        - since, until: dates ISO (until exclu)
+        - limit: 1-200 (défaut 50)
+        - cursor: next_cursor de la page précédente
+    """
+    try:
+        since = _parse_datetime(request.args.get('since'))
+        until = _parse_datetime(request.args.get('until'))
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format ISO attendu)'}), 400
+
+    filters = {name: request.args.get(name) for name in AuditSearch.FILTERS}
+
+    try:
+        result = AuditSearch.search(
+            db.engine,
+            filters,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            since=since,
+            until=until
+        )
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result)
+
+
+@superadmin_bp.route('/audit-logs/partitions', methods=['GET'])
+@superadmin_permission_required('audit.read')
+def list_audit_partitions():
+    """Partitions mensuelles existantes et leur volume"""
+    engine = db.engine
+    partitions = [
+        {
+            'month': month.strftime('%Y-%m'),
+            'name': partition_name(month),
+            'rows': AuditPartitions.count(engine, month)
+        }
+        for month in AuditPartitions.list(engine)
+    ]
+
+    return jsonify({
+        'mode': AuditPartitions.mode(engine),
+        'retention_months': current_app.config.get('AUDIT_RETENTION_MONTHS', 12),
+        'partitions': partitions
+    })
+
+
+@superadmin_bp.route('/audit-logs/archive', methods=['POST'])
+@superadmin_permission_required('audit.write')
+def archive_audit_logs():
+    """
+    Archive les mois au-delà de la rétention (export gzip puis suppression)
+
+    Body:
+        - retention_months: défaut AUDIT_RETENTION_MONTHS
+        - dry_run: true pour lister sans archiver
+    """
+    data = request.get_json(silent=True) or {}
+    retention = int(data.get('retention_months') or current_app.config.get('AUDIT_RETENTION_MONTHS', 12))
+    if retention < 1:
+        return jsonify({'error': 'retention_months doit être >= 1'}), 400
+
+    archived = AuditArchiver.archive(
+        db.engine,
+        retention_months=retention,
+        directory=current_app.config.get('AUDIT_ARCHIVE_DIR', 'archives/audit'),
+        dry_run=bool(data.get('dry_run'))
+    )
+
+    if not data.get('dry_run'):
+        logger.info(f"Audit: {len(archived)} partition(s) archivée(s) (rétention {retention} mois)")
+
+    return jsonify({
+        'retention_months': retention,
+        'dry_run': bool(data.get('dry_run')),
+        'archived': archived
+    })
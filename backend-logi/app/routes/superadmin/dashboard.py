@@ -8,6 +8,7 @@ Statistiques globales et métriques de la plateforme.
 from flask import request, jsonify, g
 from app.routes.superadmin import superadmin_bp
 from app.routes.superadmin.auth import superadmin_required, superadmin_permission_required
+from app.utils.db_routing import replica_read
 from app.models import (
     Tenant, User, Package, Subscription, SubscriptionPlan,
     SubscriptionPayment, PlatformPaymentProvider
@@ -22,6 +23,7 @@ logger = logging.getLogger(__name__)
 
 @superadmin_bp.route('/dashboard/stats', methods=['GET'])
 @superadmin_required
+@replica_read
 def get_dashboard_stats():
     """
     Statistiques globales du dashboard super-admin
@@ -0,0 +1,51 @@
+"""
+Routes Super-Admin - Profils de performance
+===========================================
+
+Profils échantillonnés des requêtes (X-Profile: 1 ou PROFILER_SAMPLE_RATES).
+Téléchargement au format collapsed stacks (flamegraph.pl, speedscope).
+Voir app/utils/profiler.py.
+"""
+
+from flask import jsonify, current_app, send_file
+from app.routes.superadmin import superadmin_bp
+from app.routes.superadmin.auth import superadmin_permission_required
+from app.utils.profiler import ProfileStore, PROFILE_HEADER
+import os
+
+
+@superadmin_bp.route('/profiles', methods=['GET'])
+@superadmin_permission_required('profiles.read')
+def list_profiles():
+    """Profils enregistrés (plus récents d'abord)"""
+    return jsonify({
+        'enabled': bool(current_app.config.get('PROFILER_ENABLED')),
+        'header': PROFILE_HEADER,
+        'sample_rates': current_app.extensions.get('profiler_rates', {}),
+        'profiles': ProfileStore.list()
+    })
+
+
+@superadmin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@superadmin_permission_required('profiles.read')
+def download_profile(profile_id):
+    """Télécharge un profil (.folded)"""
+    path = ProfileStore.path(profile_id)
+    if not path:
+        return jsonify({'error': 'Profil non trouvé'}), 404
+
+    return send_file(
+        os.path.abspath(path),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=f'{profile_id}.folded'
+    )
+
+
+@superadmin_bp.route('/profiles/<profile_id>', methods=['DELETE'])
+@superadmin_permission_required('profiles.write')
+def delete_profile(profile_id):
+    """Supprime un profil"""
+    if not ProfileStore.delete(profile_id):
+        return jsonify({'error': 'Profil non trouvé'}), 404
+    return jsonify({'message': 'Profil supprimé'})
@@ -6,7 +6,7 @@ Routes Super-Admin - Support Messages
 from flask import request, jsonify, g
 from app.routes.superadmin import superadmin_bp
 from app.routes.superadmin.auth import superadmin_required
-from app.models import SupportMessage, Tenant
+from app.models import SupportMessage, Tenant, UnreadCounter
 from app import db
 from datetime import datetime
 import logging
@@ -60,10 +60,12 @@ def list_support_messages():
 def get_support_message(message_id):
     """Get a support message thread with replies."""
     msg = SupportMessage.query.get_or_404(message_id)
+    marked = 0
 
     # Mark tenant messages as read
     if msg.direction == 'tenant_to_admin' and not msg.is_read:
         msg.is_read = True
+        marked += 1
 
     unread_replies = SupportMessage.query.filter_by(
         parent_id=message_id,
@@ -72,6 +74,8 @@ def get_support_message(message_id):
     ).all()
     for r in unread_replies:
         r.is_read = True
+    marked += len(unread_replies)
+    UnreadCounter.adjust(UnreadCounter.SCOPE_SUPPORT_ADMIN, UnreadCounter.PLATFORM_OWNER, -marked)
     db.session.commit()
 
     data = msg.to_dict(include_replies=True)
@@ -105,10 +109,13 @@ def reply_support_message(message_id):
         parent_id=parent.id
     )
     db.session.add(reply)
+    UnreadCounter.adjust(UnreadCounter.SCOPE_SUPPORT_TENANT, parent.tenant_id, 1)
 
     # Mark parent as read
     if not parent.is_read:
         parent.is_read = True
+        if parent.direction == 'tenant_to_admin':
+            UnreadCounter.adjust(UnreadCounter.SCOPE_SUPPORT_ADMIN, UnreadCounter.PLATFORM_OWNER, -1)
 
     db.session.commit()
 
@@ -120,9 +127,7 @@ def reply_support_message(message_id):
 @superadmin_bp.route('/support/unread-count', methods=['GET'])
 @superadmin_required
 def support_unread_count():
-    """Count unread support messages from tenants."""
-    count = SupportMessage.query.filter_by(
-        direction='tenant_to_admin',
-        is_read=False
-    ).count()
+    """Count unread support messages from tenants (maintained counter, no COUNT)."""
+    count = UnreadCounter.get(UnreadCounter.SCOPE_SUPPORT_ADMIN, UnreadCounter.PLATFORM_OWNER)
+    db.session.commit()
     return jsonify({'unread': count})
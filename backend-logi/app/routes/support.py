@@ -6,7 +6,8 @@ Routes Support - Messages tenant <-> superadmin
 from flask import Blueprint, request, jsonify, g
 from app import db
 from app.utils.decorators import tenant_required
-from app.models import SupportMessage, Tenant
+from app.utils.sql_instrumentation import query_budget
+from app.models import SupportMessage, Tenant, UnreadCounter
 from app.models.platform_config import PlatformConfig
 from datetime import datetime
 import logging
@@ -68,6 +69,7 @@ def send_message():
         sender_email=user.email if user else None
     )
     db.session.add(msg)
+    UnreadCounter.adjust(UnreadCounter.SCOPE_SUPPORT_ADMIN, UnreadCounter.PLATFORM_OWNER, 1)
     db.session.commit()
 
     logger.info(f"Support message from tenant {tenant_id}: {subject}")
@@ -92,6 +94,7 @@ def get_message(message_id):
     ).all()
     for r in unread_replies:
         r.is_read = True
+    UnreadCounter.adjust(UnreadCounter.SCOPE_SUPPORT_TENANT, msg.tenant_id, -len(unread_replies))
     db.session.commit()
 
     return jsonify(msg.to_dict(include_replies=True))
@@ -99,14 +102,11 @@ def get_message(message_id):
 
 @support_bp.route('/messages/unread-count', methods=['GET'])
 @tenant_required
+@query_budget(8)
 def unread_count():
-    """Count unread replies from admin."""
-    tenant_id = g.tenant_id
-    count = SupportMessage.query.filter_by(
-        tenant_id=tenant_id,
-        direction='admin_to_tenant',
-        is_read=False
-    ).count()
+    """Count unread replies from admin (maintained counter, no COUNT)."""
+    count = UnreadCounter.get(UnreadCounter.SCOPE_SUPPORT_TENANT, g.tenant_id)
+    db.session.commit()
     return jsonify({'unread': count})
 
 
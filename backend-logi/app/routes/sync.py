@@ -1,39 +1,41 @@
-"""Sync routes - Endpoints pour la synchronisation par snapshots.
+"""
+Routes Sync - Synchronisation différentielle (app mobile)
+Le client ne télécharge que ce qui a changé depuis sa dernière synchronisation
+"""
 
-Ces endpoints permettent le push/pull de snapshots complets
-pour la version offline de l'application.
+from flask import Blueprint, request, jsonify, g, current_app
+from flask_jwt_extended import get_jwt_identity
+from app.utils.decorators import tenant_required
+from app.utils.sql_instrumentation import query_budget
+from app.services.sync_service import SyncService, InvalidCursor, DEFAULT_LIMIT
+
+sync_bp = Blueprint('sync', __name__)
 
-Requirements: 3.2, 4.1
-"""
-from flask import Blueprint, request, jsonify, g
-
-from app.services.auth_service import auth_required
-from app.services.sync_service import SyncService
-
-sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync')
-
-@sync_bp.route('/push', methods=['POST'])
-@auth_required
-def push_data():
-    """Receive data from offline client."""
-    data = request.get_json()
-    if not data:
-        return jsonify({'success': False, 'error': 'No data provided'}), 400
-        
-    # auth_required decorator sets g.store_id and g.current_user
-    store_id = g.store_id
-    user_id = g.user_id if hasattr(g, 'user_id') else None
-    
-    result = SyncService.handle_push(data, store_id, user_id)
-    return jsonify(result)
 
-@sync_bp.route('/pull', methods=['GET'])
-@auth_required
-def pull_data():
-    """Send latest data to offline client."""
-    store_id = g.store_id
-    # Optional: get last_sync timestamp from query params if sending delta updates
-    # last_sync = request.args.get('last_sync')
-    
-    result = SyncService.handle_pull(store_id)
-    return jsonify({'success': True, 'data': result})
\ No newline at end of file
+@sync_bp.route('/changes', methods=['GET'])
+@tenant_required
+@query_budget(10)
+def get_changes():
+    """
+    Changements depuis le dernier curseur
+
+    Query params:
+        - since: Curseur retourné par l'appel précédent (absent = synchronisation complète)
+        - limit: Nombre max de lignes par type (défaut 200, max 500)
+
+    Tant que has_more est vrai, rappeler immédiatement avec le nouveau curseur.
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        result = SyncService.get_changes(
+            g.tenant_id,
+            user_id,
+            cursor=request.args.get('since'),
+            limit=request.args.get('limit', DEFAULT_LIMIT, type=int),
+            settle_seconds=current_app.config.get('SYNC_SETTLE_SECONDS', 5)
+        )
+    except InvalidCursor as e:
+        return jsonify({'error': str(e), 'code': 'INVALID_CURSOR'}), 400
+
+    return jsonify(result)
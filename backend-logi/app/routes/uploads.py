@@ -2,13 +2,21 @@
 Routes Upload - Gestion des fichiers
 =====================================
 
-Endpoints pour l'upload d'images et documents via Cloudinary.
+Endpoints pour l'upload d'images et documents via Cloudinary, ou le
+stockage local adressé par contenu si Cloudinary n'est pas configuré
+(UPLOAD_STORAGE_BACKEND), servi par /files/<clé>.
+
+Les images sont prétraitées avant l'envoi (ImagePipeline: orientation,
+réduction, réencodage, miniature). Alternative sans transit par l'API:
+upload direct signé (/signature puis /confirm pour les photos de colis).
 """
 
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 from flask_jwt_extended import get_jwt_identity
 from app.utils.decorators import tenant_required, admin_required
 from app.services.cloudinary_service import get_cloudinary_service, CloudinaryService
+from app.services.image_pipeline import ImageProcessingError, store_image
+from app.services.blob_store import BlobStoreError, put_bytes, blob_url, send_key, CONTENT_TYPES
 import logging
 import imghdr
 import mimetypes
@@ -68,6 +76,56 @@ def get_extension(filename: str) -> str:
     return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
 
+def _read_upload(file) -> bytes:
+    file.stream.seek(0)
+    return file.stream.read()
+
+
+def _signature_options() -> dict:
+    return {
+        'max_dimension': current_app.config.get('IMAGE_MAX_DIMENSION', 2048),
+        'thumbnail_size': current_app.config.get('IMAGE_THUMBNAIL_SIZE', 320),
+    }
+
+
+def _add_package_photo(package, url: str, public_id: str, photo_type: str, thumbnail: str = None,
+                       ref: str = None, thumbnail_ref: str = None):
+    """
+    Ajoute la photo au colis (si champ photos existe)
+    Stockage local: références seules, URL construites par Package.to_dict
+    """
+    from app import db
+
+    if hasattr(package, 'photos') and package.photos is not None:
+        # Copie: muter la liste chargée masquerait le changement (colonne JSON non suivie)
+        photos = list(package.photos or [])
+        photo = {
+            'public_id': public_id,
+            'type': photo_type
+        }
+        if ref:
+            photo['ref'] = ref
+            if thumbnail_ref:
+                photo['thumbnail_ref'] = thumbnail_ref
+        else:
+            photo['url'] = url
+            if thumbnail:
+                photo['thumbnail'] = thumbnail
+        photos.append(photo)
+        package.photos = photos
+        db.session.commit()
+
+
+def _get_client_package(package_id: str):
+    from app.models import Package
+
+    return Package.query.filter_by(
+        id=package_id,
+        tenant_id=g.tenant_id,
+        client_id=get_jwt_identity()
+    ).first()
+
+
 @uploads_bp.route('/image', methods=['POST'])
 @tenant_required
 def upload_image():
@@ -112,28 +170,56 @@ def upload_image():
     folder = request.form.get('folder', 'images')
     tags = request.form.get('tags', '').split(',') if request.form.get('tags') else None
     
-    # Upload
-    service = get_cloudinary_service(g.tenant_id)
-    
-    if not service.is_configured:
-        return jsonify({'error': 'Service de stockage non configuré'}), 503
+    # Prétraitement + stockage (Cloudinary ou local)
+    try:
+        stored = store_image(g.tenant_id, _read_upload(file), folder=folder, tags=tags)
+    except ImageProcessingError as e:
+        return jsonify({'error': str(e)}), 400
+    except BlobStoreError as e:
+        logger.error(f"Upload image impossible: {e}")
+        return jsonify({'error': 'Erreur lors de l\'upload'}), 500
+
+    logger.info(f"Image uploadée par user {get_jwt_identity()}: {stored.public_id or stored.ref}")
+
+    return jsonify({
+        'message': 'Image uploadée',
+        'url': stored.url,
+        'public_id': stored.public_id,
+        'ref': stored.ref,
+        'thumbnail': stored.thumbnail_url,
+        'width': stored.width,
+        'height': stored.height,
+        'format': stored.format,
+        'size': stored.bytes,
+        'original_size': stored.original_bytes
+    }), 201
+
+
+@uploads_bp.route('/signature', methods=['POST'])
+@tenant_required
+def upload_signature():
+    """
+    Paramètres signés pour un upload d'image direct vers Cloudinary
     
-    result = service.upload_image(file, folder=folder, tags=tags)
+    Body:
+        - folder: Dossier de destination (optional, default: "images")
+        - tags: Liste de tags (optional)
     
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur lors de l\'upload'}), 500
+    Returns:
+        Champs à poster (multipart) avec le fichier sur upload_url
+    """
+    data = request.get_json(silent=True) or {}
+    service = get_cloudinary_service(g.tenant_id)
     
-    logger.info(f"Image uploadée par user {get_jwt_identity()}: {result.public_id}")
+    params = service.sign_upload(
+        folder=data.get('folder') or 'images',
+        tags=data.get('tags'),
+        **_signature_options()
+    )
+    if not params:
+        return jsonify({'error': 'Service de stockage non configuré'}), 503
     
-    return jsonify({
-        'message': 'Image uploadée',
-        'url': result.secure_url,
-        'public_id': result.public_id,
-        'width': result.width,
-        'height': result.height,
-        'format': result.format,
-        'size': result.bytes
-    }), 201
+    return jsonify(params)
 
 
 @uploads_bp.route('/document', methods=['POST'])
@@ -180,10 +266,27 @@ def upload_document():
     tags = request.form.get('tags', '').split(',') if request.form.get('tags') else None
     
     service = get_cloudinary_service(g.tenant_id)
-    
-    if not service.is_configured:
-        return jsonify({'error': 'Service de stockage non configuré'}), 503
-    
+
+    if current_app.config.get('UPLOAD_STORAGE_BACKEND', 'cloudinary') != 'cloudinary' or not service.is_configured:
+        # Stockage local adressé par contenu
+        content_type = next(ct for ct, ext in CONTENT_TYPES.items() if ext == extension)
+        try:
+            ref = put_bytes(g.tenant_id, _read_upload(file), content_type, 'local')
+        except BlobStoreError as e:
+            logger.error(f"Upload document impossible: {e}")
+            return jsonify({'error': 'Erreur lors de l\'upload'}), 500
+
+        logger.info(f"Document stocké par user {get_jwt_identity()}: {ref}")
+
+        return jsonify({
+            'message': 'Document uploadé',
+            'url': blob_url(g.tenant_id, ref),
+            'public_id': None,
+            'ref': ref,
+            'format': extension,
+            'size': size
+        }), 201
+
     result = service.upload_document(file, folder=folder, tags=tags)
     
     if not result.success:
@@ -213,17 +316,7 @@ def upload_package_photo(package_id):
     Returns:
         URL de la photo
     """
-    from app.models import Package
-    from app import db
-    
-    user_id = get_jwt_identity()
-    
-    # Vérifier que le colis existe et appartient au user
-    package = Package.query.filter_by(
-        id=package_id,
-        tenant_id=g.tenant_id,
-        client_id=user_id
-    ).first()
+    package = _get_client_package(package_id)
     
     if not package:
         return jsonify({'error': 'Colis non trouvé'}), 404
@@ -242,39 +335,114 @@ def upload_package_photo(package_id):
     
     photo_type = request.form.get('type', 'package')
     
-    service = get_cloudinary_service(g.tenant_id)
+    try:
+        stored = store_image(
+            g.tenant_id, _read_upload(file),
+            folder=f"packages/{package.tracking_number}",
+            tags=[g.tenant_id, package.tracking_number, photo_type]
+        )
+    except ImageProcessingError as e:
+        return jsonify({'error': str(e)}), 400
+    except BlobStoreError as e:
+        logger.error(f"Upload photo colis impossible: {e}")
+        return jsonify({'error': 'Erreur lors de l\'upload'}), 500
+
+    _add_package_photo(
+        package, stored.url, stored.public_id, photo_type, stored.thumbnail_url, stored.ref, stored.thumbnail_ref
+    )
+
+    return jsonify({
+        'message': 'Photo uploadée',
+        'url': stored.url,
+        'public_id': stored.public_id,
+        'ref': stored.ref,
+        'thumbnail': stored.thumbnail_url
+    }), 201
+
+
+@uploads_bp.route('/package/<package_id>/photo/signature', methods=['POST'])
+@tenant_required
+def package_photo_signature(package_id):
+    """
+    Upload direct d'une photo de colis (étape 1): paramètres signés
     
-    if not service.is_configured:
-        return jsonify({'error': 'Service de stockage non configuré'}), 503
+    Body:
+        - type: Type de photo (package, label, damage) (optional)
+    """
+    package = _get_client_package(package_id)
+    if not package:
+        return jsonify({'error': 'Colis non trouvé'}), 404
     
-    result = service.upload_image(
-        file,
+    data = request.get_json(silent=True) or {}
+    service = get_cloudinary_service(g.tenant_id)
+    
+    params = service.sign_upload(
         folder=f"packages/{package.tracking_number}",
-        tags=[g.tenant_id, package.tracking_number, photo_type]
+        tags=[g.tenant_id, package.tracking_number, data.get('type', 'package')],
+        **_signature_options()
     )
+    if not params:
+        return jsonify({'error': 'Service de stockage non configuré'}), 503
     
-    if not result.success:
-        return jsonify({'error': result.error or 'Erreur lors de l\'upload'}), 500
+    return jsonify(params)
+
+
+@uploads_bp.route('/package/<package_id>/photo/confirm', methods=['POST'])
+@tenant_required
+def confirm_package_photo(package_id):
+    """
+    Upload direct d'une photo de colis (étape 2): enregistrement
     
-    # Stocker l'URL dans le colis (si champ photos existe)
-    if hasattr(package, 'photos') and package.photos is not None:
-        photos = package.photos or []
-        photos.append({
-            'url': result.secure_url,
-            'public_id': result.public_id,
-            'type': photo_type
-        })
-        package.photos = photos
-        db.session.commit()
+    Body (réponse Cloudinary):
+        - public_id, version, signature (required)
+        - type: Type de photo (optional)
+    """
+    package = _get_client_package(package_id)
+    if not package:
+        return jsonify({'error': 'Colis non trouvé'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    public_id = data.get('public_id') or ''
+    service = get_cloudinary_service(g.tenant_id)
+    
+    if not service.is_configured:
+        return jsonify({'error': 'Service de stockage non configuré'}), 503
+    
+    # La signature prouve que Cloudinary a reçu ce fichier; le dossier, qu'il vise ce colis
+    if not public_id.startswith(f"{g.tenant_id}/packages/{package.tracking_number}/") or \
+            not service.verify_upload(public_id, data.get('version'), data.get('signature')):
+        return jsonify({'error': 'Upload invalide'}), 400
+    
+    size = _signature_options()['thumbnail_size']
+    url = service.get_url(public_id)
+    thumbnail = service.get_url(public_id, transformation=CloudinaryService.limit_transformation(size))
+    _add_package_photo(package, url, public_id, data.get('type', 'package'), thumbnail)
     
     return jsonify({
-        'message': 'Photo uploadée',
-        'url': result.secure_url,
-        'public_id': result.public_id,
-        'thumbnail': service.get_thumbnail_url(result.public_id)
+        'message': 'Photo enregistrée',
+        'url': url,
+        'public_id': public_id,
+        'thumbnail': thumbnail
     }), 201
 
 
+@uploads_bp.route('/files/<key>', methods=['GET'])
+def get_file(key):
+    """
+    Fichier du stockage local (photos, documents, documents générés)
+
+    Public comme une URL Cloudinary: la clé est l'empreinte SHA-256 du
+    contenu. Range et requêtes conditionnelles (ETag) supportés.
+
+    Query params:
+        - download: Nom de fichier pour un téléchargement (optional)
+    """
+    try:
+        return send_key(key, download_name=request.args.get('download'))
+    except BlobStoreError:
+        return jsonify({'error': 'Fichier non trouvé'}), 404
+
+
 @uploads_bp.route('/<public_id>', methods=['DELETE'])
 @admin_required
 def delete_file(public_id):
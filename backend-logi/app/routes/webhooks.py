@@ -8,15 +8,18 @@ Supporte: DHL, FedEx, UPS, 17Track, AfterShip, etc.
 FLUX:
 1. Tu assignes un carrier_tracking à un DÉPART (pas à chaque colis)
 2. Le webhook reçoit une update pour ce tracking
-3. On trouve le DÉPART correspondant via carrier_tracking
-4. On met à jour TOUS les colis du départ
-5. On notifie TOUS les clients concernés
+3. Signature vérifiée, payload stocké dans webhook_events, réponse 202
+4. En arrière-plan (WebhookInbox): on trouve le DÉPART via carrier_tracking
+5. On met à jour TOUS les colis du départ
+6. On notifie TOUS les clients concernés
 """
 
 from flask import Blueprint, request, jsonify, g
 from app import db
-from app.models import Package, PackageHistory, Tenant, Departure, User
+from app.models import Package, PackageHistory, Tenant, Departure, User, TrackingAlias
 from app.services.notification_service import NotificationService
+from app.services.realtime_service import publish_package_status
+from app.services.webhook_inbox import WebhookInbox
 from app.utils.decorators import tenant_required
 import hmac
 import hashlib
@@ -126,10 +129,11 @@ def update_package_status(
     """
     Met à jour le statut depuis un webhook
     
-    LOGIQUE:
+    LOGIQUE (une lecture sur l'index tracking_aliases):
     1. Cherche d'abord un DÉPART avec ce carrier_tracking
        → Si trouvé: met à jour TOUS les colis du départ + notifie tous les clients
     2. Sinon cherche un COLIS individuel avec ce tracking
+       (tracking_number, supplier_tracking ou carrier_tracking)
        → Met à jour ce colis uniquement
     
     Args:
@@ -150,11 +154,11 @@ def update_package_status(
         'type': None  # 'departure' ou 'package'
     }
     
-    # 1. Chercher d'abord un DÉPART avec ce carrier_tracking
-    departure = Departure.query.filter(
-        Departure.tenant_id == tenant_id,
-        Departure.carrier_tracking == tracking_number
-    ).first()
+    match = TrackingAlias.resolve_one(tenant_id, tracking_number)
+    entity_type, entity_id = match if match else (None, None)
+    
+    # 1. Un DÉPART avec ce carrier_tracking (prioritaire)
+    departure = db.session.get(Departure, entity_id) if entity_type == TrackingAlias.ENTITY_DEPARTURE else None
     
     if departure:
         result['type'] = 'departure'
@@ -162,15 +166,8 @@ def update_package_status(
             departure, new_status, location, notes, external_data, result
         )
     
-    # 2. Sinon chercher un COLIS individuel
-    package = Package.query.filter(
-        Package.tenant_id == tenant_id,
-        db.or_(
-            Package.tracking_number == tracking_number,
-            Package.supplier_tracking == tracking_number,
-            Package.carrier_tracking == tracking_number
-        )
-    ).first()
+    # 2. Sinon un COLIS individuel
+    package = db.session.get(Package, entity_id) if entity_type == TrackingAlias.ENTITY_PACKAGE else None
     
     if package:
         result['type'] = 'package'
@@ -271,6 +268,7 @@ def _update_departure_from_webhook(
                 departure.carrier = None
                 departure.carrier_tracking = None
                 departure.carrier_status = None
+                TrackingAlias.sync_departure(departure)
                 departure.is_final_leg = True  # Reset pour le prochain
                 logger.info(f"Départ {departure.id}: étape intermédiaire terminée, en attente du prochain transporteur")
                 # Ne pas mettre à jour les colis vers "arrived_port" car ce n'est pas la destination finale
@@ -321,6 +319,7 @@ def _update_departure_from_webhook(
                 updated_by=None  # Système
             )
             db.session.add(history)
+            publish_package_status(package, old_status)
             result['updated_packages'] += 1
             
             # Collecter le client pour notification
@@ -381,6 +380,7 @@ def _update_departure_from_webhook(
     except Exception as e:
         db.session.rollback()
         logger.error(f"Erreur mise à jour webhook départ: {e}")
+        result['error'] = str(e)
         return result
 
 
@@ -439,6 +439,7 @@ def _update_single_package_from_webhook(
             updated_by=None
         )
         db.session.add(history)
+        publish_package_status(package, old_status)
         db.session.commit()
         
         result['updated_packages'] = 1
@@ -468,6 +469,7 @@ def _update_single_package_from_webhook(
     except Exception as e:
         db.session.rollback()
         logger.error(f"Erreur mise à jour webhook colis: {e}")
+        result['error'] = str(e)
         return result
 
 
@@ -488,6 +490,24 @@ def _get_status_label(status: str) -> str:
 
 # ==================== ENDPOINTS WEBHOOKS ====================
 
+def _accept_webhook(provider: str):
+    """
+    Persiste le webhook dans la boîte de réception et répond 202.
+    Le traitement est fait en arrière-plan (WebhookInbox).
+    """
+    try:
+        event, duplicate = WebhookInbox.ingest(g.tenant_id, provider, request.get_data())
+    except ValueError:
+        return jsonify({'error': 'JSON body required'}), 400
+    
+    return jsonify({
+        'message': 'Duplicate' if duplicate else 'Accepted',
+        'event_id': event.id,
+        'status': event.status,
+        'duplicate': duplicate
+    }), 202
+
+
 @webhooks_bp.route('/<tenant_slug>/generic', methods=['POST'])
 @webhook_auth_required('generic')
 def generic_webhook(tenant_slug):
@@ -506,36 +526,15 @@ def generic_webhook(tenant_slug):
     - Le carrier_tracking d'un COLIS individuel
     - Le tracking_number interne d'un colis
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
     if not data:
         return jsonify({'error': 'JSON body required'}), 400
     
-    tracking = data.get('tracking_number')
-    status = data.get('status')
-    
-    if not tracking or not status:
+    if not data.get('tracking_number') or not data.get('status'):
         return jsonify({'error': 'tracking_number and status required'}), 400
     
-    result = update_package_status(
-        tenant_id=g.tenant_id,
-        tracking_number=tracking,
-        new_status=status,
-        location=data.get('location'),
-        notes=data.get('notes'),
-        external_data=data
-    )
-    
-    if result['success']:
-        return jsonify({
-            'message': 'Updated',
-            'tracking': tracking,
-            'type': result['type'],
-            'updated_packages': result['updated_packages'],
-            'notified_clients': result['notified_clients']
-        })
-    else:
-        return jsonify({'error': 'Tracking not found'}), 404
+    return _accept_webhook('generic')
 
 
 @webhooks_bp.route('/<tenant_slug>/17track', methods=['POST'])
@@ -546,58 +545,7 @@ def webhook_17track(tenant_slug):
     
     Documentation: https://api.17track.net/en/doc
     """
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'JSON body required'}), 400
-    
-    # 17Track envoie un tableau d'événements
-    events = data.get('data', [])
-    
-    processed = 0
-    for event in events:
-        tracking = event.get('number')
-        track_info = event.get('track', {})
-        
-        if not tracking:
-            continue
-        
-        # Dernier événement
-        checkpoints = track_info.get('z', [])
-        if checkpoints:
-            latest = checkpoints[0]
-            status = latest.get('c', '')  # Code statut
-            location = latest.get('z', '')  # Localisation
-            notes = latest.get('a', '')  # Description
-            
-            # Mapper les codes 17Track
-            status_map = {
-                'NotFound': 'pending',
-                'InfoReceived': 'pending',
-                'InTransit': 'in_transit',
-                'OutForDelivery': 'out_for_delivery',
-                'Delivered': 'delivered',
-                'Exception': 'exception',
-            }
-            
-            mapped_status = status_map.get(status, 'in_transit')
-            
-            result = update_package_status(
-                tenant_id=g.tenant_id,
-                tracking_number=tracking,
-                new_status=mapped_status,
-                location=location,
-                notes=notes,
-                external_data=event
-            )
-            if result['success']:
-                processed += 1
-    
-    return jsonify({
-        'message': 'Processed',
-        'count': processed,
-        'total': len(events)
-    })
+    return _accept_webhook('17track')
 
 
 @webhooks_bp.route('/<tenant_slug>/aftership', methods=['POST'])
@@ -608,48 +556,15 @@ def webhook_aftership(tenant_slug):
     
     Documentation: https://www.aftership.com/docs/tracking/webhook
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
     if not data:
         return jsonify({'error': 'JSON body required'}), 400
     
-    msg = data.get('msg', {})
-    tracking = msg.get('tracking_number')
-    tag = msg.get('tag', '')  # Statut AfterShip
-    
-    if not tracking:
+    if not (data.get('msg') or {}).get('tracking_number'):
         return jsonify({'error': 'tracking_number required'}), 400
     
-    # Mapper les tags AfterShip
-    status_map = {
-        'Pending': 'pending',
-        'InfoReceived': 'pending',
-        'InTransit': 'in_transit',
-        'OutForDelivery': 'out_for_delivery',
-        'AttemptFail': 'exception',
-        'Delivered': 'delivered',
-        'AvailableForPickup': 'arrived_port',
-        'Exception': 'exception',
-        'Expired': 'exception',
-    }
-    
-    mapped_status = status_map.get(tag, 'in_transit')
-    
-    # Dernière localisation
-    checkpoints = msg.get('checkpoints', [])
-    location = checkpoints[0].get('location') if checkpoints else None
-    notes = checkpoints[0].get('message') if checkpoints else None
-    
-    result = update_package_status(
-        tenant_id=g.tenant_id,
-        tracking_number=tracking,
-        new_status=mapped_status,
-        location=location,
-        notes=notes,
-        external_data=data
-    )
-    
-    return jsonify({'message': 'Processed' if result.get('success') else 'Not found'})
+    return _accept_webhook('aftership')
 
 
 @webhooks_bp.route('/<tenant_slug>/dhl', methods=['POST'])
@@ -660,49 +575,7 @@ def webhook_dhl(tenant_slug):
     
     Documentation: https://developer.dhl.com/api-reference/shipment-tracking
     """
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'JSON body required'}), 400
-    
-    shipments = data.get('shipments', [data])  # Peut être un tableau ou un objet
-    
-    processed = 0
-    for shipment in shipments:
-        tracking = shipment.get('id') or shipment.get('trackingNumber')
-        
-        if not tracking:
-            continue
-        
-        events = shipment.get('events', [])
-        if events:
-            latest = events[0]
-            status_code = latest.get('statusCode', '')
-            location = latest.get('location', {}).get('address', {}).get('addressLocality', '')
-            notes = latest.get('description', '')
-            
-            # Mapper les codes DHL
-            status_map = {
-                'pre-transit': 'pending',
-                'transit': 'in_transit',
-                'delivered': 'delivered',
-                'failure': 'exception',
-            }
-            
-            mapped_status = status_map.get(status_code.lower(), 'in_transit')
-            
-            dhl_result = update_package_status(
-                tenant_id=g.tenant_id,
-                tracking_number=tracking,
-                new_status=mapped_status,
-                location=location,
-                notes=notes,
-                external_data=shipment
-            )
-            if dhl_result.get('success'):
-                processed += 1
-    
-    return jsonify({'message': 'Processed', 'count': processed})
+    return _accept_webhook('dhl')
 
 
 @webhooks_bp.route('/<tenant_slug>/test', methods=['POST'])
@@ -0,0 +1,347 @@
+"""
+Service Audit - Partitions mensuelles, recherche et archivage
+=============================================================
+
+Le log d'audit est découpé par mois:
+- PostgreSQL : table audit_logs partitionnée (PARTITION BY RANGE timestamp),
+  une partition audit_logs_YYYY_MM par mois, créée à la première écriture
+  du mois. Les requêtes passent par la table parente (élagage des partitions).
+- SQLite (et autres) : une table audit_logs_YYYY_MM par mois, mêmes
+  colonnes et index; la recherche parcourt les tables du plus récent au
+  plus ancien.
+- PostgreSQL avec une table audit_logs non partitionnée (créée par
+  create_all avant la migration): table unique, l'archivage supprime par
+  plage de dates.
+
+Index composites: (tenant_id, timestamp), (tenant_id, action, timestamp),
+(user_id, timestamp).
+
+Recherche: pagination par clé (timestamp, id) décroissante, curseur opaque.
+
+Archivage (AUDIT_RETENTION_MONTHS): chaque partition plus ancienne que la
+rétention est exportée en JSON Lines gzip dans AUDIT_ARCHIVE_DIR, puis
+détachée et supprimée. Lancé par `python archive_audit.py` (cron) ou par
+le super-admin.
+"""
+
+from app.utils.audit import AuditLog
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursor
+from datetime import datetime
+import sqlalchemy as sa
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'audit_logs'
+PARTITION_RE = re.compile(r'^audit_logs_(\d{4})_(\d{2})$')
+
+MODE_DECLARATIVE = 'declarative'  # PostgreSQL partitionné
+MODE_TABLES = 'tables'            # une table par mois
+MODE_SINGLE = 'single'            # PostgreSQL, table non partitionnée
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Index des partitions: (suffixe, colonnes)
+_INDEXES = (
+    ('tenant_timestamp', ('tenant_id', 'timestamp')),
+    ('tenant_action_timestamp', ('tenant_id', 'action', 'timestamp')),
+    ('user_timestamp', ('user_id', 'timestamp')),
+)
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+class AuditPartitions:
+    """Création, liste et suppression des partitions mensuelles"""
+
+    # Par moteur: mode de stockage et partitions connues (cache du processus)
+    _modes = weakref.WeakKeyDictionary()
+    _known = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    _metadata = sa.MetaData()
+    _tables = {}
+
+    @classmethod
+    def mode(cls, engine) -> str:
+        mode = cls._modes.get(engine)
+        if mode is None:
+            if engine.dialect.name != 'postgresql':
+                mode = MODE_TABLES
+            else:
+                with engine.connect() as conn:
+                    partitioned = conn.execute(sa.text(
+                        "SELECT 1 FROM pg_partitioned_table pt "
+                        "JOIN pg_class c ON c.oid = pt.partrelid "
+                        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+                    ), {'name': PARENT_TABLE}).first()
+                mode = MODE_DECLARATIVE if partitioned else MODE_SINGLE
+                if mode == MODE_SINGLE:
+                    logger.warning("audit_logs n'est pas partitionnée (migration non appliquée)")
+            cls._modes[engine] = mode
+        return mode
+
+    @classmethod
+    def table(cls, month: datetime) -> sa.Table:
+        """Table physique d'un mois (mode 'tables')"""
+        name = partition_name(month)
+        table = cls._tables.get(name)
+        if table is None:
+            with cls._lock:
+                table = cls._tables.get(name)
+                if table is None:
+                    columns = [
+                        sa.Column(c.name, c.type, nullable=c.nullable)
+                        for c in AuditLog.__table__.columns if c.name != 'id'
+                    ]
+                    table = sa.Table(
+                        name, cls._metadata,
+                        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+                        *columns
+                    )
+                    for suffix, cols in _INDEXES:
+                        sa.Index(f"idx_{name}_{suffix}", *[table.c[c] for c in cols])
+                    cls._tables[name] = table
+        return table
+
+    @classmethod
+    def ensure(cls, engine, month: datetime):
+        """Crée la partition du mois si besoin"""
+        mode = cls.mode(engine)
+        if mode == MODE_SINGLE:
+            return
+        name = partition_name(month)
+        known = cls._known.setdefault(engine, set())
+        if name in known:
+            return
+
+        try:
+            with engine.begin() as conn:
+                if mode == MODE_DECLARATIVE:
+                    conn.execute(sa.text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                        f"FOR VALUES FROM ('{month.isoformat(' ')}') TO ('{add_months(month, 1).isoformat(' ')}')"
+                    ))
+                else:
+                    cls.table(month).create(conn, checkfirst=True)
+        except sa.exc.DBAPIError as e:
+            # Création concurrente par un autre processus
+            if name not in cls.list_names(engine):
+                raise
+            logger.debug(f"Partition {name} déjà créée: {e}")
+        known.add(name)
+
+    @classmethod
+    def insert(cls, engine, rows: list):
+        """INSERT multi-lignes, regroupé par mois"""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_start(row['timestamp']), []).append(row)
+
+        mode = cls.mode(engine)
+        for month in by_month:
+            cls.ensure(engine, month)
+
+        with engine.begin() as conn:
+            for month, month_rows in by_month.items():
+                target = cls.table(month) if mode == MODE_TABLES else AuditLog.__table__
+                conn.execute(target.insert(), month_rows)
+
+    @classmethod
+    def list_names(cls, engine) -> list:
+        return [
+            name for name in sa.inspect(engine).get_table_names()
+            if PARTITION_RE.match(name)
+        ]
+
+    @classmethod
+    def list(cls, engine) -> list:
+        """Mois ayant une partition, du plus récent au plus ancien"""
+        months = []
+        for name in cls.list_names(engine):
+            match = PARTITION_RE.match(name)
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months, reverse=True)
+
+    @classmethod
+    def drop(cls, engine, month: datetime):
+        name = partition_name(month)
+        with engine.begin() as conn:
+            if cls.mode(engine) == MODE_DECLARATIVE:
+                conn.execute(sa.text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            conn.execute(sa.text(f"DROP TABLE {name}"))
+        cls._known.setdefault(engine, set()).discard(name)
+
+    @classmethod
+    def count(cls, engine, month: datetime) -> int:
+        with engine.connect() as conn:
+            return conn.execute(sa.select(sa.func.count()).select_from(sa.table(partition_name(month)))).scalar()
+
+
+class AuditSearch:
+    """Recherche paginée par clé (timestamp, id) décroissante"""
+
+    FILTERS = ('tenant_id', 'user_id', 'action', 'resource_type', 'resource_id', 'status')
+
+    @classmethod
+    def _conditions(cls, table, filters: dict, since, until, mark) -> list:
+        conditions = []
+        for name in cls.FILTERS:
+            value = filters.get(name)
+            if not value:
+                continue
+            if name == 'action' and ',' in value:
+                conditions.append(table.c.action.in_([a.strip() for a in value.split(',') if a.strip()]))
+            else:
+                conditions.append(table.c[name] == value)
+        if since:
+            conditions.append(table.c.timestamp >= since)
+        if until:
+            conditions.append(table.c.timestamp < until)
+        if mark:
+            ts, row_id = mark
+            conditions.append(sa.or_(
+                table.c.timestamp < ts,
+                sa.and_(table.c.timestamp == ts, table.c.id < row_id)
+            ))
+        return conditions
+
+    @classmethod
+    def _fetch(cls, conn, table, conditions, limit: int) -> list:
+        query = sa.select(table).where(*conditions).order_by(
+            table.c.timestamp.desc(), table.c.id.desc()
+        ).limit(limit)
+        return conn.execute(query).fetchall()
+
+    @classmethod
+    def search(cls, engine, filters: dict, cursor: str = None, limit: int = DEFAULT_LIMIT,
+               since: datetime = None, until: datetime = None) -> dict:
+        """
+        Raises:
+            InvalidCursor: curseur illisible
+
+        Returns:
+            dict: {logs, next_cursor, has_more}
+        """
+        limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        mark = decode_cursor(cursor).get('audit') if cursor else None
+        if mark:
+            try:
+                mark = (mark[0], int(mark[1]))
+            except ValueError:
+                raise InvalidCursor('Curseur invalide')
+
+        rows = []
+        with engine.connect() as conn:
+            if AuditPartitions.mode(engine) != MODE_TABLES:
+                table = AuditLog.__table__
+                rows = cls._fetch(conn, table, cls._conditions(table, filters, since, until, mark), limit + 1)
+            else:
+                # Tables du plus récent au plus ancien, jusqu'à limit + 1 lignes
+                upper = min(d for d in (until, mark[0] if mark else None) if d) if (until or mark) else None
+                for month in AuditPartitions.list(engine):
+                    if upper and month > upper:
+                        continue
+                    if since and add_months(month, 1) <= since:
+                        break
+                    table = AuditPartitions.table(month)
+                    rows.extend(cls._fetch(
+                        conn, table, cls._conditions(table, filters, since, until, mark), limit + 1 - len(rows)
+                    ))
+                    if len(rows) > limit:
+                        break
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor({'audit': (rows[-1].timestamp, rows[-1].id)})
+
+        return {
+            'logs': [AuditLog.row_to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+
+
+class AuditArchiver:
+    """Export des partitions anciennes en JSON Lines gzip, puis suppression"""
+
+    @staticmethod
+    def _export(conn, query, path: str) -> int:
+        tmp_path = path + '.tmp'
+        count = 0
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for row in conn.execution_options(stream_results=True, yield_per=1000).execute(query):
+                data = AuditLog.row_to_dict(row)
+                data['user_agent'] = row.user_agent
+                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(tmp_path, path)
+        return count
+
+    @classmethod
+    def archive(cls, engine, retention_months: int, directory: str, dry_run: bool = False) -> list:
+        """
+        Archive les mois antérieurs à la rétention.
+
+        Returns:
+            list: [{partition, rows, file}]
+        """
+        cutoff = add_months(month_start(datetime.utcnow()), -max(1, retention_months))
+        if not dry_run:
+            os.makedirs(directory, exist_ok=True)
+        mode = AuditPartitions.mode(engine)
+        archived = []
+
+        if mode == MODE_SINGLE:
+            table = AuditLog.__table__
+            path = os.path.join(directory, f"{PARENT_TABLE}_before_{cutoff:%Y_%m}.jsonl.gz")
+            query = sa.select(table).where(table.c.timestamp < cutoff).order_by(table.c.timestamp, table.c.id)
+            if dry_run:
+                with engine.connect() as conn:
+                    rows = conn.execute(sa.select(sa.func.count()).where(table.c.timestamp < cutoff)).scalar()
+                return [{'partition': PARENT_TABLE, 'rows': rows, 'file': None}]
+            with engine.begin() as conn:
+                rows = cls._export(conn, query, path)
+                conn.execute(table.delete().where(table.c.timestamp < cutoff))
+            return [{'partition': PARENT_TABLE, 'rows': rows, 'file': path}]
+
+        for month in sorted(AuditPartitions.list(engine)):
+            if month >= cutoff:
+                break
+            name = partition_name(month)
+            if dry_run:
+                archived.append({'partition': name, 'rows': AuditPartitions.count(engine, month), 'file': None})
+                continue
+
+            path = os.path.join(directory, f"{name}.jsonl.gz")
+            table = sa.table(name, *[sa.column(c.name, c.type) for c in AuditLog.__table__.columns])
+            with engine.connect() as conn:
+                rows = cls._export(conn, sa.select(table).order_by(table.c.timestamp, table.c.id), path)
+            AuditPartitions.drop(engine, month)
+            logger.info(f"Audit: partition {name} archivée ({rows} lignes) -> {path}")
+            archived.append({'partition': name, 'rows': rows, 'file': path})
+
+        # Partition du mois prochain prête avant le changement de mois
+        if not dry_run:
+            AuditPartitions.ensure(engine, add_months(month_start(datetime.utcnow()), 1))
+        return archived
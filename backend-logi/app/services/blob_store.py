@@ -0,0 +1,437 @@
+"""
+Stockage de blobs adressés par contenu
+======================================
+
+Les preuves binaires (signatures de retrait...), les uploads stockés
+localement et les documents générés ne sont plus stockés dans les
+lignes: seule une référence "<backend>:<sha256>.<ext>" est conservée.
+Le même contenu donne la même clé (dédoublonnage, écriture idempotente).
+
+Backends:
+- local: BLOB_STORE_DIR/ab/cd/<sha256>.<ext> (défaut), public: servi par
+  /api/uploads/files/<clé> (Range, ETag / If-None-Match, cache immuable)
+- private: BLOB_STORE_DIR/private/<tenant>/ab/cd/<sha256>.<ext>, espace
+  du tenant pour les preuves (signatures): jamais servi par la route
+  publique, lu seulement avec le tenant propriétaire (send_ref, open_ref)
+- cloudinary: public_id <tenant>/blobs/<sha256> (ressource raw)
+
+Choix via BLOB_STORE_BACKEND; cloudinary non configuré pour le tenant
+-> repli sur local (ou private). Les références existantes restent
+lisibles quel que soit le backend courant (le préfixe désigne le backend
+d'origine).
+
+Le disque local n'est durable que si BLOB_STORE_DIR désigne un volume
+persistant: en production, BLOB_STORE_DIR ou cloudinary est exigé
+(config.ProductionConfig, is_durable).
+
+Les lignes conservent la référence, jamais l'URL locale absolue (elle
+dépend de l'hôte de la requête d'upload: hôte interne derrière un proxy,
+domaine changé...): resolve_url la construit à la sérialisation, et
+stored_ref ramène à sa référence une URL d'upload renvoyée par le client.
+"""
+
+from typing import Optional, Tuple
+from flask import current_app
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Extensions acceptées pour les blobs image (data URL)
+IMAGE_CONTENT_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+# Tous les types stockables (uploads, documents générés)
+CONTENT_TYPES = {
+    **IMAGE_CONTENT_TYPES,
+    'application/pdf': 'pdf',
+    'application/msword': 'doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+}
+
+# Cache navigateur des blobs (contenu immuable: la clé change avec le contenu)
+MAX_AGE = 31536000
+
+_KEY_PATTERN = r'([0-9a-f]{64})\.([a-z0-9]{1,5})'
+_REF_RE = re.compile(rf'^(local|private|cloudinary):{_KEY_PATTERN}$')
+_TENANT_RE = re.compile(r'^[\w-]+$')
+_KEY_RE = re.compile(rf'^{_KEY_PATTERN}$')
+# URL de la route uploads.get_file (absolue ou non)
+_FILES_URL_RE = re.compile(rf'^(?:https?://[^/]+)?/api/uploads/files/{_KEY_PATTERN}(?:\?.*)?$')
+
+
+class BlobStoreError(Exception):
+    """Blob illisible, absent ou backend indisponible"""
+    pass
+
+
+def blob_key(data: bytes, ext: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}.{ext}"
+
+
+def parse_ref(ref: str) -> Optional[Tuple[str, str, str]]:
+    """'local:<sha>.png' -> ('local', '<sha>', 'png'), None si invalide"""
+    match = _REF_RE.match(ref or '')
+    return match.groups() if match else None
+
+
+def parse_key(key: str) -> Optional[Tuple[str, str]]:
+    """'<sha>.png' -> ('<sha>', 'png'), None si invalide"""
+    match = _KEY_RE.match(key or '')
+    return match.groups() if match else None
+
+
+def content_type_of(ext: str) -> str:
+    for content_type, known in CONTENT_TYPES.items():
+        if known == ext:
+            return content_type
+    return mimetypes.guess_type(f"x.{ext}")[0] or 'application/octet-stream'
+
+
+def decode_data_url(data_url: str, max_bytes: int = None) -> Tuple[bytes, str]:
+    """
+    'data:image/png;base64,...' -> (octets, content_type)
+
+    Raises:
+        ValueError: format, type ou taille invalide
+    """
+    if not data_url or not data_url.startswith('data:') or ',' not in data_url:
+        raise ValueError('Format invalide (data URL attendue)')
+    header, encoded = data_url[5:].split(',', 1)
+    content_type = header.split(';', 1)[0].lower()
+    if content_type not in IMAGE_CONTENT_TYPES or ';base64' not in header:
+        raise ValueError(f'Type non supporté: {content_type or "inconnu"}')
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Encodage base64 invalide')
+    if not data:
+        raise ValueError('Contenu vide')
+    if max_bytes and len(data) > max_bytes:
+        raise ValueError(f'Contenu trop volumineux (max {max_bytes // 1024}KB)')
+    return data, content_type
+
+
+class BlobStore:
+    """Interface commune des backends"""
+
+    backend = None
+
+    def put(self, data: bytes, content_type: str) -> str:
+        """Stocke le contenu et renvoie sa référence"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def url(self, key: str) -> Optional[str]:
+        """URL publique directe (None: servir via l'API)"""
+        return None
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def ref(self, key: str) -> str:
+        return f"{self.backend}:{key}"
+
+
+class LocalBlobStore(BlobStore):
+    """Système de fichiers, arborescence à deux niveaux de préfixe"""
+
+    backend = 'local'
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes, content_type: str) -> str:
+        key = blob_key(data, CONTENT_TYPES.get(content_type, 'bin'))
+        path = self.path(key)
+        if not os.path.exists(path):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Écriture atomique: un lecteur concurrent ne voit jamais un fichier partiel
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                raise BlobStoreError(f"Écriture impossible: {e}") from e
+        return self.ref(key)
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except OSError as e:
+            raise BlobStoreError(f"Blob absent: {key}") from e
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except OSError:
+            return False
+
+
+class PrivateBlobStore(LocalBlobStore):
+    """Espace privé d'un tenant: <root>/private/<tenant>/ab/cd/<clé>"""
+
+    backend = 'private'
+
+    def __init__(self, root: str, tenant_id: str):
+        if not _TENANT_RE.match(tenant_id or ''):
+            raise BlobStoreError(f"Tenant invalide: {tenant_id!r}")
+        super().__init__(os.path.join(root, 'private', tenant_id))
+
+
+class CloudinaryBlobStore(BlobStore):
+    """Cloudinary (ressources raw, public_id = empreinte du contenu)"""
+
+    backend = 'cloudinary'
+    FOLDER = 'blobs'
+
+    def __init__(self, service):
+        self.service = service
+
+    def public_id(self, key: str) -> str:
+        return f"{self.service.tenant_id}/{self.FOLDER}/{key}"
+
+    def put(self, data: bytes, content_type: str) -> str:
+        key = blob_key(data, CONTENT_TYPES.get(content_type, 'bin'))
+        stream = io.BytesIO(data)
+        stream.name = key
+        result = self.service.upload_document(stream, folder=self.FOLDER, public_id=key)
+        if not result.success:
+            raise BlobStoreError(result.error or 'Upload Cloudinary échoué')
+        return self.ref(key)
+
+    def url(self, key: str) -> Optional[str]:
+        return self.service.get_url(self.public_id(key), resource_type='raw') or None
+
+    def get(self, key: str) -> bytes:
+        import requests
+
+        try:
+            response = requests.get(self.url(key), timeout=10)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            raise BlobStoreError(f"Blob Cloudinary illisible: {key}") from e
+
+    def delete(self, key: str) -> bool:
+        return self.service.delete(self.public_id(key), resource_type='raw')
+
+
+def _local_root() -> str:
+    return current_app.config.get('BLOB_STORE_DIR') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'blobs'
+    )
+
+
+def _local_store() -> LocalBlobStore:
+    return LocalBlobStore(_local_root())
+
+
+def is_durable(store: BlobStore) -> bool:
+    """Cloudinary, ou disque local sur un BLOB_STORE_DIR explicite (volume persistant)"""
+    return store.backend == 'cloudinary' or bool(current_app.config.get('BLOB_STORE_DIR'))
+
+
+def get_blob_store(tenant_id: str, backend: str = None, private: bool = False) -> BlobStore:
+    """
+    Backend d'écriture du tenant (BLOB_STORE_BACKEND par défaut)
+
+    Args:
+        tenant_id: ID du tenant (credentials Cloudinary, espace privé)
+        backend: forcer un backend ('local', 'private', 'cloudinary')
+        private: stockage local dans l'espace privé du tenant
+    """
+    backend = backend or current_app.config.get('BLOB_STORE_BACKEND', 'local')
+    if backend == 'private':
+        return PrivateBlobStore(_local_root(), tenant_id)
+    if backend == 'cloudinary':
+        from app.services.cloudinary_service import get_cloudinary_service
+
+        service = get_cloudinary_service(tenant_id)
+        if service.is_configured:
+            return CloudinaryBlobStore(service)
+        logger.warning(f"Cloudinary non configuré pour tenant {tenant_id}, blobs stockés en local")
+    return PrivateBlobStore(_local_root(), tenant_id) if private else _local_store()
+
+
+def put_data_url(tenant_id: str, data_url: str, max_bytes: int = None, private: bool = False) -> str:
+    """
+    Stocke une data URL (signature...) et renvoie sa référence
+    (private: espace privé du tenant en stockage local)
+
+    Raises:
+        ValueError: data URL invalide
+        BlobStoreError: écriture impossible
+    """
+    data, content_type = decode_data_url(data_url, max_bytes)
+    return get_blob_store(tenant_id, private=private).put(data, content_type)
+
+
+def put_bytes(tenant_id: str, data: bytes, content_type: str, backend: str = None) -> str:
+    """
+    Stocke un contenu (upload, document généré) et renvoie sa référence
+
+    Raises:
+        BlobStoreError: écriture impossible
+    """
+    return get_blob_store(tenant_id, backend).put(data, content_type)
+
+
+def blob_url(tenant_id: str, ref: str, external: bool = True) -> Optional[str]:
+    """
+    URL de lecture d'une référence: directe (Cloudinary) ou route publique
+    /api/uploads/files/<clé> (clé = empreinte du contenu, non devinable).
+    None pour l'espace privé (servi par les routes authentifiées).
+    """
+    parsed = parse_ref(ref)
+    if not parsed:
+        return None
+    backend, digest, ext = parsed
+    if backend == 'private':
+        return None
+    if backend != 'local':
+        return get_blob_store(tenant_id, backend).url(f"{digest}.{ext}")
+    from flask import has_request_context, url_for
+
+    if not has_request_context():
+        # Hors requête (tâche de fond): chemin relatif, pas d'hôte à deviner
+        return current_app.url_map.bind('').build('uploads.get_file', {'key': f"{digest}.{ext}"})
+    return url_for('uploads.get_file', key=f"{digest}.{ext}", _external=external)
+
+
+def resolve_url(tenant_id: str, value: Optional[str]) -> Optional[str]:
+    """Valeur persistée (référence ou URL externe) -> URL de lecture"""
+    if parse_ref(value):
+        return blob_url(tenant_id, value)
+    return value
+
+
+def stored_ref(value: Optional[str]) -> Optional[str]:
+    """
+    Valeur à persister pour un fichier désigné par le client: une URL de
+    /api/uploads/files/<clé> (réponse d'upload) devient 'local:<clé>',
+    les autres valeurs (référence, URL Cloudinary) sont conservées
+    """
+    match = _FILES_URL_RE.match(value or '')
+    if match:
+        return f"local:{match.group(1)}.{match.group(2)}"
+    return value or None
+
+
+def send_key(key: str, download_name: str = None, private: bool = False, store: LocalBlobStore = None):
+    """
+    Réponse Flask pour un blob local: Range (206), ETag / If-None-Match et
+    If-Modified-Since (304) gérés par send_file, cache immuable.
+
+    Args:
+        store: espace lu (défaut: espace public du stockage local)
+
+    Raises:
+        BlobStoreError: clé invalide ou blob absent
+    """
+    from flask import send_file
+
+    parsed = parse_key(key)
+    if not parsed:
+        raise BlobStoreError(f"Clé invalide: {key}")
+    digest, ext = parsed
+    path = (store or _local_store()).path(key)
+    if not os.path.isfile(path):
+        raise BlobStoreError(f"Blob absent: {key}")
+
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=content_type_of(ext),
+        conditional=True,
+        etag=digest,
+        max_age=MAX_AGE,
+        as_attachment=bool(download_name),
+        download_name=download_name
+    )
+    response.cache_control.immutable = True
+    if private:
+        response.cache_control.private = True
+        response.cache_control.public = False
+    else:
+        response.cache_control.public = True
+    return response
+
+
+def send_ref(tenant_id: str, ref: str, download_name: str = None, private: bool = False):
+    """
+    Réponse Flask pour une référence: redirection (Cloudinary) ou fichier
+    local (espace privé: celui du tenant, cache privé)
+
+    Raises:
+        BlobStoreError: référence invalide ou blob absent
+    """
+    from flask import redirect
+
+    parsed = parse_ref(ref)
+    if not parsed:
+        raise BlobStoreError(f"Référence invalide: {ref}")
+    backend, digest, ext = parsed
+    if backend == 'cloudinary':
+        return redirect(get_blob_store(tenant_id, backend).url(f"{digest}.{ext}"))
+    store = get_blob_store(tenant_id, backend)
+    return send_key(f"{digest}.{ext}", download_name=download_name,
+                    private=private or backend == 'private', store=store)
+
+
+def open_ref(tenant_id: str, ref: str) -> Tuple[bytes, str]:
+    """
+    Contenu d'une référence -> (octets, content_type). Espace privé et
+    Cloudinary: lus dans l'espace du tenant donné, jamais celui d'un autre.
+
+    Raises:
+        BlobStoreError: référence invalide ou blob absent
+    """
+    parsed = parse_ref(ref)
+    if not parsed:
+        raise BlobStoreError(f"Référence invalide: {ref}")
+    backend, digest, ext = parsed
+    data = get_blob_store(tenant_id, backend).get(f"{digest}.{ext}")
+    return data, content_type_of(ext)
+
+
+def exists_ref(tenant_id: str, ref: str, private: bool = False) -> bool:
+    """
+    Vérifie qu'une référence existe pour ce tenant (Cloudinary: format
+    seulement, la lecture se fait dans le dossier du tenant)
+
+    Args:
+        private: n'accepter que l'espace privé du tenant ou Cloudinary
+            (preuves: pas de blob de l'espace public)
+    """
+    parsed = parse_ref(ref)
+    if not parsed:
+        return False
+    backend, digest, ext = parsed
+    if backend == 'cloudinary':
+        return True
+    if private and backend != 'private':
+        return False
+    try:
+        store = get_blob_store(tenant_id, backend)
+    except BlobStoreError:
+        return False
+    return os.path.isfile(store.path(f"{digest}.{ext}"))
@@ -4,10 +4,19 @@ Service Cloudinary pour l'upload de fichiers
 
 Gère l'upload d'images et documents vers Cloudinary.
 Configuration par tenant stockée dans TenantConfig.
+
+Les credentials du tenant sont passés à chaque appel (upload, destroy,
+URL), jamais via cloudinary.config(): la configuration globale est
+partagée par les threads (requêtes, pool d'upload des miniatures) et
+serait écrasée par le service d'un autre tenant.
 """
 
+import io
 import os
+import hmac
 import logging
+import time
+import uuid
 from typing import Optional
 from dataclasses import dataclass
 
@@ -18,6 +27,7 @@ try:
     import cloudinary
     import cloudinary.uploader
     import cloudinary.api
+    import cloudinary.utils
     CLOUDINARY_AVAILABLE = True
 except ImportError:
     CLOUDINARY_AVAILABLE = False
@@ -35,6 +45,7 @@ class UploadResult:
     width: Optional[int] = None
     height: Optional[int] = None
     bytes: Optional[int] = None
+    thumbnail_url: Optional[str] = None
     error: Optional[str] = None
 
 
@@ -64,6 +75,7 @@ class CloudinaryService:
         self.tenant_id = tenant_id
         self.config = config or {}
         self._configured = False
+        self._credentials = {}
         
         if not CLOUDINARY_AVAILABLE:
             logger.error("Cloudinary non disponible")
@@ -72,7 +84,7 @@ class CloudinaryService:
         self._configure()
     
     def _configure(self):
-        """Configure Cloudinary avec les credentials du tenant"""
+        """Credentials du tenant (passés à chaque appel)"""
         cloud_name = self.config.get('cloud_name') or os.environ.get('CLOUDINARY_CLOUD_NAME')
         api_key = self.config.get('api_key') or os.environ.get('CLOUDINARY_API_KEY')
         api_secret = self.config.get('api_secret') or os.environ.get('CLOUDINARY_API_SECRET')
@@ -81,12 +93,7 @@ class CloudinaryService:
             logger.warning(f"Cloudinary non configuré pour tenant {self.tenant_id}")
             return
         
-        cloudinary.config(
-            cloud_name=cloud_name,
-            api_key=api_key,
-            api_secret=api_secret,
-            secure=True
-        )
+        self._credentials = {'cloud_name': cloud_name, 'api_key': api_key, 'api_secret': api_secret}
         self._configured = True
     
     @property
@@ -100,17 +107,19 @@ class CloudinaryService:
         folder: str = "uploads",
         public_id: str = None,
         transformation: dict = None,
-        tags: list = None
+        tags: list = None,
+        preprocessed: bool = False
     ) -> UploadResult:
         """
         Upload une image vers Cloudinary
         
         Args:
-            file: Fichier (FileStorage, path, ou URL)
+            file: Fichier (FileStorage, path, URL ou flux en mémoire)
             folder: Dossier de destination
             public_id: ID public personnalisé (optionnel)
             transformation: Transformations à appliquer
             tags: Tags pour l'image
+            preprocessed: Déjà réduit / réencodé (ImagePipeline): stocké tel quel
             
         Returns:
             UploadResult avec les infos de l'upload
@@ -135,7 +144,7 @@ class CloudinaryService:
             
             if transformation:
                 options['transformation'] = transformation
-            else:
+            elif not preprocessed:
                 # Transformation par défaut: limiter la taille
                 options['transformation'] = {
                     'quality': 'auto:good',
@@ -143,7 +152,7 @@ class CloudinaryService:
                 }
             
             # Upload
-            result = cloudinary.uploader.upload(file, **options)
+            result = cloudinary.uploader.upload(file, **options, **self._credentials)
             
             logger.info(f"Image uploadée: {result.get('public_id')}")
             
@@ -162,6 +171,103 @@ class CloudinaryService:
             logger.error(f"Erreur upload Cloudinary: {str(e)}")
             return UploadResult(success=False, error=str(e))
     
+    def upload_processed(
+        self,
+        processed,
+        folder: str = "uploads",
+        public_id: str = None,
+        tags: list = None
+    ) -> UploadResult:
+        """
+        Upload d'une image prétraitée (ImagePipeline) et de sa miniature,
+        envoyées en parallèle depuis la mémoire.
+        
+        Args:
+            processed: ProcessedImage
+            
+        Returns:
+            UploadResult (thumbnail_url renseignée si miniature)
+        """
+        from app.services.image_pipeline import ImagePipeline
+        
+        public_id = public_id or uuid.uuid4().hex
+        thumbnail = None
+        if processed.thumbnail:
+            thumbnail = ImagePipeline.upload(
+                self.upload_image, self._stream(processed.thumbnail, processed.extension),
+                folder=folder, public_id=f"{public_id}_thumb", tags=tags, preprocessed=True
+            )
+        
+        result = self.upload_image(
+            self._stream(processed.data, processed.extension),
+            folder=folder, public_id=public_id, tags=tags, preprocessed=True
+        )
+        if thumbnail is not None:
+            thumb_result = thumbnail.result()
+            if result.success and thumb_result.success:
+                result.thumbnail_url = thumb_result.secure_url
+        return result
+    
+    @staticmethod
+    def _stream(data: bytes, extension: str):
+        stream = io.BytesIO(data)
+        stream.name = f"upload.{extension}"
+        return stream
+    
+    def sign_upload(
+        self,
+        folder: str = "uploads",
+        tags: list = None,
+        max_dimension: int = None,
+        thumbnail_size: int = None
+    ) -> Optional[dict]:
+        """
+        Paramètres signés pour un upload direct client -> Cloudinary
+        (le fichier ne transite pas par l'API). La réduction est appliquée à
+        l'arrivée (transformation entrante), la miniature en eager.
+        Signature valable 1 h (contrôle du timestamp par Cloudinary).
+        
+        Returns:
+            dict à poster avec le fichier sur upload_url, None si non configuré
+        """
+        if not self.is_configured:
+            return None
+        
+        params = {
+            'timestamp': int(time.time()),
+            'folder': f"{self.tenant_id}/{folder}",
+            'tags': ','.join(tags or [self.tenant_id]),
+            'allowed_formats': 'png,jpg,jpeg,gif,webp',
+        }
+        if max_dimension:
+            params['transformation'] = self._transformation_string(self.limit_transformation(max_dimension, 'auto:good'))
+        if thumbnail_size:
+            # Même chaîne que l'URL de la miniature (get_url): sert la variante eager
+            params['eager'] = self._transformation_string(self.limit_transformation(thumbnail_size))
+        
+        params['signature'] = cloudinary.utils.api_sign_request(params, self._credentials['api_secret'])
+        params['api_key'] = self._credentials['api_key']
+        params['upload_url'] = f"https://api.cloudinary.com/v1_1/{self._credentials['cloud_name']}/image/upload"
+        return params
+    
+    @staticmethod
+    def limit_transformation(size: int, quality: str = 'auto:low') -> dict:
+        """Réduction sans recadrage (plus grand côté <= size)"""
+        return {'crop': 'limit', 'width': size, 'height': size, 'quality': quality}
+    
+    @staticmethod
+    def _transformation_string(transformation: dict) -> str:
+        return cloudinary.utils.generate_transformation_string(**transformation)[0]
+    
+    def verify_upload(self, public_id: str, version, signature: str) -> bool:
+        """Vérifie la signature de la réponse Cloudinary d'un upload direct"""
+        if not self.is_configured or not public_id or not version or not signature:
+            return False
+        expected = cloudinary.utils.api_sign_request(
+            {'public_id': public_id, 'version': version}, self._credentials['api_secret']
+        )
+        return hmac.compare_digest(expected, str(signature))
+    
     def upload_document(
         self,
         file,
@@ -197,7 +303,7 @@ class CloudinaryService:
             if public_id:
                 options['public_id'] = public_id
             
-            result = cloudinary.uploader.upload(file, **options)
+            result = cloudinary.uploader.upload(file, **options, **self._credentials)
             
             logger.info(f"Document uploadé: {result.get('public_id')}")
             
@@ -229,7 +335,7 @@ class CloudinaryService:
             return False
         
         try:
-            result = cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+            result = cloudinary.uploader.destroy(public_id, resource_type=resource_type, **self._credentials)
             return result.get('result') == 'ok'
         except Exception as e:
             logger.error(f"Erreur suppression Cloudinary: {str(e)}")
@@ -256,11 +362,11 @@ class CloudinaryService:
             return ""
         
         try:
-            options = {'secure': True}
+            options = {'secure': True, 'cloud_name': self._credentials['cloud_name']}
             if transformation:
                 options['transformation'] = transformation
             
-            return cloudinary.CloudinaryImage(public_id).build_url(**options)
+            return cloudinary.utils.cloudinary_url(public_id, resource_type=resource_type, **options)[0]
         except Exception as e:
             logger.error(f"Erreur génération URL: {str(e)}")
             return ""
@@ -295,16 +401,11 @@ def get_cloudinary_service(tenant_id: str) -> CloudinaryService:
     Returns:
         Instance CloudinaryService configurée
     """
+    from app import db
     from app.models import TenantConfig
     
-    # Charger la config du tenant
-    tenant_config = TenantConfig.query.filter_by(
-        tenant_id=tenant_id,
-        config_key='cloudinary'
-    ).first()
-    
-    config = {}
-    if tenant_config and tenant_config.config_data:
-        config = tenant_config.config_data
+    # Charger la config du tenant (une ligne par tenant, clé 'cloudinary' du JSON)
+    config_data = db.session.query(TenantConfig.config_data).filter_by(tenant_id=tenant_id).scalar()
+    config = (config_data or {}).get('cloudinary') or {}
     
     return CloudinaryService(tenant_id, config)
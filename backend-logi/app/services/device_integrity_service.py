@@ -17,7 +17,6 @@ Configuration requise (variables d'environnement ou PlatformConfig):
 import os
 import json
 import logging
-import httpx
 import jwt
 import time
 from datetime import datetime
@@ -62,6 +61,7 @@ class PlayIntegrityVerifier:
         try:
             url = self.GOOGLE_API_URL.format(packageName=self.package_name)
             
+            import httpx  # import différé (démarrage)
             async with httpx.AsyncClient() as client:
                 response = await client.post(
                     url,
@@ -178,6 +178,7 @@ class AppleDeviceCheckVerifier:
             # Générer le JWT pour l'authentification Apple
             auth_token = self._generate_auth_token()
             
+            import httpx  # import différé (démarrage)
             async with httpx.AsyncClient() as client:
                 response = await client.post(
                     self.DEVICECHECK_API_URL,
@@ -0,0 +1,431 @@
+"""
+Cache des documents générés (factures, reçus, tickets)
+=====================================================
+
+Un reçu ou un ticket ne change pas une fois émis: le PDF rendu par
+ReportLab est gardé sur disque (DOCUMENT_CACHE_DIR, partagé entre workers)
+et resservi à chaque réimpression.
+
+Clé = (type de document, id de l'entité, version de l'entité, version de la
+charte du tenant). Une facture modifiée (updated_at) ou un logo changé
+donnent une nouvelle clé, jamais un document périmé; les anciennes entrées
+sortent par éviction LRU (DOCUMENT_CACHE_MAX_MB, date d'accès = mtime).
+La clé sert aussi d'ETag: un client qui a déjà le document reçoit un 304
+sans rendu ni lecture disque.
+
+TenantBranding garde en mémoire les infos de charte (config du tenant,
+logo décodé), revalidées par une requête légère sur les updated_at.
+
+Pré-rendu: au commit d'un paiement confirmé ou d'un retrait, les documents
+DOCUMENT_PRERENDER sont rendus en arrière-plan (le guichet imprime juste après).
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from flask import current_app, request, Response
+from sqlalchemy import event as sa_event, func
+from app import db
+from app.models import Tenant, TenantConfig, Invoice, Payment, Pickup
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_PRERENDER_KEY = 'document_cache_prerender'
+
+# type -> (modèle, méthode de PDFGenerator, arguments de to_dict)
+DOCUMENT_TYPES = {
+    'invoice': (Invoice, 'generate_invoice_pdf', {}),
+    'payment_receipt': (Payment, 'generate_payment_receipt', {'include_packages': True}),
+    'payment_ticket': (Payment, 'generate_payment_ticket', {'include_packages': True}),
+    'pickup_receipt': (Pickup, 'generate_pickup_receipt', {}),
+    'pickup_ticket': (Pickup, 'generate_pickup_ticket', {}),
+}
+
+
+class DocumentRenderError(Exception):
+    """Échec du rendu d'un document"""
+    pass
+
+
+@dataclass
+class CachedDocument:
+    """Document rendu (etag = clé de cache)"""
+    data: bytes
+    filename: str
+    content_type: str
+    etag: str
+
+
+def entity_version(entity) -> str:
+    """Version d'une entité: updated_at, ou pour un retrait (jamais modifié) sa date et sa signature"""
+    updated_at = getattr(entity, 'updated_at', None)
+    if updated_at is not None:
+        return updated_at.isoformat()
+    if isinstance(entity, Pickup):
+        return f"{entity.picked_up_at.isoformat() if entity.picked_up_at else ''}:{entity.signature_ref or ''}"
+    return ''
+
+
+class TenantBranding:
+    """
+    Infos du tenant pour les documents (nom, contact, logo, header, footer,
+    couleur), en mémoire par processus et revalidées par version
+    """
+
+    MAX_TENANTS = 256
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, tenant_id: str):
+        """
+        Returns:
+            (version, info): info = {} si le tenant n'existe pas
+        """
+        row = db.session.query(
+            Tenant.updated_at,
+            db.select(func.max(TenantConfig.updated_at))
+            .where(TenantConfig.tenant_id == tenant_id)
+            .scalar_subquery()
+        ).filter(Tenant.id == tenant_id).first()
+        if row is None:
+            return '', {}
+        version = hashlib.sha256(
+            f"{row[0].isoformat() if row[0] else ''}:{row[1].isoformat() if row[1] else ''}".encode()
+        ).hexdigest()[:16]
+
+        with cls._lock:
+            cached = cls._cache.get(tenant_id)
+            if cached and cached[0] == version:
+                cls._cache.move_to_end(tenant_id)
+                return version, dict(cached[1])
+
+        info = cls._load(tenant_id)
+        with cls._lock:
+            cls._cache[tenant_id] = (version, info)
+            cls._cache.move_to_end(tenant_id)
+            while len(cls._cache) > cls.MAX_TENANTS:
+                cls._cache.popitem(last=False)
+        return version, dict(info)
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+    @staticmethod
+    def _load(tenant_id: str) -> dict:
+        tenant = Tenant.query.get(tenant_id)
+        if not tenant:
+            return {}
+
+        info = {
+            'name': tenant.name,
+            'email': tenant.email,
+            'phone': tenant.phone,
+            'address': tenant.address,
+            # Valeurs par défaut pour les documents
+            'logo': None,
+            'header': '',
+            'footer': '',
+            'show_logo': True,
+            'primary_color': '#2563eb',
+            'export_footer': ''
+        }
+
+        # Config principale du tenant (contient invoice, export, etc.)
+        config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
+        if not config or not config.config_data:
+            logger.warning(f"[Export] No config found for tenant {tenant_id}")
+            return info
+
+        # Config company
+        if config.config_data.get('company'):
+            info.update(config.config_data['company'])
+
+        # Config invoice (logo, header, footer, couleur)
+        invoice_config = config.config_data.get('invoice', {})
+        if invoice_config:
+            info['logo'] = invoice_config.get('logo', info['logo'])
+            info['header'] = invoice_config.get('header', info['header'])
+            info['footer'] = invoice_config.get('footer', info['footer'])
+            info['show_logo'] = invoice_config.get('show_logo', info['show_logo'])
+            info['primary_color'] = invoice_config.get('primary_color', info['primary_color'])
+
+        # Config export
+        export_config = config.config_data.get('export', {})
+        if export_config:
+            info['export_footer'] = export_config.get('footer', info['export_footer'])
+
+        # Logo décodé une fois (PDFGenerator._add_logo l'utilise tel quel)
+        logo = info.get('logo')
+        if logo and isinstance(logo, str) and logo.startswith('data:image/') and ',' in logo:
+            try:
+                info['logo_bytes'] = base64.b64decode(logo.split(',', 1)[1])
+            except Exception as e:
+                logger.warning(f"Failed to decode base64 logo: {e}")
+
+        return info
+
+
+class DocumentCache:
+    """
+    Cache disque des documents rendus, partagé entre workers
+
+    Usage:
+        return DocumentCache.serve_export('invoice', invoice)
+    """
+
+    _lock = threading.Lock()
+    _last_prune = 0.0
+    _executor = None
+
+    @classmethod
+    def key(cls, doc_type: str, tenant_id: str, entity_id: str, version: str, branding: str = '') -> str:
+        return hashlib.sha256(
+            f"{doc_type}:{tenant_id}:{entity_id}:{version}:{branding}".encode()
+        ).hexdigest()[:32]
+
+    @classmethod
+    def fetch(cls, doc_type: str, tenant_id: str, entity_id: str, version: str, render, branding: str = '') -> CachedDocument:
+        """
+        Document en cache, rendu (render() -> ExportResult) et stocké sinon
+
+        Raises:
+            DocumentRenderError
+        """
+        etag = cls.key(doc_type, tenant_id, entity_id, version, branding)
+        document = cls._read(tenant_id, etag)
+        if document is not None:
+            return document
+
+        started = time.perf_counter()
+        result = render()
+        if not result.success:
+            raise DocumentRenderError(result.error or 'Erreur génération PDF')
+        logger.debug(f"Document {doc_type} {entity_id} rendu en {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        document = CachedDocument(result.data, result.filename, result.content_type, etag)
+        cls._write(tenant_id, document)
+        return document
+
+    @classmethod
+    def fetch_export(cls, doc_type: str, entity) -> CachedDocument:
+        """
+        Document PDFGenerator (DOCUMENT_TYPES) d'une entité
+
+        Raises:
+            DocumentRenderError
+        """
+        return cls.fetch(doc_type, entity.tenant_id, entity.id, *cls._export_args(doc_type, entity))
+
+    @classmethod
+    def serve(cls, doc_type: str, tenant_id: str, entity_id: str, version: str, render,
+              branding: str = '', disposition: str = 'attachment') -> Response:
+        """
+        Réponse PDF avec ETag: 304 sans rendu ni lecture disque si le client
+        a déjà cette version (If-None-Match)
+
+        Raises:
+            DocumentRenderError
+        """
+        etag = cls.key(doc_type, tenant_id, entity_id, version, branding)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            document = cls.fetch(doc_type, tenant_id, entity_id, version, render, branding)
+            response = Response(
+                document.data,
+                mimetype=document.content_type,
+                headers={'Content-Disposition': f'{disposition}; filename="{document.filename}"'}
+            )
+        response.set_etag(etag)
+        # Revalidation à chaque ouverture: 304 tant que le document n'a pas changé
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @classmethod
+    def serve_export(cls, doc_type: str, entity, disposition: str = 'attachment') -> Response:
+        """serve() pour un document PDFGenerator (DOCUMENT_TYPES)"""
+        return cls.serve(doc_type, entity.tenant_id, entity.id, *cls._export_args(doc_type, entity),
+                         disposition=disposition)
+
+    @staticmethod
+    def _export_args(doc_type: str, entity):
+        """(version, render, branding) d'un document PDFGenerator"""
+        _, method, to_dict_args = DOCUMENT_TYPES[doc_type]
+        branding, tenant_info = TenantBranding.get(entity.tenant_id)
+
+        def render():
+            # reportlab importé à la demande (coûteux au démarrage)
+            from app.services.export_service import PDFGenerator
+
+            generator = PDFGenerator(tenant_info.get('name', 'Express Cargo'))
+            return getattr(generator, method)(entity.to_dict(**to_dict_args), tenant_info)
+
+        return entity_version(entity), render, branding
+
+    # ==================== DISQUE ====================
+
+    @staticmethod
+    def _path(tenant_id: str, etag: str):
+        directory = current_app.config.get('DOCUMENT_CACHE_DIR')
+        if not directory:
+            return None
+        return os.path.join(directory, tenant_id, etag[:2], etag)
+
+    @classmethod
+    def _read(cls, tenant_id: str, etag: str):
+        path = cls._path(tenant_id, etag)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                data = f.read()
+            # Date d'accès pour l'éviction LRU (atime peu fiable: noatime)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedDocument(data, meta['filename'], meta['content_type'], etag)
+
+    @classmethod
+    def _write(cls, tenant_id: str, document: CachedDocument):
+        path = cls._path(tenant_id, document.etag)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps({'filename': document.filename, 'content_type': document.content_type}).encode())
+                f.write(b'\n')
+                f.write(document.data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Cache documents disque indisponible: {e}")
+            return
+        cls._maybe_prune()
+
+    @classmethod
+    def _maybe_prune(cls):
+        interval = current_app.config.get('DOCUMENT_CACHE_PRUNE_SECONDS', 300)
+        with cls._lock:
+            if time.monotonic() - cls._last_prune < interval:
+                return
+            cls._last_prune = time.monotonic()
+        cls.prune()
+
+    @classmethod
+    def prune(cls) -> int:
+        """
+        Éviction LRU au-delà de DOCUMENT_CACHE_MAX_MB (jusqu'à 90% de la limite)
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        directory = current_app.config.get('DOCUMENT_CACHE_DIR')
+        if not directory or not os.path.isdir(directory):
+            return 0
+        limit = current_app.config.get('DOCUMENT_CACHE_MAX_MB', 256) * 1024 * 1024
+
+        entries = []
+        total = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= limit:
+            return 0
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= limit * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        logger.info(f"Cache documents: {removed} fichier(s) évincé(s)")
+        return removed
+
+    # ==================== PRÉ-RENDU ====================
+
+    @classmethod
+    def prerender(cls, items: list):
+        """Rendu en arrière-plan de [(type, entity_id)]"""
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='document-prerender')
+        cls._executor.submit(_prerender, current_app._get_current_object(), items)
+
+
+def _prerender(app, items: list):
+    with app.app_context():
+        try:
+            for doc_type, entity_id in items:
+                model = DOCUMENT_TYPES[doc_type][0]
+                entity = db.session.get(model, entity_id)
+                if entity is None:
+                    continue
+                try:
+                    DocumentCache.fetch_export(doc_type, entity)
+                except Exception as e:
+                    logger.warning(f"Pré-rendu {doc_type} {entity_id} impossible: {e}")
+        finally:
+            db.session.remove()
+
+
+def init_document_cache(app):
+    """Pré-rendu des reçus / tickets au commit d'un paiement confirmé ou d'un retrait"""
+    if sa_event.contains(db.session, 'after_commit', _after_commit):
+        return
+    sa_event.listen(db.session, 'after_flush', _after_flush)
+    sa_event.listen(db.session, 'after_commit', _after_commit)
+    sa_event.listen(db.session, 'after_transaction_end', _after_transaction_end)
+
+
+def _after_flush(session, flush_context):
+    pending = None
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Payment):
+            if obj.status != 'confirmed' or (obj not in session.new and not db.inspect(obj).attrs.status.history.has_changes()):
+                continue
+            pending = pending if pending is not None else session.info.setdefault(_PRERENDER_KEY, [])
+            pending.extend([('payment_receipt', obj.id), ('payment_ticket', obj.id)])
+        elif isinstance(obj, Pickup) and obj in session.new:
+            pending = pending if pending is not None else session.info.setdefault(_PRERENDER_KEY, [])
+            pending.extend([('pickup_receipt', obj.id), ('pickup_ticket', obj.id)])
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PRERENDER_KEY, None)
+    if not pending or not current_app.config.get('DOCUMENT_CACHE_DIR'):
+        return
+    types = set(current_app.config.get('DOCUMENT_PRERENDER') or [])
+    items = list(dict.fromkeys(item for item in pending if item[0] in types))
+    if items:
+        DocumentCache.prerender(items)
+
+
+def _after_transaction_end(session, transaction):
+    # Transaction racine terminée sans commit (rollback, close): abandon
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop(_PRERENDER_KEY, None)
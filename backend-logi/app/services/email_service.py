@@ -8,6 +8,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from abc import ABC, abstractmethod
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -453,7 +454,7 @@ class EmailService:
                 'to': to
             }
         
-        return self.provider.send(to, subject, body, html)
+        return observe_provider('email', self.provider_name, 'send', self.provider.send, to, subject, body, html)
     
     def send_html(self, to: str, subject: str, html: str, text_fallback: str = None) -> dict:
         """
@@ -11,15 +11,36 @@ Les limites principales sont des colonnes typées sur SubscriptionPlan :
 - max_clients : clients actifs
 
 Les limites supplémentaires (max_warehouses, api_access, etc.) restent dans le JSON `limits`.
+
+Performance:
+- Snapshot des droits par tenant (limites du plan, statut d'abonnement, canaux,
+  entitlements), aussi lu par channel_required / entitlement_required: cache local
+  (ENTITLEMENT_CACHE_SECONDS) devant Redis (ENTITLEMENT_SHARED_SECONDS, si REDIS_URL).
+  Invalidé au commit d'un changement de tenant, d'abonnement ou de plan
+  (init_enforcement), republié par SubscriptionLifecycle.sweep.
+  L'invalidation incrémente une génération Redis par tenant: un snapshot
+  chargé avant le commit n'est pas réécrit après (voir _write_shared).
+- Le quota mensuel de colis est lu / consommé dans le compteur TenantUsage
+  (consume_quota: vérification + incrément atomiques, dans la transaction de l'insertion).
 """
 
-from app.models import Tenant, Subscription, SubscriptionPlan, Package, User
+from app.models import Tenant, Subscription, SubscriptionPlan, User, TenantUsage
+from app.models.tenant import DEFAULT_CHANNELS
 from app import db
+from app.utils.redis_client import get_redis, mark_unavailable
+from flask import current_app
+from sqlalchemy import event as sa_event
+import calendar
+import json
 import logging
-from datetime import datetime
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+_PLAN_CHANGES_KEY = 'enforcement_plan_changes'
+_ALL_TENANTS = '*'
+
 
 class EnforcementService:
     """
@@ -33,13 +54,232 @@ class EnforcementService:
     # Ressources dans le JSON limits
     RESOURCE_WAREHOUSES = 'max_warehouses'
     
+    # Snapshots en cache local: tenant_id -> (chargé à, snapshot)
+    _snapshots = {}
+    _lock = threading.Lock()
+    SHARED_KEY = 'entitlements:{}'
+    # Génération par tenant ('*': tous), incrémentée à chaque invalidation
+    GENERATION_KEY = 'entitlements_gen:{}'
+    GENERATION_SECONDS = 86400
+    
+    @classmethod
+    def get_snapshot(cls, tenant_id: str):
+        """
+        Snapshot des droits du tenant: cache local, puis Redis, puis base.
+        
+        Returns:
+            dict {
+                'tenant_active': bool,
+                'channels': [...], 'entitlements': {...},
+                'subscription': {'status', 'active_until' (timestamp fin d'essai)} ou None,
+                'plan': {max_packages_monthly, max_staff, max_clients, limits} ou None
+            }
+            ou None si le tenant n'existe pas
+        """
+        ttl = current_app.config.get('ENTITLEMENT_CACHE_SECONDS', 60)
+        cached = cls._snapshots.get(tenant_id)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        
+        snapshot, generation = cls._read_shared(tenant_id)
+        if snapshot is None:
+            snapshot = cls._load(tenant_id)
+            if snapshot is None:
+                return None
+            cls._write_shared(tenant_id, snapshot, generation)
+        
+        with cls._lock:
+            cls._snapshots[tenant_id] = (time.monotonic(), snapshot)
+        return snapshot
+    
+    @classmethod
+    def publish(cls, tenant_id: str):
+        """Recharge et publie le snapshot (après une transition d'abonnement)"""
+        _, generation = cls._read_shared(tenant_id)
+        snapshot = cls._load(tenant_id)
+        with cls._lock:
+            cls._snapshots.pop(tenant_id, None)
+        if snapshot is None:
+            cls._delete_shared(tenant_id)
+        else:
+            cls._write_shared(tenant_id, snapshot, generation)
+        return snapshot
+    
+    @classmethod
+    def invalidate(cls, tenant_id: str = None):
+        """
+        Invalide le snapshot d'un tenant (ou tous, localement).
+        Les autres workers le voient à l'expiration de leur cache local.
+        """
+        with cls._lock:
+            if tenant_id:
+                cls._snapshots.pop(tenant_id, None)
+            else:
+                cls._snapshots.clear()
+        cls._delete_shared(tenant_id)
+    
+    @classmethod
+    def _load(cls, tenant_id: str):
+        """Une requête (colonnes seules): tenant + abonnement + plan"""
+        row = db.session.query(
+            Tenant.is_active, Tenant.allowed_channels, Tenant.entitlements,
+            Subscription.status, Subscription.trial_ends_at, SubscriptionPlan.id.label('plan_id'),
+            SubscriptionPlan.max_packages_monthly, SubscriptionPlan.max_staff,
+            SubscriptionPlan.max_clients, SubscriptionPlan.limits
+        ).outerjoin(
+            Subscription, Subscription.tenant_id == Tenant.id
+        ).outerjoin(
+            SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id
+        ).filter(Tenant.id == tenant_id).first()
+        
+        if row is None:
+            return None
+        
+        return {
+            'tenant_active': bool(row.is_active),
+            'channels': list(row.allowed_channels or DEFAULT_CHANNELS),
+            'entitlements': dict(row.entitlements or {}),
+            'subscription': {
+                'status': row.status,
+                'active_until': calendar.timegm(row.trial_ends_at.utctimetuple()) if row.trial_ends_at else None
+            } if row.status else None,
+            'plan': {
+                cls.RESOURCE_PACKAGES_MONTHLY: row.max_packages_monthly,
+                cls.RESOURCE_STAFF: row.max_staff,
+                cls.RESOURCE_CLIENTS: row.max_clients,
+                'limits': dict(row.limits or {})
+            } if row.plan_id else None
+        }
+    
+    @classmethod
+    def _generation_keys(cls, tenant_id: str) -> list:
+        return [cls.GENERATION_KEY.format(tenant_id), cls.GENERATION_KEY.format(_ALL_TENANTS)]
+    
+    @classmethod
+    def _read_shared(cls, tenant_id: str):
+        """(snapshot ou None, génération), génération None sans Redis"""
+        client = get_redis()
+        if client is None:
+            return None, None
+        try:
+            raw, *generation = client.mget(cls.SHARED_KEY.format(tenant_id), *cls._generation_keys(tenant_id))
+        except Exception as e:
+            mark_unavailable(e)
+            return None, None
+        return (json.loads(raw) if raw else None), generation
+    
+    @classmethod
+    def _write_shared(cls, tenant_id: str, snapshot: dict, generation: list):
+        """
+        Écrit le snapshot si aucune invalidation n'a eu lieu depuis la lecture
+        de `generation` (avant le chargement en base): un snapshot chargé avant
+        le commit d'un changement n'écrase pas l'invalidation qui le suit.
+        """
+        client = get_redis()
+        if client is None or generation is None:
+            return
+        from redis.exceptions import WatchError
+        
+        keys = cls._generation_keys(tenant_id)
+        try:
+            with client.pipeline() as pipe:
+                pipe.watch(*keys)
+                if pipe.mget(*keys) != generation:
+                    return
+                pipe.multi()
+                pipe.set(
+                    cls.SHARED_KEY.format(tenant_id), json.dumps(snapshot),
+                    ex=current_app.config.get('ENTITLEMENT_SHARED_SECONDS', 600)
+                )
+                pipe.execute()
+        except WatchError:
+            # Invalidé pendant l'écriture: le prochain lecteur recharge
+            pass
+        except Exception as e:
+            mark_unavailable(e)
+    
     @classmethod
-    def _get_active_plan(cls, tenant_id: str):
-        """Récupère le plan actif du tenant."""
-        subscription = Subscription.query.filter_by(tenant_id=tenant_id).first()
-        if not subscription or not subscription.is_active:
-            return None, subscription
-        return subscription.plan, subscription
+    def _delete_shared(cls, tenant_id: str = None):
+        """
+        Supprime le snapshot partagé d'un tenant (tous: changement de plan, rare)
+        après avoir incrémenté sa génération (écritures en cours refusées)
+        """
+        client = get_redis()
+        if client is None:
+            return
+        generation_key = cls.GENERATION_KEY.format(tenant_id or _ALL_TENANTS)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, cls.GENERATION_SECONDS)
+            pipe.execute()
+            if tenant_id:
+                client.delete(cls.SHARED_KEY.format(tenant_id))
+            else:
+                keys = list(client.scan_iter(cls.SHARED_KEY.format('*'), count=500))
+                if keys:
+                    client.delete(*keys)
+        except Exception as e:
+            mark_unavailable(e)
+    
+    @staticmethod
+    def is_active(snapshot) -> bool:
+        """
+        Même règle que Subscription.is_active. Les statuts sont tenus à jour
+        par SubscriptionLifecycle.sweep; seule la fin d'essai est comparée ici
+        (essai terminé entre deux passages).
+        """
+        subscription = snapshot and snapshot['subscription']
+        if not subscription:
+            return False
+        if subscription['status'] == 'active':
+            return True
+        if subscription['status'] == 'trial' and subscription['active_until']:
+            return time.time() < subscription['active_until']
+        return False
+    
+    @classmethod
+    def _resolve_limit(cls, tenant_id: str, resource: str):
+        """
+        Returns:
+            (limite, None) ou (None, refus) - limite -1 = illimité
+        """
+        snapshot = cls.get_snapshot(tenant_id)
+        
+        if snapshot is None:
+            return None, {'allowed': False, 'reason': 'Tenant introuvable', 'limit': 0, 'current': 0}
+        
+        if not cls.is_active(snapshot):
+            return None, {
+                'allowed': False, 
+                'reason': 'Abonnement inactif ou expiré. Veuillez renouveler.',
+                'limit': 0,
+                'current': 0
+            }
+        
+        plan = snapshot['plan']
+        if not plan:
+            return None, {'allowed': False, 'reason': 'Plan invalide', 'limit': 0, 'current': 0}
+        
+        # Colonnes typées, sinon JSON limits pour les autres ressources
+        limit = plan[resource] if resource in plan else plan['limits'].get(resource, 0)
+        return (0 if limit is None else limit), None
+    
+    @classmethod
+    def _refusal(cls, resource: str, current: int, limit: int) -> dict:
+        labels = {
+            cls.RESOURCE_PACKAGES_MONTHLY: 'colis ce mois',
+            cls.RESOURCE_STAFF: 'utilisateurs staff',
+            cls.RESOURCE_CLIENTS: 'clients',
+            cls.RESOURCE_WAREHOUSES: 'entrepôts'
+        }
+        label = labels.get(resource, resource)
+        return {
+            'allowed': False,
+            'reason': f'Limite atteinte ({current}/{limit} {label}). Mettez à niveau votre plan.',
+            'limit': limit,
+            'current': current
+        }
     
     @classmethod
     def check_quota(cls, tenant_id: str, resource: str, requested_amount: int = 1) -> dict:
@@ -59,37 +299,11 @@ class EnforcementService:
                 'current': int/float
             }
         """
-        tenant = Tenant.query.get(tenant_id)
-        if not tenant:
-            return {'allowed': False, 'reason': 'Tenant introuvable', 'limit': 0, 'current': 0}
-        
-        plan, subscription = cls._get_active_plan(tenant_id)
-        
-        if not subscription or not subscription.is_active:
-            return {
-                'allowed': False, 
-                'reason': 'Abonnement inactif ou expiré. Veuillez renouveler.',
-                'limit': 0,
-                'current': 0
-            }
-            
-        if not plan:
-            return {'allowed': False, 'reason': 'Plan invalide', 'limit': 0, 'current': 0}
-             
-        # Récupérer la limite selon la ressource
-        if resource == cls.RESOURCE_PACKAGES_MONTHLY:
-            limit = plan.max_packages_monthly
-        elif resource == cls.RESOURCE_STAFF:
-            limit = plan.max_staff
-        elif resource == cls.RESOURCE_CLIENTS:
-            limit = plan.max_clients
-        else:
-            # Fallback vers le JSON limits pour les autres ressources
-            limit = plan.get_limit(resource, default=0)
+        limit, refusal = cls._resolve_limit(tenant_id, resource)
+        if refusal:
+            return refusal
         
         # -1 signifie Illimité
-        if limit is None:
-            limit = 0
         if limit == -1:
             return {'allowed': True, 'limit': -1, 'current': 0}
             
@@ -97,19 +311,7 @@ class EnforcementService:
         
         # Vérification
         if current_usage + requested_amount > limit:
-            labels = {
-                cls.RESOURCE_PACKAGES_MONTHLY: 'colis ce mois',
-                cls.RESOURCE_STAFF: 'utilisateurs staff',
-                cls.RESOURCE_CLIENTS: 'clients',
-                cls.RESOURCE_WAREHOUSES: 'entrepôts'
-            }
-            label = labels.get(resource, resource)
-            return {
-                'allowed': False,
-                'reason': f'Limite atteinte ({current_usage}/{limit} {label}). Mettez à niveau votre plan.',
-                'limit': limit,
-                'current': current_usage
-            }
+            return cls._refusal(resource, current_usage, limit)
             
         return {
             'allowed': True,
@@ -117,16 +319,37 @@ class EnforcementService:
             'current': current_usage
         }
     
+    @classmethod
+    def consume_quota(cls, tenant_id: str, resource: str, amount: int = 1) -> dict:
+        """
+        Vérifie ET consomme le quota, à appeler juste avant l'insertion.
+        
+        Pour le quota mensuel de colis, l'incrément est un UPDATE conditionnel
+        sur TenantUsage: il est commité (ou annulé) avec l'insertion et deux
+        créations concurrentes ne peuvent pas dépasser la limite. Les autres
+        ressources sont comptées sur leur table (check_quota).
+        
+        Returns:
+            dict: comme check_quota
+        """
+        if resource != cls.RESOURCE_PACKAGES_MONTHLY:
+            return cls.check_quota(tenant_id, resource, amount)
+        
+        limit, refusal = cls._resolve_limit(tenant_id, resource)
+        if refusal:
+            return refusal
+        
+        # Illimité: le compteur est tenu à jour quand même (changement de plan)
+        if TenantUsage.try_increment(tenant_id, TenantUsage.RESOURCE_PACKAGES, amount, limit):
+            return {'allowed': True, 'limit': limit}
+        
+        return cls._refusal(resource, TenantUsage.get(tenant_id, TenantUsage.RESOURCE_PACKAGES), limit)
+    
     @classmethod
     def _get_current_usage(cls, tenant_id: str, resource: str) -> int:
         """Calcule l'usage actuel pour une ressource donnée."""
         if resource == cls.RESOURCE_PACKAGES_MONTHLY:
-            now = datetime.utcnow()
-            start_of_month = datetime(now.year, now.month, 1)
-            return Package.query.filter(
-                Package.tenant_id == tenant_id,
-                Package.created_at >= start_of_month
-            ).count()
+            return TenantUsage.get(tenant_id, TenantUsage.RESOURCE_PACKAGES)
             
         elif resource == cls.RESOURCE_STAFF:
             return User.query.filter(
@@ -157,16 +380,56 @@ class EnforcementService:
         Returns:
             dict: {'allowed': bool, 'reason': str (si refusé)}
         """
-        plan, subscription = cls._get_active_plan(tenant_id)
+        snapshot = cls.get_snapshot(tenant_id)
         
-        if not subscription or not subscription.is_active:
+        if not cls.is_active(snapshot):
             return {'allowed': False, 'reason': 'Abonnement inactif ou expiré.'}
         
-        if not plan:
+        if not snapshot['plan']:
             return {'allowed': False, 'reason': 'Plan invalide.'}
         
-        limit_val = plan.get_limit(feature_code)
+        limit_val = snapshot['plan']['limits'].get(feature_code)
         if isinstance(limit_val, bool) and limit_val:
             return {'allowed': True}
             
         return {'allowed': False, 'reason': f'Fonctionnalité "{feature_code}" non incluse dans votre plan.'}
+
+
+def init_enforcement(app):
+    """Invalide les snapshots au commit d'un changement de tenant / d'abonnement / de plan"""
+    if sa_event.contains(db.session, 'after_commit', _after_commit):
+        return
+    sa_event.listen(db.session, 'after_flush', _after_flush)
+    sa_event.listen(db.session, 'after_commit', _after_commit)
+    sa_event.listen(db.session, 'after_transaction_end', _after_transaction_end)
+
+
+def _after_flush(session, flush_context):
+    changes = None
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Subscription):
+            changes = changes or session.info.setdefault(_PLAN_CHANGES_KEY, set())
+            changes.add(obj.tenant_id)
+        elif isinstance(obj, Tenant):
+            changes = changes or session.info.setdefault(_PLAN_CHANGES_KEY, set())
+            changes.add(obj.id)
+        elif isinstance(obj, SubscriptionPlan):
+            changes = changes or session.info.setdefault(_PLAN_CHANGES_KEY, set())
+            changes.add(_ALL_TENANTS)
+
+
+def _after_commit(session):
+    changes = session.info.pop(_PLAN_CHANGES_KEY, None)
+    if not changes:
+        return
+    if _ALL_TENANTS in changes:
+        EnforcementService.invalidate()
+    else:
+        for tenant_id in changes:
+            EnforcementService.invalidate(tenant_id)
+
+
+def _after_transaction_end(session, transaction):
+    # Transaction racine terminée sans commit (rollback, close): abandon
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop(_PLAN_CHANGES_KEY, None)
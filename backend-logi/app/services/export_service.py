@@ -11,6 +11,7 @@ import logging
 from datetime import datetime
 from typing import List, Optional
 from dataclasses import dataclass
+from app.utils.metrics import observed_export
 
 logger = logging.getLogger(__name__)
 
@@ -89,12 +90,14 @@ class PDFGenerator:
                 logger.warning("Invalid image type")
                 return
             
-            # Décoder et valider la taille
-            try:
-                logo_bytes = base64.b64decode(encoded)
-            except Exception as e:
-                logger.warning(f"Failed to decode base64 logo: {e}")
-                return
+            # Décoder et valider la taille (déjà décodé par TenantBranding)
+            logo_bytes = tenant_info.get('logo_bytes')
+            if logo_bytes is None:
+                try:
+                    logo_bytes = base64.b64decode(encoded)
+                except Exception as e:
+                    logger.warning(f"Failed to decode base64 logo: {e}")
+                    return
             
             # Limiter la taille (max 500KB)
             if len(logo_bytes) > 500 * 1024:
@@ -179,6 +182,7 @@ class PDFGenerator:
             elements.append(Spacer(1, 1*cm))
             elements.append(Paragraph(footer_text, footer_style))
     
+    @observed_export
     def generate_invoice_pdf(self, invoice: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un PDF de facture
@@ -332,6 +336,7 @@ class PDFGenerator:
             logger.error(f"Erreur génération PDF facture: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_package_label_pdf(self, package: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère une étiquette de colis en PDF
@@ -437,6 +442,7 @@ class PDFGenerator:
             logger.error(f"Erreur génération étiquette: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_payment_receipt(self, payment: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un reçu de paiement en PDF
@@ -476,7 +482,7 @@ class PDFGenerator:
                         raise ValueError("Invalid logo format")
                     
                     header, encoded = logo_data.split(',', 1)
-                    logo_bytes = base64.b64decode(encoded)
+                    logo_bytes = tenant_info.get('logo_bytes') or base64.b64decode(encoded)
                     
                     # Limiter la taille
                     if len(logo_bytes) > 500 * 1024:
@@ -770,6 +776,7 @@ class PDFGenerator:
             logger.error(f"Erreur génération reçu paiement: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_pickup_receipt(self, pickup: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un reçu de retrait en PDF
@@ -950,6 +957,7 @@ class PDFGenerator:
             logger.error(f"Erreur génération reçu retrait: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_statistics_report(self, stats: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un rapport statistiques en PDF
@@ -1125,6 +1133,7 @@ class PDFGenerator:
     
     # ==================== TICKETS (Format 80mm) ====================
     
+    @observed_export
     def generate_payment_ticket(self, payment: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un ticket de paiement (format 80mm pour imprimante thermique)
@@ -1160,7 +1169,7 @@ class PDFGenerator:
                         logo_base64 = logo_data.split(',')[1]
                     else:
                         logo_base64 = logo_data
-                    logo_bytes = base64.b64decode(logo_base64)
+                    logo_bytes = tenant_info.get('logo_bytes') or base64.b64decode(logo_base64)
                     logo_buffer = io.BytesIO(logo_bytes)
                     
                     # Dessiner le logo centré
@@ -1314,6 +1323,7 @@ class PDFGenerator:
             logger.error(f"Erreur génération ticket paiement: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_pickup_ticket(self, pickup: dict, tenant_info: dict = None) -> ExportResult:
         """
         Génère un ticket de retrait (format 80mm pour imprimante thermique)
@@ -1497,6 +1507,7 @@ class ExcelGenerator:
     def __init__(self):
         pass
     
+    @observed_export
     def generate_packages_excel(self, packages: List[dict], title: str = "Liste des colis") -> ExportResult:
         """
         Génère un export Excel des colis
@@ -1588,6 +1599,7 @@ class ExcelGenerator:
             logger.error(f"Erreur génération Excel colis: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_invoices_excel(self, invoices: List[dict]) -> ExportResult:
         """Génère un export Excel des factures"""
         if not OPENPYXL_AVAILABLE:
@@ -1642,6 +1654,7 @@ class ExcelGenerator:
             logger.error(f"Erreur génération Excel factures: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_departures_excel(self, departures: List[dict]) -> ExportResult:
         """Génère un export Excel des départs"""
         if not OPENPYXL_AVAILABLE:
@@ -1695,6 +1708,7 @@ class ExcelGenerator:
             logger.error(f"Erreur génération Excel départs: {str(e)}")
             return ExportResult(success=False, error=str(e))
     
+    @observed_export
     def generate_payments_excel(self, payments: List[dict]) -> ExportResult:
         """Génère un export Excel des paiements"""
         if not OPENPYXL_AVAILABLE:
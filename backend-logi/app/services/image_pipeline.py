@@ -0,0 +1,276 @@
+"""
+Prétraitement des images avant stockage
+=======================================
+
+Les photos de téléphone (4-8 MB) sont réduites localement avant l'envoi
+au stockage, au lieu de transférer l'original et de compter sur
+`quality: auto` côté Cloudinary:
+- orientation EXIF appliquée, métadonnées supprimées (GPS...)
+- plus grand côté ramené à IMAGE_MAX_DIMENSION (décodage JPEG réduit via draft)
+- réencodage IMAGE_FORMAT (webp | jpeg) en IMAGE_QUALITY
+- miniature IMAGE_THUMBNAIL_SIZE
+
+store_image choisit le stockage (UPLOAD_STORAGE_BACKEND): Cloudinary, ou
+le stockage local adressé par contenu (blob_store) si Cloudinary n'est pas
+configuré (auto-hébergement, tests sans réseau).
+
+Le travail CPU passe par un pool borné (IMAGE_PIPELINE_WORKERS): Pillow
+libère le GIL pendant le décodage, le redimensionnement et l'encodage, et
+le pool limite la mémoire quand plusieurs uploads arrivent ensemble. Les
+GIF animés sont conservés tels quels.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Optional
+from flask import current_app
+import io
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (format Pillow, content type, extension)
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+}
+
+
+class ImageProcessingError(Exception):
+    """Image illisible ou trop grande"""
+    pass
+
+
+@dataclass
+class ProcessedImage:
+    """Image prête à stocker"""
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    original_bytes: int
+    thumbnail: Optional[bytes] = None
+    thumbnail_width: Optional[int] = None
+    thumbnail_height: Optional[int] = None
+
+    @property
+    def bytes(self) -> int:
+        return len(self.data)
+
+
+def _options() -> dict:
+    config = current_app.config
+    return {
+        'max_dimension': config.get('IMAGE_MAX_DIMENSION', 2048),
+        'quality': config.get('IMAGE_QUALITY', 80),
+        'output': config.get('IMAGE_FORMAT', 'webp'),
+        'thumbnail_size': config.get('IMAGE_THUMBNAIL_SIZE', 320),
+        'max_pixels': config.get('IMAGE_MAX_PIXELS', 50_000_000),
+    }
+
+
+def _encode(img, output: str, quality: int) -> bytes:
+    from PIL import Image
+
+    pil_format, _, _ = OUTPUT_FORMATS[output]
+    buffer = io.BytesIO()
+    if pil_format == 'JPEG':
+        if img.mode not in ('RGB', 'L'):
+            # Transparence aplatie sur fond blanc
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', img.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel('A'))
+        img.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        img.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def process_image(data: bytes, options: dict) -> Optional[ProcessedImage]:
+    """
+    Traitement synchrone (exécuté dans le pool)
+
+    Returns:
+        ProcessedImage, None si l'image doit rester telle quelle (GIF animé)
+
+    Raises:
+        ImageProcessingError: contenu illisible ou dimensions excessives
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.width * img.height > options['max_pixels']:
+            raise ImageProcessingError(f"Image trop grande ({img.width}x{img.height})")
+        if getattr(img, 'is_animated', False):
+            return None
+
+        max_dimension = options['max_dimension']
+        # JPEG: décodage directement à l'échelle 1/2, 1/4, 1/8 (bien plus rapide)
+        img.draft('RGB', (max_dimension, max_dimension))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    except ImageProcessingError:
+        raise
+    except Exception as e:
+        logger.info(f"Image rejetée: {e}")
+        raise ImageProcessingError("Image illisible") from e
+
+    output = options['output'] if options['output'] in OUTPUT_FORMATS else 'webp'
+    _, content_type, extension = OUTPUT_FORMATS[output]
+    processed = ProcessedImage(
+        data=_encode(img, output, options['quality']),
+        content_type=content_type,
+        extension=extension,
+        width=img.width,
+        height=img.height,
+        original_bytes=len(data)
+    )
+
+    if options['thumbnail_size']:
+        size = options['thumbnail_size']
+        thumb = img.copy()
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        processed.thumbnail = _encode(thumb, output, min(options['quality'], 70))
+        processed.thumbnail_width, processed.thumbnail_height = thumb.size
+
+    return processed
+
+
+class ImagePipeline:
+    """
+    Pool de traitement partagé par le processus
+
+    Usage:
+        processed = ImagePipeline.process(file.read())
+    """
+
+    _executor = None
+    _uploader = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        """Pool CPU (décodage / encodage)"""
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=current_app.config.get('IMAGE_PIPELINE_WORKERS', 2),
+                        thread_name_prefix='image-pipeline'
+                    )
+        return cls._executor
+
+    @classmethod
+    def upload(cls, fn, *args, **kwargs):
+        """Envoi vers le stockage dans un pool I/O séparé (variantes envoyées en parallèle)"""
+        if cls._uploader is None:
+            with cls._lock:
+                if cls._uploader is None:
+                    cls._uploader = ThreadPoolExecutor(max_workers=4, thread_name_prefix='image-upload')
+        return cls._uploader.submit(fn, *args, **kwargs)
+
+    @classmethod
+    def process(cls, data: bytes, timeout: float = None) -> Optional[ProcessedImage]:
+        """
+        Traite une image dans le pool et attend le résultat
+
+        Raises:
+            ImageProcessingError
+        """
+        options = _options()
+        timeout = timeout or current_app.config.get('IMAGE_PIPELINE_TIMEOUT', 30)
+        try:
+            processed = cls.executor().submit(process_image, data, options).result(timeout=timeout)
+        except FutureTimeout:
+            raise ImageProcessingError("Traitement de l'image trop long")
+        if processed:
+            logger.debug(
+                f"Image {options['output']} {processed.width}x{processed.height}: "
+                f"{processed.original_bytes // 1024}KB -> {processed.bytes // 1024}KB"
+            )
+        return processed
+
+
+@dataclass
+class StoredImage:
+    """Image stockée (Cloudinary: public_id, local: ref et thumbnail_ref)"""
+    url: str
+    thumbnail_url: Optional[str] = None
+    public_id: Optional[str] = None
+    ref: Optional[str] = None
+    thumbnail_ref: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None
+    bytes: Optional[int] = None
+    original_bytes: Optional[int] = None
+
+
+def store_image(tenant_id: str, data: bytes, folder: str = 'images', tags: list = None) -> StoredImage:
+    """
+    Prétraite puis stocke une image sur le backend d'upload
+    (UPLOAD_STORAGE_BACKEND: cloudinary, repli local si non configuré)
+
+    Raises:
+        ImageProcessingError: image illisible / trop grande
+        BlobStoreError: stockage impossible
+    """
+    from app.services.blob_store import BlobStoreError, put_bytes, blob_url
+    from app.services.cloudinary_service import get_cloudinary_service
+
+    processed = ImagePipeline.process(data)
+
+    if current_app.config.get('UPLOAD_STORAGE_BACKEND', 'cloudinary') == 'cloudinary':
+        service = get_cloudinary_service(tenant_id)
+        if service.is_configured:
+            if processed is None:
+                stream = io.BytesIO(data)
+                stream.name = 'upload'
+                result = service.upload_image(stream, folder=folder, tags=tags)
+            else:
+                result = service.upload_processed(processed, folder=folder, tags=tags)
+            if not result.success:
+                raise BlobStoreError(result.error or "Erreur lors de l'upload")
+            return StoredImage(
+                url=result.secure_url,
+                thumbnail_url=result.thumbnail_url or service.get_thumbnail_url(result.public_id),
+                public_id=result.public_id,
+                width=result.width,
+                height=result.height,
+                format=result.format,
+                bytes=result.bytes,
+                original_bytes=len(data)
+            )
+        logger.warning(f"Cloudinary non configuré pour tenant {tenant_id}, image stockée en local")
+
+    if processed is None:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            content_type, width, height = img.get_format_mimetype(), img.width, img.height
+        ref = put_bytes(tenant_id, data, content_type, 'local')
+        return StoredImage(
+            url=blob_url(tenant_id, ref), ref=ref, width=width, height=height,
+            format=content_type.split('/')[-1], bytes=len(data), original_bytes=len(data)
+        )
+
+    ref = put_bytes(tenant_id, processed.data, processed.content_type, 'local')
+    thumbnail_ref = None
+    if processed.thumbnail:
+        thumbnail_ref = put_bytes(tenant_id, processed.thumbnail, processed.content_type, 'local')
+    return StoredImage(
+        url=blob_url(tenant_id, ref),
+        thumbnail_url=blob_url(tenant_id, thumbnail_ref) if thumbnail_ref else None,
+        ref=ref,
+        thumbnail_ref=thumbnail_ref,
+        width=processed.width,
+        height=processed.height,
+        format=processed.extension,
+        bytes=processed.bytes,
+        original_bytes=processed.original_bytes
+    )
@@ -6,7 +6,9 @@ Utilise la configuration du tenant pour sélectionner les providers
 
 import logging
 from typing import Optional, List, Dict, Any
-from app.models import TenantConfig, Notification, User
+from app.models import TenantConfig, Notification, User, UnreadCounter
+from app.services.notification_templates import TemplateRegistry, TEMPLATE_CHANNELS
+from app.services.realtime_service import publish_notification
 from app import db
 
 logger = logging.getLogger(__name__)
@@ -44,9 +46,22 @@ class NotificationService:
     
     def _load_config(self) -> dict:
         """Charge la configuration des notifications du tenant"""
+        self._config_version = None
+        self._templates = {}
+        
         tenant_config = TenantConfig.query.filter_by(tenant_id=self.tenant_id).first()
         if tenant_config and tenant_config.config_data:
-            return tenant_config.config_data.get('notifications', {})
+            updated_at = tenant_config.updated_at.isoformat() if tenant_config.updated_at else ''
+            self._config_version = f"{tenant_config.id}:{updated_at}"
+            
+            notifications = tenant_config.config_data.get('notifications', {})
+            # Templates enregistrés par le tenant-web (config_data['templates']),
+            # prioritaires sur l'ancien emplacement (notifications['templates'])
+            self._templates = {
+                **(notifications.get('templates') or {}),
+                **(tenant_config.config_data.get('templates') or {})
+            }
+            return notifications
         return {}
     
     def reload_config(self):
@@ -274,6 +289,8 @@ class NotificationService:
                 data=data
             )
             db.session.add(notification)
+            UnreadCounter.adjust(UnreadCounter.SCOPE_NOTIFICATIONS, user_id, 1)
+            publish_notification(notification)
             db.session.commit()
             
             result['notification_id'] = notification.id
@@ -487,31 +504,44 @@ class NotificationService:
     
     def get_templates(self) -> dict:
         """Récupère les templates de messages configurés"""
-        return self.config.get('templates', {})
+        return self._templates
+    
+    @property
+    def compiled_templates(self) -> dict:
+        """Templates compilés (mis en cache par version de configuration)"""
+        if self._config_version is None:
+            return {}
+        return TemplateRegistry.get(self.tenant_id, self._config_version, self._templates)
     
     def render_template(self, template_key: str, variables: dict) -> Dict[str, str]:
         """
         Rend un template avec les variables
         
+        Les variables absentes sont rendues vides (les placeholders sont
+        validés à l'enregistrement des templates).
+        
         Args:
             template_key: Clé du template (ex: 'package_received')
             variables: Variables à substituer
         
         Returns:
-            dict: Messages rendus par canal
+            dict: Messages rendus par canal (corps du message pour l'email)
         """
-        templates = self.get_templates()
-        template = templates.get(template_key, {})
+        template = self.compiled_templates.get(template_key, {})
         
         result = {}
         
-        for channel in ['sms', 'whatsapp', 'email', 'push']:
-            if channel in template:
-                try:
-                    result[channel] = template[channel].format(**variables)
-                except KeyError as e:
-                    logger.warning(f"Missing variable in template {template_key}: {e}")
-                    result[channel] = template[channel]
+        for channel in TEMPLATE_CHANNELS:
+            compiled = template.get(channel)
+            if compiled is None:
+                continue
+            if isinstance(compiled, dict):
+                compiled = compiled['body']
+            
+            missing = compiled.missing_fields(variables)
+            if missing:
+                logger.debug(f"Missing variables in template {template_key}/{channel}: {missing}")
+            result[channel] = compiled.render(variables)
         
         return result
     
@@ -670,9 +700,8 @@ class NotificationService:
             logger.warning(f"Channels {enabled_channels} enabled but not configured for event {event_type}")
             return {'skipped': True, 'reason': 'Channels not configured'}
         
-        # Récupérer les templates
-        templates = self.get_templates()
-        event_template = templates.get(event_type, {})
+        # Récupérer les templates compilés
+        event_template = self.compiled_templates.get(event_type, {})
         
         # Préparer les messages
         results = {}
@@ -694,25 +723,21 @@ class NotificationService:
         # Envoyer sur chaque canal
         for channel in channels_to_use:
             try:
-                # Récupérer le template du canal
-                template_text = event_template.get(channel, '')
+                # Rendre le template compilé du canal
+                compiled = event_template.get(channel)
+                subject = title
                 
-                if isinstance(template_text, dict):
+                if isinstance(compiled, dict):
                     # Pour email: {subject, body}
-                    message = template_text.get('body', '')
-                    subject = template_text.get('subject', title)
+                    message = compiled['body'].render(variables)
+                    if compiled['subject']:
+                        subject = compiled['subject'].render(variables) or title
+                elif compiled is not None:
+                    message = compiled.render(variables)
                 else:
-                    message = template_text
-                    subject = title
+                    message = ''
                 
-                # Substituer les variables
-                if message:
-                    try:
-                        message = message.format(**variables)
-                        subject = subject.format(**variables) if subject else title
-                    except KeyError as e:
-                        logger.warning(f"Missing variable in template: {e}")
-                else:
+                if not message:
                     # Message par défaut si pas de template
                     message = f"{title}: {variables.get('tracking', '')}"
                 
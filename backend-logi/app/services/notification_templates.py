@@ -0,0 +1,242 @@
+"""
+Templates de notification précompilés
+=====================================
+
+Les templates de messages (SMS, WhatsApp, Email, Push) utilisent la syntaxe
+`str.format` avec des variables nommées: "Colis {tracking} reçu".
+
+Plutôt que de re-parser chaque template à chaque envoi et sur chaque canal,
+les templates d'un tenant sont découpés une seule fois (segments littéraux /
+champs) et mis en cache par version de configuration. Les placeholders sont
+validés à l'enregistrement des paramètres par le tenant.
+"""
+
+from string import Formatter
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_formatter = Formatter()
+
+# Canaux supportés par les templates
+TEMPLATE_CHANNELS = ('sms', 'whatsapp', 'email', 'push')
+
+# Variables disponibles dans les templates (fournies par les routes d'envoi)
+TEMPLATE_VARIABLES = frozenset({
+    # Colis
+    'tracking', 'client_name', 'description', 'package_type', 'status',
+    'location', 'notes', 'route', 'transport', 'departure_date', 'eta',
+    'warehouse', 'company',
+    # Facturation
+    'billing_qty', 'billing_rate', 'billing_detail', 'shipping_cost',
+    'amount', 'amount_paid', 'amount_due',
+    # Retrait
+    'pickup_date', 'pickup_by', 'proxy_name', 'amount_collected', 'payment_method',
+    # Divers
+    'title', 'subject',
+})
+
+
+class TemplateError(ValueError):
+    """Template invalide (syntaxe ou variable inconnue)"""
+    pass
+
+
+class CompiledTemplate:
+    """
+    Template découpé en segments (littéral, champ, conversion, format).
+    Le rendu est une simple concaténation, sans re-parsing.
+    """
+
+    __slots__ = ('source', 'segments', 'fields')
+
+    def __init__(self, source: str):
+        self.source = source or ''
+        self.segments = []
+        fields = set()
+
+        try:
+            for literal, field, format_spec, conversion in _formatter.parse(self.source):
+                if field is None:
+                    self.segments.append((literal, None, None, None))
+                    continue
+                if field == '' or field.isdigit():
+                    raise TemplateError('Les variables positionnelles ({} ou {0}) ne sont pas supportées')
+                self.segments.append((literal, field, conversion, format_spec or None))
+                fields.add(_root_name(field))
+        except ValueError as e:
+            if isinstance(e, TemplateError):
+                raise
+            raise TemplateError(f'Syntaxe invalide: {e}')
+
+        self.fields = frozenset(fields)
+
+    def render(self, variables: dict, missing: str = '') -> str:
+        """
+        Rend le template.
+
+        Args:
+            variables: Valeurs des variables
+            missing: Valeur utilisée pour une variable absente
+        """
+        parts = []
+        append = parts.append
+        for literal, field, conversion, format_spec in self.segments:
+            if literal:
+                append(literal)
+            if field is None:
+                continue
+
+            if field in variables:
+                value = variables[field]
+            else:
+                try:
+                    value = _formatter.get_field(field, (), variables)[0]
+                except (KeyError, AttributeError, IndexError, TypeError):
+                    append(missing)
+                    continue
+
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            if format_spec:
+                try:
+                    append(format(value, format_spec))
+                except (ValueError, TypeError):
+                    append(str(value))
+            else:
+                append(value if isinstance(value, str) else str(value))
+        return ''.join(parts)
+
+    def missing_fields(self, variables: dict) -> set:
+        """Variables du template absentes de `variables`"""
+        return {f for f in self.fields if f not in variables}
+
+
+def _root_name(field: str) -> str:
+    """Nom racine d'un champ ('client.name' -> 'client', 'items[0]' -> 'items')"""
+    for i, c in enumerate(field):
+        if c in '.[':
+            return field[:i]
+    return field
+
+
+def compile_event_template(event_template: dict) -> dict:
+    """
+    Compile les templates d'un événement.
+
+    Returns:
+        dict: canal -> CompiledTemplate, ou pour l'email
+              {'subject': CompiledTemplate|None, 'body': CompiledTemplate}
+    """
+    compiled = {}
+    for channel, text in (event_template or {}).items():
+        if channel not in TEMPLATE_CHANNELS or not text:
+            continue
+        if isinstance(text, dict):
+            # Pour email: {subject, body}
+            subject = text.get('subject')
+            compiled[channel] = {
+                'subject': CompiledTemplate(subject) if subject else None,
+                'body': CompiledTemplate(text.get('body', ''))
+            }
+        elif isinstance(text, str):
+            compiled[channel] = CompiledTemplate(text)
+    return compiled
+
+
+def validate_templates(templates: dict) -> list:
+    """
+    Vérifie la syntaxe et les placeholders d'un ensemble de templates.
+
+    Args:
+        templates: {event: {channel: str | {subject, body}}}
+
+    Returns:
+        list: Erreurs [{'template', 'channel', 'error'}] (vide si valide)
+    """
+    errors = []
+    if not isinstance(templates, dict):
+        return [{'template': None, 'channel': None, 'error': 'Format de templates invalide'}]
+
+    for template_key, event_template in templates.items():
+        if not isinstance(event_template, dict):
+            errors.append({'template': template_key, 'channel': None, 'error': 'Format de template invalide'})
+            continue
+
+        for channel, text in event_template.items():
+            if channel not in TEMPLATE_CHANNELS or not text:
+                continue
+
+            sources = []
+            if isinstance(text, dict):
+                sources = [('subject', text.get('subject')), ('body', text.get('body'))]
+            elif isinstance(text, str):
+                sources = [(None, text)]
+            else:
+                errors.append({'template': template_key, 'channel': channel, 'error': 'Le template doit être un texte'})
+                continue
+
+            for part, source in sources:
+                if not source:
+                    continue
+                label = f'{channel}.{part}' if part else channel
+                try:
+                    compiled = CompiledTemplate(source)
+                except TemplateError as e:
+                    errors.append({'template': template_key, 'channel': label, 'error': str(e)})
+                    continue
+
+                unknown = sorted(compiled.fields - TEMPLATE_VARIABLES)
+                if unknown:
+                    errors.append({
+                        'template': template_key,
+                        'channel': label,
+                        'error': f"Variable(s) inconnue(s): {', '.join('{' + u + '}' for u in unknown)}"
+                    })
+    return errors
+
+
+class TemplateRegistry:
+    """
+    Cache par processus des templates compilés, par tenant et version de config.
+    """
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, tenant_id: str, version: str, templates: dict) -> dict:
+        """
+        Retourne {event: compiled} pour le tenant, en recompilant si la
+        version de configuration a changé.
+        """
+        cached = cls._cache.get(tenant_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with cls._lock:
+            cached = cls._cache.get(tenant_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            compiled = {}
+            for event_type, event_template in (templates or {}).items():
+                if not isinstance(event_template, dict):
+                    continue
+                try:
+                    compiled[event_type] = compile_event_template(event_template)
+                except TemplateError as e:
+                    # Template enregistré avant la validation: ignoré
+                    logger.warning(f"Invalid template {event_type} for tenant {tenant_id}: {e}")
+
+            cls._cache[tenant_id] = (version, compiled)
+            return compiled
+
+    @classmethod
+    def invalidate(cls, tenant_id: str = None):
+        """Invalide le cache local (un tenant ou tous)"""
+        if tenant_id:
+            cls._cache.pop(tenant_id, None)
+        else:
+            cls._cache.clear()
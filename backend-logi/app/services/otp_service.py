@@ -7,6 +7,11 @@ pour l'authentification 2FA, la réinitialisation de mot de passe, etc.
 
 Canaux supportés: SMS, WhatsApp, Email
 Fallback EmailJS pour les tests
+
+Anti-abus: en plus du délai de renvoi par utilisateur, les envois vers une
+même destination (téléphone / email) sont limités par fenêtres glissantes
+(OTP_DESTINATION_LIMITS, app/utils/throttle.py), avant tout appel au
+fournisseur SMS. Les codes expirés sont purgés périodiquement (purge_otp.py).
 """
 
 import random
@@ -15,7 +20,9 @@ import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
+from flask import current_app
 from app import db
+from app.utils.throttle import SlidingWindow, parse_windows
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +31,7 @@ OTP_VALIDITY_MINUTES = 10
 OTP_LENGTH = 6
 MAX_ATTEMPTS = 3
 RESEND_COOLDOWN_SECONDS = 60
+PURGE_BATCH_SIZE = 1000
 
 
 class OTPService:
@@ -168,6 +176,19 @@ class OTPService:
                     'cooldown': remaining
                 }
         
+        # Limite par destination (partagée entre utilisateurs et tenants)
+        allowed, retry_after = SlidingWindow.hit(
+            self._destination_key(channel, destination),
+            parse_windows(current_app.config.get('OTP_DESTINATION_LIMITS'))
+        )
+        if not allowed:
+            logger.warning(f"OTP throttled for {self._mask_destination(channel, destination)} ({purpose})")
+            return {
+                'success': False,
+                'error': f'Trop de codes envoyés à cette destination. Réessayez dans {max(1, retry_after // 60)} minute(s).',
+                'cooldown': retry_after
+            }
+        
         # Générer le code
         code = self.generate_otp()
         code_hash = self._hash_otp(code, user_id, purpose)
@@ -483,6 +504,46 @@ _{company}_"""
             'message': 'Code vérifié avec succès'
         }
     
+    @staticmethod
+    def purge_expired(now: datetime = None, dry_run: bool = False) -> int:
+        """
+        Supprime les codes expirés depuis plus de OTP_PURGE_AFTER_HOURS
+        (utilisés ou non), par lots sur idx_otp_expires
+        
+        Returns:
+            Nombre de codes supprimés (à supprimer si dry_run)
+        """
+        from app.models import OTPCode
+        
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=current_app.config.get('OTP_PURGE_AFTER_HOURS', 24))
+        if dry_run:
+            return db.session.query(db.func.count(OTPCode.id)).filter(OTPCode.expires_at < cutoff).scalar()
+        
+        purged = 0
+        while True:
+            ids = [row.id for row in db.session.query(OTPCode.id).filter(
+                OTPCode.expires_at < cutoff
+            ).limit(PURGE_BATCH_SIZE)]
+            if not ids:
+                break
+            db.session.execute(
+                db.delete(OTPCode).where(OTPCode.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            purged += len(ids)
+        
+        logger.info(f"OTP purge: {purged} code(s) expiré(s) supprimé(s)")
+        return purged
+    
+    @staticmethod
+    def _destination_key(channel: str, destination: str) -> str:
+        """Clé de limitation: empreinte de la destination normalisée (pas de numéro en clair dans Redis)"""
+        if channel == 'email':
+            normalized = destination.strip().lower()
+        else:
+            normalized = ''.join(c for c in destination if c.isdigit())
+        return f"otp:{hashlib.sha256(normalized.encode()).hexdigest()[:24]}"
+    
     def _mask_email(self, email: str) -> str:
         """Masque un email: j***@g***.com"""
         if not email or '@' not in email:
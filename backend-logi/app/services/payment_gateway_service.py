@@ -25,7 +25,6 @@ Usage:
 """
 
 import logging
-import requests
 import hashlib
 import hmac
 import json
@@ -33,6 +32,7 @@ from urllib.parse import parse_qs
 from typing import Optional, Dict, Any
 from datetime import datetime
 from abc import ABC, abstractmethod
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -125,6 +125,7 @@ class StripeProvider(PaymentProviderBase):
                 for key, value in metadata.items():
                     data[f'metadata[{key}]'] = str(value)
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/checkout/sessions',
                 headers=self._get_headers(),
@@ -156,6 +157,7 @@ class StripeProvider(PaymentProviderBase):
     def verify_payment(self, payment_id: str) -> dict:
         """Vérifie le statut d'une session Checkout"""
         try:
+            import requests  # import différé (démarrage)
             response = requests.get(
                 f'{self.BASE_URL}/checkout/sessions/{payment_id}',
                 headers=self._get_headers(),
@@ -211,6 +213,7 @@ class StripeProvider(PaymentProviderBase):
             if amount:
                 data['amount'] = int(amount * 100)
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/refunds',
                 headers=self._get_headers(),
@@ -278,6 +281,7 @@ class FlutterwaveProvider(PaymentProviderBase):
                 'meta': metadata or {}
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/payments',
                 headers=self._get_headers(),
@@ -310,6 +314,7 @@ class FlutterwaveProvider(PaymentProviderBase):
         """Vérifie le statut d'un paiement par tx_ref"""
         try:
             # D'abord chercher par tx_ref
+            import requests  # import différé (démarrage)
             response = requests.get(
                 f'{self.BASE_URL}/transactions/verify_by_reference',
                 headers=self._get_headers(),
@@ -409,6 +414,7 @@ class CinetPayProvider(PaymentProviderBase):
                 'metadata': json.dumps(metadata) if metadata else None
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/payment',
                 headers=self._get_headers(),
@@ -447,6 +453,7 @@ class CinetPayProvider(PaymentProviderBase):
                 'transaction_id': payment_id
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/payment/check',
                 headers=self._get_headers(),
@@ -546,6 +553,7 @@ class MonetbilProvider(PaymentProviderBase):
                 'return_url': return_url,
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/placePayment',
                 data=payload,
@@ -581,6 +589,7 @@ class MonetbilProvider(PaymentProviderBase):
                 'service': self.credentials.get('service_key'),
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self.BASE_URL}/checkPayment',
                 data=payload,
@@ -667,6 +676,7 @@ class OrangeMoneyProvider(PaymentProviderBase):
     def _get_access_token(self):
         """Obtient un token OAuth2 depuis l'API Orange"""
         try:
+            import requests  # import différé (démarrage)
             response = requests.post(
                 self.AUTH_URL,
                 headers={
@@ -721,6 +731,7 @@ class OrangeMoneyProvider(PaymentProviderBase):
                 'reference': description or 'Paiement colis'
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self._get_base_url()}/webpayment',
                 headers={
@@ -760,6 +771,7 @@ class OrangeMoneyProvider(PaymentProviderBase):
             if not access_token:
                 return {'success': False, 'error': 'Failed to authenticate'}
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self._get_base_url()}/transactionstatus',
                 headers={
@@ -864,6 +876,7 @@ class MTNMoMoProvider(PaymentProviderBase):
             api_key = self.credentials.get('api_key', '')
             auth_string = base64.b64encode(f"{api_user}:{api_key}".encode()).decode()
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 self._get_auth_url(),
                 headers={
@@ -940,6 +953,7 @@ class MTNMoMoProvider(PaymentProviderBase):
             if cb_url:
                 headers['X-Callback-Url'] = cb_url
             
+            import requests  # import différé (démarrage)
             response = requests.post(
                 f'{self._get_base_url()}/requesttopay',
                 headers=headers,
@@ -981,6 +995,7 @@ class MTNMoMoProvider(PaymentProviderBase):
             if not access_token:
                 return {'success': False, 'error': 'Failed to authenticate'}
             
+            import requests  # import différé (démarrage)
             response = requests.get(
                 f'{self._get_base_url()}/requesttopay/{payment_id}',
                 headers={
@@ -1129,7 +1144,8 @@ class PaymentGatewayService:
                 'error': f'Provider {provider} not available'
             }
         
-        result = provider_instance.initialize_payment(
+        result = observe_provider(
+            'payment', provider, 'initialize_payment', provider_instance.initialize_payment,
             amount=amount,
             currency=currency,
             customer_email=customer_email,
@@ -1154,7 +1170,7 @@ class PaymentGatewayService:
                 'error': f'Provider {provider} not available'
             }
         
-        return provider_instance.verify_payment(payment_id)
+        return observe_provider('payment', provider, 'verify_payment', provider_instance.verify_payment, payment_id)
     
     def verify_webhook(self, provider: str, payload: bytes, signature: str) -> bool:
         """Vérifie la signature d'un webhook"""
@@ -1173,7 +1189,7 @@ class PaymentGatewayService:
                 'error': f'Provider {provider} not available'
             }
         
-        return provider_instance.refund_payment(payment_id, amount)
+        return observe_provider('payment', provider, 'refund_payment', provider_instance.refund_payment, payment_id, amount)
     
     # ==================== TENANT-LEVEL METHODS ====================
     
@@ -1234,7 +1250,8 @@ class PaymentGatewayService:
                 'error': f'Provider {provider} not available for this tenant'
             }
         
-        result = provider_instance.initialize_payment(
+        result = observe_provider(
+            'payment', provider, 'initialize_payment', provider_instance.initialize_payment,
             amount=amount,
             currency=currency,
             customer_email=customer_email,
@@ -1259,7 +1276,7 @@ class PaymentGatewayService:
                 'error': f'Provider {provider} not available for this tenant'
             }
         
-        return provider_instance.verify_payment(payment_id)
+        return observe_provider('payment', provider, 'verify_payment', provider_instance.verify_payment, payment_id)
     
     def verify_tenant_webhook(self, tenant_id: str, provider: str, payload: bytes, signature: str) -> bool:
         """Vérifie la signature d'un webhook avec les credentials d'un tenant"""
@@ -7,6 +7,7 @@ import logging
 import json
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -505,12 +506,12 @@ class PushService:
     
     def send_to_token(self, token: str, title: str, body: str, data: dict = None) -> dict:
         """Envoie une notification à un token"""
-        return self.provider.send_to_token(token, title, body, data)
+        return observe_provider('push', self.provider_name, 'send_to_token', self.provider.send_to_token, token, title, body, data)
     
     def send_to_tokens(self, tokens: List[str], title: str, body: str, data: dict = None) -> dict:
         """Envoie une notification à plusieurs tokens"""
-        return self.provider.send_to_tokens(tokens, title, body, data)
+        return observe_provider('push', self.provider_name, 'send_to_tokens', self.provider.send_to_tokens, tokens, title, body, data)
     
     def send_to_topic(self, topic: str, title: str, body: str, data: dict = None) -> dict:
         """Envoie une notification à un topic"""
-        return self.provider.send_to_topic(topic, title, body, data)
+        return observe_provider('push', self.provider_name, 'send_to_topic', self.provider.send_to_topic, topic, title, body, data)
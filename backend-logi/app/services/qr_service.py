@@ -0,0 +1,231 @@
+"""
+QR codes des colis
+==================
+
+Le contenu d'un QR code ({tracking, tenant_id, package_id}) ne change pas:
+le rendu PNG est déterministe et mis en cache par colis, en mémoire (LRU
+par processus, QR_CACHE_SIZE entrées) puis sur disque (QR_CACHE_DIR,
+partagé entre workers). La clé inclut l'empreinte du contenu: un numéro
+de suivi modifié donne une nouvelle entrée, jamais une image périmée.
+
+Planches A4 (render_sheet): grille d'étiquettes QR + suivi + client, pour
+imprimer un départ ou une sélection en une fois.
+"""
+
+from collections import OrderedDict
+from flask import current_app
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+BOX_SIZE = 10  # pixels par module
+BORDER = 4  # modules de marge blanche
+
+
+def qr_payload(tenant_id: str, package_id: str, tracking_number: str) -> str:
+    """Contenu encodé (lu par /api/pickups/scan)"""
+    return json.dumps({
+        'tracking': tracking_number,
+        'tenant_id': tenant_id,
+        'package_id': package_id
+    })
+
+
+def render_qr_png(payload: str) -> bytes:
+    """PNG du QR code (mêmes paramètres => mêmes octets)"""
+    import qrcode  # import différé (démarrage)
+    from qrcode.constants import ERROR_CORRECT_L
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECT_L,
+        box_size=BOX_SIZE,
+        border=BORDER,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """
+    Cache par processus des PNG (LRU), adossé à un cache disque.
+    """
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, tenant_id: str, package_id: str, tracking_number: str):
+        """
+        Returns:
+            (png, etag): etag = empreinte du contenu encodé
+        """
+        payload = qr_payload(tenant_id, package_id, tracking_number)
+        etag = hashlib.sha256(payload.encode()).hexdigest()[:32]
+        key = (package_id, etag)
+
+        with cls._lock:
+            png = cls._cache.get(key)
+            if png is not None:
+                cls._cache.move_to_end(key)
+                return png, etag
+
+        png = cls._read_disk(tenant_id, package_id, etag)
+        if png is None:
+            png = render_qr_png(payload)
+            cls._write_disk(tenant_id, package_id, etag, png)
+
+        with cls._lock:
+            cls._cache[key] = png
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > current_app.config.get('QR_CACHE_SIZE', 1024):
+                cls._cache.popitem(last=False)
+        return png, etag
+
+    @classmethod
+    def invalidate(cls):
+        """Vide le cache local (le cache disque reste valide: clé = contenu)"""
+        with cls._lock:
+            cls._cache.clear()
+
+    @staticmethod
+    def _path(tenant_id: str, package_id: str, etag: str):
+        directory = current_app.config.get('QR_CACHE_DIR')
+        if not directory:
+            return None
+        return os.path.join(directory, tenant_id, package_id[:2], f'{package_id}-{etag}.png')
+
+    @classmethod
+    def _read_disk(cls, tenant_id, package_id, etag):
+        path = cls._path(tenant_id, package_id, etag)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @classmethod
+    def _write_disk(cls, tenant_id, package_id, etag, png):
+        path = cls._path(tenant_id, package_id, etag)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Cache QR disque indisponible: {e}")
+
+
+def _dark_runs(png: bytes):
+    """
+    Modules noirs du PNG en cache, par segments horizontaux (ligne, début, longueur),
+    en modules hors marge: la planche est tracée en vectoriel (PDF léger, rendu rapide)
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(png)).convert('L')
+    count = img.width // BOX_SIZE
+    pixels = img.load()
+    size = count - 2 * BORDER
+    runs = []
+    for row in range(size):
+        y = (row + BORDER) * BOX_SIZE + BOX_SIZE // 2
+        start = None
+        for col in range(size + 1):
+            dark = col < size and pixels[(col + BORDER) * BOX_SIZE + BOX_SIZE // 2, y] < 128
+            if dark and start is None:
+                start = col
+            elif not dark and start is not None:
+                runs.append((row, start, col - start))
+                start = None
+    return size, runs
+
+
+def render_sheet(tenant_id: str, packages: list, title: str = None) -> bytes:
+    """
+    Planche(s) A4 d'étiquettes QR (3 x 4 par page)
+
+    Args:
+        packages: colis (client chargé)
+        title: en-tête de chaque page (ex: départ)
+
+    Returns:
+        PDF
+    """
+    # reportlab importé à la demande (coûteux au démarrage)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    columns, rows = 3, 4
+    page_width, page_height = A4
+    margin = 12 * mm
+    header = 10 * mm if title else 0
+    cell_width = (page_width - 2 * margin) / columns
+    cell_height = (page_height - 2 * margin - header) / rows
+    qr_size = min(cell_width, cell_height) - 22 * mm
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    per_page = columns * rows
+
+    for index, package in enumerate(packages):
+        slot = index % per_page
+        if slot == 0:
+            if index:
+                pdf.showPage()
+            if title:
+                pdf.setFont('Helvetica-Bold', 11)
+                pdf.drawString(margin, page_height - margin - 6 * mm, title)
+                pdf.setFont('Helvetica', 8)
+                pdf.drawRightString(
+                    page_width - margin, page_height - margin - 6 * mm,
+                    f"{index // per_page + 1}/{(len(packages) - 1) // per_page + 1}"
+                )
+
+        column, row = slot % columns, slot // columns
+        x = margin + column * cell_width
+        y = page_height - margin - header - (row + 1) * cell_height
+
+        # Trait de coupe
+        pdf.setDash(2, 3)
+        pdf.setStrokeGray(0.7)
+        pdf.rect(x, y, cell_width, cell_height)
+        pdf.setDash()
+
+        png, _ = QRCodeCache.get(tenant_id, package.id, package.tracking_number)
+        size, runs = _dark_runs(png)
+        # Repère en modules (coordonnées entières: flux PDF compact)
+        pdf.saveState()
+        pdf.translate(x + (cell_width - qr_size) / 2, y + 14 * mm + qr_size)
+        pdf.scale(qr_size / size, -qr_size / size)
+        path = pdf.beginPath()
+        for line, start, length in runs:
+            path.rect(start, line, length, 1)
+        pdf.setFillGray(0)
+        pdf.drawPath(path, stroke=0, fill=1)
+        pdf.restoreState()
+
+        pdf.setFont('Helvetica-Bold', 10)
+        pdf.drawCentredString(x + cell_width / 2, y + 9 * mm, package.tracking_number)
+        client = package.client
+        if client:
+            pdf.setFont('Helvetica', 8)
+            pdf.drawCentredString(x + cell_width / 2, y + 4.5 * mm, f"{client.first_name} {client.last_name}"[:40])
+
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,266 @@
+"""
+Service Tarifs - Index compilé des tarifs d'expédition
+======================================================
+
+Les tarifs du tenant sont stockés dans `TenantConfig.config_data['shipping_rates']`
+sous forme de dictionnaires imbriqués:
+
+    { "China_Cameroon": { "air_normal": { "currency": "XAF",
+                                          "normal": {"label": ..., "rate": 5000, "unit": "kg"} } } }
+
+Plutôt que de reconstruire la clé de route et parcourir ces dictionnaires à chaque
+requête, on compile une table plate par tenant, indexée par
+(origine, destination, transport, type de colis), reconstruite uniquement
+lorsque la configuration change (version = `TenantConfig.updated_at`).
+"""
+
+from app import db
+from app.models import TenantConfig
+from collections import namedtuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Tarif compilé pour (origine, destination, transport, type)
+RateEntry = namedtuple('RateEntry', ['route_key', 'rate', 'unit', 'currency', 'label'])
+
+DEFAULT_CURRENCIES = ['XAF', 'USD', 'EUR']
+DEFAULT_CURRENCY = 'XAF'
+
+
+def _to_number(value):
+    """Convertit un tarif en nombre (int/float conservés tels quels)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateTable:
+    """
+    Table de tarifs compilée pour un tenant.
+    Toutes les recherches sont des accès dictionnaire O(1).
+    """
+
+    def __init__(self, shipping_rates: dict, currencies=None, default_currency=None, version=None):
+        self.version = version
+        self.raw = shipping_rates or {}
+        self.currencies = currencies or DEFAULT_CURRENCIES
+        self.default_currency = default_currency or DEFAULT_CURRENCY
+
+        # (origin, destination, transport, package_type) -> RateEntry
+        self._entries = {}
+        # (origin, destination, transport) -> tuple des types configurés
+        self._types = {}
+        # (origin, destination) -> route_key
+        self._routes = {}
+        # Routes "simples" ORIGINE_DESTINATION, pour le filtrage public
+        self.route_list = []
+
+        self._compile()
+
+    def _compile(self):
+        for route_key, route_rates in self.raw.items():
+            if not isinstance(route_rates, dict):
+                continue
+
+            parts = route_key.split('_')
+            if len(parts) == 2:
+                self.route_list.append((parts[0], parts[1], route_key))
+
+            # Enregistrer chaque découpage possible de la clé pour rester
+            # équivalent à f"{origin}_{destination}" (pays contenant un '_')
+            splits = [
+                ('_'.join(parts[:i]), '_'.join(parts[i:]))
+                for i in range(1, len(parts))
+            ]
+
+            for origin, destination in splits:
+                self._routes.setdefault((origin, destination), route_key)
+
+                for transport, transport_rates in route_rates.items():
+                    if not isinstance(transport_rates, dict):
+                        continue
+
+                    currency = transport_rates.get('currency', DEFAULT_CURRENCY)
+                    types = tuple(k for k in transport_rates.keys() if k != 'currency')
+                    self._types.setdefault((origin, destination, transport), types)
+
+                    for package_type in types:
+                        rate_info = transport_rates[package_type]
+
+                        # Support ancien format (number) et nouveau format (object)
+                        if isinstance(rate_info, dict):
+                            rate = _to_number(rate_info.get('rate', 0))
+                            unit = rate_info.get('unit', 'kg')
+                            label = rate_info.get('label')
+                        else:
+                            rate = _to_number(rate_info)
+                            unit = 'kg'
+                            label = None
+
+                        if rate is None:
+                            continue
+
+                        self._entries.setdefault(
+                            (origin, destination, transport, package_type),
+                            RateEntry(route_key, rate, unit, currency, label)
+                        )
+
+    def lookup(self, origin, destination, transport_mode, package_type):
+        """Retourne le RateEntry ou None"""
+        return self._entries.get((origin, destination, transport_mode, package_type))
+
+    def has_transport(self, origin, destination, transport_mode) -> bool:
+        """Indique si des tarifs existent pour ce mode sur cette route"""
+        return bool(self._types.get((origin, destination, transport_mode)))
+
+    def package_types(self, origin, destination, transport_mode) -> tuple:
+        """Types de colis configurés pour une route et un mode de transport"""
+        return self._types.get((origin, destination, transport_mode), ())
+
+    def route_key(self, origin, destination):
+        """Clé de route telle que stockée dans la configuration"""
+        return self._routes.get((origin, destination), f"{origin}_{destination}")
+
+    def filter(self, origin=None, destination=None, transport=None) -> dict:
+        """
+        Filtre les tarifs bruts par origine / destination / transport.
+        Même sémantique que l'ancien filtrage de GET /tenant/<id>/rates.
+        """
+        if not origin and not destination:
+            return self.raw
+
+        filtered = {}
+        for route_origin, route_dest, route_key in self.route_list:
+            if origin and route_origin != origin:
+                continue
+            if destination and route_dest != destination:
+                continue
+
+            route_rates = self.raw[route_key]
+            if transport:
+                if transport in route_rates:
+                    filtered[route_key] = {transport: route_rates[transport]}
+            else:
+                filtered[route_key] = route_rates
+        return filtered
+
+    @staticmethod
+    def quote(entry: RateEntry, weight=None, cbm=None, quantity=None) -> dict:
+        """
+        Calcule le coût pour un tarif compilé.
+
+        Raises:
+            ValueError: si weight / cbm / quantity ne sont pas numériques
+
+        Returns:
+            dict: rate, unit, currency, total, calculation
+        """
+        for value in (weight, cbm, quantity):
+            if value is not None and _to_number(value) is None:
+                raise ValueError('weight, cbm and quantity must be numbers')
+        weight = _to_number(weight) if weight is not None else None
+        cbm = _to_number(cbm) if cbm is not None else None
+        quantity = _to_number(quantity) if quantity is not None else None
+
+        rate = entry.rate
+        unit = entry.unit
+        currency = entry.currency
+
+        # Calculer selon l'unité
+        if unit == 'kg':
+            weight = weight or 0
+            total = rate * weight
+            calculation = f"{weight} kg × {rate} {currency}/kg"
+        elif unit == 'cbm':
+            cbm = cbm or 0
+            total = rate * cbm
+            calculation = f"{cbm} m³ × {rate} {currency}/m³"
+        elif unit == 'piece':
+            quantity = quantity if quantity is not None else 1
+            total = rate * quantity
+            calculation = f"{quantity} pcs × {rate} {currency}/pc"
+        elif unit == 'fixed':
+            total = rate
+            calculation = f"Forfait: {rate} {currency}"
+        else:
+            total = rate
+            calculation = f"{rate} {currency}"
+
+        return {
+            'rate': rate,
+            'unit': unit,
+            'currency': currency,
+            'total': round(total, 2),
+            'calculation': calculation
+        }
+
+
+class RateService:
+    """
+    Cache par processus des tables de tarifs compilées.
+
+    Chaque lecture vérifie la version de la config (une requête sur une seule
+    colonne); la table n'est recompilée que si la config a changé.
+    """
+
+    _tables = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_version(cls, tenant_id: str):
+        row = db.session.query(TenantConfig.id, TenantConfig.updated_at).filter(
+            TenantConfig.tenant_id == tenant_id
+        ).first()
+        if not row:
+            return None
+        return f"{row.id}:{row.updated_at.isoformat() if row.updated_at else ''}"
+
+    @classmethod
+    def get_table(cls, tenant_id: str):
+        """
+        Retourne la table compilée du tenant, ou None si aucune config.
+        """
+        version = cls._get_version(tenant_id)
+        if version is None:
+            cls._tables.pop(tenant_id, None)
+            return None
+
+        cached = cls._tables.get(tenant_id)
+        if cached is not None and cached.version == version:
+            return cached
+
+        with cls._lock:
+            cached = cls._tables.get(tenant_id)
+            if cached is not None and cached.version == version:
+                return cached
+
+            config = TenantConfig.query.filter_by(tenant_id=tenant_id).first()
+            if not config:
+                return None
+
+            config_data = config.config_data or {}
+            table = RateTable(
+                config_data.get('shipping_rates') or {},
+                currencies=config_data.get('currencies'),
+                default_currency=config_data.get('default_currency'),
+                version=version
+            )
+            cls._tables[tenant_id] = table
+            logger.debug(f"Rate table compiled for tenant {tenant_id} ({len(table._entries)} entries)")
+            return table
+
+    @classmethod
+    def invalidate(cls, tenant_id: str = None):
+        """Invalide le cache local (un tenant ou tous)"""
+        if tenant_id:
+            cls._tables.pop(tenant_id, None)
+        else:
+            cls._tables.clear()
@@ -4,27 +4,52 @@ Service Temps Réel - WebSocket avec Flask-SocketIO
 
 Gère les connexions WebSocket pour les mises à jour en temps réel.
 Permet de notifier les clients des changements de statut, nouveaux messages, etc.
+
+Activé par REALTIME_ENABLED. La diffusion entre workers gunicorn passe par
+le backend pub/sub REALTIME_MESSAGE_QUEUE:
+- redis://...  : RedisManager de python-socketio (multi-workers / multi-instances)
+- memory://    : gestionnaire en processus (un seul worker, tests)
+
+Les événements sont publiés APRÈS le commit de la transaction: `publish()`
+les met en attente sur la session SQLAlchemy, ils sont envoyés au commit et
+abandonnés au rollback. Plusieurs événements identiques vers une même room
+(ex: changement de statut en masse) sont regroupés en un seul envoi
+`<event>_batch`.
 """
 
+import importlib.util
 import logging
+from collections import OrderedDict
 from typing import Optional
 from flask import request
 from flask_jwt_extended import decode_token
 from functools import wraps
+from sqlalchemy import event as sa_event
 
 logger = logging.getLogger(__name__)
 
-# Import conditionnel de SocketIO
-try:
-    from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
-    SOCKETIO_AVAILABLE = True
-except ImportError:
-    SOCKETIO_AVAILABLE = False
+# Import différé de SocketIO (coûteux, inutile si REALTIME_ENABLED est faux)
+SOCKETIO_AVAILABLE = importlib.util.find_spec('flask_socketio') is not None
+if not SOCKETIO_AVAILABLE:
     logger.warning("flask-socketio non installé - pip install flask-socketio")
 
 # Instance globale SocketIO (initialisée dans create_app)
 socketio = None
 
+# Clé des événements en attente dans Session.info
+_PENDING_KEY = 'realtime_pending'
+
+# Rôles rejoignant la room staff du tenant
+STAFF_ROLES = ('admin', 'staff')
+
+
+def _message_queue(app) -> Optional[str]:
+    """URL du backend pub/sub, None pour le gestionnaire en processus"""
+    url = app.config.get('REALTIME_MESSAGE_QUEUE') or 'memory://'
+    if url.startswith('memory://'):
+        return None
+    return url
+
 
 def init_socketio(app, **kwargs):
     """
@@ -37,17 +62,22 @@ def init_socketio(app, **kwargs):
     Returns:
         Instance SocketIO
     """
-    global socketio
+    global socketio, SocketIO, emit, join_room, leave_room, disconnect
     
     if not SOCKETIO_AVAILABLE:
         logger.error("Flask-SocketIO non disponible")
         return None
     
+    from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
+    
     # Configuration par défaut
     default_kwargs = {
         'cors_allowed_origins': app.config.get('CORS_ORIGINS', '*'),
-        'async_mode': 'eventlet',  # ou 'gevent', 'threading'
-        'logger': True,
+        # threading: compatible avec les workers gthread de gunicorn
+        'async_mode': app.config.get('SOCKETIO_ASYNC_MODE', 'threading'),
+        'message_queue': _message_queue(app),
+        'channel': app.config.get('REALTIME_CHANNEL', 'flask-socketio'),
+        'logger': False,
         'engineio_logger': False,
     }
     default_kwargs.update(kwargs)
@@ -57,7 +87,10 @@ def init_socketio(app, **kwargs):
     # Enregistrer les handlers
     register_handlers(socketio)
     
-    logger.info("Flask-SocketIO initialisé")
+    # Publication après commit
+    _register_session_hooks()
+    
+    logger.info(f"Flask-SocketIO initialisé (backend: {default_kwargs['message_queue'] or 'memory'})")
     
     return socketio
 
@@ -114,6 +147,8 @@ def register_handlers(sio):
             # Rejoindre les rooms
             join_room(f"user_{user_id}")
             join_room(f"tenant_{tenant_id}")
+            if decoded.get('role') in STAFF_ROLES:
+                join_room(f"staff_{tenant_id}")
             
             logger.info(f"WebSocket connecté: user {user_id}, tenant {tenant_id}")
             
@@ -156,6 +191,94 @@ def register_handlers(sio):
         emit('pong')
 
 
+# ==================== PUBLICATION APRÈS COMMIT ====================
+
+def publish(room: str, event: str, data):
+    """
+    Met un événement en attente jusqu'au commit de la session courante.
+    
+    Args:
+        room: Room destinataire
+        event: Nom de l'événement
+        data: Données (dict), ou callable retournant les données, évalué
+              juste avant le commit (après flush: ids et dates renseignés)
+    """
+    if socketio is None:
+        return
+    from app import db
+    db.session.info.setdefault(_PENDING_KEY, []).append((room, event, data))
+
+
+def _register_session_hooks():
+    """Branche l'envoi des événements sur le cycle de vie de la session"""
+    from app import db
+    if sa_event.contains(db.session, 'after_commit', _after_commit):
+        return
+    sa_event.listen(db.session, 'before_commit', _before_commit)
+    sa_event.listen(db.session, 'after_commit', _after_commit)
+    sa_event.listen(db.session, 'after_transaction_end', _after_transaction_end)
+
+
+def _before_commit(session):
+    """Évalue les données différées tant que la session peut encore exécuter du SQL"""
+    pending = session.info.get(_PENDING_KEY)
+    if not pending or not any(callable(item[2]) for item in pending):
+        return
+    session.flush()
+    resolved = []
+    for room, event, data in pending:
+        if callable(data):
+            try:
+                data = data()
+            except Exception as e:
+                logger.warning(f"Realtime payload error for {event}: {e}")
+                continue
+        resolved.append((room, event, data))
+    session.info[_PENDING_KEY] = resolved
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        dispatch(pending)
+
+
+def _after_transaction_end(session, transaction):
+    # Transaction racine terminée sans commit (rollback, close): abandon
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def dispatch(events: list):
+    """
+    Envoie une liste d'événements (room, event, data), regroupés par room.
+    
+    Un seul événement pour (room, event) est envoyé tel quel; plusieurs sont
+    envoyés en un seul message `<event>_batch`: {'type': 'batch', 'event', 'items'}.
+    """
+    if socketio is None or not events:
+        return
+
+    grouped = OrderedDict()
+    for room, event, data in events:
+        grouped.setdefault((room, event), []).append(data)
+
+    for (room, event), items in grouped.items():
+        try:
+            if len(items) == 1:
+                socketio.emit(event, items[0], to=room)
+            else:
+                socketio.emit(f"{event}_batch", {
+                    'type': 'batch',
+                    'event': event,
+                    'items': items
+                }, to=room)
+            logger.debug(f"Emit {event} x{len(items)} to {room}")
+        except Exception as e:
+            # Le temps réel ne doit jamais faire échouer une requête
+            logger.warning(f"Realtime emit failed ({event} -> {room}): {e}")
+
+
 # ==================== FONCTIONS D'ÉMISSION ====================
 
 def emit_to_user(user_id: str, event: str, data: dict):
@@ -167,9 +290,7 @@ def emit_to_user(user_id: str, event: str, data: dict):
         event: Nom de l'événement
         data: Données à envoyer
     """
-    if socketio:
-        socketio.emit(event, data, room=f"user_{user_id}")
-        logger.debug(f"Emit {event} to user {user_id}")
+    publish(f"user_{user_id}", event, data)
 
 
 def emit_to_tenant(tenant_id: str, event: str, data: dict):
@@ -181,9 +302,7 @@ def emit_to_tenant(tenant_id: str, event: str, data: dict):
         event: Nom de l'événement
         data: Données à envoyer
     """
-    if socketio:
-        socketio.emit(event, data, room=f"tenant_{tenant_id}")
-        logger.debug(f"Emit {event} to tenant {tenant_id}")
+    publish(f"tenant_{tenant_id}", event, data)
 
 
 def emit_to_package(package_id: str, event: str, data: dict):
@@ -195,8 +314,7 @@ def emit_to_package(package_id: str, event: str, data: dict):
         event: Nom de l'événement
         data: Données à envoyer
     """
-    if socketio:
-        socketio.emit(event, data, room=f"package_{package_id}")
+    publish(f"package_{package_id}", event, data)
 
 
 def emit_package_update(package: dict, old_status: str = None):
@@ -223,6 +341,99 @@ def emit_package_update(package: dict, old_status: str = None):
         emit_to_package(package['id'], 'package_update', data)
 
 
+def emit_to_staff(tenant_id: str, event: str, data: dict):
+    """
+    Envoie un événement au staff (admin, staff) d'un tenant
+    
+    Args:
+        tenant_id: ID du tenant
+        event: Nom de l'événement
+        data: Données à envoyer
+    """
+    publish(f"staff_{tenant_id}", event, data)
+
+
+def package_payload(package) -> dict:
+    """Représentation compacte d'un colis pour les événements temps réel"""
+    return {
+        'id': package.id,
+        'tenant_id': package.tenant_id,
+        'client_id': package.client_id,
+        'tracking_number': package.tracking_number,
+        'status': package.status,
+        'current_location': package.current_location,
+        'departure_id': package.departure_id,
+        'updated_at': (package.updated_at.isoformat() + 'Z') if package.updated_at else None
+    }
+
+
+def publish_package_status(package, old_status: str = None):
+    """
+    Publie un changement de statut de colis (modèle Package) après commit:
+    client propriétaire, abonnés du colis et staff du tenant.
+    """
+    if socketio is None:
+        return
+
+    def build():
+        data = package_payload(package)
+        return {
+            'type': 'package_update',
+            'package': data,
+            'old_status': old_status,
+            'timestamp': data['updated_at']
+        }
+
+    publish(f"user_{package.client_id}", 'package_update', build)
+    publish(f"package_{package.id}", 'package_update', build)
+    publish(f"staff_{package.tenant_id}", 'package_update', build)
+
+
+def publish_departure(departure, event_type: str = 'update'):
+    """Publie une mise à jour de départ au staff du tenant après commit"""
+    if socketio is None:
+        return
+    publish(f"staff_{departure.tenant_id}", 'departure_update', lambda: {
+        'type': f'departure_{event_type}',
+        'departure': departure.to_dict()
+    })
+
+
+def publish_payment(payment, event_type: str = 'created'):
+    """Publie un paiement (création, confirmation, annulation) après commit"""
+    if socketio is None:
+        return
+
+    def build():
+        return {
+            'type': f'payment_{event_type}',
+            'payment': {
+                'id': payment.id,
+                'client_id': payment.client_id,
+                'amount': payment.amount,
+                'currency': payment.currency,
+                'method': payment.method,
+                'status': payment.status,
+                'reference': payment.reference,
+                'created_at': (payment.created_at.isoformat() + 'Z') if payment.created_at else None
+            }
+        }
+
+    if payment.client_id:
+        publish(f"user_{payment.client_id}", 'payment_update', build)
+    publish(f"staff_{payment.tenant_id}", 'payment_update', build)
+
+
+def publish_notification(notification):
+    """Publie une notification in-app après commit"""
+    if socketio is None:
+        return
+    publish(f"user_{notification.user_id}", 'new_notification', lambda: {
+        'type': 'notification',
+        'notification': notification.to_dict()
+    })
+
+
 def emit_new_notification(user_id: str, notification: dict):
     """
     Notifie d'une nouvelle notification
@@ -5,6 +5,7 @@ Providers supportés: Twilio, Vonage (Nexmo), Africa's Talking
 
 import logging
 from abc import ABC, abstractmethod
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -309,7 +310,7 @@ class SMSService:
             logger.warning(f"SMS message truncated from {len(message)} to 1600 chars")
             message = message[:1597] + '...'
         
-        return self.provider.send(to, message)
+        return observe_provider('sms', self.provider_name, 'send', self.provider.send, to, message)
     
     def get_balance(self) -> dict:
         """Récupère le solde du compte"""
@@ -0,0 +1,184 @@
+"""
+Cycle de vie des abonnements
+============================
+
+Passage périodique (sweep_subscriptions.py, cron horaire) qui tient les
+statuts à jour au lieu de les déduire des dates à chaque requête:
+- essai terminé (trial_ends_at dépassé) -> expired
+- période payée terminée depuis plus de SUBSCRIPTION_GRACE_DAYS -> expired
+- rappels de renouvellement aux admins du tenant (notification in-app),
+  SUBSCRIPTION_REMINDER_DAYS jours avant l'échéance, une fois par seuil
+
+Les transitions sont faites en masse (UPDATE ... WHERE id IN), chacune
+tracée dans SubscriptionLog. Après le commit, le snapshot des droits des
+tenants concernés est republié (EnforcementService.publish).
+"""
+
+from app import db
+from app.models import Subscription, SubscriptionLog, User, Notification, UnreadCounter
+from flask import current_app
+from sqlalchemy import case
+from datetime import datetime, timedelta
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+ACTION_EXPIRED = 'expired'
+ACTION_REMINDER = 'renewal_reminder'
+
+
+class SubscriptionLifecycle:
+    """Transitions d'état et rappels, en masse"""
+
+    @classmethod
+    def sweep(cls, now: datetime = None, dry_run: bool = False) -> dict:
+        """
+        Un passage complet (idempotent: relancer ne refait rien)
+
+        Returns:
+            dict {'expired_trials', 'expired_periods', 'reminders'}
+        """
+        now = now or datetime.utcnow()
+        grace = timedelta(days=current_app.config.get('SUBSCRIPTION_GRACE_DAYS', 3))
+
+        expired_trials = cls._expire(
+            Subscription.status == 'trial',
+            Subscription.trial_ends_at < now,
+            from_status='trial', reason='trial_ended', ends_at=Subscription.trial_ends_at,
+            now=now, dry_run=dry_run
+        )
+        expired_periods = cls._expire(
+            Subscription.status == 'active',
+            Subscription.current_period_end < now - grace,
+            from_status='active', reason='period_ended', ends_at=Subscription.current_period_end,
+            now=now, dry_run=dry_run
+        )
+        reminders = cls._remind(now, dry_run)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+            # Snapshots republiés (les workers sans Redis les rechargent à expiration du cache local)
+            from app.services.enforcement_service import EnforcementService
+
+            for tenant_id in {tenant_id for _, tenant_id in expired_trials + expired_periods}:
+                EnforcementService.publish(tenant_id)
+
+        result = {
+            'expired_trials': len(expired_trials),
+            'expired_periods': len(expired_periods),
+            'reminders': reminders
+        }
+        logger.info(f"Sweep abonnements{' (dry run)' if dry_run else ''}: {result}")
+        return result
+
+    @classmethod
+    def _expire(cls, *criteria, from_status: str, reason: str, ends_at, now: datetime, dry_run: bool) -> list:
+        """
+        Passe les abonnements correspondants en 'expired'
+
+        Returns:
+            [(subscription_id, tenant_id)]
+        """
+        rows = db.session.query(Subscription.id, Subscription.tenant_id, ends_at.label('ends_at')).filter(
+            *criteria
+        ).with_for_update(skip_locked=True).all()
+        if dry_run or not rows:
+            return [(row.id, row.tenant_id) for row in rows]
+
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            db.session.execute(
+                db.update(Subscription)
+                .where(Subscription.id.in_([row.id for row in batch]), Subscription.status == from_status)
+                .values(status='expired', updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(db.insert(SubscriptionLog), [{
+                'subscription_id': row.id,
+                'tenant_id': row.tenant_id,
+                'action': ACTION_EXPIRED,
+                'details': {
+                    'from': from_status,
+                    'reason': reason,
+                    'ended_at': row.ends_at.isoformat() if row.ends_at else None
+                },
+                'created_at': now
+            } for row in batch])
+
+        return [(row.id, row.tenant_id) for row in rows]
+
+    @classmethod
+    def _remind(cls, now: datetime, dry_run: bool) -> int:
+        """Rappels de renouvellement (un par échéance et par seuil)"""
+        thresholds = sorted(current_app.config.get('SUBSCRIPTION_REMINDER_DAYS') or [])
+        if not thresholds:
+            return 0
+        horizon = now + timedelta(days=thresholds[-1])
+
+        ends_at = case(
+            (Subscription.status == 'trial', Subscription.trial_ends_at),
+            else_=Subscription.current_period_end
+        )
+        rows = db.session.query(
+            Subscription.id, Subscription.tenant_id, Subscription.status, ends_at.label('ends_at')
+        ).filter(
+            Subscription.status.in_(['trial', 'active']),
+            ends_at > now,
+            ends_at <= horizon
+        ).all()
+        if not rows:
+            return 0
+
+        # Rappels déjà envoyés pour ces échéances (une requête)
+        sent = set()
+        for log in db.session.query(SubscriptionLog.subscription_id, SubscriptionLog.details).filter(
+            SubscriptionLog.action == ACTION_REMINDER,
+            SubscriptionLog.subscription_id.in_([row.id for row in rows]),
+            SubscriptionLog.created_at >= now - timedelta(days=thresholds[-1] + 1)
+        ):
+            details = log.details or {}
+            sent.add((log.subscription_id, details.get('ends_at'), details.get('days')))
+
+        due = []
+        for row in rows:
+            days_left = math.ceil((row.ends_at - now).total_seconds() / 86400)
+            threshold = next(d for d in thresholds if days_left <= d)
+            if (row.id, row.ends_at.isoformat(), threshold) not in sent:
+                due.append((row, days_left, threshold))
+        if dry_run or not due:
+            return len(due)
+
+        admins = {}
+        for user_id, tenant_id in db.session.query(User.id, User.tenant_id).filter(
+            User.tenant_id.in_({row.tenant_id for row, _, _ in due}),
+            User.role == 'admin',
+            User.is_active.is_(True)
+        ):
+            admins.setdefault(tenant_id, []).append(user_id)
+
+        for row, days_left, threshold in due:
+            label = "La période d'essai" if row.status == 'trial' else "L'abonnement"
+            for user_id in admins.get(row.tenant_id, []):
+                db.session.add(Notification(
+                    user_id=user_id,
+                    title='Renouvellement de l\'abonnement',
+                    message=f"{label} se termine dans {days_left} jour(s), "
+                            f"le {row.ends_at.strftime('%d/%m/%Y')}. Pensez à renouveler.",
+                    type='system',
+                    data={'subscription_id': row.id, 'ends_at': row.ends_at.isoformat()}
+                ))
+                UnreadCounter.adjust(UnreadCounter.SCOPE_NOTIFICATIONS, user_id, 1)
+            db.session.add(SubscriptionLog(
+                subscription_id=row.id,
+                tenant_id=row.tenant_id,
+                action=ACTION_REMINDER,
+                details={'ends_at': row.ends_at.isoformat(), 'days': threshold, 'notified': len(admins.get(row.tenant_id, []))},
+                created_at=now
+            ))
+
+        return len(due)
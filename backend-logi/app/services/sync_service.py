@@ -1,113 +1,134 @@
-from datetime import datetime
+"""
+Service Sync - Synchronisation différentielle pour l'app mobile
+==============================================================
+
+Le client envoie le curseur reçu lors de la synchronisation précédente et ne
+reçoit que ce qui a changé depuis: colis, historique, notifications,
+paiements et suppressions (tombstones).
+
+Le curseur est opaque pour le client. Il contient, pour chaque type
+d'entité, la dernière position (updated_at, id) déjà transmise; chaque
+requête est une lecture par clé (keyset) sur les index (owner, updated_at).
+Il ne recule jamais.
+
+Les lignes modifiées pendant les dernières secondes (SYNC_SETTLE_SECONDS)
+sont renvoyées une seconde fois, pour ne pas manquer une transaction
+commitée avec un updated_at légèrement antérieur. Le client applique les
+changements de façon idempotente (upsert par id).
+"""
+
 from app import db
-from app.models.shopproduct import Product
-from app.models.invoice import Invoice
-from app.models.customer import Customer
-from app.models.sync import SyncQueue
+from app.models import Package, PackageHistory, Notification, Payment, SyncTombstone
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursor
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
 import logging
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 500
+DEFAULT_SETTLE_SECONDS = 5
+
+
 class SyncService:
-    """Service to handle synchronization logic."""
-    
-    @staticmethod
-    def handle_push(payload, store_id, user_id):
-        """
-        Handle incoming push data from offline clients.
-        
-        Args:
-            payload (dict): The data payload containing entity_type, operation, data, etc.
-            store_id (str): The store ID.
-            user_id (str): The user ID processing the request.
-            
-        Returns:
-            dict: Result of the operation.
-        """
-        entity_type = payload.get('entity_type')
-        operation = payload.get('operation')
-        data = payload.get('data')
-        entity_id = payload.get('entity_id')
-        
-        if not all([entity_type, operation, data]):
-            return {'success': False, 'error': 'Missing required fields'}
-
-        try:
-            # Route to appropriate handler
-            if entity_type == 'invoice':
-                SyncService._sync_invoice(operation, data, store_id)
-            elif entity_type == 'product':
-                SyncService._sync_product(operation, data, store_id)
-            elif entity_type == 'customer':
-                SyncService._sync_customer(operation, data, store_id)
-            # Add other entities as needed
-            
-            # Log the successful sync to SyncQueue history (optional but good for audit)
-            # or just return success
-            return {'success': True}
-
-        except Exception as e:
-            logging.error(f"Sync error for {entity_type} {entity_id}: {str(e)}")
-            return {'success': False, 'error': str(e)}
+    """Lecture des changements d'un utilisateur depuis un curseur"""
+
+    # entité -> (modèle, colonne de version)
+    ENTITIES = (
+        ('packages', Package, Package.updated_at),
+        ('history', PackageHistory, PackageHistory.created_at),
+        ('notifications', Notification, Notification.updated_at),
+        ('payments', Payment, Payment.updated_at),
+        ('tombstones', SyncTombstone, SyncTombstone.deleted_at),
+    )
 
     @staticmethod
-    def handle_pull(store_id, last_sync=None):
+    def _scope(name: str, query, tenant_id: str, user_id: str):
+        """Restreint la requête aux données visibles par l'utilisateur"""
+        if name == 'packages':
+            return query.filter(Package.tenant_id == tenant_id, Package.client_id == user_id)
+        if name == 'history':
+            return query.join(Package, Package.id == PackageHistory.package_id).filter(
+                Package.tenant_id == tenant_id,
+                Package.client_id == user_id
+            )
+        if name == 'notifications':
+            return query.filter(Notification.user_id == user_id)
+        if name == 'payments':
+            return query.filter(Payment.tenant_id == tenant_id, Payment.client_id == user_id)
+        return query.filter(SyncTombstone.user_id == user_id)
+
+    @classmethod
+    def get_changes(cls, tenant_id: str, user_id: str, cursor: str = None,
+                    limit: int = DEFAULT_LIMIT, settle_seconds: int = DEFAULT_SETTLE_SECONDS) -> dict:
         """
-        Retrieve latest state for the store.
-        
+        Changements depuis le curseur (synchronisation complète si absent).
+
         Args:
-            store_id (str): The store ID.
-            last_sync (datetime, optional): Timestamp of last sync.
-        
+            tenant_id: ID du tenant
+            user_id: ID de l'utilisateur
+            cursor: Curseur de la synchronisation précédente
+            limit: Nombre max de lignes par type d'entité
+            settle_seconds: Fenêtre renvoyée à nouveau pour les commits tardifs
+
+        Raises:
+            InvalidCursor: si le curseur est illisible
+
         Returns:
-            dict: Dictionary of all relevant entities.
+            dict: changes, tombstones, cursor, has_more, server_time
         """
-        # For V1, we return full state for critical entities.
-        # Optimizations: Implement filtering by updated_at > last_sync
-        
-        products = Product.query.filter_by(store_id=store_id).all()
-        # Invoices might be too heavy to send all, maybe only recent ones or unsynced ones?
-        # Usually for offline mode, you want the product catalog and maybe customers.
-        # Invoices are often "write-only" from the offline client perspective (history),
-        # but if we want two-way sync, we need them.
-        # For now, let's send Products and Customers.
-        
-        customers = Customer.query.filter_by(store_id=store_id).all()
-        
-        return {
-            'products': [p.to_dict() for p in products],
-            'customers': [c.to_dict() for c in customers],
-            'server_time': datetime.utcnow().isoformat()
-        }
+        marks = decode_cursor(cursor)
+        limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
 
-    @staticmethod
-    def _sync_invoice(operation, data, store_id):
-        if operation == 'create':
-            # Check if exists to avoid duplicates
-            existing = Invoice.query.filter_by(invoice_number=data.get('invoice_number'), store_id=store_id).first()
-            if existing:
-                return # Idempotency
-            
-            new_invoice = Invoice(
-                store_id=store_id,
-                # Map other fields from data
-                invoice_number=data.get('invoice_number'),
-                total_amount=data.get('total_amount'),
-                payment_method=data.get('payment_method'),
-                status='paid', # Assume paid if offline sale completed
-                created_at=datetime.fromisoformat(data.get('created_at').replace('Z', '+00:00')) if data.get('created_at') else datetime.utcnow()
-            )
-            # Handle items... this requires more complex logic to create InvoiceItem
-            # For this MVP step, we assume the Invoice model can handle a dict or we parse it manually
-            # detailed implementation depends on Invoice model structure
-            
-            db.session.add(new_invoice)
-            db.session.commit()
+        now = datetime.utcnow()
+        settled = (now - timedelta(seconds=settle_seconds), '')
 
-    @staticmethod
-    def _sync_product(operation, data, store_id):
-        # Product sync logic (mainly updating stock or creating new products)
-        pass
+        results = {}
+        new_marks = {}
+        has_more = False
 
-    @staticmethod
-    def _sync_customer(operation, data, store_id):
-        # Customer sync logic
-        pass
+        for name, model, version_col in cls.ENTITIES:
+            query = cls._scope(name, model.query, tenant_id, user_id)
+
+            mark = marks.get(name)
+            if mark:
+                ts, row_id = mark
+                query = query.filter(or_(
+                    version_col > ts,
+                    and_(version_col == ts, model.id > row_id)
+                ))
+
+            rows = query.order_by(version_col, model.id).limit(limit + 1).all()
+            truncated = len(rows) > limit
+            rows = rows[:limit]
+            results[name] = rows
+
+            last = None
+            if rows and getattr(rows[-1], version_col.key) is not None:
+                last = (getattr(rows[-1], version_col.key), rows[-1].id)
+
+            if truncated:
+                # Page suivante: reprendre exactement après la dernière ligne
+                has_more = True
+                new_mark = last or mark
+            else:
+                new_mark = min(last, settled) if last else settled
+
+            if mark and (new_mark is None or new_mark < mark):
+                new_mark = mark
+            if new_mark:
+                new_marks[name] = new_mark
+
+        return {
+            'changes': {
+                'packages': [p.to_dict() for p in results['packages']],
+                'history': [h.to_dict() for h in results['history']],
+                'notifications': [n.to_dict() for n in results['notifications']],
+                'payments': [p.to_dict() for p in results['payments']],
+            },
+            'tombstones': [t.to_dict() for t in results['tombstones']],
+            'cursor': encode_cursor(new_marks),
+            'has_more': has_more,
+            'server_time': now.isoformat()
+        }
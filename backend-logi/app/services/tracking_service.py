@@ -17,6 +17,7 @@ import requests
 from typing import Optional, List
 from dataclasses import dataclass
 from datetime import datetime
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -415,7 +416,10 @@ class TrackingService:
                 error='Tracking service not configured'
             )
         
-        return self.provider.track(tracking_number, carrier)
+        return observe_provider(
+            'tracking', self.config.get('provider', '17track'), 'track',
+            self.provider.track, tracking_number, carrier
+        )
     
     def update_package_from_tracking(self, package_id: str) -> bool:
         """
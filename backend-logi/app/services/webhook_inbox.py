@@ -0,0 +1,463 @@
+"""
+Boîte de réception des webhooks transporteurs
+=============================================
+
+Les routes de `app/routes/webhooks.py` ne font plus que:
+1. vérifier la signature (webhook_auth_required)
+2. persister le payload brut dans `webhook_events` (hash SHA-256 -> dédupe)
+3. répondre 202
+
+Le traitement (départ / colis, historique, notifications) est fait par un
+pool de workers en arrière-plan. Chaque événement de tracking est routé vers
+un worker selon (tenant, tracking): les mises à jour d'un même tracking sont
+donc appliquées dans l'ordre de réception, sans sérialiser tout le flux.
+
+Un événement est réclamé (UPDATE conditionnel queued -> processing) avant
+d'être planifié: un seul processus le traite, même si plusieurs workers
+gunicorn lancent la récupération en même temps.
+
+Récupération (recover, par recover_webhooks.py en cron et dans un thread
+lancé au démarrage du pool, jamais dans la requête): événements 'queued' jamais réclamés, et 'processing' depuis plus de
+WEBHOOK_RECOVER_AFTER_SECONDS (processus arrêté en cours de traitement).
+Après WEBHOOK_MAX_ATTEMPTS réclamations, l'événement passe en 'dead'.
+
+Configuration:
+- WEBHOOK_INBOX_ASYNC : False pour traiter dans la requête (tests)
+- WEBHOOK_WORKERS     : nombre de workers (défaut 2)
+- WEBHOOK_RECOVER_AFTER_SECONDS : délai après lequel un événement
+  'processing' est considéré abandonné
+- WEBHOOK_MAX_ATTEMPTS : réclamations max avant 'dead' (défaut 5)
+"""
+
+from app import db
+from app.models import WebhookEvent
+from app.utils.metrics import queue_depth
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import json
+import logging
+import queue
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+# Événement de tracking normalisé, extrait d'un payload fournisseur
+TrackingUpdate = namedtuple('TrackingUpdate', ['tracking', 'status', 'location', 'notes', 'external_data'])
+
+
+# ==================== PARSERS ====================
+
+def parse_generic(data: dict) -> list:
+    tracking = data.get('tracking_number')
+    status = data.get('status')
+    if not tracking or not status:
+        return []
+    return [TrackingUpdate(tracking, status, data.get('location'), data.get('notes'), data)]
+
+
+def parse_17track(data: dict) -> list:
+    # Mapper les codes 17Track
+    status_map = {
+        'NotFound': 'pending',
+        'InfoReceived': 'pending',
+        'InTransit': 'in_transit',
+        'OutForDelivery': 'out_for_delivery',
+        'Delivered': 'delivered',
+        'Exception': 'exception',
+    }
+
+    updates = []
+    # 17Track envoie un tableau d'événements
+    for event in data.get('data', []) or []:
+        tracking = event.get('number')
+        track_info = event.get('track', {}) or {}
+        if not tracking:
+            continue
+
+        # Dernier événement
+        checkpoints = track_info.get('z', [])
+        if not checkpoints:
+            continue
+        latest = checkpoints[0]
+        updates.append(TrackingUpdate(
+            tracking,
+            status_map.get(latest.get('c', ''), 'in_transit'),
+            latest.get('z', ''),
+            latest.get('a', ''),
+            event
+        ))
+    return updates
+
+
+def parse_aftership(data: dict) -> list:
+    msg = data.get('msg', {}) or {}
+    tracking = msg.get('tracking_number')
+    if not tracking:
+        return []
+
+    # Mapper les tags AfterShip
+    status_map = {
+        'Pending': 'pending',
+        'InfoReceived': 'pending',
+        'InTransit': 'in_transit',
+        'OutForDelivery': 'out_for_delivery',
+        'AttemptFail': 'exception',
+        'Delivered': 'delivered',
+        'AvailableForPickup': 'arrived_port',
+        'Exception': 'exception',
+        'Expired': 'exception',
+    }
+
+    # Dernière localisation
+    checkpoints = msg.get('checkpoints', [])
+    location = checkpoints[0].get('location') if checkpoints else None
+    notes = checkpoints[0].get('message') if checkpoints else None
+
+    return [TrackingUpdate(tracking, status_map.get(msg.get('tag', ''), 'in_transit'), location, notes, data)]
+
+
+def parse_dhl(data: dict) -> list:
+    # Mapper les codes DHL
+    status_map = {
+        'pre-transit': 'pending',
+        'transit': 'in_transit',
+        'delivered': 'delivered',
+        'failure': 'exception',
+    }
+
+    updates = []
+    for shipment in data.get('shipments', [data]) or []:  # Peut être un tableau ou un objet
+        tracking = shipment.get('id') or shipment.get('trackingNumber')
+        if not tracking:
+            continue
+
+        events = shipment.get('events', [])
+        if not events:
+            continue
+        latest = events[0]
+        updates.append(TrackingUpdate(
+            tracking,
+            status_map.get((latest.get('statusCode', '') or '').lower(), 'in_transit'),
+            latest.get('location', {}).get('address', {}).get('addressLocality', ''),
+            latest.get('description', ''),
+            shipment
+        ))
+    return updates
+
+
+PARSERS = {
+    'generic': parse_generic,
+    '17track': parse_17track,
+    'aftership': parse_aftership,
+    'dhl': parse_dhl,
+}
+
+
+def parse_payload(provider: str, payload: str) -> list:
+    """Payload brut -> liste de TrackingUpdate (ValueError si JSON invalide)"""
+    data = json.loads(payload)
+    if not isinstance(data, dict):
+        raise ValueError('JSON object expected')
+    return PARSERS[provider](data)
+
+
+# ==================== POOL DE WORKERS ====================
+
+class _EventRun:
+    """Suivi d'un traitement d'événement réparti sur plusieurs workers"""
+
+    def __init__(self, event_id: str, tenant_id: str, total: int):
+        self.event_id = event_id
+        self.tenant_id = tenant_id
+        self.remaining = total
+        self.lock = threading.Lock()
+        self.summary = {'updates': total, 'matched': 0, 'updated_packages': 0, 'notified_clients': 0}
+        self.errors = []
+
+    def record(self, update: TrackingUpdate, result: dict = None, error: str = None) -> bool:
+        """Enregistre le résultat d'une mise à jour, True si c'était la dernière"""
+        with self.lock:
+            if error:
+                self.errors.append(f"{update.tracking}: {error}")
+            elif result and result.get('success'):
+                self.summary['matched'] += 1
+                self.summary['updated_packages'] += result.get('updated_packages', 0)
+                self.summary['notified_clients'] += result.get('notified_clients', 0)
+            self.remaining -= 1
+            return self.remaining == 0
+
+
+class WebhookWorkerPool:
+    """
+    Workers à file dédiée: une clé de routage donnée va toujours au même
+    worker, qui traite sa file dans l'ordre (FIFO).
+    """
+
+    def __init__(self, app, size: int = 2):
+        self.app = app
+        self.queues = [queue.Queue() for _ in range(max(1, size))]
+        for i, q in enumerate(self.queues):
+            threading.Thread(
+                target=self._run, args=(q,), name=f'webhook-worker-{i}', daemon=True
+            ).start()
+
+    def submit(self, key: str, job):
+        self.queues[zlib.crc32(key.encode()) % len(self.queues)].put(job)
+        queue_depth('webhooks', 1)
+
+    def _run(self, q):
+        while True:
+            job = q.get()
+            try:
+                with self.app.app_context():
+                    job()
+            except Exception as e:
+                logger.exception(f"Webhook worker error: {e}")
+            finally:
+                queue_depth('webhooks', -1)
+                q.task_done()
+
+    def join(self):
+        """Attend que toutes les files soient vides"""
+        for q in self.queues:
+            q.join()
+
+
+# ==================== INBOX ====================
+
+class WebhookInbox:
+    """Réception, traitement et rejeu des webhooks transporteurs"""
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def ingest(cls, tenant_id: str, provider: str, raw: bytes) -> tuple:
+        """
+        Persiste un webhook (signature déjà vérifiée) et planifie son traitement.
+
+        Raises:
+            ValueError: si le payload n'est pas un objet JSON
+
+        Returns:
+            (WebhookEvent, duplicate: bool)
+        """
+        payload = (raw or b'').decode('utf-8', errors='replace')
+        updates = parse_payload(provider, payload)
+
+        content_hash = WebhookEvent.hash_payload(raw)
+        event = WebhookEvent(
+            tenant_id=tenant_id,
+            provider=provider,
+            payload=payload,
+            content_hash=content_hash,
+            status=WebhookEvent.STATUS_QUEUED if updates else WebhookEvent.STATUS_IGNORED
+        )
+        db.session.add(event)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Renvoi du fournisseur: déjà reçu
+            db.session.rollback()
+            existing = WebhookEvent.query.filter_by(
+                tenant_id=tenant_id, provider=provider, content_hash=content_hash
+            ).first()
+            return existing, True
+
+        if updates:
+            cls.dispatch(event.id, tenant_id, updates)
+        return event, False
+
+    @classmethod
+    def replay(cls, event: WebhookEvent) -> int:
+        """
+        Retraite un événement stocké (sauf s'il est en cours de traitement).
+
+        Returns:
+            int: nombre de mises à jour planifiées
+        """
+        if event.status == WebhookEvent.STATUS_PROCESSING:
+            return 0
+        updates = parse_payload(event.provider, event.payload)
+        event.status = WebhookEvent.STATUS_QUEUED if updates else WebhookEvent.STATUS_IGNORED
+        event.error = None
+        db.session.commit()
+
+        if updates:
+            cls.dispatch(event.id, event.tenant_id, updates)
+        return len(updates)
+
+    @classmethod
+    def dispatch(cls, event_id: str, tenant_id: str, updates: list) -> bool:
+        """
+        Réclame l'événement puis répartit ses mises à jour sur les workers
+        (ou les traite immédiatement)
+
+        Returns:
+            False si l'événement a déjà été réclamé par un autre processus
+        """
+        if not cls.claim(event_id):
+            return False
+
+        run = _EventRun(event_id, tenant_id, len(updates))
+
+        if not current_app.config.get('WEBHOOK_INBOX_ASYNC', True):
+            for update in updates:
+                cls._process(run, update)
+            return True
+
+        pool = cls.get_pool(current_app._get_current_object())
+        for update in updates:
+            pool.submit(f"{tenant_id}:{update.tracking}", lambda u=update: cls._process(run, u))
+        return True
+
+    @staticmethod
+    def claim(event_id: str, now: datetime = None) -> bool:
+        """
+        Passe l'événement de 'queued' à 'processing' (UPDATE conditionnel)
+
+        Returns:
+            True si ce processus l'a réclamé (rowcount == 1)
+        """
+        result = db.session.execute(
+            db.update(WebhookEvent)
+            .where(WebhookEvent.id == event_id, WebhookEvent.status == WebhookEvent.STATUS_QUEUED)
+            .values(
+                status=WebhookEvent.STATUS_PROCESSING,
+                claimed_at=now or datetime.utcnow(),
+                attempts=db.func.coalesce(WebhookEvent.attempts, 0) + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def get_pool(cls, app) -> WebhookWorkerPool:
+        """Pool du processus, démarré à la première utilisation"""
+        if cls._pool is not None:
+            return cls._pool
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = WebhookWorkerPool(app, app.config.get('WEBHOOK_WORKERS', 2))
+                logger.info(f"Webhook worker pool started ({len(cls._pool.queues)} workers)")
+                # Reprise hors du chemin de la requête qui a démarré le pool
+                threading.Thread(
+                    target=cls._recover_in_background, args=(app,), name='webhook-recover', daemon=True
+                ).start()
+        return cls._pool
+
+    @classmethod
+    def _recover_in_background(cls, app):
+        try:
+            with app.app_context():
+                result = cls.recover()
+            logger.info(f"Webhook recovery: {result['recovered']} recovered, {result['dead']} dead")
+        except Exception as e:
+            logger.exception(f"Webhook recovery error: {e}")
+
+    @classmethod
+    def recover(cls, now: datetime = None) -> dict:
+        """
+        Reprend les événements abandonnés (idempotent: chaque événement est
+        réclamé avant d'être relancé, un seul processus le traite)
+
+        Returns:
+            dict {'recovered', 'dead'}
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=current_app.config.get('WEBHOOK_RECOVER_AFTER_SECONDS', 300))
+        max_attempts = current_app.config.get('WEBHOOK_MAX_ATTEMPTS', 5)
+        abandoned = (
+            WebhookEvent.status == WebhookEvent.STATUS_PROCESSING,
+            WebhookEvent.claimed_at < cutoff
+        )
+
+        # Traitements interrompus: trop de reprises -> dead, sinon retour dans la file
+        dead = db.session.execute(
+            db.update(WebhookEvent)
+            .where(*abandoned, db.func.coalesce(WebhookEvent.attempts, 0) >= max_attempts)
+            .values(
+                status=WebhookEvent.STATUS_DEAD,
+                error=f'Abandonné après {max_attempts} tentative(s)',
+                processed_at=now
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.execute(
+            db.update(WebhookEvent)
+            .where(*abandoned)
+            .values(status=WebhookEvent.STATUS_QUEUED)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        pending = db.session.query(
+            WebhookEvent.id, WebhookEvent.tenant_id, WebhookEvent.provider, WebhookEvent.payload
+        ).filter(
+            WebhookEvent.status == WebhookEvent.STATUS_QUEUED
+        ).order_by(WebhookEvent.received_at).all()
+
+        recovered = 0
+        for event in pending:
+            try:
+                updates = parse_payload(event.provider, event.payload)
+            except ValueError:
+                updates = []
+            if not updates:
+                db.session.execute(
+                    db.update(WebhookEvent)
+                    .where(WebhookEvent.id == event.id, WebhookEvent.status == WebhookEvent.STATUS_QUEUED)
+                    .values(status=WebhookEvent.STATUS_IGNORED, processed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                continue
+            if cls.dispatch(event.id, event.tenant_id, updates):
+                recovered += 1
+
+        if recovered or dead:
+            logger.info(f"Webhook inbox: {recovered} événement(s) repris, {dead} abandonné(s)")
+        return {'recovered': recovered, 'dead': dead}
+
+    @classmethod
+    def _process(cls, run: _EventRun, update: TrackingUpdate):
+        """Applique une mise à jour de tracking (dans un worker ou la requête)"""
+        from app.routes.webhooks import update_package_status
+
+        result = None
+        error = None
+        try:
+            result = update_package_status(
+                tenant_id=run.tenant_id,
+                tracking_number=update.tracking,
+                new_status=update.status,
+                location=update.location,
+                notes=update.notes,
+                external_data=update.external_data
+            )
+        except Exception as e:
+            db.session.rollback()
+            error = str(e)
+            logger.error(f"Webhook event {run.event_id} ({update.tracking}): {e}")
+
+        if error is None and result and result.get('error'):
+            error = result['error']
+
+        if run.record(update, result, error):
+            cls._finalize(run)
+
+    @staticmethod
+    def _finalize(run: _EventRun):
+        event = db.session.get(WebhookEvent, run.event_id)
+        if not event:
+            return
+        event.status = WebhookEvent.STATUS_FAILED if run.errors else WebhookEvent.STATUS_PROCESSED
+        event.error = '\n'.join(run.errors)[:2000] if run.errors else None
+        event.result = run.summary
+        event.processed_at = datetime.utcnow()
+        db.session.commit()
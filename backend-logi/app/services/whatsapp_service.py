@@ -4,8 +4,8 @@ Providers supportés: Twilio, Meta (WhatsApp Business API), WATI
 """
 
 import logging
-import requests
 from abc import ABC, abstractmethod
+from app.utils.metrics import observe_provider
 
 logger = logging.getLogger(__name__)
 
@@ -172,6 +172,7 @@ class MetaWhatsAppProvider(WhatsAppProvider):
                 }
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(url, headers=headers, json=payload)
             data = response.json()
             
@@ -247,6 +248,7 @@ class MetaWhatsAppProvider(WhatsAppProvider):
             if components:
                 payload['template']['components'] = components
             
+            import requests  # import différé (démarrage)
             response = requests.post(url, headers=headers, json=payload)
             data = response.json()
             
@@ -321,6 +323,7 @@ class WATIWhatsAppProvider(WhatsAppProvider):
                 'messageText': message
             }
             
+            import requests  # import différé (démarrage)
             response = requests.post(url, headers=headers, json=payload)
             data = response.json()
             
@@ -371,6 +374,7 @@ class WATIWhatsAppProvider(WhatsAppProvider):
             if parameters:
                 payload['parameters'] = [{'name': f'param{i+1}', 'value': str(p)} for i, p in enumerate(parameters)]
             
+            import requests  # import différé (démarrage)
             response = requests.post(url, headers=headers, json=payload)
             data = response.json()
             
@@ -441,8 +445,11 @@ class WhatsAppService:
     
     def send_message(self, to: str, message: str) -> dict:
         """Envoie un message texte"""
-        return self.provider.send_message(to, message)
+        return observe_provider('whatsapp', self.provider_name, 'send_message', self.provider.send_message, to, message)
     
     def send_template(self, to: str, template_name: str, parameters: list = None, language: str = 'fr') -> dict:
         """Envoie un message template"""
-        return self.provider.send_template(to, template_name, parameters, language)
+        return observe_provider(
+            'whatsapp', self.provider_name, 'send_template',
+            self.provider.send_template, to, template_name, parameters, language
+        )
@@ -3,40 +3,78 @@ Audit Logging - Traçabilité des actions sensibles
 =================================================
 
 Enregistre les actions importantes pour la sécurité et la conformité.
+
+Écriture asynchrone:
+- audit_log() ne fait que construire la ligne et la déposer dans un buffer
+  borné en mémoire (AUDIT_BUFFER_SIZE); il ne touche pas à db.session et ne
+  commite donc pas l'état en cours de l'appelant
+- un thread d'écriture vide le buffer par lots (AUDIT_BATCH_SIZE, au plus
+  toutes les AUDIT_FLUSH_INTERVAL secondes) avec un INSERT multi-lignes par
+  partition mensuelle, sur sa propre connexion
+- buffer plein: l'entrée est écrite dans audit.log mais pas en base
+  (compteur `dropped`, avertissement)
+- le buffer est vidé à l'arrêt du processus (atexit)
+- le fichier audit.log est écrit via QueueHandler / QueueListener
+- AUDIT_ASYNC=false: insertion immédiate (tests)
 """
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
 from datetime import datetime
-from flask import request, g
+from flask import request, g, current_app
 from app import db
+from app.utils.metrics import queue_depth
 import json
 
 logger = logging.getLogger('audit')
 
 # Configurer un handler séparé pour les logs d'audit
-if not any(
-    isinstance(h, logging.FileHandler) and getattr(h, 'baseFilename', '').endswith('audit.log')
-    for h in logger.handlers
-):
+# (écriture disque dans le thread du QueueListener, pas dans la requête)
+if not any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers):
     audit_handler = logging.FileHandler('audit.log')
     audit_handler.setLevel(logging.INFO)
     audit_handler.setFormatter(logging.Formatter(
         '%(asctime)s - AUDIT - %(message)s'
     ))
-    logger.addHandler(audit_handler)
+    _log_queue = queue.Queue(-1)
+    _log_listener = logging.handlers.QueueListener(_log_queue, audit_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
 
 logger.setLevel(logging.INFO)
 logger.propagate = False
 
 
 class AuditLog(db.Model):
-    """Modèle pour stocker les logs d'audit en base"""
+    """
+    Modèle pour stocker les logs d'audit en base
+
+    Partitionné par mois (voir app/services/audit_service.py):
+    - PostgreSQL: table partitionnée (PARTITION BY RANGE timestamp), une
+      partition audit_logs_YYYY_MM par mois; la clé primaire inclut donc
+      le timestamp
+    - SQLite: une table audit_logs_YYYY_MM par mois, audit_logs reste vide
+    Les écritures passent par AuditPartitions.insert, jamais par la session.
+    """
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('idx_audit_tenant_timestamp', 'tenant_id', 'timestamp'),
+        db.Index('idx_audit_tenant_action_timestamp', 'tenant_id', 'action', 'timestamp'),
+        db.Index('idx_audit_user_timestamp', 'user_id', 'timestamp'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    tenant_id = db.Column(db.String(36), index=True)
-    user_id = db.Column(db.String(36), index=True)
+    # Séquence explicite: clé primaire composite (ignorée par SQLite)
+    id = db.Column(db.Integer, db.Sequence('audit_logs_id_seq'), primary_key=True)
+    timestamp = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
+    tenant_id = db.Column(db.String(36))
+    user_id = db.Column(db.String(36))
     user_email = db.Column(db.String(120))
     action = db.Column(db.String(50), nullable=False, index=True)
     resource_type = db.Column(db.String(50))
@@ -46,20 +84,25 @@ class AuditLog(db.Model):
     user_agent = db.Column(db.String(500))
     status = db.Column(db.String(20), default='success')  # success, failure, warning
     
-    def to_dict(self):
+    @staticmethod
+    def row_to_dict(row):
+        """Sérialise une instance ou une ligne brute (partition SQLite, recherche)"""
         return {
-            'id': self.id,
-            'timestamp': self.timestamp.isoformat(),
-            'tenant_id': self.tenant_id,
-            'user_id': self.user_id,
-            'user_email': self.user_email,
-            'action': self.action,
-            'resource_type': self.resource_type,
-            'resource_id': self.resource_id,
-            'details': json.loads(self.details) if self.details else None,
-            'ip_address': self.ip_address,
-            'status': self.status
+            'id': row.id,
+            'timestamp': row.timestamp.isoformat(),
+            'tenant_id': row.tenant_id,
+            'user_id': row.user_id,
+            'user_email': row.user_email,
+            'action': row.action,
+            'resource_type': row.resource_type,
+            'resource_id': row.resource_id,
+            'details': json.loads(row.details) if row.details else None,
+            'ip_address': row.ip_address,
+            'status': row.status
         }
+    
+    def to_dict(self):
+        return AuditLog.row_to_dict(self)
 
 
 # Actions auditées
@@ -84,6 +127,7 @@ class AuditAction:
     PACKAGE_DELETE = 'package_delete'
     PACKAGE_STATUS_CHANGE = 'package_status_change'
     PACKAGE_BULK_UPDATE = 'package_bulk_update'
+    PACKAGE_BULK_STATUS_CHANGE = 'package_bulk_status_change'
     
     # Payments
     PAYMENT_CREATE = 'payment_create'
@@ -104,6 +148,119 @@ class AuditAction:
     OTP_FAILED = 'otp_failed'
 
 
+class AuditWriter:
+    """
+    Buffer borné + thread d'écriture par lots vers audit_logs
+
+    Une instance par application (app.extensions['audit_writer']). Le thread
+    est démarré à la première entrée, et redémarré après un fork (workers
+    gunicorn en preload).
+    """
+
+    _SENTINEL = object()
+
+    def __init__(self, app, buffer_size: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        self.app = app
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max(1, buffer_size))
+        self.dropped = 0
+        self.written = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def enqueue(self, row: dict) -> bool:
+        """Dépose une ligne (non bloquant), False si le buffer est plein"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(row)
+            queue_depth('audit', 1)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logging.warning(f"Audit buffer plein: {self.dropped} entrée(s) non persistée(s)")
+            return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=max(timeout, 0.001)) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._SENTINEL:
+                    stop = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self.write(batch)
+            if stop:
+                return
+
+    def write(self, rows: list):
+        """INSERT multi-lignes sur une connexion dédiée (hors db.session)"""
+        queue_depth('audit', -len(rows))
+        try:
+            with self.app.app_context():
+                from app.services.audit_service import AuditPartitions
+                AuditPartitions.insert(db.engine, rows)
+            self.written += len(rows)
+        except Exception as e:
+            logging.error(f"Audit log write error ({len(rows)} entrée(s)): {e}")
+
+    def flush(self):
+        """Écrit immédiatement le contenu du buffer (appelant)"""
+        rows = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._SENTINEL:
+                rows.append(item)
+        for i in range(0, len(rows), self.batch_size):
+            self.write(rows[i:i + self.batch_size])
+
+    def stop(self, timeout: float = 5.0):
+        """Arrêt: le thread vide le buffer puis s'arrête"""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self.queue.put(self._SENTINEL, timeout=timeout)
+                thread.join(timeout)
+            except queue.Full:
+                pass
+        self.flush()
+
+
+def init_audit(app):
+    """Attache le writer d'audit à l'application"""
+    app.extensions['audit_writer'] = AuditWriter(
+        app,
+        buffer_size=app.config.get('AUDIT_BUFFER_SIZE', 10000),
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 200),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 1.0)
+    )
+    return app.extensions['audit_writer']
+
+
 def audit_log(
     action: str,
     resource_type: str = None,
@@ -115,7 +272,7 @@ def audit_log(
     tenant_id: str = None
 ):
     """
-    Enregistre une action dans le log d'audit
+    Enregistre une action dans le log d'audit (mise en buffer, voir AuditWriter)
     
     Args:
         action: Type d'action (voir AuditAction)
@@ -140,22 +297,27 @@ def audit_log(
         ip_address = request.remote_addr if request else None
         user_agent = request.headers.get('User-Agent', '')[:500] if request else None
         
-        # Créer l'entrée en base
-        log_entry = AuditLog(
-            tenant_id=tenant_id,
-            user_id=user_id,
-            user_email=user_email,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=json.dumps(details) if details else None,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            status=status
-        )
+        details_json = json.dumps(details) if details else None
+        row = {
+            'timestamp': datetime.utcnow(),
+            'tenant_id': tenant_id,
+            'user_id': user_id,
+            'user_email': user_email,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': str(resource_id) if resource_id is not None else None,
+            'details': details_json,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'status': status
+        }
         
-        db.session.add(log_entry)
-        db.session.commit()
+        writer = current_app.extensions.get('audit_writer')
+        if writer is None or not current_app.config.get('AUDIT_ASYNC', True):
+            from app.services.audit_service import AuditPartitions
+            AuditPartitions.insert(db.engine, [row])
+        else:
+            writer.enqueue(row)
         
         # Logger aussi dans le fichier
         log_message = f"[{status.upper()}] {action}"
@@ -164,8 +326,8 @@ def audit_log(
         if resource_id:
             log_message += f":{resource_id}"
         log_message += f" | user:{user_id} | tenant:{tenant_id} | ip:{ip_address}"
-        if details:
-            log_message += f" | {json.dumps(details)}"
+        if details_json:
+            log_message += f" | {details_json}"
         
         if status == 'failure':
             logger.warning(log_message)
@@ -0,0 +1,59 @@
+"""
+Curseurs de pagination opaques
+==============================
+
+Un curseur encode, pour chaque flux (entité de synchronisation, journal
+d'audit...), la dernière position (horodatage, id) déjà transmise. Il est
+opaque pour le client (JSON compact en base64 url-safe) et versionné.
+"""
+
+from datetime import datetime, timedelta
+import base64
+import json
+
+_EPOCH = datetime(1970, 1, 1)
+
+CURSOR_VERSION = 1
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou d'une version non supportée"""
+    pass
+
+
+def _to_micros(value: datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def encode_cursor(marks: dict) -> str:
+    """{flux: (datetime, id)} -> curseur opaque"""
+    payload = {
+        'v': CURSOR_VERSION,
+        'm': {name: [_to_micros(ts), row_id] for name, (ts, row_id) in marks.items()}
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Curseur opaque -> {flux: (datetime, id)}"""
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload.get('v') != CURSOR_VERSION:
+            raise InvalidCursor('Version de curseur non supportée')
+        return {
+            name: (_from_micros(mark[0]), str(mark[1] or ''))
+            for name, mark in (payload.get('m') or {}).items()
+        }
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor('Curseur invalide')
@@ -0,0 +1,134 @@
+"""
+Routage lecture / écriture vers un réplica
+==========================================
+
+Les endpoints explicitement en lecture seule (statistiques, tableaux de bord,
+comptabilité, exports) sont marqués avec @replica_read. Pendant leur
+exécution, les SELECT de db.session partent vers le bind 'replica'
+(DATABASE_REPLICA_URL); tout le reste reste sur le primaire.
+
+Garde-fous:
+- pas de réplica configuré, ou réplica en erreur récente : primaire
+- écriture dans la session (flush) : toutes les lectures suivantes de la
+  requête vont au primaire (read-your-writes)
+- écriture commitée par le tenant il y a moins de REPLICA_STALENESS_SECONDS :
+  primaire (retard de réplication; mémoire du processus, best effort)
+- erreur de connexion au réplica : la vue est rejouée sur le primaire et le
+  réplica est écarté pendant REPLICA_RETRY_SECONDS
+
+En local: deux fichiers SQLite (DATABASE_URL et DATABASE_REPLICA_URL).
+"""
+
+from functools import wraps
+from flask import g, has_app_context, current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import Select
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+
+_state_lock = threading.Lock()
+_recent_writes = {}       # tenant_id -> instant du dernier commit avec écriture
+_replica_down_until = 0.0
+_hooks_registered = False
+
+
+def route_bind(session, engine, clause):
+    """
+    Choix du moteur pour une instruction (appelé par RoutingSession.get_bind)
+
+    engine: moteur résolu par Flask-SQLAlchemy (primaire ou bind du modèle)
+    """
+    if engine is not session._db.engine or not _replica_allowed(session, clause):
+        return engine
+    replica = session._db.engines.get(REPLICA_BIND)
+    if replica is None:
+        return engine
+    g.db_replica_used = True
+    return replica
+
+
+def _replica_allowed(session, clause) -> bool:
+    if not isinstance(clause, Select) or session._flushing or session.info.get('wrote'):
+        return False
+    if not has_app_context() or not g.get('db_use_replica'):
+        return False
+    return replica_available() and not recently_written(g.get('tenant_id'))
+
+
+def init_db_routing(app):
+    """Enregistre les hooks de session (read-your-writes)"""
+    global _hooks_registered
+    from app import db
+
+    if _hooks_registered:
+        return
+    sa_event.listen(db.session, 'after_flush', _after_flush)
+    sa_event.listen(db.session, 'after_commit', _after_commit)
+    _hooks_registered = True
+
+
+def _after_flush(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info['wrote'] = True
+
+
+def _after_commit(session):
+    if session.info.get('wrote') and has_app_context() and g.get('tenant_id'):
+        with _state_lock:
+            _recent_writes[g.tenant_id] = time.monotonic()
+
+
+def recently_written(tenant_id) -> bool:
+    """True si le tenant a commité une écriture trop récente pour le réplica"""
+    if not tenant_id:
+        return False
+    last = _recent_writes.get(tenant_id)
+    if last is None:
+        return False
+    return time.monotonic() - last < current_app.config.get('REPLICA_STALENESS_SECONDS', 5)
+
+
+def replica_available() -> bool:
+    return time.monotonic() >= _replica_down_until
+
+
+def _mark_replica_down():
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + current_app.config.get('REPLICA_RETRY_SECONDS', 30)
+
+
+def replica_read(fn):
+    """
+    Marque une vue en lecture seule: ses SELECT peuvent aller au réplica.
+    À placer sous les décorateurs d'authentification (qui lisent le primaire).
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from app import db
+
+        if REPLICA_BIND not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+            return fn(*args, **kwargs)
+
+        g.db_use_replica = True
+        g.db_replica_used = False
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError as e:
+            if not g.db_replica_used:
+                raise
+            # Réplica injoignable: on rejoue la lecture sur le primaire
+            logger.warning(f"Réplica indisponible, repli sur le primaire: {e}")
+            _mark_replica_down()
+            db.session.rollback()
+            g.db_use_replica = False
+            return fn(*args, **kwargs)
+        finally:
+            g.db_use_replica = False
+
+    return wrapper
@@ -1,7 +1,7 @@
 from functools import wraps
 from flask import request, jsonify, g
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request, get_jwt
-from app.models import User, Tenant
+from app.models import User
 from app.models.tenant import ALL_CHANNELS, DEFAULT_CHANNELS, channel_matches
 from app import db
 import logging
@@ -349,16 +349,17 @@ def channel_required(allowed_channels: list = None):
             channel = _get_channel_from_request()
             g.app_channel = channel
             
-            # Récupérer le tenant
-            tenant = db.session.get(Tenant, g.tenant_id)
-            if not tenant:
+            # Snapshot des droits du tenant (en cache, voir EnforcementService)
+            from app.services.enforcement_service import EnforcementService
+            snapshot = EnforcementService.get_snapshot(g.tenant_id)
+            if not snapshot:
                 return jsonify({'error': 'Tenant non trouvé'}), 404
             
             # Vérifier si le canal est autorisé pour le tenant
-            if not tenant.is_channel_allowed(channel):
+            if not channel_matches(channel, snapshot['channels']):
                 logger.warning(
                     f"Canal refusé: user {g.user.id} tente d'accéder via '{channel}' "
-                    f"(tenant autorise: {tenant.allowed_channels})"
+                    f"(tenant autorise: {snapshot['channels']})"
                 )
                 return jsonify({
                     'error': 'Canal d\'accès non autorisé',
@@ -401,11 +402,12 @@ def entitlement_required(entitlement: str, min_value=None):
             if request.method == 'OPTIONS':
                 return fn(*args, **kwargs)
             
-            tenant = db.session.get(Tenant, g.tenant_id)
-            if not tenant:
+            from app.services.enforcement_service import EnforcementService
+            snapshot = EnforcementService.get_snapshot(g.tenant_id)
+            if not snapshot:
                 return jsonify({'error': 'Tenant non trouvé'}), 404
             
-            value = tenant.get_entitlement(entitlement)
+            value = snapshot['entitlements'].get(entitlement)
             
             # Vérification selon le type
             if min_value is not None:
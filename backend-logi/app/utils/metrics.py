@@ -0,0 +1,226 @@
+"""
+Métriques Prometheus (GET /metrics)
+===================================
+
+- http_request_duration_seconds / http_requests_total : latence et statuts
+  par blueprint et endpoint
+- db_pool_checkout_seconds, db_pool_connections_in_use, db_pool_capacity,
+  db_pool_checkout_timeouts_total : attente et occupation du pool SQLAlchemy
+  (dimensionnement pool_size / max_overflow)
+- provider_request_duration_seconds / provider_requests_total : appels
+  sortants (sms, whatsapp, email, push, payment, tracking) et taux d'erreur
+- background_queue_depth : files en mémoire (webhooks transporteurs et
+  notifications qu'ils déclenchent, audit)
+- export_duration_seconds : génération des PDF / Excel
+
+Multi-processus (gunicorn): PROMETHEUS_MULTIPROC_DIR doit être défini avant
+le démarrage des workers (voir gunicorn.conf.py); /metrics agrège alors les
+fichiers de tous les workers. Sans prometheus_client, tout est no-op.
+
+Accès: METRICS_TOKEN (Authorization: Bearer ...) si défini; sans jeton,
+/metrics n'est servi que si METRICS_PUBLIC (false en production -> 403).
+"""
+
+from functools import wraps
+from flask import Response, abort, g, request, current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import hmac
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    logger.warning("prometheus_client non installé - pip install prometheus-client")
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'Durée des requêtes HTTP',
+        ['blueprint', 'endpoint', 'method'], buckets=LATENCY_BUCKETS
+    )
+    REQUEST_COUNT = Counter(
+        'http_requests_total', 'Requêtes HTTP par statut',
+        ['blueprint', 'endpoint', 'method', 'status']
+    )
+    DB_POOL_CHECKOUT = Histogram(
+        'db_pool_checkout_seconds', "Attente d'une connexion du pool",
+        ['bind'], buckets=CHECKOUT_BUCKETS
+    )
+    DB_POOL_TIMEOUTS = Counter(
+        'db_pool_checkout_timeouts_total', 'Pool épuisé (pool_timeout atteint)', ['bind']
+    )
+    DB_POOL_IN_USE = Gauge(
+        'db_pool_connections_in_use', 'Connexions empruntées au pool',
+        ['bind'], multiprocess_mode='livesum'
+    )
+    DB_POOL_CAPACITY = Gauge(
+        'db_pool_capacity', 'pool_size + max_overflow', ['bind'], multiprocess_mode='livesum'
+    )
+    PROVIDER_LATENCY = Histogram(
+        'provider_request_duration_seconds', 'Durée des appels aux fournisseurs externes',
+        ['kind', 'provider', 'operation'], buckets=LATENCY_BUCKETS
+    )
+    PROVIDER_REQUESTS = Counter(
+        'provider_requests_total', 'Appels aux fournisseurs externes par résultat',
+        ['kind', 'provider', 'operation', 'outcome']
+    )
+    QUEUE_DEPTH = Gauge(
+        'background_queue_depth', 'Travaux en attente dans les files en mémoire',
+        ['queue'], multiprocess_mode='livesum'
+    )
+    EXPORT_DURATION = Histogram(
+        'export_duration_seconds', 'Génération des exports PDF / Excel',
+        ['export', 'outcome'], buckets=LATENCY_BUCKETS
+    )
+
+
+def init_metrics(app):
+    """Hooks de requête, instrumentation du pool et route /metrics"""
+    if not PROMETHEUS_AVAILABLE or not app.config.get('METRICS_ENABLED', True):
+        return
+
+    from app import db, limiter
+
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            _instrument_engine(engine, key or 'default')
+
+    view = limiter.exempt(_metrics_view)
+    app.add_url_rule('/metrics', 'metrics', view, methods=['GET'])
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    # Routes inconnues regroupées: pas de label par URL (cardinalité)
+    endpoint = request.endpoint or '<unmatched>'
+    blueprint = request.blueprint or ''
+    REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - started)
+    REQUEST_COUNT.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+def _metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(provided.encode(), token.encode()):
+            abort(401)
+    elif not current_app.config.get('METRICS_PUBLIC', True):
+        abort(403)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+# ==================== POOL ====================
+
+def _instrument_engine(engine, bind: str):
+    if getattr(engine, '_metrics_instrumented', False):
+        return
+    engine._metrics_instrumented = True
+
+    pool = engine.pool
+    if hasattr(pool, 'size') and hasattr(pool, '_max_overflow'):
+        DB_POOL_CAPACITY.labels(bind).set(pool.size() + max(pool._max_overflow, 0))
+
+    in_use = DB_POOL_IN_USE.labels(bind)
+    sa_event.listen(engine, 'checkout', lambda *args: in_use.inc())
+    sa_event.listen(engine, 'checkin', lambda *args: in_use.dec())
+
+    # Engine.raw_connection -> pool.connect(): attente de checkout (survit à dispose())
+    raw_connection = engine.raw_connection
+    checkout = DB_POOL_CHECKOUT.labels(bind)
+    timeouts = DB_POOL_TIMEOUTS.labels(bind)
+
+    @wraps(raw_connection)
+    def timed_raw_connection(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        except PoolTimeoutError:
+            timeouts.inc()
+            raise
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+
+# ==================== FOURNISSEURS / FILES / EXPORTS ====================
+
+def _succeeded(result) -> bool:
+    if isinstance(result, dict):
+        return bool(result.get('success', True))
+    return bool(getattr(result, 'success', True))
+
+
+def observe_provider(kind: str, provider: str, operation: str, fn, *args, **kwargs):
+    """
+    Appelle fn en mesurant durée et résultat
+    Erreur = exception ou résultat {'success': False}
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return fn(*args, **kwargs)
+
+    provider = (provider or 'unknown').lower()
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        result = fn(*args, **kwargs)
+        outcome = 'success' if _succeeded(result) else 'error'
+        return result
+    finally:
+        PROVIDER_LATENCY.labels(kind, provider, operation).observe(time.perf_counter() - started)
+        PROVIDER_REQUESTS.labels(kind, provider, operation, outcome).inc()
+
+
+def queue_depth(queue_name: str, delta: int):
+    """Variation de la profondeur d'une file en mémoire"""
+    if PROMETHEUS_AVAILABLE and delta:
+        QUEUE_DEPTH.labels(queue_name).inc(delta)
+
+
+def observed_export(fn):
+    """Décorateur des méthodes generate_* (export = nom sans le préfixe)"""
+    if not PROMETHEUS_AVAILABLE:
+        return fn
+    export = fn.__name__.removeprefix('generate_')
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = fn(*args, **kwargs)
+            outcome = 'success' if _succeeded(result) else 'error'
+            return result
+        finally:
+            EXPORT_DURATION.labels(export, outcome).observe(time.perf_counter() - started)
+
+    return wrapper
@@ -0,0 +1,217 @@
+"""
+Profilage à la demande (échantillonnage statistique)
+====================================================
+
+Activé uniquement avec PROFILER_ENABLED=true: sinon aucun hook n'est
+enregistré (coût nul). Une requête est profilée si:
+
+- elle porte l'en-tête X-Profile: 1 avec un token super-admin ou un token
+  d'impersonation (reproduire l'écran lent d'un tenant)
+- son endpoint figure dans PROFILER_SAMPLE_RATES avec un pourcentage
+  (ex: "admin.get_dashboard_stats=5,sync.get_changes=1")
+
+Un thread échantillonne la pile du thread de la requête toutes les
+PROFILER_INTERVAL_MS ms. Résultat: fichier .folded (format "collapsed
+stacks", une ligne "a;b;c N" par pile, pour flamegraph.pl / speedscope)
+et métadonnées .json dans PROFILER_DIR. Les PROFILER_MAX_FILES plus récents
+sont conservés. Consultation: /api/superadmin/profiles.
+"""
+
+from collections import Counter
+from datetime import datetime
+from flask import g, request, current_app
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+
+class StackSampler:
+    """Échantillonne la pile d'un thread à intervalle fixe"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+
+class ProfileStore:
+    """Profils sur disque: <id>.folded + <id>.json"""
+
+    @staticmethod
+    def directory() -> str:
+        return current_app.config.get('PROFILER_DIR', 'profiles')
+
+    @classmethod
+    def save(cls, stacks: Counter, meta: dict) -> str:
+        directory = cls.directory()
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        meta = dict(meta, id=profile_id, created_at=datetime.utcnow().isoformat())
+
+        with open(os.path.join(directory, f'{profile_id}.folded'), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(meta, f)
+
+        cls.prune(current_app.config.get('PROFILER_MAX_FILES', 200))
+        return profile_id
+
+    @classmethod
+    def list(cls) -> list:
+        """Métadonnées des profils, plus récents d'abord"""
+        directory = cls.directory()
+        if not os.path.isdir(directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    @classmethod
+    def path(cls, profile_id: str):
+        """Chemin du .folded, None si l'id est invalide ou absent"""
+        if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+            return None
+        path = os.path.join(cls.directory(), f'{profile_id}.folded')
+        return path if os.path.isfile(path) else None
+
+    @classmethod
+    def delete(cls, profile_id: str) -> bool:
+        path = cls.path(profile_id)
+        if not path:
+            return False
+        for ext in ('.folded', '.json'):
+            try:
+                os.remove(path[:-len('.folded')] + ext)
+            except OSError:
+                pass
+        return True
+
+    @classmethod
+    def prune(cls, keep: int):
+        directory = cls.directory()
+        ids = sorted((n[:-5] for n in os.listdir(directory) if n.endswith('.json')), reverse=True)
+        for profile_id in ids[keep:]:
+            cls.delete(profile_id)
+
+
+def parse_sample_rates(value: str) -> dict:
+    """'endpoint=pct,endpoint=pct' -> {endpoint: pct}"""
+    rates = {}
+    for item in (value or '').split(','):
+        endpoint, _, pct = item.partition('=')
+        try:
+            if endpoint.strip():
+                rates[endpoint.strip()] = float(pct)
+        except ValueError:
+            logger.warning(f"PROFILER_SAMPLE_RATES: entrée ignorée '{item}'")
+    return rates
+
+
+def init_profiler(app):
+    """Enregistre les hooks de profilage si PROFILER_ENABLED"""
+    if not app.config.get('PROFILER_ENABLED'):
+        return
+    app.extensions['profiler_rates'] = parse_sample_rates(app.config.get('PROFILER_SAMPLE_RATES', ''))
+    app.before_request(_maybe_start)
+    app.after_request(_maybe_stop)
+    logger.info("Profilage à la demande activé")
+
+
+def _trigger():
+    """'header', 'sample' ou None"""
+    if request.headers.get(PROFILE_HEADER) == '1' and _is_superadmin():
+        return 'header'
+    rate = current_app.extensions['profiler_rates'].get(request.endpoint)
+    if rate and random.random() * 100 < rate:
+        return 'sample'
+    return None
+
+
+def _is_superadmin() -> bool:
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt
+
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+    except Exception:
+        return False
+    return claims.get('type') == 'superadmin' or bool(claims.get('impersonated_by'))
+
+
+def _maybe_start():
+    trigger = _trigger()
+    if not trigger:
+        return
+    interval = current_app.config.get('PROFILER_INTERVAL_MS', 5) / 1000
+    g.profiler = (StackSampler(threading.get_ident(), interval).start(), trigger, time.perf_counter())
+
+
+def _maybe_stop(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    sampler, trigger, started = profiler
+    stacks = sampler.stop()
+    try:
+        profile_id = ProfileStore.save(stacks, {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'tenant_id': g.get('tenant_id'),
+            'trigger': trigger,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'samples': sampler.samples,
+            'interval_ms': round(sampler.interval * 1000, 2),
+        })
+        response.headers['X-Profile-Id'] = profile_id
+    except OSError as e:
+        logger.error(f"Profil non enregistré: {e}")
+    return response
@@ -0,0 +1,50 @@
+"""
+Client Redis partagé (REDIS_URL, optionnel)
+===========================================
+
+Caches et compteurs partagés entre workers. Sans REDIS_URL, ou pendant
+REDIS_RETRY_SECONDS après une erreur, get_redis() renvoie None: l'appelant
+se replie sur son cache en processus (jamais d'échec de requête à cause
+de Redis).
+"""
+
+import logging
+import threading
+import time
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_lock = threading.Lock()
+_retry_after = 0.0
+
+
+def get_redis():
+    """Client Redis (décodage str), None si non configuré ou indisponible"""
+    url = current_app.config.get('REDIS_URL')
+    if not url or time.monotonic() < _retry_after:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        try:
+            import redis
+        except ImportError:
+            return None
+        timeout = current_app.config.get('REDIS_SOCKET_TIMEOUT', 0.25)
+        with _lock:
+            client = _clients.setdefault(url, redis.Redis.from_url(
+                url, decode_responses=True,
+                socket_timeout=timeout, socket_connect_timeout=timeout
+            ))
+    return client
+
+
+def mark_unavailable(error: Exception):
+    """Met Redis de côté après une erreur (repli local en attendant)"""
+    global _retry_after
+    retry = current_app.config.get('REDIS_RETRY_SECONDS', 30)
+    if time.monotonic() >= _retry_after:
+        logger.warning(f"Redis indisponible ({error}), repli local pendant {retry}s")
+    _retry_after = time.monotonic() + retry
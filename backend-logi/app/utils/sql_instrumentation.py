@@ -0,0 +1,178 @@
+"""
+Instrumentation SQL par requête
+===============================
+
+Des hooks SQLAlchemy (before/after_cursor_execute, tous moteurs, réplica
+compris) comptent les requêtes et le temps base de données de chaque requête
+HTTP:
+
+- en-tête Server-Timing: db;dur=12.4;desc="8 queries" (onglet Timing du
+  navigateur), seulement en DEBUG, avec SQL_SERVER_TIMING=true ou pour une
+  requête X-Profile: 1 d'un super-admin: il révèle le nombre de requêtes
+  et les temps internes
+- log structuré (logger 'sql'): endpoint, statut, nombre de requêtes, durée
+- suspicion de N+1: même instruction SQL exécutée SQL_N_PLUS_ONE_THRESHOLD
+  fois ou plus dans la requête (warning avec l'instruction)
+- budget: @query_budget(n) déclare le nombre max de requêtes d'un endpoint.
+  SQL_QUERY_BUDGET_STRICT (tests): un dépassement lève QueryBudgetExceeded,
+  sinon simple warning.
+
+Hors requête HTTP (threads d'audit, webhooks, scripts), rien n'est compté.
+"""
+
+from collections import Counter
+from flask import g, has_app_context, request, current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+import json
+import logging
+import time
+
+logger = logging.getLogger('sql')
+
+_engine_hooks_registered = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un endpoint a dépassé son budget de requêtes (mode strict)"""
+
+
+class RequestSQLStats:
+    """Compteurs SQL d'une requête HTTP (stockés dans g.sql_stats)"""
+
+    __slots__ = ('count', 'duration', 'statements', 'started')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.started = time.perf_counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def repeated(self, threshold: int) -> list:
+        """Instructions exécutées au moins threshold fois (suspects N+1)"""
+        if not threshold:
+            return []
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and g.get('sql_stats') is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = g.get('sql_stats') if has_app_context() else None
+    started = conn.info.get('query_started')
+    if stats is None or not started:
+        return
+    stats.record(' '.join(statement.split()), time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    # Instruction en erreur: pas d'after_cursor_execute, on dépile quand même
+    conn = exception_context.connection
+    started = conn.info.get('query_started') if conn is not None else None
+    if started:
+        started.pop()
+
+
+def init_sql_instrumentation(app):
+    """Enregistre les hooks moteur (une fois par processus) et de requête"""
+    global _engine_hooks_registered
+
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    if not _engine_hooks_registered:
+        sa_event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        sa_event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        sa_event.listen(Engine, 'handle_error', _handle_error)
+        _engine_hooks_registered = True
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _start_request():
+    g.sql_stats = RequestSQLStats()
+
+
+def _finish_request(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+
+    config = current_app.config
+    endpoint = request.endpoint or request.path
+    total_ms = (time.perf_counter() - stats.started) * 1000
+
+    if config.get('SQL_SERVER_TIMING') or current_app.debug or _profile_requested():
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+        )
+
+    suspects = stats.repeated(config.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    budget = _endpoint_budget()
+
+    payload = {
+        'endpoint': endpoint,
+        'method': request.method,
+        'status': response.status_code,
+        'queries': stats.count,
+        'db_ms': round(stats.duration_ms, 1),
+        'total_ms': round(total_ms, 1),
+    }
+    if budget is not None:
+        payload['budget'] = budget
+    if suspects:
+        payload['n_plus_one'] = [{'statement': s[:300], 'count': c} for s, c in suspects[:3]]
+
+    slow_ms = config.get('SQL_SLOW_REQUEST_MS', 500)
+    if suspects or (slow_ms and stats.duration_ms > slow_ms):
+        logger.warning(json.dumps(payload, ensure_ascii=False))
+    else:
+        logger.debug(json.dumps(payload, ensure_ascii=False))
+
+    if budget is not None and stats.count > budget:
+        message = f"{endpoint}: {stats.count} requêtes SQL pour un budget de {budget}"
+        if config.get('SQL_QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    return response
+
+
+def _profile_requested() -> bool:
+    """En-tête X-Profile: 1 avec un token super-admin (voir app/utils/profiler.py)"""
+    from app.utils.profiler import PROFILE_HEADER, _is_superadmin
+
+    return request.headers.get(PROFILE_HEADER) == '1' and _is_superadmin()
+
+
+def _endpoint_budget():
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, 'query_budget', None)
+
+
+def query_budget(max_queries: int):
+    """
+    Déclare le nombre max de requêtes SQL d'un endpoint (auth comprise).
+    Dépassement: QueryBudgetExceeded en mode strict, warning sinon.
+    L'attribut suit les décorateurs à base de functools.wraps.
+    """
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+
+    return decorator
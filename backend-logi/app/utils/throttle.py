@@ -0,0 +1,137 @@
+"""
+Limitation par fenêtre glissante
+================================
+
+Compte les événements d'une clé (ex: envois d'OTP vers un numéro) sur une
+ou plusieurs fenêtres glissantes, par exemple 3 / 10 min et 10 / jour.
+
+Les compteurs vivent dans Redis (sorted set d'horodatages par clé et par
+fenêtre, partagé entre workers). Sans Redis, ou pendant son indisponibilité
+(app/utils/redis_client.py), repli sur un compteur en processus: la limite
+devient alors par worker.
+
+Seuls les événements acceptés sont comptés: un refus ne prolonge pas le
+blocage.
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+import uuid
+
+from app.utils.redis_client import get_redis, mark_unavailable
+
+logger = logging.getLogger(__name__)
+
+MAX_LOCAL_KEYS = 10000
+
+
+def parse_windows(spec: str) -> list:
+    """"3/600,10/86400" -> [(3, 600), (10, 86400)] (limite / secondes)"""
+    windows = []
+    for part in (spec or '').split(','):
+        if part.strip():
+            limit, seconds = part.split('/')
+            windows.append((int(limit), int(seconds)))
+    return windows
+
+
+class SlidingWindow:
+    """
+    Usage:
+        allowed, retry_after = SlidingWindow.hit('otp:<empreinte>', [(3, 600), (10, 86400)])
+    """
+
+    _events = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def hit(cls, key: str, windows: list, now: float = None):
+        """
+        Enregistre un événement si toutes les fenêtres le permettent
+
+        Returns:
+            (allowed, retry_after): retry_after en secondes si refusé
+        """
+        if not windows:
+            return True, 0
+        now = now if now is not None else time.time()
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return cls._hit_redis(redis, key, windows, now)
+            except Exception as e:
+                mark_unavailable(e)
+        return cls._hit_local(key, windows, now)
+
+    @classmethod
+    def reset(cls, key: str = None):
+        """Oublie les événements locaux (d'une clé ou de toutes)"""
+        with cls._lock:
+            if key is None:
+                cls._events.clear()
+            else:
+                cls._events.pop(key, None)
+
+    @staticmethod
+    def _hit_redis(redis, key: str, windows: list, now: float):
+        member = f"{now:.6f}:{uuid.uuid4().hex[:8]}"
+        pipe = redis.pipeline()
+        for limit, seconds in windows:
+            name = f"throttle:{key}:{seconds}"
+            pipe.zremrangebyscore(name, 0, now - seconds)
+            pipe.zadd(name, {member: now})
+            pipe.zcard(name)
+            pipe.expire(name, seconds)
+        results = pipe.execute()
+
+        retry_after = 0
+        for index, (limit, seconds) in enumerate(windows):
+            if results[index * 4 + 2] > limit:
+                name = f"throttle:{key}:{seconds}"
+                # Plus ancien événement encore compté (sans l'essai en cours)
+                oldest = redis.zrange(name, 0, 0, withscores=True)
+                if oldest:
+                    retry_after = max(retry_after, int(oldest[0][1] + seconds - now) + 1)
+        if not retry_after:
+            return True, 0
+
+        # Refusé: l'essai n'est pas compté
+        pipe = redis.pipeline()
+        for _, seconds in windows:
+            pipe.zrem(f"throttle:{key}:{seconds}", member)
+        pipe.execute()
+        return False, retry_after
+
+    @classmethod
+    def _hit_local(cls, key: str, windows: list, now: float):
+        longest = max(seconds for _, seconds in windows)
+        with cls._lock:
+            events = cls._events.get(key)
+            if events is None:
+                if len(cls._events) >= MAX_LOCAL_KEYS:
+                    cls._prune(now, longest)
+                events = cls._events[key] = deque()
+            while events and events[0] <= now - longest:
+                events.popleft()
+
+            retry_after = 0
+            for limit, seconds in windows:
+                recent = [t for t in events if t > now - seconds]
+                if len(recent) >= limit:
+                    retry_after = max(retry_after, int(recent[len(recent) - limit] + seconds - now) + 1)
+            if retry_after:
+                return False, retry_after
+
+            events.append(now)
+            return True, 0
+
+    @classmethod
+    def _prune(cls, now: float, seconds: float):
+        """Supprime les clés sans événement récent (appelé sous le verrou)"""
+        for key in [k for k, events in cls._events.items() if not events or events[-1] <= now - seconds]:
+            del cls._events[key]
+        if len(cls._events) >= MAX_LOCAL_KEYS:
+            logger.warning(f"Limiteur local saturé ({len(cls._events)} clés)")
@@ -0,0 +1,36 @@
+"""
+Archivage du journal d'audit
+============================
+Exporte les partitions mensuelles au-delà de AUDIT_RETENTION_MONTHS en
+JSON Lines gzip (AUDIT_ARCHIVE_DIR), puis les supprime.
+
+À planifier une fois par jour (cron Railway):
+    python archive_audit.py [--dry-run]
+"""
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault('FLASK_ENV', 'production')
+
+    from app import create_app, db
+    from app.services.audit_service import AuditArchiver
+
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    dry_run = '--dry-run' in sys.argv[1:]
+
+    with app.app_context():
+        archived = AuditArchiver.archive(
+            db.engine,
+            retention_months=app.config.get('AUDIT_RETENTION_MONTHS', 12),
+            directory=app.config.get('AUDIT_ARCHIVE_DIR', 'archives/audit'),
+            dry_run=dry_run
+        )
+        for item in archived:
+            print(f"[AUDIT] {item['partition']}: {item['rows']} ligne(s) -> {item['file'] or '(dry run)'}")
+        print(f"[AUDIT] {len(archived)} partition(s) {'à archiver' if dry_run else 'archivée(s)'}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks des endpoints chauds (hors suite de tests)
+Voir benchmarks/__main__.py pour l'usage.
+"""
@@ -0,0 +1,215 @@
+"""
+Jeu de données synthétique d'un tenant (reproductible: graine fixe)
+"""
+
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+import random
+
+from app import db
+from app.models import (
+    Tenant, TenantConfig, User, Warehouse, Package, PackageHistory, Departure,
+    Payment, PackagePayment, Notification, TrackingAlias
+)
+
+TENANT_SLUG = 'bench-cargo'
+WEBHOOK_SECRET = 'bench-webhook-secret'
+
+# Répartition des statuts (poids relatifs)
+STATUS_WEIGHTS = {
+    'pending': 15, 'received': 25, 'in_transit': 20, 'arrived_port': 10, 'customs': 5,
+    'out_for_delivery': 5, 'delivered': 15, 'exception': 2, 'returned': 1, 'cancelled': 2,
+}
+
+BATCH = 500
+
+
+@dataclass
+class Scale:
+    """Volumes du tenant synthétique"""
+    clients: int = 200
+    packages: int = 2000
+    departures: int = 20
+    payments: int = 500
+    notifications: int = 2000
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def build_tenant(scale: Scale, seed: int = 42) -> dict:
+    """
+    Crée le tenant et ses données (appelant: contexte d'application)
+
+    Returns:
+        contexte des scénarios: ids du tenant, de l'admin, des colis par statut...
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    tenant = Tenant(name='Bench Cargo', slug=TENANT_SLUG, email='bench@cargo.test')
+    db.session.add(tenant)
+    db.session.flush()
+
+    db.session.add(TenantConfig(tenant_id=tenant.id, config_data={
+        'webhooks': {'generic': {'enabled': True, 'secret': WEBHOOK_SECRET}}
+    }))
+
+    admin = User(
+        tenant_id=tenant.id, email='admin@bench.test', phone='+237600000001', password_hash='x',
+        first_name='Bench', last_name='Admin', role='admin', is_active=True
+    )
+    db.session.add(admin)
+
+    origins = [Warehouse(tenant_id=tenant.id, country='China', city=city, name=f'Entrepôt {city}')
+               for city in ('Guangzhou', 'Yiwu')]
+    destinations = [Warehouse(tenant_id=tenant.id, country='Cameroon', city=city, name=f'Agence {city}')
+                    for city in ('Douala', 'Yaoundé')]
+    db.session.add_all(origins + destinations)
+    db.session.flush()
+
+    clients = []
+    for i in range(scale.clients):
+        clients.append(User(
+            tenant_id=tenant.id, email=f'client{i:05d}@bench.test', phone=f'+2376{i:08d}',
+            password_hash='x', first_name=f'Client{i}', last_name=rng.choice(('Mbarga', 'Ngono', 'Fotso', 'Kamga')),
+            role='client', is_active=True
+        ))
+    _add_batched(clients)
+
+    departures = []
+    for i in range(scale.departures):
+        status = 'departed' if i % 2 else 'scheduled'
+        departures.append(Departure(
+            tenant_id=tenant.id, origin_country='China', origin_city='gz', dest_country='Cameroon',
+            transport_mode=rng.choice(('sea', 'air_normal', 'air_express')),
+            departure_date=date.today() + timedelta(days=rng.randint(-30, 30)),
+            status=status, departed_at=now - timedelta(days=rng.randint(1, 20)) if status == 'departed' else None,
+            created_by=admin.id
+        ))
+    _add_batched(departures)
+    scheduled = [d for d in departures if d.status == 'scheduled']
+    departed = [d for d in departures if d.status == 'departed']
+
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    packages = []
+    for i in range(scale.packages):
+        status = rng.choices(statuses, weights)[0]
+        amount = rng.randint(5, 400) * 1000
+        created = now - timedelta(days=rng.randint(0, 180), minutes=rng.randint(0, 1440))
+        package = Package(
+            tenant_id=tenant.id, client_id=rng.choice(clients).id,
+            tracking_number=f'BCH{i:07d}', supplier_tracking=f'SUP{rng.randint(10**9, 10**10)}',
+            description=rng.choice(('Téléphones', 'Vêtements', 'Pièces auto', 'Cosmétiques', 'Électroménager')),
+            transport_mode=rng.choice(('sea', 'air_normal', 'air_express')),
+            weight=round(rng.uniform(0.5, 80), 2), quantity=rng.randint(1, 10),
+            origin_warehouse_id=rng.choice(origins).id, destination_warehouse_id=rng.choice(destinations).id,
+            destination_country='Cameroon', status=status,
+            amount=amount, paid_amount=amount if status == 'delivered' else 0,
+            created_at=created, updated_at=created,
+            delivered_at=created + timedelta(days=20) if status == 'delivered' else None,
+        )
+        if status == 'in_transit' and departed:
+            package.departure_id = rng.choice(departed).id
+        elif status == 'received' and scheduled and rng.random() < 0.5:
+            package.departure_id = rng.choice(scheduled).id
+        packages.append(package)
+    _add_batched(packages)
+
+    for package in packages:
+        TrackingAlias.sync_package(package)
+    _add_batched([
+        PackageHistory(package_id=p.id, status=p.status, notes='bench', created_at=p.created_at)
+        for p in packages
+    ])
+
+    payments = []
+    links = []
+    for i in range(scale.payments):
+        package = rng.choice(packages)
+        amount = float(package.amount or 0) or 1000
+        payment = Payment(
+            tenant_id=tenant.id, client_id=package.client_id, amount=amount, currency='XAF',
+            method=rng.choice(('cash', 'mobile_money', 'bank_transfer')), status='confirmed',
+            created_at=now - timedelta(days=rng.randint(0, 180)), created_by=admin.id
+        )
+        payments.append(payment)
+    _add_batched(payments)
+    for payment in payments:
+        package = rng.choice(packages)
+        links.append(PackagePayment(payment_id=payment.id, package_id=package.id, amount=payment.amount))
+    _add_batched(links)
+
+    notifications = [
+        Notification(
+            user_id=rng.choice(clients).id, title='Mise à jour', message='Votre colis a changé de statut',
+            type='status_update', package_id=rng.choice(packages).id, is_read=rng.random() < 0.6,
+            created_at=now - timedelta(days=rng.randint(0, 60))
+        )
+        for _ in range(scale.notifications)
+    ]
+    _add_batched(notifications)
+    db.session.commit()
+
+    by_status = {}
+    for package in packages:
+        by_status.setdefault(package.status, []).append(package.id)
+
+    return {
+        'tenant_id': tenant.id,
+        'tenant_slug': tenant.slug,
+        'admin_id': admin.id,
+        'origin_warehouse_id': origins[0].id,
+        'destination_warehouse_id': destinations[0].id,
+        'client_ids': [c.id for c in clients],
+        'packages_by_status': by_status,
+        'trackings': [p.tracking_number for p in packages],
+    }
+
+
+def make_departure(ctx: dict, package_count: int, departed: bool, rng: random.Random) -> str:
+    """Départ neuf avec package_count colis (préparation d'un scénario depart / arrive)"""
+    now = datetime.utcnow()
+    departure = Departure(
+        tenant_id=ctx['tenant_id'], origin_country='China', origin_city='gz', dest_country='Cameroon',
+        transport_mode='air_normal', departure_date=date.today(),
+        status='departed' if departed else 'scheduled',
+        departed_at=now if departed else None, created_by=ctx['admin_id']
+    )
+    db.session.add(departure)
+    db.session.flush()
+
+    packages = []
+    for _ in range(package_count):
+        packages.append(Package(
+            tenant_id=ctx['tenant_id'], client_id=rng.choice(ctx['client_ids']), departure_id=departure.id,
+            tracking_number=f'BDP{rng.randint(10**9, 10**10)}', description='Bench',
+            origin_warehouse_id=ctx['origin_warehouse_id'], destination_warehouse_id=ctx['destination_warehouse_id'],
+            status='in_transit' if departed else 'received', amount=10000
+        ))
+    _add_batched(packages)
+    db.session.commit()
+    return departure.id
+
+
+def _add_batched(objects: list):
+    for i in range(0, len(objects), BATCH):
+        db.session.add_all(objects[i:i + BATCH])
+        db.session.flush()
+
+
+def make_ready_packages(ctx: dict, package_count: int, rng: random.Random) -> list:
+    """Colis prêts au retrait d'un même client, à moitié impayés (préparation de pickups.batch)"""
+    client_id = rng.choice(ctx['client_ids'])
+    packages = [
+        Package(
+            tenant_id=ctx['tenant_id'], client_id=client_id,
+            tracking_number=f'BPK{rng.randint(10**9, 10**10)}', description='Bench',
+            origin_warehouse_id=ctx['origin_warehouse_id'], destination_warehouse_id=ctx['destination_warehouse_id'],
+            status='arrived_port', amount=10000, paid_amount=10000 if i % 2 else 0
+        )
+        for i in range(package_count)
+    ]
+    _add_batched(packages)
+    db.session.commit()
+    return [p.id for p in packages]
@@ -0,0 +1,147 @@
+"""
+Exécution des scénarios et mesures (durée, requêtes SQL, temps SQL)
+
+Les requêtes SQL sont lues dans l'en-tête Server-Timing posé par
+app/utils/sql_instrumentation.py.
+"""
+
+from datetime import datetime
+import platform
+import random
+import re
+import statistics
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from config import config
+from benchmarks.dataset import Scale, build_tenant
+from benchmarks.scenarios import SCENARIOS
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def make_app(database_url: str = None):
+    """create_app('testing'), sur une autre base si database_url"""
+    if not database_url:
+        return create_app('testing')
+    config['benchmark'] = type('BenchmarkConfig', (config['testing'],), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_pre_ping': True},
+    })
+    return create_app('benchmark')
+
+
+def run(scale: Scale, iterations: int = 20, only: list = None, database_url: str = None,
+        seed: int = 42, departure_size: int = 50) -> dict:
+    """Construit le jeu de données puis mesure chaque scénario"""
+    app = make_app(database_url)
+    rng = random.Random(seed)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        ctx = build_tenant(scale, seed)
+        dataset_seconds = time.perf_counter() - started
+        ctx['departure_size'] = departure_size
+        token = create_access_token(
+            identity=ctx['admin_id'], additional_claims={'tenant_id': ctx['tenant_id'], 'role': 'admin'}
+        )
+        dialect = db.engine.dialect.name
+
+    client = app.test_client()
+    auth_headers = {
+        'Authorization': f'Bearer {token}',
+        'X-Tenant-ID': ctx['tenant_id'],
+        'X-App-Channel': 'app_android_client',
+    }
+
+    results = {}
+    for name, build in SCENARIOS.items():
+        if only and name not in only:
+            continue
+        results[name] = _measure(app, client, build, ctx, rng, auth_headers, iterations)
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'database': dialect,
+        'python': platform.python_version(),
+        'scale': scale.to_dict(),
+        'iterations': iterations,
+        'seed': seed,
+        'dataset_seconds': round(dataset_seconds, 2),
+        'scenarios': results,
+    }
+
+
+def _measure(app, client, build, ctx, rng, auth_headers, iterations) -> dict:
+    durations, queries, db_ms, statuses = [], [], [], set()
+    error = None
+
+    # Une itération d'échauffement (caches, compilation SQL)
+    for i in range(iterations + 1):
+        with app.app_context():
+            spec = build(ctx, rng)
+        headers = dict(auth_headers if spec.get('auth', True) else {}, **spec.get('headers', {}))
+
+        started = time.perf_counter()
+        try:
+            response = client.open(
+                spec['url'], method=spec['method'], headers=headers,
+                json=spec.get('json'), data=spec.get('data')
+            )
+        except AssertionError as e:
+            # Mode strict: budget de requêtes (@query_budget) dépassé
+            error = str(e)
+            break
+        elapsed = time.perf_counter() - started
+        if i == 0:
+            continue
+
+        durations.append(elapsed * 1000)
+        statuses.add(response.status_code)
+        match = _SERVER_TIMING_DB.search(response.headers.get('Server-Timing', ''))
+        if match:
+            db_ms.append(float(match.group(1)))
+            queries.append(int(match.group(2)))
+
+    if error:
+        return {'error': error}
+    return {
+        'status': sorted(statuses),
+        'ms': _summary(durations),
+        'db_ms': _summary(db_ms),
+        'queries': {'min': min(queries), 'max': max(queries), 'median': statistics.median(queries)} if queries else None,
+    }
+
+
+def _summary(values: list) -> dict:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'min': round(ordered[0], 2),
+        'median': round(statistics.median(ordered), 2),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'mean': round(statistics.fmean(ordered), 2),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.0) -> list:
+    """
+    Régressions par rapport à une référence (nombre de requêtes SQL, stable
+    d'une machine à l'autre; la durée dépend de la machine et n'est pas comparée)
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if not reference or not reference.get('queries') or not result.get('queries'):
+            if result.get('error'):
+                regressions.append(f"{name}: {result['error']}")
+            continue
+        before, after = reference['queries']['max'], result['queries']['max']
+        if after > before * (1 + tolerance):
+            regressions.append(f"{name}: {before} -> {after} requêtes SQL")
+    return regressions
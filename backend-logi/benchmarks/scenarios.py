@@ -0,0 +1,98 @@
+"""
+Scénarios mesurés: endpoints chauds de l'admin et ingestion webhook
+
+Chaque scénario prépare une itération (hors chronométrage) et renvoie la
+requête à envoyer: {'method', 'url', 'json'?, 'data'?, 'headers'?}.
+"""
+
+import hashlib
+import hmac
+import json
+
+from benchmarks.dataset import WEBHOOK_SECRET, make_departure, make_ready_packages
+
+SCENARIOS = {}
+
+
+def scenario(name: str):
+    def decorator(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return decorator
+
+
+@scenario('packages.list')
+def packages_list(ctx, rng):
+    return {'method': 'GET', 'url': '/api/admin/packages?page=1&per_page=20'}
+
+
+@scenario('packages.list_status')
+def packages_list_status(ctx, rng):
+    return {'method': 'GET', 'url': '/api/admin/packages?status=in_transit&page=2&per_page=50'}
+
+
+@scenario('packages.search')
+def packages_search(ctx, rng):
+    tracking = rng.choice(ctx['trackings'])
+    return {'method': 'GET', 'url': f'/api/admin/packages?search={tracking[:-2]}'}
+
+
+@scenario('dashboard.stats')
+def dashboard_stats(ctx, rng):
+    return {'method': 'GET', 'url': '/api/admin/dashboard/stats'}
+
+
+@scenario('finance.stats')
+def finance_stats(ctx, rng):
+    return {'method': 'GET', 'url': '/api/admin/finance/stats?period=year'}
+
+
+@scenario('pickups.desk')
+def pickups_desk(ctx, rng):
+    return {'method': 'GET', 'url': '/api/pickups/desk'}
+
+
+@scenario('pickups.batch')
+def pickups_batch(ctx, rng):
+    package_ids = make_ready_packages(ctx, 10, rng)
+    return {'method': 'POST', 'url': '/api/pickups/batch',
+            'json': {'package_ids': package_ids, 'pickup_by': 'client', 'payment': {'method': 'cash'}}}
+
+
+@scenario('departures.depart')
+def departures_depart(ctx, rng):
+    departure_id = make_departure(ctx, ctx['departure_size'], departed=False, rng=rng)
+    return {'method': 'POST', 'url': f'/api/admin/departures/{departure_id}/depart'}
+
+
+@scenario('departures.arrive')
+def departures_arrive(ctx, rng):
+    departure_id = make_departure(ctx, ctx['departure_size'], departed=True, rng=rng)
+    return {'method': 'POST', 'url': f'/api/admin/departures/{departure_id}/arrive'}
+
+
+@scenario('packages.bulk_status')
+def packages_bulk_status(ctx, rng):
+    ids = rng.sample(ctx['packages_by_status']['arrived_port'], min(50, len(ctx['packages_by_status']['arrived_port'])))
+    return {'method': 'PUT', 'url': '/api/admin/packages/bulk-status',
+            'json': {'ids': ids, 'status': 'arrived_port', 'location': 'Douala', 'notify': False}}
+
+
+@scenario('exports.packages_excel')
+def exports_packages_excel(ctx, rng):
+    return {'method': 'GET', 'url': '/api/admin/exports/packages/excel?status=received'}
+
+
+@scenario('webhooks.generic')
+def webhooks_generic(ctx, rng):
+    body = json.dumps({
+        'tracking_number': rng.choice(ctx['trackings']),
+        'status': 'in_transit',
+        'location': 'Hub Dubai',
+        'notes': 'bench'
+    }).encode()
+    signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return {
+        'method': 'POST', 'url': f"/api/webhooks/{ctx['tenant_slug']}/generic", 'data': body, 'auth': False,
+        'headers': {'Content-Type': 'application/json', 'X-Webhook-Signature': f'sha256={signature}'}
+    }
@@ -0,0 +1,26 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis le dossier courant)
+
+Métriques Prometheus multi-workers: chaque worker écrit ses compteurs dans
+PROMETHEUS_MULTIPROC_DIR, agrégés par /metrics (app/utils/metrics.py).
+Le dossier est vidé au démarrage du master et les fichiers d'un worker
+terminé sont marqués morts (jauges livesum).
+"""
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
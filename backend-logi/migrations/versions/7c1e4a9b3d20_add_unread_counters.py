@@ -0,0 +1,43 @@
+"""add unread_counters table and unread indexes
+
+Revision ID: 7c1e4a9b3d20
+Revises: 2f6afc09d27e
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a9b3d20'
+down_revision = '2f6afc09d27e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('unread_counters',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('scope', sa.String(length=30), nullable=False),
+    sa.Column('owner_id', sa.String(length=36), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scope', 'owner_id', name='uq_unread_counter_scope_owner')
+    )
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('idx_notification_user_read_created', ['user_id', 'is_read', 'created_at'], unique=False)
+
+    with op.batch_alter_table('support_messages', schema=None) as batch_op:
+        batch_op.create_index('idx_support_direction_read', ['direction', 'is_read', 'tenant_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('support_messages', schema=None) as batch_op:
+        batch_op.drop_index('idx_support_direction_read')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notification_user_read_created')
+
+    op.drop_table('unread_counters')
@@ -0,0 +1,70 @@
+"""add updated_at sync indexes and sync_tombstones table
+
+Revision ID: 8d2f5b0c4e31
+Revises: 7c1e4a9b3d20
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f5b0c4e31'
+down_revision = '7c1e4a9b3d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('entity_type', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.String(length=36), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.create_index('idx_tombstone_user_deleted', ['user_id', 'deleted_at'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE notifications SET updated_at = COALESCE(read_at, created_at) WHERE updated_at IS NULL')
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('idx_notification_user_updated', ['user_id', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE payments SET updated_at = created_at WHERE updated_at IS NULL')
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('idx_payment_client_updated', ['client_id', 'updated_at'], unique=False)
+
+    op.execute('UPDATE packages SET updated_at = created_at WHERE updated_at IS NULL')
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.create_index('idx_package_client_updated', ['client_id', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('package_history', schema=None) as batch_op:
+        batch_op.create_index('idx_history_package_created', ['package_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('package_history', schema=None) as batch_op:
+        batch_op.drop_index('idx_history_package_created')
+
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.drop_index('idx_package_client_updated')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('idx_payment_client_updated')
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notification_user_updated')
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('idx_tombstone_user_deleted')
+
+    op.drop_table('sync_tombstones')
@@ -0,0 +1,46 @@
+"""add webhook_events inbox table
+
+Revision ID: 9e4a1c7d2f53
+Revises: 8d2f5b0c4e31
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a1c7d2f53'
+down_revision = '8d2f5b0c4e31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('webhook_events',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('provider', sa.String(length=30), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tenant_id', 'provider', 'content_hash', name='uq_webhook_event_hash')
+    )
+    with op.batch_alter_table('webhook_events', schema=None) as batch_op:
+        batch_op.create_index('idx_webhook_event_status_received', ['status', 'received_at'], unique=False)
+        batch_op.create_index('idx_webhook_event_tenant_received', ['tenant_id', 'received_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('webhook_events', schema=None) as batch_op:
+        batch_op.drop_index('idx_webhook_event_tenant_received')
+        batch_op.drop_index('idx_webhook_event_status_received')
+
+    op.drop_table('webhook_events')
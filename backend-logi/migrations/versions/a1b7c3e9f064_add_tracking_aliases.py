@@ -0,0 +1,77 @@
+"""add tracking_aliases lookup table
+
+Revision ID: a1b7c3e9f064
+Revises: 9e4a1c7d2f53
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+import uuid
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1b7c3e9f064'
+down_revision = '9e4a1c7d2f53'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(value):
+    if not value:
+        return None
+    normalized = ''.join(str(value).split()).upper()[:100]
+    return normalized or None
+
+
+def upgrade():
+    aliases = op.create_table('tracking_aliases',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('tracking', sa.String(length=100), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.String(length=36), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity_type', 'entity_id', 'kind', name='uq_tracking_alias_entity_kind')
+    )
+    with op.batch_alter_table('tracking_aliases', schema=None) as batch_op:
+        batch_op.create_index('idx_tracking_alias_lookup', ['tenant_id', 'tracking'], unique=False)
+
+    # Remplissage initial depuis les colis et départs existants
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    rows = []
+
+    packages = bind.execute(sa.text(
+        'SELECT id, tenant_id, tracking_number, supplier_tracking, carrier_tracking FROM packages'
+    ))
+    for pkg in packages:
+        for kind, value in (('tracking_number', pkg.tracking_number),
+                            ('supplier_tracking', pkg.supplier_tracking),
+                            ('carrier_tracking', pkg.carrier_tracking)):
+            tracking = _normalize(value)
+            if tracking:
+                rows.append({'id': str(uuid.uuid4()), 'tenant_id': pkg.tenant_id, 'tracking': tracking,
+                             'entity_type': 'package', 'entity_id': pkg.id, 'kind': kind, 'created_at': now})
+
+    departures = bind.execute(sa.text(
+        'SELECT id, tenant_id, carrier_tracking FROM departures WHERE carrier_tracking IS NOT NULL'
+    ))
+    for dep in departures:
+        tracking = _normalize(dep.carrier_tracking)
+        if tracking:
+            rows.append({'id': str(uuid.uuid4()), 'tenant_id': dep.tenant_id, 'tracking': tracking,
+                         'entity_type': 'departure', 'entity_id': dep.id, 'kind': 'carrier_tracking', 'created_at': now})
+
+    if rows:
+        op.bulk_insert(aliases, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('tracking_aliases', schema=None) as batch_op:
+        batch_op.drop_index('idx_tracking_alias_lookup')
+
+    op.drop_table('tracking_aliases')
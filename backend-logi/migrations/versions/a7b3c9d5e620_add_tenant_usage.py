@@ -0,0 +1,36 @@
+"""add tenant usage counters
+
+Revision ID: a7b3c9d5e620
+Revises: f6a2b8c4d519
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b3c9d5e620'
+down_revision = 'f6a2b8c4d519'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Compteurs initialisés à la première création de la période (TenantUsage.rebuild)
+    op.create_table(
+        'tenant_usage',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('tenant_id', sa.String(length=36), nullable=False),
+        sa.Column('resource', sa.String(length=30), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'resource', 'period', name='uq_tenant_usage_resource_period')
+    )
+
+
+def downgrade():
+    op.drop_table('tenant_usage')
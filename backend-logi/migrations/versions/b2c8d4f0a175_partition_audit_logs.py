@@ -0,0 +1,164 @@
+"""partition audit_logs by month with composite indexes
+
+PostgreSQL: audit_logs devient une table partitionnée (RANGE timestamp),
+une partition par mois. SQLite: les lignes sont déplacées dans une table
+audit_logs_YYYY_MM par mois.
+
+Revision ID: b2c8d4f0a175
+Revises: a1b7c3e9f064
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c8d4f0a175'
+down_revision = 'a1b7c3e9f064'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = ('id', 'timestamp', 'tenant_id', 'user_id', 'user_email', 'action', 'resource_type',
+           'resource_id', 'details', 'ip_address', 'user_agent', 'status')
+
+INDEXES = (
+    ('tenant_timestamp', ['tenant_id', 'timestamp']),
+    ('tenant_action_timestamp', ['tenant_id', 'action', 'timestamp']),
+    ('user_timestamp', ['user_id', 'timestamp']),
+)
+
+OLD_INDEXES = ('ix_audit_logs_tenant_id', 'ix_audit_logs_user_id', 'ix_audit_logs_action')
+
+
+def _columns(composite_pk):
+    return [
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('tenant_id', sa.String(length=36), nullable=True),
+        sa.Column('user_id', sa.String(length=36), nullable=True),
+        sa.Column('user_email', sa.String(length=120), nullable=True),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('resource_type', sa.String(length=50), nullable=True),
+        sa.Column('resource_id', sa.String(length=36), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.PrimaryKeyConstraint(*(('id', 'timestamp') if composite_pk else ('id',)))
+    ]
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _months(bind, table_name):
+    """Mois couverts par les lignes d'une table (du plus ancien au plus récent)"""
+    table = sa.table(table_name, sa.column('timestamp', sa.DateTime()))
+    first, last = bind.execute(sa.select(sa.func.min(table.c.timestamp), sa.func.max(table.c.timestamp))).first()
+    if first is None:
+        return []
+    month = datetime(first.year, first.month, 1)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = _add_months(month, 1)
+    return months
+
+
+def _range_params():
+    return [sa.bindparam('start', type_=sa.DateTime()), sa.bindparam('end', type_=sa.DateTime())]
+
+
+def upgrade():
+    bind = op.get_bind()
+    exists = 'audit_logs' in sa.inspect(bind).get_table_names()
+    if bind.dialect.name == 'postgresql':
+        _upgrade_postgresql(bind, exists)
+    elif exists:
+        _upgrade_tables(bind)
+
+
+def _upgrade_postgresql(bind, exists):
+    if exists:
+        op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_legacy')
+        op.execute('ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey')
+        op.execute('ALTER SEQUENCE IF EXISTS audit_logs_id_seq RENAME TO audit_logs_legacy_id_seq')
+        for name in OLD_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    op.create_table('audit_logs', *_columns(composite_pk=True), postgresql_partition_by='RANGE (timestamp)')
+    for suffix, columns in INDEXES:
+        op.create_index(f'idx_audit_{suffix}', 'audit_logs', columns, unique=False)
+    op.create_index('ix_audit_logs_action', 'audit_logs', ['action'], unique=False)
+
+    now = datetime.utcnow()
+    months = _months(bind, 'audit_logs_legacy') if exists else []
+    current = datetime(now.year, now.month, 1)
+    for month in sorted(set(months) | {current, _add_months(current, 1)}):
+        op.execute(
+            f"CREATE TABLE audit_logs_{month:%Y_%m} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        )
+
+    if exists:
+        columns = ', '.join(COLUMNS)
+        op.execute(f'INSERT INTO audit_logs ({columns}) SELECT {columns} FROM audit_logs_legacy')
+        op.execute("SELECT setval('audit_logs_id_seq', COALESCE((SELECT MAX(id) FROM audit_logs), 0) + 1, false)")
+        op.drop_table('audit_logs_legacy')
+
+
+def _upgrade_tables(bind):
+    for month in _months(bind, 'audit_logs'):
+        name = f'audit_logs_{month:%Y_%m}'
+        op.create_table(name, *_columns(composite_pk=False))
+        for suffix, columns in INDEXES:
+            op.create_index(f'idx_{name}_{suffix}', name, columns, unique=False)
+        columns = ', '.join(COLUMNS)
+        bind.execute(sa.text(
+            f'INSERT INTO {name} ({columns}) SELECT {columns} FROM audit_logs '
+            f'WHERE timestamp >= :start AND timestamp < :end'
+        ).bindparams(*_range_params()), {'start': month, 'end': _add_months(month, 1)})
+    op.execute('DELETE FROM audit_logs')
+
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_logs_tenant_id')
+        batch_op.drop_index('ix_audit_logs_user_id')
+        for suffix, columns in INDEXES:
+            batch_op.create_index(f'idx_audit_{suffix}', columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    partitions = sorted(
+        name for name in sa.inspect(bind).get_table_names()
+        if name.startswith('audit_logs_') and name[len('audit_logs_'):].replace('_', '').isdigit()
+    )
+    columns = ', '.join(COLUMNS)
+
+    if bind.dialect.name == 'postgresql':
+        op.create_table('audit_logs_plain', *_columns(composite_pk=False))
+        op.execute(f'INSERT INTO audit_logs_plain ({columns}) SELECT {columns} FROM audit_logs')
+        op.execute("SELECT setval('audit_logs_plain_id_seq', COALESCE((SELECT MAX(id) FROM audit_logs_plain), 0) + 1, false)")
+        op.drop_table('audit_logs')
+        op.execute('ALTER TABLE audit_logs_plain RENAME TO audit_logs')
+        op.execute('ALTER TABLE audit_logs RENAME CONSTRAINT audit_logs_plain_pkey TO audit_logs_pkey')
+        op.execute('ALTER SEQUENCE audit_logs_plain_id_seq RENAME TO audit_logs_id_seq')
+    else:
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            for suffix, _ in INDEXES:
+                batch_op.drop_index(f'idx_audit_{suffix}')
+        # Les ids sont propres à chaque table mensuelle: renumérotés
+        data_columns = ', '.join(c for c in COLUMNS if c != 'id')
+        for name in partitions:
+            op.execute(f'INSERT INTO audit_logs ({data_columns}) SELECT {data_columns} FROM {name} ORDER BY timestamp, id')
+            op.drop_table(name)
+
+    for name, column in (('ix_audit_logs_tenant_id', 'tenant_id'), ('ix_audit_logs_user_id', 'user_id')):
+        op.create_index(name, 'audit_logs', [column], unique=False)
+    if bind.dialect.name == 'postgresql':
+        op.create_index('ix_audit_logs_action', 'audit_logs', ['action'], unique=False)
@@ -0,0 +1,48 @@
+"""replace otp lookup index with (tenant, user, purpose, created_at)
+
+Revision ID: b8c4d0e6f731
+Revises: a7b3c9d5e620
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8c4d0e6f731'
+down_revision = 'a7b3c9d5e620'
+branch_labels = None
+depends_on = None
+
+
+def _otp_indexes(bind):
+    """None si otp_codes n'existe pas encore (créée par create_all, après les migrations)"""
+    inspector = sa.inspect(bind)
+    if 'otp_codes' not in inspector.get_table_names():
+        return None
+    return {index['name'] for index in inspector.get_indexes('otp_codes')}
+
+
+def upgrade():
+    indexes = _otp_indexes(op.get_bind())
+    if indexes is None:
+        return
+    with op.batch_alter_table('otp_codes', schema=None) as batch_op:
+        if 'idx_otp_user_purpose' in indexes:
+            batch_op.drop_index('idx_otp_user_purpose')
+        if 'idx_otp_user_purpose_created' not in indexes:
+            batch_op.create_index(
+                'idx_otp_user_purpose_created', ['tenant_id', 'user_id', 'purpose', 'created_at'], unique=False
+            )
+
+
+def downgrade():
+    indexes = _otp_indexes(op.get_bind())
+    if indexes is None:
+        return
+    with op.batch_alter_table('otp_codes', schema=None) as batch_op:
+        if 'idx_otp_user_purpose_created' in indexes:
+            batch_op.drop_index('idx_otp_user_purpose_created')
+        if 'idx_otp_user_purpose' not in indexes:
+            batch_op.create_index('idx_otp_user_purpose', ['tenant_id', 'user_id', 'purpose'], unique=False)
@@ -0,0 +1,29 @@
+"""add seed_versions table
+
+Revision ID: c3d9e5a1b286
+Revises: b2c8d4f0a175
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9e5a1b286'
+down_revision = 'b2c8d4f0a175'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('seed_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('applied_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('seed_versions')
@@ -0,0 +1,28 @@
+"""add webhook_events.claimed_at (atomic claim before processing)
+
+Revision ID: c9d5e1f7a842
+Revises: b8c4d0e6f731
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d5e1f7a842'
+down_revision = 'b8c4d0e6f731'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('webhook_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    # Événements en cours: rendus à la file (repris par la récupération)
+    op.execute("UPDATE webhook_events SET status = 'queued' WHERE status = 'processing'")
+    with op.batch_alter_table('webhook_events', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
@@ -0,0 +1,32 @@
+"""add partial index on packages ready for pickup
+
+Revision ID: d4e0f6a2b397
+Revises: c3d9e5a1b286
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e0f6a2b397'
+down_revision = 'c3d9e5a1b286'
+branch_labels = None
+depends_on = None
+
+
+READY_WHERE = sa.text("status IN ('arrived_port', 'customs', 'out_for_delivery')")
+
+
+def upgrade():
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_package_pickup_ready', ['tenant_id', 'destination_warehouse_id', 'updated_at'], unique=False,
+            postgresql_where=READY_WHERE, sqlite_where=READY_WHERE
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.drop_index('idx_package_pickup_ready')
@@ -0,0 +1,109 @@
+"""move pickup signatures to the blob store
+
+Revision ID: e5f1a7b3c408
+Revises: d4e0f6a2b397
+Create Date: 2026-10-19 17:00:00.000000
+
+Les colonnes base64 (pickups.signature, packages.pickup_signature) sont
+conservées: elles seront supprimées par une migration ultérieure, une fois
+la copie vérifiée (aucune ligne avec l'ancienne colonne renseignée et la
+référence vide).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import base64
+import logging
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1a7b3c408'
+down_revision = 'd4e0f6a2b397'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# (table, ancienne colonne base64, nouvelle colonne référence)
+COLUMNS = (
+    ('pickups', 'signature', 'signature_ref'),
+    ('packages', 'pickup_signature', 'pickup_signature_ref'),
+)
+
+
+def _require_durable_store(bind):
+    """Refuse de copier les signatures vers un disque éphémère"""
+    from app.services.blob_store import get_blob_store, is_durable
+
+    tenant_ids = set()
+    for table, old, _ in COLUMNS:
+        tenant_ids.update(bind.execute(sa.text(
+            f'SELECT DISTINCT tenant_id FROM {table} WHERE {old} IS NOT NULL'
+        )).scalars())
+    ephemeral = sorted(t for t in tenant_ids if not is_durable(get_blob_store(t, private=True)))
+    if ephemeral:
+        raise RuntimeError(
+            'Stockage des signatures non persistant (BLOB_STORE_DIR sur un volume '
+            f"ou BLOB_STORE_BACKEND=cloudinary requis) pour les tenants: {', '.join(ephemeral)}"
+        )
+
+
+def _copy(table, old, row):
+    """Référence du blob copié; contenu non décodable conservé en octets bruts"""
+    from app.services.blob_store import get_blob_store, put_data_url
+
+    data_url = row.data if row.data.startswith('data:') else f'data:image/png;base64,{row.data}'
+    try:
+        return put_data_url(row.tenant_id, data_url, private=True)
+    except ValueError as e:
+        logger.warning(f"{table}.{old} {row.id} non décodable ({e}): copiée en octets bruts")
+        return get_blob_store(row.tenant_id, private=True).put(row.data.encode(), 'application/octet-stream')
+
+
+def upgrade():
+    # Exécuté par "flask db upgrade": contexte d'application disponible (BLOB_STORE_*)
+    from app.services.blob_store import BlobStoreError
+
+    bind = op.get_bind()
+    _require_durable_store(bind)
+
+    for table, old, new in COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(new, sa.String(length=255), nullable=True))
+
+        failed = []
+        rows = bind.execute(sa.text(f'SELECT id, tenant_id, {old} AS data FROM {table} WHERE {old} IS NOT NULL'))
+        for row in rows.fetchall():
+            try:
+                ref = _copy(table, old, row)
+            except BlobStoreError as e:
+                logger.error(f"{table}.{old} {row.id} non copiée: {e}")
+                failed.append(str(row.id))
+                continue
+            bind.execute(sa.text(f'UPDATE {table} SET {new} = :ref WHERE id = :id'), {'ref': ref, 'id': row.id})
+
+        # Aucune ligne laissée sans copie: la migration échoue (et est annulée)
+        if failed:
+            raise RuntimeError(f"{table}.{old}: copie impossible pour {len(failed)} ligne(s): {', '.join(failed)}")
+
+
+def downgrade():
+    from app.services.blob_store import open_ref, BlobStoreError
+
+    bind = op.get_bind()
+    for table, old, new in COLUMNS:
+        # Ancienne colonne conservée: seules les signatures créées depuis l'upgrade sont à restaurer
+        rows = bind.execute(sa.text(
+            f'SELECT id, tenant_id, {new} AS ref FROM {table} WHERE {new} IS NOT NULL AND {old} IS NULL'
+        ))
+        for row in rows.fetchall():
+            try:
+                data, content_type = open_ref(row.tenant_id, row.ref)
+            except BlobStoreError as e:
+                logger.warning(f"{table}.{new} {row.id} non restaurée: {e}")
+                continue
+            data_url = f"data:{content_type};base64,{base64.b64encode(data).decode()}"
+            bind.execute(sa.text(f'UPDATE {table} SET {old} = :data WHERE id = :id'), {'data': data_url, 'id': row.id})
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column(new)
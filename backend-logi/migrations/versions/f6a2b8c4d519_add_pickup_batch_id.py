@@ -0,0 +1,28 @@
+"""add batch_id to pickups
+
+Revision ID: f6a2b8c4d519
+Revises: e5f1a7b3c408
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a2b8c4d519'
+down_revision = 'e5f1a7b3c408'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pickups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sa.String(length=36), nullable=True))
+        batch_op.create_index('idx_pickup_batch', ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pickups', schema=None) as batch_op:
+        batch_op.drop_index('idx_pickup_batch')
+        batch_op.drop_column('batch_id')
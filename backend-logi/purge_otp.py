@@ -0,0 +1,29 @@
+"""
+Purge des codes OTP
+===================
+Supprime les codes expirés depuis plus de OTP_PURGE_AFTER_HOURS (utilisés
+ou non), par lots (app/services/otp_service.py).
+
+À planifier toutes les heures (cron Railway):
+    python purge_otp.py [--dry-run]
+"""
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault('FLASK_ENV', 'production')
+
+    from app import create_app
+    from app.services.otp_service import OTPService
+
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    dry_run = '--dry-run' in sys.argv[1:]
+
+    with app.app_context():
+        purged = OTPService.purge_expired(dry_run=dry_run)
+        print(f"[OTP] {purged} code(s) expiré(s) {'à supprimer' if dry_run else 'supprimé(s)'}.")
+
+
+if __name__ == '__main__':
+    main()
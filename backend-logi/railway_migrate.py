@@ -4,6 +4,8 @@ Railway migration script
 Runs database migrations on deploy.
 If Flask-Migrate is set up, runs `flask db upgrade`.
 Otherwise, falls back to `db.create_all()`.
+Missing tables are then created with `db.create_all()` (no-op when up to date),
+so the Procfile no longer boots a separate app just for that.
 """
 import os
 import sys
@@ -11,8 +13,9 @@ import sys
 def main():
     os.environ.setdefault('FLASK_ENV', 'production')
     
-    from app import create_app, db
+    from app import create_app, db, init_migrate
     app = create_app('production')
+    init_migrate(app)
     
     with app.app_context():
         try:
@@ -25,6 +28,11 @@ def main():
             print(f"[MIGRATE] Flask-Migrate not available or failed ({e}), using db.create_all()...")
             db.create_all()
             print("[MIGRATE] db.create_all() completed successfully.")
+            return
+        
+        # Tables sans migration (create_all ne crée que les manquantes)
+        db.create_all()
+        print("[MIGRATE] Missing tables created (db.create_all).")
 
 if __name__ == '__main__':
     main()
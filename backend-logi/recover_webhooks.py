@@ -0,0 +1,32 @@
+"""
+Reprise des webhooks transporteurs
+==================================
+Relance les événements restés 'queued' ou abandonnés en 'processing'
+(processus arrêté en cours de traitement), passe en 'dead' ceux qui ont
+dépassé WEBHOOK_MAX_ATTEMPTS (app/services/webhook_inbox.py). Chaque
+événement est réclamé avant traitement: sans risque si plusieurs instances
+tournent en même temps.
+
+À planifier toutes les 5 minutes (cron Railway):
+    python recover_webhooks.py
+"""
+import os
+
+
+def main():
+    os.environ.setdefault('FLASK_ENV', 'production')
+
+    from app import create_app
+    from app.services.webhook_inbox import WebhookInbox
+
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    # Traitement dans ce processus (pas de pool: le script s'arrête ensuite)
+    app.config['WEBHOOK_INBOX_ASYNC'] = False
+
+    with app.app_context():
+        result = WebhookInbox.recover()
+        print(f"[WEBHOOKS] {result['recovered']} événement(s) repris, {result['dead']} abandonné(s).")
+
+
+if __name__ == '__main__':
+    main()
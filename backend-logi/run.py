@@ -10,4 +10,10 @@ app = create_app(env)
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
-    app.run(debug=(env == 'development'), port=int(os.environ.get('PORT', 5000)))
+    port = int(os.environ.get('PORT', 5000))
+    from app.services.realtime_service import get_socketio
+    socketio = get_socketio()
+    if socketio:
+        socketio.run(app, debug=(env == 'development'), port=port, allow_unsafe_werkzeug=True)
+    else:
+        app.run(debug=(env == 'development'), port=port)
@@ -10,7 +10,8 @@ Creates:
   5. Default subscription plans
 
 Usage:
-    python seed.py
+    python seed.py            # sauté si ce fichier et les permissions/rôles n'ont pas changé
+    python seed.py --force    # relance toutes les étapes
 """
 
 import os
@@ -45,11 +46,29 @@ CLIENT_PASSWORD = 'client123'
 # ─────────────────────────────────────────────────────────────
 
 
-def seed():
+SEED_NAME = 'seed_script'
+
+
+def seed_digest():
+    """Empreinte du seed: ce fichier + permissions et rôles par défaut"""
+    from app.models.seed_version import SeedVersion
+    from app.models.permission import SYSTEM_PERMISSIONS
+    from app.models.role import DEFAULT_ROLES
+    with open(os.path.abspath(__file__), encoding='utf-8') as f:
+        return SeedVersion.compute_digest(f.read(), SYSTEM_PERMISSIONS, DEFAULT_ROLES)
+
+
+def seed(force=False):
     env = os.environ.get('FLASK_ENV', 'development')
     app = create_app(env)
 
     with app.app_context():
+        from app.models.seed_version import SeedVersion
+        digest = seed_digest()
+        if not force and SeedVersion.is_current(SEED_NAME, digest):
+            print('✓ Seed déjà appliqué (aucun changement) - python seed.py --force pour relancer')
+            return
+
         # 1. Create tables
         db.create_all()
         print('✓ Tables créées / vérifiées')
@@ -301,6 +320,9 @@ def seed():
         else:
             print(f'✓ Abonnement existe déjà (status: {sub.status})')
 
+        SeedVersion.mark(SEED_NAME, digest)
+        db.session.commit()
+
         # Done
         print('\n' + '=' * 50)
         print('SEED TERMINÉ')
@@ -312,4 +334,4 @@ def seed():
 
 
 if __name__ == '__main__':
-    seed()
+    seed(force='--force' in sys.argv[1:])
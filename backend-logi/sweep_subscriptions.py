@@ -0,0 +1,33 @@
+"""
+Cycle de vie des abonnements
+============================
+Expire les essais et périodes terminés, envoie les rappels de
+renouvellement et republie le snapshot des droits des tenants concernés
+(app/services/subscription_lifecycle.py).
+
+À planifier toutes les heures (cron Railway):
+    python sweep_subscriptions.py [--dry-run]
+"""
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault('FLASK_ENV', 'production')
+
+    from app import create_app
+    from app.services.subscription_lifecycle import SubscriptionLifecycle
+
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    dry_run = '--dry-run' in sys.argv[1:]
+
+    with app.app_context():
+        result = SubscriptionLifecycle.sweep(dry_run=dry_run)
+        suffix = ' (dry run)' if dry_run else ''
+        print(f"[SUBSCRIPTIONS] {result['expired_trials']} essai(s) expiré(s){suffix}")
+        print(f"[SUBSCRIPTIONS] {result['expired_periods']} période(s) expirée(s){suffix}")
+        print(f"[SUBSCRIPTIONS] {result['reminders']} rappel(s) de renouvellement{suffix}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Fixtures communes: application 'testing' (SQLite en mémoire), tenant,
+admin authentifié, client et colis, Redis factice.
+
+Lancer depuis backend-logi:
+    python -m pytest tests
+"""
+
+import fnmatch
+
+import pytest
+from flask_jwt_extended import create_access_token
+from redis.exceptions import WatchError
+
+from app import create_app, db
+from app.models import Package, Tenant, User
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def tenant(app):
+    tenant = Tenant(name='Test Cargo', slug='test-cargo', email='contact@test-cargo.com')
+    db.session.add(tenant)
+    db.session.commit()
+    return tenant
+
+
+def make_user(tenant, role='admin', email=None, **kwargs):
+    user = User(
+        tenant_id=tenant.id,
+        email=email or f'{role}@test-cargo.com',
+        password_hash='x',
+        role=role,
+        first_name=kwargs.pop('first_name', role.capitalize()),
+        last_name=kwargs.pop('last_name', 'Test'),
+        phone=kwargs.pop('phone', '+237699000000'),
+        **kwargs
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def admin(tenant):
+    return make_user(tenant, 'admin')
+
+
+def auth_headers(user) -> dict:
+    token = create_access_token(user.id, additional_claims={'tenant_id': user.tenant_id, 'role': user.role})
+    return {'Authorization': f'Bearer {token}', 'X-App-Channel': 'app_android_client'}
+
+
+@pytest.fixture
+def admin_headers(admin):
+    return auth_headers(admin)
+
+
+@pytest.fixture
+def customer(tenant):
+    return make_user(tenant, 'client', first_name='Awa', last_name='Ngono', phone='+237677000001')
+
+
+def make_package(tenant, customer, tracking='TRK-1', amount=0, paid_amount=0, status='arrived_port', **kwargs):
+    package = Package(
+        tenant_id=tenant.id, client_id=customer.id, tracking_number=tracking, description='Test',
+        status=status, amount=amount, paid_amount=paid_amount, **kwargs
+    )
+    db.session.add(package)
+    db.session.commit()
+    return package
+
+
+class FakeRedis:
+    """Sous-ensemble de redis.Redis utilisé par l'application (WATCH, sorted sets)"""
+
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.versions = {}
+
+    def _write(self, key, value):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = value
+        self._touch(key)
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self._write(key, value)
+
+    def incr(self, key):
+        self._write(key, str(int(self.data.get(key) or 0) + 1))
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self._write(key, None)
+
+    def scan_iter(self, pattern, count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+    def zremrangebyscore(self, name, low, high):
+        zset = self.zsets.setdefault(name, {})
+        for member in [m for m, score in zset.items() if low <= score <= high]:
+            del zset[member]
+        self._touch(name)
+
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+        self._touch(name)
+
+    def zcard(self, name):
+        return len(self.zsets.get(name, {}))
+
+    def zrange(self, name, start, end, withscores=False):
+        items = sorted(self.zsets.get(name, {}).items(), key=lambda item: item[1])[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def zrem(self, name, member):
+        self.zsets.get(name, {}).pop(member, None)
+        self._touch(name)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.watched = {}
+        self.commands = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, *keys):
+        self.watched = {key: self.redis.versions.get(key, 0) for key in keys}
+
+    def multi(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        if self.commands is None and self.watched:
+            return method  # mode immédiat après WATCH
+        if self.commands is None:
+            self.commands = []
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+
+    def execute(self):
+        if any(self.redis.versions.get(key, 0) != version for key, version in self.watched.items()):
+            raise WatchError('watched key changed')
+        results = [method(*args, **kwargs) for method, args, kwargs in self.commands or []]
+        self.commands = None
+        return results
@@ -0,0 +1,93 @@
+"""
+Fichiers du stockage local: références persistées, URL construites à la
+sérialisation avec l'hôte de la requête (ProxyFix derrière un proxy)
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app import create_app, db
+from app.models import Pickup
+from app.services.blob_store import blob_url, put_bytes, stored_ref
+from config import TestingConfig
+from tests.conftest import auth_headers, make_package
+
+KEY = f"{'ab' * 32}.webp"
+
+
+@pytest.fixture
+def local_storage(app, tmp_path):
+    app.config.update(UPLOAD_STORAGE_BACKEND='local', BLOB_STORE_DIR=str(tmp_path))
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_package_photo_persisted_as_reference(client, tenant, customer, local_storage):
+    package = make_package(tenant, customer)
+
+    response = client.post(
+        f'/api/uploads/package/{package.id}/photo', headers=auth_headers(customer),
+        data={'file': (io.BytesIO(png_bytes()), 'photo.png'), 'type': 'damage'},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()['url'].startswith('http://localhost/api/uploads/files/')
+    db.session.refresh(package)
+    photo = package.photos[0]
+    assert photo['ref'].startswith('local:')
+    assert 'url' not in photo and 'thumbnail' not in photo
+    assert photo['type'] == 'damage'
+
+
+def test_photo_urls_built_with_current_host(app, tenant, customer):
+    package = make_package(tenant, customer, photos=[
+        {'ref': f'local:{KEY}', 'thumbnail_ref': f'local:{KEY}', 'type': 'package'},
+        # Photo enregistrée avec une URL absolue interne: ramenée à sa référence
+        {'url': f'http://internal-host:8080/api/uploads/files/{KEY}', 'type': 'package'},
+        {'url': 'https://res.cloudinary.com/c/image/upload/x.jpg', 'public_id': 'x', 'type': 'label'},
+    ])
+
+    with app.test_request_context(base_url='https://api.example.com'):
+        photos = package.to_dict()['photos']
+
+    expected = f'https://api.example.com/api/uploads/files/{KEY}'
+    assert photos[0]['url'] == expected and photos[0]['thumbnail'] == expected
+    assert photos[1]['url'] == expected
+    assert photos[2]['url'] == 'https://res.cloudinary.com/c/image/upload/x.jpg'
+
+    # Hors requête: chemin relatif
+    assert package.to_dict()['photos'][0]['url'] == f'/api/uploads/files/{KEY}'
+
+
+def test_pickup_photo_url_stored_as_reference(app, tenant, customer):
+    package = make_package(tenant, customer)
+    proof = stored_ref(f'http://internal-host/api/uploads/files/{KEY}')
+    pickup = Pickup(tenant_id=tenant.id, package_id=package.id, client_id=customer.id,
+                    pickup_by='client', photo_proof=proof)
+
+    assert proof == f'local:{KEY}'
+    assert stored_ref('https://res.cloudinary.com/c/image/upload/x.jpg') == 'https://res.cloudinary.com/c/image/upload/x.jpg'
+    with app.test_request_context(base_url='https://api.example.com'):
+        assert pickup.to_dict()['photo_url'] == f'https://api.example.com/api/uploads/files/{KEY}'
+
+
+def test_proxy_fix_uses_forwarded_scheme_and_host(monkeypatch, tmp_path):
+    monkeypatch.setattr(TestingConfig, 'PROXY_FIX_HOPS', 1)
+    proxied = create_app('testing')
+    proxied.config['BLOB_STORE_DIR'] = str(tmp_path)
+    with proxied.app_context():
+        ref = put_bytes('t1', png_bytes(), 'image/png', 'local')
+    proxied.add_url_rule('/_test/blob-url', 'test_blob_url', lambda: blob_url('t1', ref))
+
+    response = proxied.test_client().get('/_test/blob-url', headers={
+        'X-Forwarded-Proto': 'https', 'X-Forwarded-Host': 'api.example.com'
+    })
+
+    assert response.get_data(as_text=True).startswith('https://api.example.com/api/uploads/files/')
@@ -0,0 +1,67 @@
+"""
+CloudinaryService: credentials du tenant passés à chaque appel, sans
+toucher la configuration globale (partagée entre threads et tenants)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+
+import cloudinary
+import cloudinary.uploader
+import cloudinary.utils
+import pytest
+
+from app.services.cloudinary_service import CloudinaryService
+
+TENANTS = {
+    'tenant-a': {'cloud_name': 'cloud-a', 'api_key': 'key-a', 'api_secret': 'secret-a'},
+    'tenant-b': {'cloud_name': 'cloud-b', 'api_key': 'key-b', 'api_secret': 'secret-b'},
+}
+
+
+@pytest.fixture
+def api_calls(monkeypatch):
+    """Appels à l'API Cloudinary: (tenant du dossier, URL, paramètres signés)"""
+    calls = []
+
+    def call_api(action, params, file=None, **options):
+        signed = cloudinary.utils.sign_request(dict(params), options)
+        url = cloudinary.utils.cloudinary_api_url(action, **options)
+        calls.append((params['folder'].split('/')[0], url, signed))
+        return {'public_id': f"{params['folder']}/x", 'secure_url': url}
+
+    monkeypatch.setattr(cloudinary.uploader, 'call_api', call_api)
+    monkeypatch.setattr(cloudinary.uploader, 'call_cacheable_api', call_api)
+    return calls
+
+
+def upload(tenant_id):
+    service = CloudinaryService(tenant_id, TENANTS[tenant_id])
+    return service.upload_image(io.BytesIO(b'img'), folder='packages', preprocessed=True)
+
+
+def test_each_upload_signed_with_its_tenant_credentials(api_calls):
+    global_cloud = cloudinary.config().cloud_name
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(upload, ['tenant-a', 'tenant-b'] * 20))
+
+    assert all(result.success for result in results)
+    assert len(api_calls) == 40
+    for tenant_id, url, signed in api_calls:
+        credentials = TENANTS[tenant_id]
+        assert f"/{credentials['cloud_name']}/" in url
+        assert signed['api_key'] == credentials['api_key']
+        expected = cloudinary.utils.api_sign_request(
+            {k: v for k, v in signed.items() if k not in ('api_key', 'signature')}, credentials['api_secret']
+        )
+        assert signed['signature'] == expected
+    assert cloudinary.config().cloud_name == global_cloud
+
+
+def test_urls_use_tenant_cloud():
+    service = CloudinaryService('tenant-b', TENANTS['tenant-b'])
+    CloudinaryService('tenant-a', TENANTS['tenant-a'])
+
+    assert service.get_url('tenant-b/packages/x').startswith('https://res.cloudinary.com/cloud-b/image/')
+    assert '/cloud-b/raw/upload/' in service.get_url('tenant-b/blobs/x', resource_type='raw')
@@ -0,0 +1,116 @@
+"""
+Cache des documents générés (DocumentCache): ETag / 304, réutilisation du
+rendu sur disque, nouvelle version à la modification de l'entité ou de la
+charte du tenant, pré-rendu abandonné au rollback
+"""
+
+import pytest
+
+from app import db
+from app.models import Invoice, Payment
+from app.services.document_cache import DocumentCache, TenantBranding
+from app.services.export_service import ExportResult
+
+
+class Renderer:
+    """render() compté, contenu différent à chaque rendu"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return ExportResult(success=True, data=f'%PDF-{self.calls}'.encode(),
+                            filename='doc.pdf', content_type='application/pdf')
+
+
+@pytest.fixture
+def cache_dir(app, tmp_path):
+    app.config['DOCUMENT_CACHE_DIR'] = str(tmp_path)
+    return tmp_path
+
+
+def serve(app, render, version='v1', branding='b1', etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    with app.test_request_context(headers=headers):
+        response = DocumentCache.serve('invoice', 't1', 'inv-1', version, render, branding)
+        return response.status_code, response.get_etag()[0], response.get_data()
+
+
+def test_rendered_once_then_served_from_disk(app, cache_dir):
+    render = Renderer()
+
+    status, etag, body = serve(app, render)
+    assert (status, body, render.calls) == (200, b'%PDF-1', 1)
+
+    status, second_etag, body = serve(app, render)
+    assert (status, second_etag, body, render.calls) == (200, etag, b'%PDF-1', 1)
+
+
+def test_if_none_match_returns_304_without_render(app):
+    render = Renderer()
+    _, etag, _ = serve(app, render)
+
+    status, same_etag, body = serve(app, render, etag=etag)
+
+    assert (status, same_etag, body) == (304, etag, b'')
+    assert render.calls == 1
+
+
+def test_new_entity_version_invalidates(app, cache_dir):
+    render = Renderer()
+    _, etag, _ = serve(app, render, version='v1')
+
+    status, new_etag, body = serve(app, render, version='v2', etag=etag)
+
+    assert status == 200 and new_etag != etag
+    assert body == b'%PDF-2' and render.calls == 2
+
+
+def test_new_branding_invalidates(app, cache_dir):
+    render = Renderer()
+    _, etag, _ = serve(app, render, branding='b1')
+
+    status, new_etag, _ = serve(app, render, branding='b2', etag=etag)
+
+    assert status == 200 and new_etag != etag
+    assert render.calls == 2
+
+
+def test_invoice_pdf_etag_follows_updates(client, tenant, admin, admin_headers, customer, cache_dir):
+    TenantBranding.invalidate()
+    invoice = Invoice(tenant_id=tenant.id, client_id=customer.id, invoice_number='INV-0001',
+                      description='Fret', amount=25000, created_by=admin.id)
+    db.session.add(invoice)
+    db.session.commit()
+    url = f'/api/admin/exports/invoice/{invoice.id}/pdf'
+
+    first = client.get(url, headers=admin_headers)
+    assert first.status_code == 200, first.get_json()
+    assert first.data.startswith(b'%PDF')
+    etag = first.headers['ETag']
+
+    assert client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag})).status_code == 304
+
+    invoice.amount = 30000
+    db.session.commit()
+
+    updated = client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert updated.status_code == 200
+    assert updated.headers['ETag'] != etag
+
+
+def test_prerender_dropped_on_rollback(app, tenant, customer, cache_dir, monkeypatch):
+    prerendered = []
+    monkeypatch.setattr(DocumentCache, 'prerender', prerendered.extend)
+
+    db.session.add(Payment(tenant_id=tenant.id, client_id=customer.id, amount=5000,
+                           method='cash', status='confirmed'))
+    db.session.flush()
+    db.session.rollback()
+
+    # Commit suivant sans paiement: rien à pré-rendre
+    customer.first_name = 'Awa'
+    db.session.commit()
+
+    assert prerendered == []
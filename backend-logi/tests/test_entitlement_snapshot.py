@@ -0,0 +1,85 @@
+"""
+Snapshot des droits partagé dans Redis (EnforcementService): un snapshot
+chargé avant le commit d'un changement n'est pas réécrit après
+l'invalidation; un changement annulé (rollback) n'invalide rien.
+"""
+
+import pytest
+
+from app import db
+from app.services import enforcement_service
+from app.services.enforcement_service import EnforcementService
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture
+def redis(app, monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(enforcement_service, 'get_redis', lambda: fake)
+    EnforcementService.invalidate()
+    yield fake
+    EnforcementService.invalidate()
+
+
+def shared(redis, tenant):
+    return redis.get(EnforcementService.SHARED_KEY.format(tenant.id))
+
+
+def test_snapshot_shared_between_workers(redis, tenant):
+    snapshot = EnforcementService.get_snapshot(tenant.id)
+
+    assert snapshot['tenant_active'] is True
+    assert shared(redis, tenant) is not None
+
+    # Autre worker: cache local vide, lecture Redis
+    EnforcementService._snapshots.clear()
+    assert EnforcementService.get_snapshot(tenant.id) == snapshot
+
+
+def test_commit_invalidates_shared_snapshot(redis, tenant):
+    EnforcementService.get_snapshot(tenant.id)
+
+    tenant.is_active = False
+    db.session.commit()
+
+    assert shared(redis, tenant) is None
+    assert EnforcementService.get_snapshot(tenant.id)['tenant_active'] is False
+
+
+def test_rolled_back_change_does_not_invalidate(redis, tenant):
+    EnforcementService.get_snapshot(tenant.id)
+
+    tenant.is_active = False
+    db.session.flush()
+    db.session.rollback()
+
+    # Commit suivant sans changement de droits: snapshot conservé
+    db.session.commit()
+
+    assert shared(redis, tenant) is not None
+
+
+def test_stale_snapshot_not_written_back_after_invalidation(redis, tenant):
+    # Lecteur: cache manquant, chargement en base avant le commit
+    _, generation = EnforcementService._read_shared(tenant.id)
+    stale = EnforcementService._load(tenant.id)
+
+    tenant.is_active = False
+    db.session.commit()
+
+    # Écriture du lecteur après l'invalidation: refusée
+    EnforcementService._write_shared(tenant.id, stale, generation)
+    assert shared(redis, tenant) is None
+
+    assert EnforcementService.get_snapshot(tenant.id)['tenant_active'] is False
+    assert '"tenant_active": false' in shared(redis, tenant)
+
+
+def test_plan_change_invalidates_all_tenants(redis, tenant):
+    _, generation = EnforcementService._read_shared(tenant.id)
+    stale = EnforcementService._load(tenant.id)
+
+    EnforcementService.invalidate()
+
+    EnforcementService._write_shared(tenant.id, stale, generation)
+    assert shared(redis, tenant) is None
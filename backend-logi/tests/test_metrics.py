@@ -0,0 +1,18 @@
+"""
+Accès à /metrics: jeton Bearer, refus sans jeton quand METRICS_PUBLIC est faux
+"""
+
+
+def test_metrics_public_without_token(app, client):
+    assert client.get('/metrics').status_code == 200
+
+
+def test_metrics_refused_without_token_when_not_public(app, client):
+    app.config['METRICS_PUBLIC'] = False
+    assert client.get('/metrics').status_code == 403
+
+
+def test_metrics_token_required(app, client):
+    app.config.update(METRICS_TOKEN='secret', METRICS_PUBLIC=False)
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
@@ -0,0 +1,82 @@
+"""
+Signatures de retrait: espace privé du tenant, jamais servi par la route
+publique des fichiers, référence d'un autre tenant refusée
+"""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app import db
+from app.models import Pickup, Tenant
+from app.services.blob_store import BlobStoreError, exists_ref, open_ref, put_bytes
+from tests.conftest import auth_headers, make_package, make_user
+
+
+@pytest.fixture
+def local_storage(app, tmp_path):
+    app.config.update(BLOB_STORE_BACKEND='local', BLOB_STORE_DIR=str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def other_admin(app):
+    other = Tenant(name='Other Cargo', slug='other-cargo', email='contact@other-cargo.com')
+    db.session.add(other)
+    db.session.commit()
+    return make_user(other, 'admin', email='admin@other-cargo.com')
+
+
+def signature_data_url(color='black'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (20, 10), color).save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def upload_signature(client, headers, color='black'):
+    response = client.post('/api/pickups/upload-signature', headers=headers,
+                           json={'signature': signature_data_url(color)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['signature_ref']
+
+
+def test_signature_stored_in_tenant_private_space(client, tenant, admin_headers, local_storage):
+    ref = upload_signature(client, admin_headers)
+    key = ref.split(':', 1)[1]
+
+    assert ref.startswith('private:')
+    assert (local_storage / 'private' / tenant.id / key[:2] / key[2:4] / key).is_file()
+    assert client.get(f'/api/uploads/files/{key}').status_code == 404
+
+
+def test_signature_ref_of_other_tenant_rejected(client, tenant, admin_headers, customer, other_admin, local_storage):
+    foreign = upload_signature(client, auth_headers(other_admin), color='blue')
+    package = make_package(tenant, customer)
+
+    assert exists_ref(other_admin.tenant_id, foreign, private=True)
+    assert not exists_ref(tenant.id, foreign, private=True)
+
+    response = client.post('/api/pickups/batch', headers=admin_headers, json={
+        'package_ids': [package.id], 'pickup_by': 'client', 'signature_ref': foreign
+    })
+
+    assert response.status_code == 400
+    assert Pickup.query.count() == 0
+
+
+def test_public_blob_not_accepted_as_signature(app, tenant, local_storage):
+    public = put_bytes(tenant.id, b'%PDF-1', 'application/pdf', 'local')
+
+    assert exists_ref(tenant.id, public)
+    assert not exists_ref(tenant.id, public, private=True)
+
+
+def test_signature_read_only_with_owner_tenant(client, tenant, admin_headers, other_admin, local_storage):
+    ref = upload_signature(client, admin_headers)
+
+    data, content_type = open_ref(tenant.id, ref)
+    assert content_type == 'image/png' and data.startswith(b'\x89PNG')
+    with pytest.raises(BlobStoreError):
+        open_ref(other_admin.tenant_id, ref)
@@ -0,0 +1,105 @@
+"""
+Retrait groupé (/api/pickups/batch): colis payés et impayés d'un même client;
+file du guichet et planches de QR codes
+"""
+
+from app import db
+from app.models import Package, PackageHistory, PackagePayment, Payment, Pickup
+from app.routes.pickups import QR_SHEET_MAX
+from tests.conftest import make_package, make_user
+
+
+def test_batch_pickup_mixed_paid_and_unpaid(client, tenant, admin_headers, customer):
+    unpaid = make_package(tenant, customer, 'TRK-UNPAID', 10000)
+    partial = make_package(tenant, customer, 'TRK-PARTIAL', 8000, paid_amount=3000)
+    paid = make_package(tenant, customer, 'TRK-PAID', 5000, paid_amount=5000)
+    ids = [unpaid.id, partial.id, paid.id]
+
+    response = client.post('/api/pickups/batch', headers=admin_headers, json={
+        'package_ids': ids, 'pickup_by': 'client', 'payment': {'method': 'cash'}
+    })
+
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body['amount_collected'] == 15000
+    assert len(body['pickups']) == 3
+
+    db.session.expire_all()
+    payment = db.session.get(Payment, body['payment_id'])
+    assert payment.amount == 15000
+    links = {link.package_id: link.amount for link in PackagePayment.query.filter_by(payment_id=payment.id)}
+    assert links == {unpaid.id: 10000, partial.id: 5000}
+
+    for package in Package.query.filter(Package.id.in_(ids)):
+        assert package.status == 'delivered'
+        assert package.paid_amount == package.amount
+        assert package.picked_up_by == customer.full_name
+
+    pickups = {p.package_id: p for p in Pickup.query.filter_by(batch_id=body['batch_id'])}
+    assert pickups[paid.id].payment_id is None
+    assert not pickups[paid.id].payment_required
+    assert pickups[partial.id].payment_collected == 5000
+    assert pickups[unpaid.id].payment_id == payment.id
+    assert PackageHistory.query.filter(PackageHistory.package_id.in_(ids), PackageHistory.status == 'delivered').count() == 3
+
+
+def test_batch_pickup_requires_payment_for_unpaid(client, tenant, admin_headers, customer):
+    unpaid = make_package(tenant, customer, 'TRK-UNPAID', 10000)
+    paid = make_package(tenant, customer, 'TRK-PAID', 5000, paid_amount=5000)
+
+    response = client.post('/api/pickups/batch', headers=admin_headers, json={
+        'package_ids': [unpaid.id, paid.id], 'pickup_by': 'client'
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['remaining_amount'] == 10000
+    db.session.expire_all()
+    assert {p.status for p in Package.query} == {'arrived_port'}
+    assert Pickup.query.count() == 0
+
+
+def test_batch_pickup_all_paid_creates_no_payment(client, tenant, admin_headers, customer):
+    first = make_package(tenant, customer, 'TRK-1', 5000, paid_amount=5000)
+    second = make_package(tenant, customer, 'TRK-2', 0)
+
+    response = client.post('/api/pickups/batch', headers=admin_headers, json={
+        'package_ids': [first.id, second.id], 'pickup_by': 'client'
+    })
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['payment_id'] is None
+    assert Payment.query.count() == 0
+
+
+def test_batch_pickup_rejects_other_client(client, tenant, admin_headers, customer):
+    other = make_user(tenant, 'client', email='other@test-cargo.com')
+    mine = make_package(tenant, customer, 'TRK-1', 0)
+    theirs = make_package(tenant, other, 'TRK-2', 0)
+
+    response = client.post('/api/pickups/batch', headers=admin_headers, json={
+        'package_ids': [mine.id, theirs.id], 'pickup_by': 'client'
+    })
+
+    assert response.status_code == 400
+
+
+def test_desk_lists_package_without_paid_amount(client, tenant, admin_headers, customer):
+    package = make_package(tenant, customer, 'TRK-NULL', 7000)
+    # Lignes historiques: paid_amount NULL en base (le défaut ORM ne s'applique pas)
+    db.session.execute(db.update(Package).where(Package.id == package.id).values(paid_amount=None))
+    db.session.commit()
+
+    response = client.get('/api/pickups/desk', headers=admin_headers)
+
+    assert response.status_code == 200, response.get_json()
+    row, = response.get_json()['queue']['packages']
+    assert (row['payment_status'], row['remaining']) == ('unpaid', 7000)
+    assert not package.is_paid and package.remaining_amount == 7000
+
+
+def test_qr_sheet_rejects_selection_over_limit(client, admin_headers):
+    response = client.post('/api/pickups/qr/sheet', headers=admin_headers, json={
+        'package_ids': [f'pkg-{i}' for i in range(QR_SHEET_MAX + 1)]
+    })
+
+    assert response.status_code == 400
@@ -0,0 +1,29 @@
+"""
+En-tête Server-Timing (app/utils/sql_instrumentation.py): absent par défaut
+hors DEBUG, exposé avec SQL_SERVER_TIMING ou pour un super-admin X-Profile.
+"""
+
+from flask_jwt_extended import create_access_token
+
+
+def test_server_timing_hidden_by_default(app, client):
+    app.config['SQL_SERVER_TIMING'] = False
+
+    response = client.get('/api/health')
+
+    assert 'Server-Timing' not in response.headers
+
+
+def test_server_timing_with_flag(app, client):
+    response = client.get('/api/health')
+
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+
+
+def test_server_timing_for_profiled_superadmin(app, client, admin_headers):
+    app.config['SQL_SERVER_TIMING'] = False
+    token = create_access_token('sa-1', additional_claims={'type': 'superadmin'})
+
+    assert 'Server-Timing' not in client.get('/api/health', headers=dict(admin_headers, **{'X-Profile': '1'})).headers
+    response = client.get('/api/health', headers={'Authorization': f'Bearer {token}', 'X-Profile': '1'})
+    assert 'Server-Timing' in response.headers
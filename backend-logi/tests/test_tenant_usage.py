@@ -0,0 +1,56 @@
+"""
+Compteurs de quota (TenantUsage.try_increment): limite atteinte, illimité,
+initialisation depuis les colis existants
+"""
+
+from datetime import datetime
+
+from app import db
+from app.models import Package
+from app.models.tenant_usage import TenantUsage
+
+PACKAGES = TenantUsage.RESOURCE_PACKAGES
+
+
+def test_increment_up_to_limit_then_refuse(tenant):
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=2)
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=2)
+    db.session.commit()
+
+    assert not TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=2)
+    db.session.commit()
+    assert TenantUsage.get(tenant.id, PACKAGES) == 2
+
+
+def test_amount_exceeding_remaining_is_refused_whole(tenant):
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 3, limit=5)
+
+    assert not TenantUsage.try_increment(tenant.id, PACKAGES, 3, limit=5)
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 2, limit=5)
+    db.session.commit()
+    assert TenantUsage.get(tenant.id, PACKAGES) == 5
+
+
+def test_unlimited(tenant):
+    for _ in range(3):
+        assert TenantUsage.try_increment(tenant.id, PACKAGES, 10, limit=-1)
+    db.session.commit()
+    assert TenantUsage.get(tenant.id, PACKAGES) == 30
+
+
+def test_counter_initialised_from_existing_packages(tenant, admin):
+    for i in range(2):
+        db.session.add(Package(tenant_id=tenant.id, client_id=admin.id, tracking_number=f'TRK-{i}',
+                               description='Test', created_at=datetime.utcnow()))
+    db.session.commit()
+
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=3)
+    assert not TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=3)
+    db.session.commit()
+    assert TenantUsage.get(tenant.id, PACKAGES) == 3
+
+
+def test_periods_are_separate(tenant):
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=1, period='2026-09')
+    assert TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=1, period='2026-10')
+    assert not TenantUsage.try_increment(tenant.id, PACKAGES, 1, limit=1, period='2026-10')
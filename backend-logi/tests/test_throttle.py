@@ -0,0 +1,79 @@
+"""
+Limitation par fenêtre glissante (SlidingWindow): refus au-delà de la
+limite, retry_after, refus non comptés, repli local et Redis
+"""
+
+import pytest
+
+from app.utils import throttle
+from app.utils.throttle import SlidingWindow, parse_windows
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture(params=['local', 'redis'])
+def backend(request, app, monkeypatch):
+    fake = FakeRedis() if request.param == 'redis' else None
+    monkeypatch.setattr(throttle, 'get_redis', lambda: fake)
+    SlidingWindow.reset()
+    yield fake
+    SlidingWindow.reset()
+
+
+def test_parse_windows():
+    assert parse_windows('3/600, 10/86400') == [(3, 600), (10, 86400)]
+    assert parse_windows('') == []
+
+
+def test_refused_beyond_limit_with_retry_after(backend):
+    windows = [(3, 600)]
+    for now in (1000, 1010, 1020):
+        assert SlidingWindow.hit('otp:a', windows, now=now) == (True, 0)
+
+    # Libre quand l'envoi de 1000 sort de la fenêtre
+    assert SlidingWindow.hit('otp:a', windows, now=1030) == (False, 571)
+
+
+def test_refusal_not_counted(backend):
+    windows = [(2, 600)]
+    SlidingWindow.hit('otp:a', windows, now=1000)
+    SlidingWindow.hit('otp:a', windows, now=1100)
+    for now in (1200, 1300, 1500):
+        assert not SlidingWindow.hit('otp:a', windows, now=now)[0]
+
+    # Les refus n'ont pas prolongé le blocage
+    assert SlidingWindow.hit('otp:a', windows, now=1601) == (True, 0)
+    assert SlidingWindow.hit('otp:a', windows, now=1650) == (False, 51)
+
+
+def test_longest_blocking_window_wins(backend):
+    windows = [(2, 60), (3, 3600)]
+    assert SlidingWindow.hit('otp:a', windows, now=0)[0]
+    assert SlidingWindow.hit('otp:a', windows, now=10)[0]
+    assert SlidingWindow.hit('otp:a', windows, now=20) == (False, 41)
+    assert SlidingWindow.hit('otp:a', windows, now=61)[0]
+
+    # Fenêtre courte libre, fenêtre longue pleine
+    assert SlidingWindow.hit('otp:a', windows, now=130) == (False, 3471)
+
+
+def test_keys_are_independent(backend):
+    windows = [(1, 600)]
+    assert SlidingWindow.hit('otp:a', windows, now=1000)[0]
+    assert not SlidingWindow.hit('otp:a', windows, now=1001)[0]
+    assert SlidingWindow.hit('otp:b', windows, now=1001)[0]
+
+
+def test_redis_error_falls_back_to_local(app, monkeypatch):
+    class Broken:
+        def pipeline(self):
+            raise ConnectionError('down')
+
+    unavailable = []
+    monkeypatch.setattr(throttle, 'get_redis', lambda: Broken())
+    monkeypatch.setattr(throttle, 'mark_unavailable', unavailable.append)
+    SlidingWindow.reset()
+
+    assert SlidingWindow.hit('otp:c', [(1, 600)], now=1000) == (True, 0)
+    assert SlidingWindow.hit('otp:c', [(1, 600)], now=1001) == (False, 600)
+    assert len(unavailable) == 2
+    SlidingWindow.reset()
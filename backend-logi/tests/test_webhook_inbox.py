@@ -0,0 +1,122 @@
+"""Boîte de réception des webhooks: réclamation atomique et reprise idempotente"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import WebhookEvent
+from app.services.webhook_inbox import WebhookInbox
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Mises à jour de tracking appliquées (update_package_status espionné)"""
+    calls = []
+
+    def fake_update(**kwargs):
+        calls.append(kwargs['tracking_number'])
+        return {'success': True, 'updated_packages': 1, 'notified_clients': 1}
+
+    monkeypatch.setattr('app.routes.webhooks.update_package_status', fake_update)
+    return calls
+
+
+def make_event(tenant, tracking='TRK-1', status=WebhookEvent.STATUS_QUEUED, **kwargs):
+    payload = json.dumps({'tracking_number': tracking, 'status': 'in_transit'})
+    event = WebhookEvent(
+        tenant_id=tenant.id,
+        provider='generic',
+        payload=payload,
+        content_hash=WebhookEvent.hash_payload(payload.encode()),
+        status=status,
+        **kwargs
+    )
+    db.session.add(event)
+    db.session.commit()
+    return event.id
+
+
+def test_claim_is_exclusive(tenant):
+    event_id = make_event(tenant)
+
+    assert WebhookInbox.claim(event_id) is True
+    assert WebhookInbox.claim(event_id) is False
+
+    event = db.session.get(WebhookEvent, event_id)
+    db.session.refresh(event)
+    assert event.status == WebhookEvent.STATUS_PROCESSING
+    assert event.attempts == 1
+    assert event.claimed_at is not None
+
+
+def test_recover_processes_fresh_queued_event_once(tenant, applied):
+    event_id = make_event(tenant)
+
+    assert WebhookInbox.recover() == {'recovered': 1, 'dead': 0}
+    # Deuxième passage (autre worker, cron): rien à reprendre
+    assert WebhookInbox.recover() == {'recovered': 0, 'dead': 0}
+
+    assert applied == ['TRK-1']
+    event = db.session.get(WebhookEvent, event_id)
+    db.session.refresh(event)
+    assert event.status == WebhookEvent.STATUS_PROCESSED
+    assert event.attempts == 1
+
+
+def test_recover_skips_event_claimed_elsewhere(tenant, applied):
+    make_event(tenant, status=WebhookEvent.STATUS_PROCESSING, claimed_at=datetime.utcnow(), attempts=1)
+
+    assert WebhookInbox.recover() == {'recovered': 0, 'dead': 0}
+    assert applied == []
+
+
+def test_recover_requeues_abandoned_processing(tenant, applied):
+    event_id = make_event(
+        tenant, status=WebhookEvent.STATUS_PROCESSING,
+        claimed_at=datetime.utcnow() - timedelta(hours=1), attempts=1
+    )
+
+    assert WebhookInbox.recover() == {'recovered': 1, 'dead': 0}
+
+    assert applied == ['TRK-1']
+    event = db.session.get(WebhookEvent, event_id)
+    db.session.refresh(event)
+    assert event.status == WebhookEvent.STATUS_PROCESSED
+    assert event.attempts == 2
+
+
+def test_recover_dead_letters_after_max_attempts(app, tenant, applied):
+    app.config['WEBHOOK_MAX_ATTEMPTS'] = 3
+    event_id = make_event(
+        tenant, status=WebhookEvent.STATUS_PROCESSING,
+        claimed_at=datetime.utcnow() - timedelta(hours=1), attempts=3
+    )
+
+    assert WebhookInbox.recover() == {'recovered': 0, 'dead': 1}
+
+    assert applied == []
+    event = db.session.get(WebhookEvent, event_id)
+    db.session.refresh(event)
+    assert event.status == WebhookEvent.STATUS_DEAD
+
+
+def test_replay_ignores_event_in_progress(tenant, applied):
+    event_id = make_event(tenant, status=WebhookEvent.STATUS_PROCESSING, claimed_at=datetime.utcnow(), attempts=1)
+
+    assert WebhookInbox.replay(db.session.get(WebhookEvent, event_id)) == 0
+    assert applied == []
+
+
+def test_ingest_processes_and_deduplicates(tenant, applied):
+    raw = json.dumps({'tracking_number': 'TRK-2', 'status': 'delivered'}).encode()
+
+    event, duplicate = WebhookInbox.ingest(tenant.id, 'generic', raw)
+    assert duplicate is False
+    again, duplicate = WebhookInbox.ingest(tenant.id, 'generic', raw)
+    assert duplicate is True and again.id == event.id
+
+    assert applied == ['TRK-2']
+    assert WebhookInbox.recover() == {'recovered': 0, 'dead': 0}
+    assert applied == ['TRK-2']